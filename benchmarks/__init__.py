@@ -0,0 +1,12 @@
+## @file __init__.py
+#  @brief Benchmarks of the signing and key generating applications.
+#  @details The benchmarks are run from the repository root, e.g. `python -m benchmarks.bench_timestamping`.
+#           The signing application imports its services as the top-level `services` package,
+#           so its directory is added to the import path here.
+
+import os
+import sys
+
+_SIGNING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "signing")
+if _SIGNING_DIR not in sys.path:
+    sys.path.insert(0, _SIGNING_DIR)
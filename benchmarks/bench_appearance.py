@@ -0,0 +1,73 @@
+## @file bench_appearance.py
+#  @brief Compares the signature appearance modes of `pdf_signer.sign`.
+#  @details Signs the same document with every appearance mode and prints the time per document,
+#           the time spent on the PDF itself (where the appearance is built) and the
+#           size of the signed document. Timestamps are disabled so they do not hide the difference.
+#           Run from the repository root: `python -m benchmarks.bench_appearance`.
+
+import argparse
+import os
+import statistics
+import tempfile
+
+from services import instrumentation, pdf_signer
+from services.pdf_signer import NoTimestamps
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the signature appearance modes of the PDF signer.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured signatures per mode")
+    parser.add_argument("--pages", type=int, default=1, help="number of pages of the signed document")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    sink = instrumentation.MemorySink()
+    instrumentation.enable(sink)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_in_path = os.path.join(directory, "in.pdf")
+        pdf_out_path = os.path.join(directory, "out.pdf")
+        write_pdf(pdf_in_path, pages=args.pages)
+
+        for appearance in pdf_signer.APPEARANCE_MODES:
+            sign = lambda: pdf_signer.sign(private_key, pdf_in_path, pdf_out_path, NoTimestamps(), appearance)
+            sign()
+            sink.clear()
+            result = measure(sign, args.repeat, warmup=0)
+            overheads = _pdf_times(sink.records)
+            rows.append([appearance, result["median"], statistics.median(overheads), os.path.getsize(pdf_out_path)])
+
+    instrumentation.disable()
+    visible_size = rows[0][3]
+    for row in rows:
+        row.append(visible_size - row[3])
+    print_table(["appearance", "median s", "pdf s", "output bytes", "saved bytes"], rows)
+
+
+## @brief Computes the time of every signature spent outside of the RSA operations and the certificate generation.
+#  @param records The span records of the measured signatures.
+#  @type records list[instrumentation.SpanRecord]
+#  @return The times in seconds, one per signature.
+#  @rtype list[float]
+def _pdf_times(records: list) -> list[float]:
+    overheads, rsa_time = [], 0.0
+    for record in records:
+        if record.name in ("sign.rsa", "sign.cert_generation"):
+            rsa_time += record.wall_time
+        elif record.name == "sign":
+            overheads.append(record.wall_time - rsa_time)
+            rsa_time = 0.0
+    return overheads
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+## @file bench_async.py
+#  @brief Shows the event loop latency while documents are signed from asyncio code.
+#  @details A probe task asks to be woken up every few milliseconds and records how late it
+#           actually runs. The lateness is measured while the loop is idle, while it calls the
+#           blocking `sign` directly and while it awaits `async_sign` with a concurrency limit.
+#           Run from the repository root: `python -m benchmarks.bench_async`.
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import pdf_signer
+from services.instrumentation import LatencyTracker
+from services.pdf_signer import NoTimestamps
+
+from .common import generate_private_key, print_table, write_pdf
+
+## @var PROBE_INTERVAL
+#  @brief Interval in seconds at which the probe task asks to be woken up.
+PROBE_INTERVAL = 0.005
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the event loop latency of the async signing API.")
+    parser.add_argument("--documents", type=int, default=8, help="number of documents signed per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximal number of documents signed at once")
+    return parser.parse_args()
+
+
+## @brief Records how late the probe task wakes up until cancelled.
+#  @param tracker The tracker receiving the lateness in seconds.
+#  @type tracker LatencyTracker
+async def probe(tracker: LatencyTracker):
+    while True:
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        tracker.record(time.perf_counter() - expected)
+
+
+## @brief Runs a workload next to the probe task.
+#  @param workload The coroutine function of the workload.
+#  @return The lateness snapshot of the probe and the duration of the workload in seconds.
+#  @rtype tuple[dict, float]
+async def run_scenario(workload) -> tuple[dict, float]:
+    tracker = LatencyTracker()
+    probe_task = asyncio.create_task(probe(tracker))
+    await asyncio.sleep(10 * PROBE_INTERVAL)
+    start = time.perf_counter()
+    await workload()
+    duration = time.perf_counter() - start
+    probe_task.cancel()
+    return tracker.snapshot(), duration
+
+
+async def benchmark(args: argparse.Namespace, private_key, directory: str) -> list[list]:
+    pdf_in_path = os.path.join(directory, "in.pdf")
+    write_pdf(pdf_in_path, pages=10)
+    out_paths = [os.path.join(directory, f"out-{i}.pdf") for i in range(args.documents)]
+    executor = ThreadPoolExecutor(args.concurrency)
+    limiter = asyncio.Semaphore(args.concurrency)
+
+    async def idle():
+        await asyncio.sleep(1.0)
+
+    async def blocking():
+        # pyhanko runs its own event loop inside sign, so it cannot be called from a coroutine
+        # directly; waiting for it on another thread blocks the loop the same way
+        for out_path in out_paths:
+            executor.submit(pdf_signer.sign, private_key, pdf_in_path, out_path, NoTimestamps()).result()
+            await asyncio.sleep(0)
+
+    async def non_blocking():
+        await asyncio.gather(*(pdf_signer.async_sign(private_key, pdf_in_path, out_path, NoTimestamps(),
+                                                     executor=executor, limiter=limiter)
+                               for out_path in out_paths))
+
+    rows = []
+    for name, workload in (("idle", idle), ("sign", blocking), ("async_sign", non_blocking)):
+        lateness, duration = await run_scenario(workload)
+        documents = 0 if workload is idle else args.documents
+        rows.append([name, lateness["p50"], lateness["p95"], lateness["max"], documents / duration])
+    executor.shutdown()
+    return rows
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    with tempfile.TemporaryDirectory() as directory:
+        rows = asyncio.run(benchmark(args, private_key, directory))
+    print_table(["workload", "lag p50 s", "lag p95 s", "lag max s", "documents/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+## @file bench_batch_dss.py
+#  @brief Measures what sharing one certificate and one DSS across a batch saves.
+#  @details Signs a batch of documents with a certificate generated per document and with credentials
+#           created once for the batch, with and without an embedded DSS, then verifies the signed
+#           documents with a single `VerifierSession`, which reuses its validation context for
+#           documents with the same certificate and DSS. The time of creating the shared credentials
+#           is included in the batch time.
+#           Run from the repository root: `python -m benchmarks.bench_batch_dss`.
+
+import argparse
+import os
+import tempfile
+import time
+
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps, VerifierSession, create_signing_credentials
+
+from .common import generate_private_key, print_table, write_pdf
+
+## @var CASES
+#  @brief Whether the credentials are shared and whether the DSS is embedded, by case name.
+CASES = {
+    "certificate per document": (False, False),
+    "shared certificate": (True, False),
+    "shared certificate + DSS": (True, True),
+}
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks batch-level certificates and validation data.")
+    parser.add_argument("--documents", type=int, default=50, help="number of documents per batch")
+    parser.add_argument("--pages", type=int, default=1, help="number of pages per document")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    public_key = private_key.public_key()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "unsigned.pdf")
+        write_pdf(path, pages=args.pages)
+        with open(path, "rb") as f:
+            unsigned = f.read()
+
+    rows = []
+    for name, (shared, embed_dss) in CASES.items():
+        start = time.perf_counter()
+        credentials = create_signing_credentials(private_key, pdf_signer.DEFAULT_DIGEST_ALGORITHM) if shared else None
+        signed = [pdf_signer.sign_bytes(private_key, unsigned, NoTimestamps(), embed_dss=embed_dss,
+                                        credentials=credentials)
+                  for _ in range(args.documents)]
+        sign_seconds = time.perf_counter() - start
+
+        session = VerifierSession(public_key)
+        start = time.perf_counter()
+        assert all(session.verify_stream(data) for data in signed)
+        verify_seconds = time.perf_counter() - start
+
+        rows.append([name, sign_seconds / args.documents * 1000, verify_seconds / args.documents * 1000])
+
+    print_table(["batch", "sign ms/doc", "verify ms/doc"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+## @file bench_bytes_api.py
+#  @brief Compares `sign_bytes` and `verify_bytes` with the path-based API for documents held in memory.
+#  @details A web service receiving a document has to write it to a temporary file for `sign` and
+#           `verify`, and read the signed document back. The benchmark measures that round trip
+#           against the in-memory functions for a small and a medium document.
+#           Run from the repository root: `python -m benchmarks.bench_bytes_api`.
+
+import argparse
+import os
+import tempfile
+
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+## @var DOCUMENT_SIZES
+#  @brief Padding of the benchmark documents in bytes, by name.
+DOCUMENT_SIZES = {"small": 0, "medium": 5 * 1024 * 1024}
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the in-memory signing and verification API.")
+    parser.add_argument("--repeat", type=int, default=20, help="number of measured calls per variant")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    public_key = private_key.public_key()
+    timestamp_policy = NoTimestamps()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        in_path = os.path.join(directory, "upload.pdf")
+        out_path = os.path.join(directory, "signed.pdf")
+
+        for name, padding_bytes in DOCUMENT_SIZES.items():
+            write_pdf(in_path, padding_bytes=padding_bytes)
+            with open(in_path, "rb") as f:
+                data = f.read()
+            signed = pdf_signer.sign_bytes(private_key, data, timestamp_policy)
+
+            def sign_through_files():
+                with open(in_path, "wb") as f:
+                    f.write(data)
+                pdf_signer.sign(private_key, in_path, out_path, timestamp_policy)
+                with open(out_path, "rb") as f:
+                    return f.read()
+
+            def verify_through_file():
+                with open(out_path, "wb") as f:
+                    f.write(signed)
+                return pdf_signer.verify(public_key, out_path)
+
+            variants = [
+                ("sign", "files", sign_through_files),
+                ("sign", "sign_bytes", lambda: pdf_signer.sign_bytes(private_key, data, timestamp_policy)),
+                ("verify", "file", verify_through_file),
+                ("verify", "verify_bytes", lambda: pdf_signer.verify_bytes(public_key, signed)),
+            ]
+            for operation, variant, function in variants:
+                result = measure(function, args.repeat)
+                rows.append([f"{name} ({len(data) / 1024:.1f} KiB)", operation, variant,
+                             result["median"] * 1000, result["p95"] * 1000])
+
+    print_table(["document", "operation", "variant", "median ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
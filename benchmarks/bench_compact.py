@@ -0,0 +1,82 @@
+## @file bench_compact.py
+#  @brief Measures the savings of the compact signature revision of `pdf_signer.sign`.
+#  @details Signs a small synthetic corpus (documents of several page counts, with cross-reference
+#           streams and with classic tables) with and without `compact` and prints, per document
+#           kind, the size of the appended revision and the time spent writing it (the PDF part
+#           of the signing, without the RSA operations). Timestamps are disabled.
+#           Run from the repository root: `python -m benchmarks.bench_compact`.
+
+import argparse
+import os
+import statistics
+import tempfile
+
+from services import instrumentation, pdf_signer
+from services.pdf_signer import NoTimestamps
+
+from .common import generate_private_key, print_table, write_pdf
+
+## @var PAGE_COUNTS
+#  @brief Page counts of the corpus documents.
+PAGE_COUNTS = (1, 10, 100)
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the compact signature revision of the PDF signer.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured signatures per document and mode")
+    parser.add_argument("--appearance", choices=pdf_signer.APPEARANCE_MODES, default=pdf_signer.APPEARANCE_VISIBLE,
+                        help="appearance of the signature field")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    sink = instrumentation.MemorySink()
+    instrumentation.enable(sink)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_out_path = os.path.join(directory, "out.pdf")
+        for stream_xrefs in (True, False):
+            for pages in PAGE_COUNTS:
+                pdf_in_path = os.path.join(directory, f"in-{pages}-{stream_xrefs}.pdf")
+                write_pdf(pdf_in_path, pages=pages, stream_xrefs=stream_xrefs)
+                input_size = os.path.getsize(pdf_in_path)
+
+                results = {}
+                for compact in (False, True):
+                    sink.clear()
+                    for _ in range(args.repeat):
+                        pdf_signer.sign(private_key, pdf_in_path, pdf_out_path, NoTimestamps(), args.appearance, compact)
+                    results[compact] = (os.path.getsize(pdf_out_path) - input_size, statistics.median(_write_times(sink.records)))
+
+                (plain_size, plain_time), (compact_size, compact_time) = results[False], results[True]
+                rows.append(["stream" if stream_xrefs else "table", pages, plain_size, compact_size,
+                             plain_size - compact_size, plain_time, compact_time])
+
+    instrumentation.disable()
+    print_table(["xref", "pages", "revision bytes", "compact bytes", "saved bytes", "write s", "compact write s"], rows)
+
+
+## @brief Computes the time of every signature spent in `sign.pdf_sign` outside of the RSA operations.
+#  @param records The span records of the measured signatures.
+#  @type records list[instrumentation.SpanRecord]
+#  @return The times in seconds, one per signature.
+#  @rtype list[float]
+def _write_times(records: list) -> list[float]:
+    times, rsa_time = [], 0.0
+    for record in records:
+        if record.name == "sign.rsa":
+            rsa_time += record.wall_time
+        elif record.name == "sign.pdf_sign":
+            times.append(record.wall_time - rsa_time)
+            rsa_time = 0.0
+    return times
+
+
+if __name__ == "__main__":
+    main()
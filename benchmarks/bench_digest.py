@@ -0,0 +1,65 @@
+## @file bench_digest.py
+#  @brief Compares the digest algorithms of `pdf_signer.sign` across document sizes.
+#  @details Prints the raw hashing throughput of every algorithm on this machine and the time
+#           to sign documents of several sizes with it. Timestamps are disabled, the appearance
+#           is invisible, so the document digest is the main cost that grows with the size.
+#           Run from the repository root: `python -m benchmarks.bench_digest`.
+
+import argparse
+import hashlib
+import os
+import tempfile
+
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+## @var DOCUMENT_SIZES_MB
+#  @brief Approximate sizes in MiB of the signed documents.
+DOCUMENT_SIZES_MB = (1, 16, 64)
+
+## @var HASH_BUFFER_SIZE
+#  @brief Size of the buffer hashed to measure the raw throughput.
+HASH_BUFFER_SIZE = 64 * 1024 * 1024
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the digest algorithms of the PDF signer.")
+    parser.add_argument("--repeat", type=int, default=3, help="number of measured signatures per size and algorithm")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+
+    buffer = os.urandom(HASH_BUFFER_SIZE)
+    throughput_rows = []
+    for algorithm in pdf_signer.DIGEST_ALGORITHMS:
+        result = measure(lambda: hashlib.new(algorithm, buffer).digest(), args.repeat)
+        throughput_rows.append([algorithm, HASH_BUFFER_SIZE / result["median"] / 2 ** 20])
+    print_table(["algorithm", "hash MiB/s"], throughput_rows)
+    print()
+
+    sign_rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_out_path = os.path.join(directory, "out.pdf")
+        for size_mb in DOCUMENT_SIZES_MB:
+            pdf_in_path = os.path.join(directory, f"in-{size_mb}.pdf")
+            write_pdf(pdf_in_path, padding_bytes=size_mb * 2 ** 20)
+            row = [size_mb]
+            for algorithm in pdf_signer.DIGEST_ALGORITHMS:
+                result = measure(lambda: pdf_signer.sign(private_key, pdf_in_path, pdf_out_path, NoTimestamps(),
+                                                         pdf_signer.APPEARANCE_INVISIBLE,
+                                                         digest_algorithm=algorithm), args.repeat)
+                row.append(result["median"])
+            sign_rows.append(row)
+    print_table(["MiB"] + [f"{algorithm} s" for algorithm in pdf_signer.DIGEST_ALGORITHMS], sign_rows)
+
+
+if __name__ == "__main__":
+    main()
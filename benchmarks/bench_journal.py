@@ -0,0 +1,92 @@
+## @file bench_journal.py
+#  @brief Measures the overhead of the batch journal and of resuming a large batch from it.
+#  @details Journals a synthetic batch the way `BatchSigner` does, a `pending` and a `signed` record
+#           per document, with the default batched fsync and with an fsync per record (on fewer
+#           documents, the result is per document). A crash is then simulated at 80% of the batch
+#           and the time to reopen the journal and decide for every document whether to submit it
+#           again is measured. No document is signed, the numbers are the bookkeeping cost alone.
+#           Run from the repository root: `python -m benchmarks.bench_journal`.
+
+import argparse
+import os
+import tempfile
+
+from services.batch import BatchJournal, JOB_PENDING
+from services.signing_pool import OUTCOME_SIGNED
+
+from .common import measure, print_table
+
+## @var UNBATCHED_DOCUMENTS
+#  @brief Number of documents journaled with an fsync per record.
+UNBATCHED_DOCUMENTS = 500
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the batch journal.")
+    parser.add_argument("--documents", type=int, default=100_000, help="number of documents of the batch")
+    parser.add_argument("--completed", type=float, default=0.8, help="share of the batch done before the crash")
+    parser.add_argument("--repeat", type=int, default=3, help="number of measured runs per case")
+    return parser.parse_args()
+
+
+## @brief Journals a batch.
+#  @param path The path of the journal file.
+#  @type path str
+#  @param paths The document paths.
+#  @type paths list[str]
+#  @param completed The number of documents that get a `signed` record after their `pending` one.
+#  @type completed int
+#  @param sync_interval The number of records between two fsyncs.
+#  @type sync_interval int
+def write_journal(path: str, paths: list[str], completed: int, sync_interval: int | None = None):
+    options = {} if sync_interval is None else {"sync_interval": sync_interval}
+    with BatchJournal(path, **options) as journal:
+        for index, document in enumerate(paths):
+            journal.record(document, JOB_PENDING)
+            if index < completed:
+                journal.record(document, OUTCOME_SIGNED, output_dir=os.path.dirname(path))
+
+
+## @brief Reopens a journal and selects the documents a resumed run submits.
+#  @param path The path of the journal file.
+#  @type path str
+#  @param paths The document paths of the batch.
+#  @type paths list[str]
+#  @return The number of documents submitted again.
+#  @rtype int
+def resume(path: str, paths: list[str]) -> int:
+    with BatchJournal(path, resume=True) as journal:
+        return sum(1 for document in paths if not journal.is_completed(document))
+
+
+def main():
+    args = parse_args()
+    completed = int(args.documents * args.completed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, "in", f"document-{index:07d}.pdf") for index in range(args.documents)]
+        journal_path = os.path.join(directory, "batch.journal")
+
+        batched = measure(lambda: write_journal(journal_path, paths, args.documents), args.repeat)
+        unbatched = measure(lambda: write_journal(journal_path, paths[:UNBATCHED_DOCUMENTS],
+                                                  UNBATCHED_DOCUMENTS, sync_interval=1), args.repeat)
+        write_journal(journal_path, paths, completed)
+        journal_bytes = os.path.getsize(journal_path)
+        resumed = measure(lambda: resume(journal_path, paths), args.repeat)
+        remaining = resume(journal_path, paths)
+
+    rows = [
+        ["journal, batched fsync", args.documents, batched["median"], batched["median"] / args.documents * 1e6],
+        ["journal, fsync per record", UNBATCHED_DOCUMENTS, unbatched["median"],
+         unbatched["median"] / UNBATCHED_DOCUMENTS * 1e6],
+        [f"resume, {remaining} left", args.documents, resumed["median"], resumed["median"] / args.documents * 1e6],
+    ]
+    print_table(["case", "documents", "total s", "us/document"], rows)
+    print(f"journal of {args.documents} documents at {args.completed:.0%}: {journal_bytes / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
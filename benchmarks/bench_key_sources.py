@@ -0,0 +1,113 @@
+## @file bench_key_sources.py
+#  @brief Measures the cold key load latency of every key source of `key_getter.get_key`.
+#  @details Encrypts a 4096-bit key file with a calibrated key derivation and loads it in a fresh
+#           interpreter per sample, as a CLI or a container entry point does: from its path, from an
+#           inherited file descriptor and from a path held by an environment variable. The USB source
+#           is measured too; without a USB drive attached it reports the time the drive detection
+#           takes to give up. Every sample reports the import of `key_getter`, the reading of the
+#           encrypted key file, the whole unlock and the wall time of the process, interpreter start
+#           included. Run from the repository root: `python -m benchmarks.bench_key_sources`.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from cryptography.hazmat.primitives import serialization
+
+from generating.key_generate.AES_key_generator import aes_encrypt_file, calibrate_kdf
+
+from . import _SIGNING_DIR
+from .common import generate_private_key, measure, print_table
+
+## @var PIN
+#  @brief PIN of the benchmark key file.
+PIN = "1234"
+
+## @var KEY_PATH_VARIABLE
+#  @brief Environment variable holding the key file path for the `env:` source.
+KEY_PATH_VARIABLE = "BENCH_SIGNING_KEY_PATH"
+
+## @var CHILD_SCRIPT
+#  @brief Loads the key in the child process and prints the stage times in seconds as JSON.
+#  @details The stages are those of `key_getter.get_key`, timed one by one.
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from services import key_getter
+from services.key_getter.AES_PIN_decryptor import aes_decrypt_file
+imported = time.perf_counter()
+try:
+    encrypted_key = key_getter.read_encrypted_key(sys.argv[1])
+except Exception as e:
+    print(json.dumps({"import": imported - started, "read": time.perf_counter() - imported,
+                      "unlock": None, "error": type(e).__name__}))
+    sys.exit()
+read = time.perf_counter()
+key_getter.load_private_key(aes_decrypt_file(encrypted_key, sys.argv[2]), authenticated=True)
+print(json.dumps({"import": imported - started, "read": read - imported,
+                  "unlock": time.perf_counter() - started, "error": None}))
+"""
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the cold key load of every key source.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured processes per source")
+    return parser.parse_args()
+
+
+## @brief Loads the key in a fresh interpreter.
+#  @param key_source The key source passed to `read_encrypted_key`, `{fd}` is replaced with the
+#                    number of the inherited descriptor of the key file.
+#  @type key_source str
+#  @param key_path The path of the encrypted key file.
+#  @type key_path str
+#  @return The stage times printed by `CHILD_SCRIPT`.
+#  @rtype dict
+def load_in_child(key_source: str, key_path: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_SIGNING_DIR, os.environ.get("PYTHONPATH")])))
+    env[KEY_PATH_VARIABLE] = key_path
+    with open(key_path, "rb") as key_file:
+        fd = key_file.fileno()
+        output = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, key_source.format(fd=fd), PIN], env=env,
+                                pass_fds=(fd,), check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    params = calibrate_kdf()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        key_path = os.path.join(directory, "private_key.key")
+        with open(key_path, "wb") as f:
+            f.write(private_key.private_bytes(serialization.Encoding.DER, serialization.PrivateFormat.TraditionalOpenSSL,
+                                              serialization.NoEncryption()))
+        aes_encrypt_file(key_path, PIN, params)
+
+        for name, key_source in (("path", key_path), ("fd", "fd:{fd}"),
+                                 ("env", f"env:{KEY_PATH_VARIABLE}"), ("usb", "usb")):
+            samples = []
+            process = measure(lambda: samples.append(load_in_child(key_source, key_path)), args.repeat)
+            samples = samples[-args.repeat:]
+            error = samples[-1]["error"]
+            unlock = "-" if error else statistics.median(sample["unlock"] for sample in samples)
+            rows.append([name if error is None else f"{name} ({error})",
+                         statistics.median(sample["import"] for sample in samples) * 1000,
+                         statistics.median(sample["read"] for sample in samples) * 1000,
+                         unlock, process["median"]])
+
+    print_table(["source", "import ms", "read ms", "unlock s", "process s"], rows)
+    print(f"key derivation calibrated to {params}")
+
+
+if __name__ == "__main__":
+    main()
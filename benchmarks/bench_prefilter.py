@@ -0,0 +1,76 @@
+## @file bench_prefilter.py
+#  @brief Measures how much the raw byte prefilter of `VerifierSession` saves on documents failing the verification.
+#  @details Verifies unsigned documents and documents signed with another key, of several shapes,
+#           with the prefilter on and off. A document signed with the expected key shows the cost
+#           the prefilter adds to documents it cannot decide.
+#           Run from the repository root: `python -m benchmarks.bench_prefilter`.
+
+import argparse
+import os
+import tempfile
+
+from services import pdf_signer
+from services.pdf_signer import NoSignatureFound, NoTimestamps, VerifierSession
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+## @var DOCUMENT_SHAPES
+#  @brief Pages and padding bytes of the benchmark documents, by name.
+DOCUMENT_SHAPES = {
+    "1 page": (1, 0),
+    "1000 pages": (1000, 0),
+    "5 MiB padding": (1, 5 * 1024 * 1024),
+}
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the prefilter of the PDF verifier.")
+    parser.add_argument("--repeat", type=int, default=20, help="number of measured verifications per case")
+    return parser.parse_args()
+
+
+## @brief Verifies a document, counting a missing signature as a failed verification.
+#  @param session The session.
+#  @type session VerifierSession
+#  @param path The path of the document.
+#  @type path str
+#  @return The result of the verification.
+#  @rtype bool
+def verify(session: VerifierSession, path: str) -> bool:
+    try:
+        return session.verify(path)
+    except NoSignatureFound:
+        return False
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    other_key = generate_private_key()
+    public_key = private_key.public_key()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (pages, padding_bytes) in DOCUMENT_SHAPES.items():
+            documents = {"unsigned": os.path.join(directory, "unsigned.pdf"),
+                         "other key": os.path.join(directory, "other.pdf"),
+                         "expected key": os.path.join(directory, "expected.pdf")}
+            write_pdf(documents["unsigned"], pages=pages, padding_bytes=padding_bytes)
+            pdf_signer.sign(other_key, documents["unsigned"], documents["other key"], NoTimestamps())
+            pdf_signer.sign(private_key, documents["unsigned"], documents["expected key"], NoTimestamps())
+
+            for case, path in documents.items():
+                medians = []
+                for prefilter in (False, True):
+                    session = VerifierSession(public_key, prefilter=prefilter)
+                    medians.append(measure(lambda: verify(session, path), args.repeat)["median"] * 1000)
+                rows.append([name, case, medians[0], medians[1], medians[0] / medians[1]])
+
+    print_table(["document", "signature", "parsed ms", "prefiltered ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+## @file bench_scheduler.py
+#  @brief Compares the size-aware scheduler with first-in-first-out dispatch on a mixed batch.
+#  @details Signs and then verifies a shuffled batch of small and large documents, once handing
+#           the jobs to the pool in batch order with a bound on the pending jobs only, once through a
+#           `SizeAwareScheduler`. Reports the latency per scheduler lane, from the start of the batch
+#           until the document is done, the batch duration, and the peak total size of the large
+#           documents in flight.
+#           Run from the repository root: `python -m benchmarks.bench_scheduler`.
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from services.instrumentation import LatencyTracker
+from services.pdf_signer import NoTimestamps, VerifierSession
+from services.scheduler import LANE_LARGE, LANE_SMALL, SizeAwareScheduler, estimate_cost
+from services.signing_pool import SigningPool
+
+from .common import generate_private_key, print_table, write_pdf
+
+## @var MIB
+#  @brief Number of bytes in a MiB.
+MIB = 1024 * 1024
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the size-aware scheduler.")
+    parser.add_argument("--small", type=int, default=40, help="number of small documents")
+    parser.add_argument("--large", type=int, default=4, help="number of large documents")
+    parser.add_argument("--small-kib", type=int, default=50, help="size of the small documents in KiB")
+    parser.add_argument("--large-mib", type=int, default=50, help="size of the large documents in MiB")
+    parser.add_argument("--workers", type=int, default=2, help="number of worker processes or threads")
+    parser.add_argument("--max-in-flight-mib", type=int, default=64, help="in-flight byte limit of the scheduler")
+    return parser.parse_args()
+
+
+## @class _Run
+#  @brief Tracks the latency per lane and the large bytes in flight of one benchmark run.
+#  @private
+class _Run:
+    def __init__(self, small_document_size: int):
+        self.small_document_size = small_document_size
+        self.latency = {LANE_SMALL: LatencyTracker(), LANE_LARGE: LatencyTracker()}
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._large_bytes = 0
+        self.peak_large_bytes = 0
+
+    def lane(self, size: int) -> str:
+        return LANE_SMALL if size <= self.small_document_size else LANE_LARGE
+
+    def started(self, size: int):
+        if self.lane(size) == LANE_LARGE:
+            with self._lock:
+                self._large_bytes += size
+                self.peak_large_bytes = max(self.peak_large_bytes, self._large_bytes)
+
+    def done(self, size: int):
+        self.latency[self.lane(size)].record(time.monotonic() - self.started_at)
+        if self.lane(size) == LANE_LARGE:
+            with self._lock:
+                self._large_bytes -= size
+
+
+## @brief Runs the jobs in batch order, keeping at most `max_pending` of them in the pool.
+#  @private
+def run_fifo(submit, paths: list[str], max_pending: int, run: _Run):
+    slots = threading.BoundedSemaphore(max_pending)
+    for path in paths:
+        size = os.path.getsize(path)
+        slots.acquire()
+        run.started(size)
+        future: Future = submit(path)
+        future.add_done_callback(lambda f, size=size: (run.done(size), slots.release()))
+    for _ in range(max_pending):
+        slots.acquire()
+
+
+## @brief Runs the jobs through a `SizeAwareScheduler`.
+#  @private
+def run_scheduled(submit, paths: list[str], max_pending: int, max_in_flight_bytes: int, run: _Run):
+    def dispatch(path: str, size: int) -> Future:
+        run.started(size)
+        return submit(path)
+
+    scheduler = SizeAwareScheduler(dispatch, max_pending, max_in_flight_bytes, run.small_document_size)
+    for path in paths:
+        cost = estimate_cost(path)
+        scheduler.add(cost, path, cost.size, on_done=lambda f, size=cost.size: run.done(size))
+    scheduler.close()
+    scheduler.run()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    session = VerifierSession(private_key.public_key())
+    small_document_size = 4 * args.small_kib * 1024
+    max_pending = 2 * args.workers
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(args.small):
+            paths.append(os.path.join(directory, f"small-{index}.pdf"))
+            write_pdf(paths[-1], padding_bytes=args.small_kib * 1024)
+        for index in range(args.large):
+            paths.append(os.path.join(directory, f"large-{index}.pdf"))
+            write_pdf(paths[-1], padding_bytes=args.large_mib * MIB)
+        random.Random(0).shuffle(paths)
+
+        with SigningPool(private_key, args.workers, {"timestamp_policy": NoTimestamps()}) as pool, \
+                ThreadPoolExecutor(args.workers) as executor:
+            operations = {
+                "sign": lambda path: pool.submit(path, f"{path}.signed"),
+                "verify": lambda path: executor.submit(session.verify, f"{path}.signed"),
+            }
+            for operation, submit in operations.items():
+                for mode in ("fifo", "scheduled"):
+                    run = _Run(small_document_size)
+                    if mode == "fifo":
+                        run_fifo(submit, paths, max_pending, run)
+                    else:
+                        run_scheduled(submit, paths, max_pending, args.max_in_flight_mib * MIB, run)
+                    duration = time.monotonic() - run.started_at
+                    small, large = (run.latency[lane].snapshot() for lane in (LANE_SMALL, LANE_LARGE))
+                    rows.append([operation, mode, small["p50"], small["p95"], large["p50"], large["p95"],
+                                 duration, run.peak_large_bytes / MIB])
+
+    print_table(["operation", "dispatch", "small p50 s", "small p95 s", "large p50 s", "large p95 s",
+                 "batch s", "peak large MiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+## @file bench_shared_memory.py
+#  @brief Compares handing documents held in memory to the signing workers by pickling and through shared memory.
+#  @details Signs documents of several sizes in a single worker process, once by sending the bytes
+#           through the executor (pickled to the worker and back) and once with `SigningPool.submit_bytes`,
+#           which passes them in recycled shared memory segments. Signing the same document in the
+#           benchmark process gives the cost without any handoff; the difference is the handoff overhead.
+#           Run from the repository root: `python -m benchmarks.bench_shared_memory`.
+
+import argparse
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.hazmat.primitives import serialization
+
+from services.pdf_signer import NoTimestamps
+from services.pdf_signer.signer import _sign_stream
+from services.signing_pool import SigningPool
+from services.signing_pool import pool as signing_pool
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+## @var MIB
+#  @brief Bytes per MiB.
+MIB = 1024 * 1024
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the handoff of in-memory documents to the signing workers.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured signatures per size and variant")
+    parser.add_argument("--sizes", default="10,100",
+                        help="comma separated document sizes in MiB; 500 needs about 4 GiB of memory")
+    return parser.parse_args()
+
+
+## @brief Signs a document sent by pickling, run in the worker process.
+#  @param data The PDF document.
+#  @type data bytes
+#  @return The signed PDF document, pickled back to the caller.
+#  @rtype bytes
+def sign_pickled(data: bytes) -> bytes:
+    output = io.BytesIO()
+    _sign_stream(signing_pool._worker_key, io.BytesIO(data), output, **signing_pool._worker_sign_options)
+    return output.getvalue()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    sign_options = {"timestamp_policy": NoTimestamps()}
+    key_der = private_key.private_bytes(serialization.Encoding.DER, serialization.PrivateFormat.PKCS8,
+                                        serialization.NoEncryption())
+
+    rows = []
+    with SigningPool(private_key, 1, sign_options) as pool, ProcessPoolExecutor(
+            max_workers=1, initializer=signing_pool._init_worker, initargs=(key_der, sign_options, None)) as executor:
+        for size_mib in (float(size) for size in args.sizes.split(",")):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "in.pdf")
+                write_pdf(path, padding_bytes=int(size_mib * MIB))
+                with open(path, "rb") as f:
+                    data = f.read()
+
+            def in_process():
+                _sign_stream(private_key, io.BytesIO(data), io.BytesIO(), **sign_options)
+
+            def pickled():
+                return len(executor.submit(sign_pickled, data).result())
+
+            def shared():
+                with pool.submit_bytes(data).result() as document:
+                    return len(document)
+
+            baseline = measure(in_process, args.repeat)["median"]
+            pickled_median = measure(pickled, args.repeat)["median"]
+            shared_median = measure(shared, args.repeat)["median"]
+            rows.append([f"{len(data) / MIB:.0f}", baseline * 1000, pickled_median * 1000,
+                         (pickled_median - baseline) * 1000, shared_median * 1000, (shared_median - baseline) * 1000])
+            del data
+
+    print_table(["MiB", "in-process ms", "pickled ms", "pickled overhead ms", "shared ms", "shared overhead ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+## @file bench_storage.py
+#  @brief Measures the throughput of concurrent transfers through the storage backends.
+#  @details Uploads a set of documents through `open_write` from a number of threads and downloads
+#           them again through `open_read`, once with `LocalStorage` in a temporary directory and
+#           once with `S3Storage` against the in-process `StandInObjectStore`. Documents larger than
+#           the part size take the multipart path. For the object store the number of requests sent
+#           and connections opened is reported as well, which shows whether the pool keeps its
+#           connections alive. The stand-in store runs in the benchmark process and shares its CPUs,
+#           so its numbers are a lower bound of the client throughput, not those of a real store.
+#           Run from the repository root: `python -m benchmarks.bench_storage`.
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from services.storage import LocalStorage, S3Storage, StorageBackend
+
+from .common import measure, print_table
+from .object_store_server import StandInObjectStore
+
+## @var MIB
+#  @brief Number of bytes in a MiB.
+MIB = 1024 * 1024
+
+## @var ACCESS_KEY
+#  @brief Access key ID of the stand-in object store.
+ACCESS_KEY = "bench"
+
+## @var SECRET_KEY
+#  @brief Secret access key of the stand-in object store.
+SECRET_KEY = "bench-secret"
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks concurrent transfers through the storage backends.")
+    parser.add_argument("--documents", type=int, default=32, help="number of documents transferred per run")
+    parser.add_argument("--size-mib", type=float, default=2.0, help="size of every document in MiB")
+    parser.add_argument("--part-mib", type=int, default=8, help="part size of the multipart uploads in MiB")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16], help="numbers of transferring threads")
+    parser.add_argument("--repeat", type=int, default=3, help="number of measured runs per case")
+    return parser.parse_args()
+
+
+## @brief Uploads the documents from a number of threads.
+#  @param storage The backend.
+#  @type storage StorageBackend
+#  @param keys The keys of the documents.
+#  @type keys list[str]
+#  @param data The content of every document.
+#  @type data bytes
+#  @param threads The number of threads.
+#  @type threads int
+def upload(storage: StorageBackend, keys: list[str], data: bytes, threads: int):
+    def write(key: str):
+        with storage.open_write(key) as outf:
+            outf.write(data)
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(write, keys))
+
+
+## @brief Downloads the documents from a number of threads.
+#  @param storage The backend.
+#  @type storage StorageBackend
+#  @param keys The keys of the documents.
+#  @type keys list[str]
+#  @param threads The number of threads.
+#  @type threads int
+#  @return The number of bytes read.
+#  @rtype int
+def download(storage: StorageBackend, keys: list[str], threads: int) -> int:
+    def read(key: str) -> int:
+        with storage.open_read(key) as inf:
+            return len(inf.read())
+
+    with ThreadPoolExecutor(threads) as executor:
+        return sum(executor.map(read, keys))
+
+
+## @brief Measures the uploads and downloads of a backend.
+#  @param name The name of the backend in the table.
+#  @type name str
+#  @param storage The backend.
+#  @type storage StorageBackend
+#  @param data The content of every document.
+#  @type data bytes
+#  @param args The parsed arguments.
+#  @type args argparse.Namespace
+#  @return One table row per direction and number of threads.
+#  @rtype list[list]
+def bench_backend(name: str, storage: StorageBackend, data: bytes, args: argparse.Namespace) -> list[list]:
+    keys = [f"bench/document-{index:05d}.pdf" for index in range(args.documents)]
+    total_mib = len(data) * args.documents / MIB
+    rows = []
+    for threads in args.threads:
+        for direction, function in (("upload", lambda: upload(storage, keys, data, threads)),
+                                    ("download", lambda: download(storage, keys, threads))):
+            requests_before = getattr(storage, "requests_sent", 0)
+            connections_before = getattr(storage, "connections_opened", 0)
+            result = measure(function, args.repeat)
+            runs = args.repeat + 1
+            if isinstance(storage, S3Storage):
+                requests = (storage.requests_sent - requests_before) / runs
+                connections = (storage.connections_opened - connections_before) / runs
+                traffic = [f"{requests:.0f}", f"{connections:.1f}"]
+            else:
+                traffic = ["-", "-"]
+            rows.append([name, direction, threads, result["median"], total_mib / result["median"]] + traffic)
+    return rows
+
+
+def main():
+    args = parse_args()
+    data = os.urandom(int(args.size_mib * MIB))
+    rows = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        rows += bench_backend("local", LocalStorage(directory), data, args)
+
+    with StandInObjectStore(access_key=ACCESS_KEY, secret_key=SECRET_KEY) as store:
+        with S3Storage(store.url, "bench", ACCESS_KEY, SECRET_KEY, pool_size=max(args.threads),
+                       part_size=args.part_mib * MIB) as storage:
+            rows += bench_backend("s3 stand-in", storage, data, args)
+
+    print_table(["backend", "direction", "threads", "median s", "MiB/s", "requests/run", "connections/run"], rows)
+    print(f"{args.documents} documents of {args.size_mib:g} MiB, parts of {args.part_mib} MiB")
+
+
+if __name__ == "__main__":
+    main()
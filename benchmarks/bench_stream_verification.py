@@ -0,0 +1,91 @@
+## @file bench_stream_verification.py
+#  @brief Compares verifying streamed documents through a temporary file and with `verify_stream`.
+#  @details Sends the same signed document through a pipe, as a socket or stdin would deliver it,
+#           and verifies it by writing it to a temporary file first, by spooling it in memory, and
+#           by spooling it to an anonymous memory file. Verifying the document as bytes is the
+#           lower bound. Run from the repository root: `python -m benchmarks.bench_stream_verification`.
+
+import argparse
+import os
+import tempfile
+import threading
+
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps, VerifierSession
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks verifying documents received on a stream.")
+    parser.add_argument("--repeat", type=int, default=20, help="number of measured verifications per variant")
+    parser.add_argument("--padding-mb", type=float, default=4, help="size of the padding added to the document in MiB")
+    parser.add_argument("--level", choices=pdf_signer.VALIDATION_LEVELS, default=pdf_signer.VALIDATION_INTEGRITY,
+                        help="validation level of the verifications")
+    return parser.parse_args()
+
+
+## @brief Opens a pipe and writes the data into it from a thread.
+#  @param data The data to send.
+#  @type data bytes
+#  @return The read end of the pipe.
+#  @rtype BinaryIO
+def open_pipe(data: bytes):
+    read_fd, write_fd = os.pipe()
+
+    def write():
+        with open(write_fd, "wb") as f:
+            f.write(data)
+
+    threading.Thread(target=write, daemon=True).start()
+    return open(read_fd, "rb")
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    public_key = private_key.public_key()
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_in_path = os.path.join(directory, "in.pdf")
+        pdf_path = os.path.join(directory, "signed.pdf")
+        write_pdf(pdf_in_path, padding_bytes=int(args.padding_mb * 1024 * 1024))
+        pdf_signer.sign(private_key, pdf_in_path, pdf_path, NoTimestamps())
+        with open(pdf_path, "rb") as f:
+            data = f.read()
+
+        in_memory = VerifierSession(public_key, args.level, spool_threshold=len(data))
+        memfd = VerifierSession(public_key, args.level, spool_threshold=0)
+
+        def through_temporary_file():
+            spool_path = os.path.join(directory, "received.pdf")
+            with open_pipe(data) as stream, open(spool_path, "wb") as f:
+                while chunk := stream.read(256 * 1024):
+                    f.write(chunk)
+            return in_memory.verify(spool_path)
+
+        def spooled(session: VerifierSession):
+            with open_pipe(data) as stream:
+                return session.verify_stream(stream)
+
+        variants = {
+            "temporary file": through_temporary_file,
+            "spool in memory": lambda: spooled(in_memory),
+            "spool to memfd": lambda: spooled(memfd),
+            "bytes": lambda: in_memory.verify_stream(data),
+        }
+        rows = []
+        for name, variant in variants.items():
+            assert variant(), name
+            result = measure(variant, args.repeat)
+            rows.append([name, result["median"] * 1000, result["p95"] * 1000])
+
+    print(f"document size: {len(data) / 1024 / 1024:.1f} MiB, level: {args.level}")
+    print_table(["variant", "median ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
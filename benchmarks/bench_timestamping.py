@@ -0,0 +1,56 @@
+## @file bench_timestamping.py
+#  @brief Compares the cost of the timestamping policies of `pdf_signer.sign`.
+#  @details Signs the same document with every policy and prints the wall and CPU time per
+#           document and the size of the signed document. The `tsa` policy talks to a local
+#           `StandInTsaServer`; its request and connection counts show the keep-alive reuse.
+#           Run from the repository root: `python -m benchmarks.bench_timestamping`.
+
+import argparse
+import os
+import tempfile
+import time
+
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps, DummyTimestamps, TsaTimestamps
+
+from .common import generate_private_key, measure, print_table, write_pdf
+from .tsa_server import StandInTsaServer
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the timestamping policies of the PDF signer.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured signatures per policy")
+    parser.add_argument("--pages", type=int, default=1, help="number of pages of the signed document")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+
+    with tempfile.TemporaryDirectory() as directory, StandInTsaServer() as tsa_server:
+        pdf_in_path = os.path.join(directory, "in.pdf")
+        pdf_out_path = os.path.join(directory, "out.pdf")
+        write_pdf(pdf_in_path, pages=args.pages)
+
+        tsa_policy = TsaTimestamps(tsa_server.url)
+        policies = [("none", NoTimestamps()), ("dummy", DummyTimestamps()), ("tsa", tsa_policy)]
+        rows = []
+        for name, policy in policies:
+            cpu_start = time.process_time()
+            result = measure(lambda: pdf_signer.sign(private_key, pdf_in_path, pdf_out_path, policy), args.repeat)
+            cpu_time = (time.process_time() - cpu_start) / (args.repeat + 1)
+            rows.append([name, result["median"], result["p95"], cpu_time, os.path.getsize(pdf_out_path)])
+        tsa_policy.close()
+
+    print_table(["policy", "median s", "p95 s", "cpu s", "output bytes"], rows)
+    # One extra request estimates the signature size, the other requests are one per document
+    print(f"\nstand-in TSA: {tsa_server.requests} requests over {tsa_server.connections} connections "
+          f"for {args.repeat + 1} documents")
+
+
+if __name__ == "__main__":
+    main()
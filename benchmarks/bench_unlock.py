@@ -0,0 +1,67 @@
+## @file bench_unlock.py
+#  @brief Measures the latency of unlocking the private key, as done by `key_getter.get_key`.
+#  @details Encrypts a 4096-bit key as PEM and as DER key files with the same calibrated key
+#           derivation, then times decrypting and parsing them with and without the RSA key
+#           consistency check. The USB drive lookup is left out.
+#           Run from the repository root: `python -m benchmarks.bench_unlock`.
+
+import argparse
+import os
+import tempfile
+
+from cryptography.hazmat.primitives import serialization
+
+from generating.key_generate.AES_key_generator import aes_encrypt_file, calibrate_kdf
+from services.key_getter import load_private_key
+from services.key_getter.AES_PIN_decryptor import aes_decrypt_file
+
+from .common import generate_private_key, measure, print_table
+
+## @var PIN
+#  @brief PIN of the benchmark key files.
+PIN = "1234"
+
+## @var KEY_ENCODINGS
+#  @brief Key file formats, mapped to their `cryptography` encodings.
+KEY_ENCODINGS = {"PEM": serialization.Encoding.PEM, "DER": serialization.Encoding.DER}
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks unlocking the private key file.")
+    parser.add_argument("--repeat", type=int, default=10, help="number of measured unlocks per configuration")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    params = calibrate_kdf()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, encoding in KEY_ENCODINGS.items():
+            path = os.path.join(directory, f"private_key.{name.lower()}")
+            with open(path, "wb") as f:
+                f.write(private_key.private_bytes(encoding, serialization.PrivateFormat.TraditionalOpenSSL,
+                                                  serialization.NoEncryption()))
+            aes_encrypt_file(path, PIN, params)
+            with open(path, "rb") as f:
+                encrypted_key = f.read()
+            key_data = aes_decrypt_file(encrypted_key, PIN)
+
+            decrypt = measure(lambda: aes_decrypt_file(encrypted_key, PIN), args.repeat)
+            for authenticated in (False, True):
+                parse = measure(lambda: load_private_key(key_data, authenticated), args.repeat)
+                unlock = measure(lambda: load_private_key(aes_decrypt_file(encrypted_key, PIN), authenticated),
+                                 args.repeat)
+                rows.append([name, "skipped" if authenticated else "full", decrypt["median"], parse["median"] * 1000,
+                             unlock["median"], unlock["p95"]])
+
+    print_table(["format", "key check", "decrypt s", "parse ms", "unlock s", "unlock p95 s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+## @file bench_verification.py
+#  @brief Compares the validation levels of the PDF verifier.
+#  @details Verifies the same signed document at every validation level, once through a fresh
+#           `verify` call per document and once through a reused `VerifierSession`, and prints
+#           the time per document. Run from the repository root: `python -m benchmarks.bench_verification`.
+
+import argparse
+import os
+import tempfile
+
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps, VerifierSession
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks the validation levels of the PDF verifier.")
+    parser.add_argument("--repeat", type=int, default=20, help="number of measured verifications per level")
+    parser.add_argument("--pages", type=int, default=10, help="number of pages of the verified document")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    private_key = generate_private_key()
+    public_key = private_key.public_key()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_in_path = os.path.join(directory, "in.pdf")
+        pdf_path = os.path.join(directory, "signed.pdf")
+        write_pdf(pdf_in_path, pages=args.pages)
+        pdf_signer.sign(private_key, pdf_in_path, pdf_path, NoTimestamps())
+
+        for level in pdf_signer.VALIDATION_LEVELS:
+            one_shot = measure(lambda: pdf_signer.verify(public_key, pdf_path, level), args.repeat)
+            session = VerifierSession(public_key, level)
+            reused = measure(lambda: session.verify(pdf_path), args.repeat)
+            rows.append([level, one_shot["median"], reused["median"], reused["p95"]])
+
+    print_table(["level", "verify() s", "session s", "session p95 s"], rows)
+
+
+if __name__ == "__main__":
+    main()
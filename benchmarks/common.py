@@ -0,0 +1,90 @@
+## @file common.py
+#  @brief Helpers shared by the benchmarks: test keys, test documents, timing and result tables.
+
+import statistics
+import time
+from typing import Callable
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.writer import PageObject, PdfFileWriter
+
+from services.instrumentation import percentile
+
+## @var KEY_SIZE
+#  @brief Size in bits of the benchmark RSA keys, the same as the keys of the key generator.
+KEY_SIZE = 4096
+
+## @var PAGE_SIZE
+#  @brief Media box of the benchmark document pages (US Letter).
+PAGE_SIZE = (0, 0, 612, 792)
+
+
+## @brief Generates a fresh RSA key for the benchmarks.
+#  @return The private key.
+#  @rtype rsa.RSAPrivateKey
+def generate_private_key() -> rsa.RSAPrivateKey:
+    return rsa.generate_private_key(public_exponent=65537, key_size=KEY_SIZE)
+
+
+## @brief Writes a simple unsigned PDF document.
+#  @param path The path of the document to write.
+#  @type path str
+#  @param pages The number of pages.
+#  @type pages int
+#  @param padding_bytes The number of bytes of an extra uncompressed stream, to control the document size.
+#  @type padding_bytes int
+#  @param stream_xrefs Whether to write a cross-reference stream instead of a classic table.
+#  @type stream_xrefs bool
+def write_pdf(path: str, pages: int = 1, padding_bytes: int = 0, stream_xrefs: bool = True):
+    writer = PdfFileWriter(stream_xrefs=stream_xrefs)
+    for page_number in range(pages):
+        content = generic.StreamObject(stream_data=f"BT /F1 12 Tf 72 712 Td (Page {page_number + 1}) Tj ET".encode())
+        writer.insert_page(PageObject(
+            contents=writer.add_object(content),
+            media_box=generic.ArrayObject(generic.NumberObject(x) for x in PAGE_SIZE),
+        ))
+    if padding_bytes:
+        writer.add_object(generic.StreamObject(stream_data=b"%" * padding_bytes))
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+## @brief Measures the duration of repeated calls.
+#  @param function The function to measure, called without arguments.
+#  @type function Callable[[], object]
+#  @param repeat The number of measured calls.
+#  @type repeat int
+#  @param warmup The number of unmeasured calls before the measurement.
+#  @type warmup int
+#  @return A dict with the `samples` in seconds and their `median`, `p95` and `min`.
+#  @rtype dict
+def measure(function: Callable[[], object], repeat: int = 5, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    ordered = sorted(samples)
+    return {
+        "samples": samples,
+        "median": statistics.median(ordered),
+        "p95": percentile(ordered, 0.95),
+        "min": ordered[0],
+    }
+
+
+## @brief Prints rows as an aligned text table.
+#  @param headers The column headers.
+#  @type headers list[str]
+#  @param rows The rows; the values are converted with `str`, floats are printed with 4 decimals.
+#  @type rows list[list]
+def print_table(headers: list[str], rows: list[list]):
+    cells = [headers] + [[f"{value:.4f}" if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for index, row in enumerate(cells):
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+        if index == 0:
+            print("  ".join("-" * width for width in widths))
@@ -0,0 +1,449 @@
+## @file corpus.py
+#  @brief Generates synthetic PDF corpora for benchmarks and load tests.
+#  @details A document is described by a `DocumentSpec`: page count, number of extra objects,
+#           embedded images, cross-reference style (classic table or stream), an approximate
+#           target size, the keys of pre-existing signatures and an optional corruption. The
+#           unsigned documents are serialized here rather than with pyhanko's writer, which
+#           stamps a random `/ID` and the current time into every file, so the same spec and
+#           seed always produce the same bytes. Signatures are added with `pdf_signer` and embed
+#           the signing time and a random certificate serial, so signed documents only differ in
+#           those bytes between runs. The signing keys are generated with `RSA_key_generator`
+#           from seeded random bytes and saved with the corpus, so a corpus can be recreated
+#           and verified offline. Run from the repository root:
+#           `python -m benchmarks.corpus <directory> --count 100`.
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import zlib
+from dataclasses import asdict, dataclass
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+from pyhanko.sign import signers
+from pyhanko.sign.signers import PdfSignatureMetadata
+from pyhanko_certvalidator.registry import SimpleCertificateStore
+
+from generating.key_generate.RSA_key_generator import RSA_KEY_SIZE, generate_rsa_key, save_keys
+from services import pdf_signer
+from services.pdf_signer import NoTimestamps
+from services.pdf_signer.signer import _generate_self_signed_cert
+
+## @var KEY_NAMES
+#  @brief Names of the signing keys of a corpus: the key the documents are verified against and a foreign one.
+KEY_NAMES = ("signer", "other")
+
+## @var CORRUPTION_TRUNCATED
+#  @brief Corruption cutting the file in the middle.
+CORRUPTION_TRUNCATED = "truncated"
+
+## @var CORRUPTION_BAD_STARTXREF
+#  @brief Corruption pointing the last `startxref` to a wrong offset.
+CORRUPTION_BAD_STARTXREF = "bad_startxref"
+
+## @var CORRUPTION_MISSING_EOF
+#  @brief Corruption removing the final `%%EOF` marker.
+CORRUPTION_MISSING_EOF = "missing_eof"
+
+## @var CORRUPTION_BAD_HEADER
+#  @brief Corruption damaging the `%PDF-` header.
+CORRUPTION_BAD_HEADER = "bad_header"
+
+## @var CORRUPTION_TAMPERED
+#  @brief Corruption changing one byte covered by the first signature, or any content byte of an unsigned document.
+CORRUPTION_TAMPERED = "tampered"
+
+## @var CORRUPTIONS
+#  @brief Corruptions accepted by `DocumentSpec`.
+CORRUPTIONS = (CORRUPTION_TRUNCATED, CORRUPTION_BAD_STARTXREF, CORRUPTION_MISSING_EOF, CORRUPTION_BAD_HEADER,
+               CORRUPTION_TAMPERED)
+
+## @var PAGE_SIZE
+#  @brief Media box of the pages (US Letter).
+PAGE_SIZE = (0, 0, 612, 792)
+
+## @var LINES_PER_PAGE
+#  @brief Number of text lines on a page.
+LINES_PER_PAGE = 40
+
+## @var WORDS
+#  @brief Vocabulary of the page text.
+WORDS = ("contract", "party", "agreement", "signature", "document", "payment", "date", "terms", "clause", "annex",
+         "invoice", "amount", "total", "period", "notice", "delivery", "section", "liability", "the", "of", "and")
+
+## @var _BYTE_RANGE_PATTERN
+#  @brief Matches a `/ByteRange` entry and captures its four integers.
+#  @private
+_BYTE_RANGE_PATTERN = re.compile(rb"/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+
+## @var _LOW_NIBBLE
+#  @brief Translation table keeping the low 4 bits of a byte.
+#  @private
+_LOW_NIBBLE = bytes(value & 0x0f for value in range(256))
+
+
+## @class DocumentSpec
+#  @brief Describes a synthetic document.
+#  @details `extra_objects` small dictionaries are added beside the pages, `images` RGB images of
+#           `image_size` x `image_size` pixels are spread over the pages. A `target_size` in bytes
+#           pads the unsigned document with an incompressible stream to about that size. `signers`
+#           are names of `KEY_NAMES` signing the document one after the other, and `corruption`
+#           is one of `CORRUPTIONS`, applied after signing.
+@dataclass(frozen=True)
+class DocumentSpec:
+    pages: int = 1
+    extra_objects: int = 0
+    images: int = 0
+    image_size: int = 256
+    stream_xrefs: bool = True
+    target_size: int = 0
+    signers: tuple[str, ...] = ()
+    corruption: str | None = None
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generates a reproducible corpus of synthetic PDF documents.")
+    parser.add_argument("directory", help="directory receiving the documents, the keys and manifest.json")
+    parser.add_argument("--count", type=int, default=100, help="number of documents")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus")
+    parser.add_argument("--key-bits", type=int, default=RSA_KEY_SIZE, help="size of the signing keys")
+    parser.add_argument("--signed-ratio", type=float, default=0.5, help="share of signed documents")
+    parser.add_argument("--corrupt-ratio", type=float, default=0.1, help="share of corrupted documents")
+    parser.add_argument("--max-size", type=int, default=5 * 1024 * 1024, help="largest target size in bytes")
+    return parser.parse_args()
+
+
+## @brief Serializes an unsigned document.
+#  @param spec The document; its signers and corruption are ignored.
+#  @type spec DocumentSpec
+#  @param seed The seed of the text, images and padding.
+#  @type seed int
+#  @return The PDF document, the same bytes for the same spec and seed.
+#  @rtype bytes
+def build_document(spec: DocumentSpec, seed: int) -> bytes:
+    data = _PdfBuilder(spec, seed).build(padding_size=0)
+    if spec.target_size > len(data):
+        # The padding stream adds its own dictionary and cross-reference entry, measured by a second pass
+        overhead = len(_PdfBuilder(spec, seed).build(padding_size=1)) - len(data) - 1
+        data = _PdfBuilder(spec, seed).build(padding_size=max(1, spec.target_size - len(data) - overhead))
+    return data
+
+
+## @brief Generates a document: builds it, signs it and corrupts it as specified.
+#  @param spec The document.
+#  @type spec DocumentSpec
+#  @param seed The seed of the document.
+#  @type seed int
+#  @param keys The signing keys by name, needed if the spec has signers.
+#  @type keys dict[str, rsa.RSAPrivateKey] | None
+#  @return The PDF document.
+#  @rtype bytes
+#  @exception ValueError If the corruption is unknown.
+def generate_document(spec: DocumentSpec, seed: int, keys: dict[str, rsa.RSAPrivateKey] | None = None) -> bytes:
+    data = build_document(spec, seed)
+    for index, name in enumerate(spec.signers):
+        data = sign_document(data, keys[name], index)
+    if spec.corruption is not None:
+        data = corrupt_document(data, spec.corruption, seed)
+    return data
+
+
+## @brief Appends a signature to a document.
+#  @details The first signature is made by `pdf_signer.sign_bytes`, as in production. Its signature field
+#           can only be filled once, so further signatures use their own invisible fields.
+#  @param data The PDF document.
+#  @type data bytes
+#  @param private_key The signing key.
+#  @type private_key rsa.RSAPrivateKey
+#  @param index The number of signatures the document already has.
+#  @type index int
+#  @return The signed PDF document.
+#  @rtype bytes
+def sign_document(data: bytes, private_key: rsa.RSAPrivateKey, index: int = 0) -> bytes:
+    if index == 0:
+        return pdf_signer.sign_bytes(private_key, data, NoTimestamps())
+    asn1_cert, asn1_private_key = _generate_self_signed_cert(private_key)
+    registry = SimpleCertificateStore()
+    registry.register(asn1_cert)
+    signer = signers.SimpleSigner(signing_cert=asn1_cert, signing_key=asn1_private_key, cert_registry=registry)
+    output = io.BytesIO()
+    signers.sign_pdf(IncrementalPdfFileWriter(io.BytesIO(data), strict=False),
+                     PdfSignatureMetadata(field_name=f"Signature{index + 1}"), signer=signer, output=output)
+    return output.getvalue()
+
+
+## @brief Damages a document.
+#  @param data The PDF document.
+#  @type data bytes
+#  @param corruption One of `CORRUPTIONS`.
+#  @type corruption str
+#  @param seed The seed choosing the changed byte of `CORRUPTION_TAMPERED`.
+#  @type seed int
+#  @return The corrupted document.
+#  @rtype bytes
+#  @exception ValueError If the corruption is unknown.
+def corrupt_document(data: bytes, corruption: str, seed: int = 0) -> bytes:
+    if corruption == CORRUPTION_TRUNCATED:
+        return data[:len(data) // 2]
+    if corruption == CORRUPTION_BAD_STARTXREF:
+        position = data.rindex(b"startxref") + len(b"startxref")
+        match = re.compile(rb"\s*(\d+)").match(data, position)
+        wrong_offset = str(int(match.group(1)) // 2).encode()
+        return data[:match.start(1)] + wrong_offset + data[match.end(1):]
+    if corruption == CORRUPTION_MISSING_EOF:
+        return data[:data.rindex(b"%%EOF")]
+    if corruption == CORRUPTION_BAD_HEADER:
+        return data.replace(b"%PDF-", b"%PXF-", 1)
+    if corruption == CORRUPTION_TAMPERED:
+        match = _BYTE_RANGE_PATTERN.search(data)
+        # Inside the signed bytes before the signature, past the header
+        end = int(match.group(2)) if match else len(data) // 2
+        position = random.Random(seed).randrange(len(data) // 4, end) if end > len(data) // 4 else end // 2
+        return data[:position] + bytes([data[position] ^ 0x01]) + data[position + 1:]
+    raise ValueError(f"Unknown corruption {corruption}")
+
+
+## @brief Loads the signing keys of a corpus, generating and saving the missing ones.
+#  @details Each key is generated by `RSA_key_generator` from random bytes seeded with the corpus seed
+#           and the key name, so the same seed yields the same keys. The keys are saved as
+#           `keys/<name>_private.pem` and `keys/<name>_public.pem`; the private keys are not encrypted.
+#  @param directory The corpus directory.
+#  @type directory str
+#  @param seed The seed of the corpus.
+#  @type seed int
+#  @param bits The size of the keys.
+#  @type bits int
+#  @return The private keys by name.
+#  @rtype dict[str, rsa.RSAPrivateKey]
+def load_or_create_keys(directory: str, seed: int, bits: int = RSA_KEY_SIZE) -> dict[str, rsa.RSAPrivateKey]:
+    keys_directory = os.path.join(directory, "keys")
+    os.makedirs(keys_directory, exist_ok=True)
+    keys = {}
+    for name in KEY_NAMES:
+        private_path, public_path = key_paths(directory, name)
+        if not os.path.exists(private_path):
+            key = generate_rsa_key(bits, randfunc=random.Random(f"{seed}-{name}").randbytes)
+            if not save_keys(public_path, private_path, key.export_key(format="PEM"), key.public_key().export_key()):
+                raise OSError(f"Could not save the key {name} to {keys_directory}")
+        with open(private_path, "rb") as f:
+            keys[name] = serialization.load_pem_private_key(f.read(), password=None)
+    return keys
+
+
+## @brief Returns the paths of the private and the public key file of a corpus key.
+#  @param directory The corpus directory.
+#  @type directory str
+#  @param name One of `KEY_NAMES`.
+#  @type name str
+#  @return The paths of the private and the public key.
+#  @rtype tuple[str, str]
+def key_paths(directory: str, name: str) -> tuple[str, str]:
+    return (os.path.join(directory, "keys", f"{name}_private.pem"),
+            os.path.join(directory, "keys", f"{name}_public.pem"))
+
+
+## @brief Draws the spec of a document of a mixed corpus.
+#  @param rng The random generator of the corpus.
+#  @type rng random.Random
+#  @param signed_ratio The probability of a signed document.
+#  @type signed_ratio float
+#  @param corrupt_ratio The probability of a corrupted document.
+#  @type corrupt_ratio float
+#  @param max_size The largest target size in bytes.
+#  @type max_size int
+#  @return The spec.
+#  @rtype DocumentSpec
+def random_spec(rng: random.Random, signed_ratio: float = 0.5, corrupt_ratio: float = 0.1,
+                max_size: int = 5 * 1024 * 1024) -> DocumentSpec:
+    signers_choice = ()
+    if rng.random() < signed_ratio:
+        signers_choice = rng.choice([("signer",), ("signer",), ("other",), ("signer", "other"), ("other", "signer")])
+    return DocumentSpec(
+        pages=rng.choice([1, 1, 2, 3, 5, 10, 20, 50, 200]),
+        extra_objects=rng.choice([0, 0, 10, 100, 1000]),
+        images=rng.choice([0, 0, 0, 1, 2, 5]),
+        image_size=rng.choice([64, 256, 512]),
+        stream_xrefs=rng.random() < 0.5,
+        target_size=rng.randrange(max_size) if rng.random() < 0.1 else 0,
+        signers=signers_choice,
+        corruption=rng.choice(CORRUPTIONS) if rng.random() < corrupt_ratio else None,
+    )
+
+
+## @brief Generates a mixed corpus and its manifest.
+#  @details The documents are written as `doc-<index>.pdf`. `manifest.json` lists the seed, the key
+#           files and, per document, its spec, size and SHA-256 hash.
+#  @param directory The corpus directory, created if needed.
+#  @type directory str
+#  @param count The number of documents.
+#  @type count int
+#  @param seed The seed of the corpus.
+#  @type seed int
+#  @param key_bits The size of the signing keys.
+#  @type key_bits int
+#  @param signed_ratio The share of signed documents.
+#  @type signed_ratio float
+#  @param corrupt_ratio The share of corrupted documents.
+#  @type corrupt_ratio float
+#  @param max_size The largest target size in bytes.
+#  @type max_size int
+#  @return The manifest.
+#  @rtype dict
+def generate_corpus(directory: str, count: int, seed: int = 0, key_bits: int = RSA_KEY_SIZE,
+                    signed_ratio: float = 0.5, corrupt_ratio: float = 0.1, max_size: int = 5 * 1024 * 1024) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    keys = load_or_create_keys(directory, seed, key_bits)
+    rng = random.Random(seed)
+    documents = []
+    for index in range(count):
+        spec = random_spec(rng, signed_ratio, corrupt_ratio, max_size)
+        document_seed = rng.getrandbits(32)
+        data = generate_document(spec, document_seed, keys)
+        file_name = f"doc-{index:05d}.pdf"
+        with open(os.path.join(directory, file_name), "wb") as f:
+            f.write(data)
+        documents.append({"file": file_name, "seed": document_seed, "size": len(data),
+                          "sha256": hashlib.sha256(data).hexdigest(), **asdict(spec)})
+
+    manifest = {
+        "seed": seed,
+        "key_bits": key_bits,
+        "keys": {name: dict(zip(("private_key", "public_key"),
+                                (os.path.relpath(path, directory) for path in key_paths(directory, name))))
+                 for name in KEY_NAMES},
+        "documents": documents,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest
+
+
+def main():
+    args = parse_args()
+    manifest = generate_corpus(args.directory, args.count, args.seed, args.key_bits, args.signed_ratio,
+                               args.corrupt_ratio, args.max_size)
+    total = sum(document["size"] for document in manifest["documents"])
+    print(f"Wrote {len(manifest['documents'])} documents ({total / 1024 / 1024:.1f} MiB) to {args.directory}")
+
+
+## @class _PdfBuilder
+#  @brief Serializes the objects of a synthetic document with a classic or a stream cross-reference.
+#  @private
+class _PdfBuilder:
+    def __init__(self, spec: DocumentSpec, seed: int):
+        self.spec = spec
+        self.seed = seed
+        self.objects: list[bytes] = []
+
+    def build(self, padding_size: int) -> bytes:
+        rng = random.Random(self.seed)
+        self.objects = []
+        catalog = self._reserve()
+        pages = self._reserve()
+        font = self._add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        images = [self._add_image(rng) for _ in range(self.spec.images)]
+        page_refs = []
+        for page_number in range(self.spec.pages):
+            page_images = images[page_number::self.spec.pages]
+            content = self._add_stream(self._page_content(rng, page_number, len(page_images)), compress=True)
+            xobjects = b" ".join(b"/Im%d %d 0 R" % (index, ref) for index, ref in enumerate(page_images))
+            page_refs.append(self._add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [%d %d %d %d] /Contents %d 0 R "
+                b"/Resources << /Font << /F1 %d 0 R >> /XObject << %s >> >> >>"
+                % (pages, *PAGE_SIZE, content, font, xobjects)))
+        self._set(pages, b"<< /Type /Pages /Count %d /Kids [%s] >>"
+                  % (len(page_refs), b" ".join(b"%d 0 R" % ref for ref in page_refs)))
+
+        extras = [self._add(b"<< /Type /CorpusData /Index %d /Value (%s) >>" % (index, self._words(rng, 8)))
+                  for index in range(self.spec.extra_objects)]
+        catalog_entries = b"/Type /Catalog /Pages %d 0 R" % pages
+        if extras:
+            catalog_entries += b" /CorpusData [%s]" % b" ".join(b"%d 0 R" % ref for ref in extras)
+        if padding_size:
+            catalog_entries += b" /CorpusPadding %d 0 R" % self._add_stream(rng.randbytes(padding_size), compress=False)
+        self._set(catalog, b"<< %s >>" % catalog_entries)
+        info = self._add(b"<< /Producer (benchmarks.corpus) >>")
+        return self._serialize(catalog, info)
+
+    def _reserve(self) -> int:
+        self.objects.append(b"")
+        return len(self.objects)
+
+    def _set(self, number: int, body: bytes):
+        self.objects[number - 1] = body
+
+    def _add(self, body: bytes) -> int:
+        self.objects.append(body)
+        return len(self.objects)
+
+    def _add_stream(self, data: bytes, compress: bool, entries: bytes = b"") -> int:
+        if compress:
+            data = zlib.compress(data)
+            entries += b" /Filter /FlateDecode"
+        return self._add(b"<< /Length %d%s >>\nstream\n%s\nendstream" % (len(data), entries, data))
+
+    def _add_image(self, rng: random.Random) -> int:
+        size = self.spec.image_size
+        row_size = size * 3
+        # A smooth gradient with 4 bits of noise compresses about as well as a photograph. The gradient
+        # stays below 240, so the bytes can be added as one large integer without carries.
+        gradient = int.from_bytes(bytes(x * 240 // (2 * row_size) for x in range(2 * row_size)), "big")
+        rows = []
+        for y in range(size):
+            base = (gradient >> (8 * (row_size - y * 3))) & ((1 << (8 * row_size)) - 1)
+            noise = int.from_bytes(rng.randbytes(row_size).translate(_LOW_NIBBLE), "big")
+            rows.append((base + noise).to_bytes(row_size, "big"))
+        return self._add_stream(b"".join(rows), compress=True,
+                                entries=b" /Type /XObject /Subtype /Image /Width %d /Height %d "
+                                        b"/ColorSpace /DeviceRGB /BitsPerComponent 8" % (size, size))
+
+    def _page_content(self, rng: random.Random, page_number: int, image_count: int) -> bytes:
+        lines = [b"BT /F1 11 Tf 72 740 Td 14 TL (Page %d) Tj" % (page_number + 1)]
+        lines += [b"T* (%s) Tj" % self._words(rng, 12) for _ in range(LINES_PER_PAGE)]
+        lines.append(b"ET")
+        for index in range(image_count):
+            lines.append(b"q 144 0 0 144 %d 72 cm /Im%d Do Q" % (72 + 160 * (index % 3), index))
+        return b"\n".join(lines)
+
+    @staticmethod
+    def _words(rng: random.Random, count: int) -> bytes:
+        return " ".join(rng.choice(WORDS) for _ in range(count)).encode("ascii")
+
+    def _serialize(self, catalog: int, info: int) -> bytes:
+        document_id = hashlib.sha256(f"{self.spec}-{self.seed}".encode()).hexdigest()[:32].encode()
+        out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(self.objects, start=1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        trailer = b"/Size %d /Root %d 0 R /Info %d 0 R /ID [<%s> <%s>]"
+
+        xref_offset = len(out)
+        if not self.spec.stream_xrefs:
+            out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1)
+            out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+            out += b"trailer\n<< %s >>\n" % (trailer % (len(offsets) + 1, catalog, info, document_id, document_id))
+        else:
+            # The cross-reference stream is an object itself and lists its own offset
+            number = len(offsets) + 1
+            rows = b"\x00\x00\x00\x00\x00\xff\xff" + b"".join(
+                b"\x01" + offset.to_bytes(4, "big") + b"\x00\x00" for offset in offsets + [xref_offset])
+            rows = zlib.compress(rows)
+            out += b"%d 0 obj\n<< /Type /XRef %s /W [1 4 2] /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (
+                number, trailer % (number + 1, catalog, info, document_id, document_id), len(rows), rows)
+        out += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+        return bytes(out)
+
+
+if __name__ == "__main__":
+    main()
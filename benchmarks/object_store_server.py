@@ -0,0 +1,275 @@
+## @file object_store_server.py
+#  @brief Provides a local stand-in S3-compatible object store.
+#  @details The server keeps the objects in memory and answers the requests `S3Storage` sends over
+#           HTTP/1.1 with keep-alive: HEAD, GET with ranges, PUT, server-side copies, multipart
+#           uploads, DELETE and `list-type=2` listings. Buckets are created by the first request
+#           naming them. Given credentials, it checks the AWS Signature Version 4 of every request.
+#           It counts the requests and connections, so benchmarks can check how a client reuses
+#           its connections. It is meant for benchmarks and manual testing only.
+
+import hashlib
+import hmac
+import itertools
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+## @var S3_XML_NAMESPACE
+#  @brief XML namespace of the S3 API responses.
+S3_XML_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+## @var MAX_KEYS
+#  @brief Number of keys returned by one listing request.
+MAX_KEYS = 1000
+
+## @var _RANGE_PATTERN
+#  @brief Matches the `Range` header of a request.
+_RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+## @var _AUTHORIZATION_PATTERN
+#  @brief Matches the `Authorization` header of a request signed with AWS Signature Version 4.
+_AUTHORIZATION_PATTERN = re.compile(
+    r"AWS4-HMAC-SHA256 Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request, SignedHeaders=([^,]+), Signature=([0-9a-f]+)")
+
+
+## @class StandInObjectStore
+#  @brief Local S3-compatible object store running in a background thread.
+class StandInObjectStore:
+    ## @brief Initializes the StandInObjectStore and binds its socket.
+    #  @param host The address to listen on.
+    #  @type host str
+    #  @param port The port to listen on, 0 picks a free one.
+    #  @type port int
+    #  @param access_key The access key ID the requests have to be signed with, None accepts any request.
+    #  @type access_key str | None
+    #  @param secret_key The secret access key.
+    #  @type secret_key str | None
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, access_key: str | None = None,
+                 secret_key: str | None = None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.buckets: dict[str, dict[str, bytes]] = {}
+        self.requests = 0
+        self.connections = 0
+        self._uploads: dict[str, dict[int, bytes]] = {}
+        self._upload_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    ## @brief The URL of the object store.
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    ## @brief Starts serving in a background thread.
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    ## @brief Stops serving and closes the socket.
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    ## @brief Checks the AWS Signature Version 4 of a request.
+    #  @return True if the request is signed with the credentials of the store.
+    #  @rtype bool
+    #  @private
+    def _is_authorized(self, method: str, raw_path: str, headers) -> bool:
+        if self.access_key is None:
+            return True
+        match = _AUTHORIZATION_PATTERN.fullmatch(headers.get("Authorization", ""))
+        if match is None or match.group(1) != self.access_key:
+            return False
+        _, date, region, signed_names, signature = match.groups()
+        path, _, query = raw_path.partition("?")
+        canonical_query = "&".join(sorted(
+            f"{urllib.parse.quote(name, safe='-_.~')}={urllib.parse.quote(value, safe='-_.~')}"
+            for name, value in urllib.parse.parse_qsl(query, keep_blank_values=True)))
+        canonical_headers = "".join(f"{name}:{' '.join(headers.get(name, '').split())}\n"
+                                    for name in signed_names.split(";"))
+        canonical_request = "\n".join([method, path, canonical_query, canonical_headers, signed_names,
+                                       headers.get("x-amz-content-sha256", "")])
+        amz_date = headers.get("x-amz-date", "")
+        string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, f"{date}/{region}/s3/aws4_request",
+                                    hashlib.sha256(canonical_request.encode()).hexdigest()])
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (date, region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        expected = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    ## @brief Creates the request handler class bound to this store.
+    #  @return The handler class.
+    #  @rtype type[BaseHTTPRequestHandler]
+    #  @private
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # The headers and the body of a response are written separately
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with store._lock:
+                    store.connections += 1
+
+            def do_HEAD(self):
+                self._dispatch("HEAD")
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def _dispatch(self, method: str):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with store._lock:
+                    store.requests += 1
+                if not store._is_authorized(method, self.path, self.headers):
+                    self._error(403, "SignatureDoesNotMatch")
+                    return
+                path, _, query_string = self.path.partition("?")
+                query = dict(urllib.parse.parse_qsl(query_string, keep_blank_values=True))
+                bucket_name, _, key = urllib.parse.unquote(path).lstrip("/").partition("/")
+                with store._lock:
+                    bucket = store.buckets.setdefault(bucket_name, {})
+                if not key:
+                    if method == "GET":
+                        self._list(bucket, query)
+                    else:
+                        self._error(405, "MethodNotAllowed")
+                    return
+                getattr(self, f"_{method.lower()}")(bucket, key, query, body)
+
+            def _head(self, bucket: dict, key: str, query: dict, body: bytes):
+                data = bucket.get(key)
+                if data is None:
+                    self._send(404)
+                    return
+                self._send(200, content_length=len(data))
+
+            def _get(self, bucket: dict, key: str, query: dict, body: bytes):
+                data = bucket.get(key)
+                if data is None:
+                    self._error(404, "NoSuchKey")
+                    return
+                match = _RANGE_PATTERN.fullmatch(self.headers.get("Range", ""))
+                if match is None:
+                    self._send(200, data)
+                    return
+                first, last = match.groups()
+                if not first:
+                    start, end = max(0, len(data) - int(last)), len(data)
+                else:
+                    start, end = int(first), min(len(data), int(last) + 1 if last else len(data))
+                if start >= end:
+                    self._send(416, headers={"Content-Range": f"bytes */{len(data)}"})
+                    return
+                self._send(206, data[start:end], {"Content-Range": f"bytes {start}-{end - 1}/{len(data)}"})
+
+            def _put(self, bucket: dict, key: str, query: dict, body: bytes):
+                if "uploadId" in query:
+                    parts = store._uploads.get(query["uploadId"])
+                    if parts is None:
+                        self._error(404, "NoSuchUpload")
+                        return
+                    parts[int(query["partNumber"])] = body
+                    self._send(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+                    return
+                source = self.headers.get("x-amz-copy-source")
+                if source is not None:
+                    source_bucket, _, source_key = urllib.parse.unquote(source).lstrip("/").partition("/")
+                    body = store.buckets.get(source_bucket, {}).get(source_key)
+                    if body is None:
+                        self._error(404, "NoSuchKey")
+                        return
+                bucket[key] = body
+                self._send(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+            def _post(self, bucket: dict, key: str, query: dict, body: bytes):
+                if "uploads" in query:
+                    with store._lock:
+                        upload_id = str(next(store._upload_ids))
+                        store._uploads[upload_id] = {}
+                    self._send_xml(f"<InitiateMultipartUploadResult xmlns=\"{S3_XML_NAMESPACE}\">"
+                                   f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+                    return
+                parts = store._uploads.pop(query.get("uploadId"), None)
+                if parts is None:
+                    self._error(404, "NoSuchUpload")
+                    return
+                numbers = [int(element.text) for element in ElementTree.fromstring(body).iter("PartNumber")]
+                if any(number not in parts for number in numbers):
+                    self._send_xml("<Error><Code>InvalidPart</Code><Message>Unknown part</Message></Error>")
+                    return
+                bucket[key] = b"".join(parts[number] for number in numbers)
+                self._send_xml(f"<CompleteMultipartUploadResult xmlns=\"{S3_XML_NAMESPACE}\">"
+                               f"<Key>{escape(key)}</Key></CompleteMultipartUploadResult>")
+
+            def _delete(self, bucket: dict, key: str, query: dict, body: bytes):
+                if "uploadId" in query:
+                    store._uploads.pop(query["uploadId"], None)
+                else:
+                    bucket.pop(key, None)
+                self._send(204)
+
+            def _list(self, bucket: dict, query: dict):
+                prefix = query.get("prefix", "")
+                keys = sorted(key for key in bucket if key.startswith(prefix))
+                start = int(query.get("continuation-token", 0))
+                page = keys[start:start + MAX_KEYS]
+                truncated = start + MAX_KEYS < len(keys)
+                contents = "".join(f"<Contents><Key>{escape(key)}</Key><Size>{len(bucket[key])}</Size></Contents>"
+                                   for key in page)
+                token = f"<NextContinuationToken>{start + MAX_KEYS}</NextContinuationToken>" if truncated else ""
+                self._send_xml(f"<ListBucketResult xmlns=\"{S3_XML_NAMESPACE}\">{contents}"
+                               f"<IsTruncated>{str(truncated).lower()}</IsTruncated>{token}</ListBucketResult>")
+
+            def _send_xml(self, document: str):
+                self._send(200, ('<?xml version="1.0" encoding="UTF-8"?>' + document).encode(),
+                           {"Content-Type": "application/xml"})
+
+            def _error(self, status: int, code: str):
+                self._send(status, (f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code>'
+                                    f"<Message>{code}</Message></Error>").encode(),
+                           {"Content-Type": "application/xml"})
+
+            def _send(self, status: int, content: bytes = b"", headers: dict | None = None,
+                      content_length: int | None = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content) if content_length is None else content_length))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
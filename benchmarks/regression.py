@@ -0,0 +1,365 @@
+## @file regression.py
+#  @brief Detects performance regressions of signing, verification, key unlocking and key generation.
+#  @details `record` runs a fixed suite of benchmark cases and stores their medians and p95s, together
+#           with the tolerances of the cases and a fingerprint of the machine, in a baseline JSON file.
+#           `check` runs the suite again, prints a table comparing both runs and exits with status 1 if
+#           a case got slower than its tolerance allows. Timings are only comparable on the same
+#           machine, so a baseline recorded on another machine is reported (and refused with
+#           `--require-same-machine`). The suite avoids machine-dependent inputs: the key derivation
+#           of the key file uses fixed cost parameters instead of calibrated ones, and key generation
+#           draws its prime candidates from a seeded generator, so every run tests the same candidates.
+#           Run from the repository root:
+#           `python -m benchmarks.regression record` on the reference state,
+#           `python -m benchmarks.regression check` on a change.
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from importlib import metadata
+from typing import Callable
+
+from cryptography.hazmat.primitives import serialization
+
+from generating.key_generate.AES_key_generator import KDF_SCRYPT, SCRYPT_BLOCK_SIZE, SCRYPT_MIN_N, SALT_SIZE
+from generating.key_generate.AES_key_generator import KdfParameters, aes_encrypt_file
+from generating.key_generate.RSA_key_generator import RSA_KEY_SIZE, generate_rsa_key
+from services import pdf_signer
+from services.key_getter import get_key
+from services.pdf_signer import NoTimestamps, VerifierSession
+
+from .common import generate_private_key, measure, print_table, write_pdf
+
+## @var DEFAULT_BASELINE_PATH
+#  @brief Path of the checked-in baseline file.
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+## @var BASELINE_FORMAT_VERSION
+#  @brief Version of the layout of the baseline files.
+BASELINE_FORMAT_VERSION = 1
+
+## @var DEFAULT_MEDIAN_TOLERANCE
+#  @brief Default relative increase of a median counted as a regression.
+DEFAULT_MEDIAN_TOLERANCE = 0.25
+
+## @var DEFAULT_P95_TOLERANCE
+#  @brief Default relative increase of a p95 counted as a regression. Tail latencies are noisier than medians.
+DEFAULT_P95_TOLERANCE = 0.5
+
+## @var MIN_REGRESSION_SECONDS
+#  @brief Absolute increase in seconds below which a slower result is not counted as a regression,
+#         so that timer noise on sub-millisecond cases does not fail the check.
+MIN_REGRESSION_SECONDS = 0.001
+
+## @var DOCUMENT_PAGES
+#  @brief Number of pages of the signed and verified document.
+DOCUMENT_PAGES = 10
+
+## @var PIN
+#  @brief PIN of the benchmark key file.
+PIN = "1234"
+
+## @var KEY_GENERATION_SEED
+#  @brief Seed of the random bytes of the key generation case.
+KEY_GENERATION_SEED = 0
+
+## @var MACHINE_FINGERPRINT_FIELDS
+#  @brief Metadata fields identifying a machine; the other metadata are informational.
+MACHINE_FINGERPRINT_FIELDS = ("system", "machine", "cpu_model", "cpu_count", "python_implementation", "python_version")
+
+## @var STATUS_OK
+#  @brief Comparison status of a case within its tolerances.
+STATUS_OK = "ok"
+
+## @var STATUS_FASTER
+#  @brief Comparison status of a case whose median improved by more than its tolerance.
+STATUS_FASTER = "faster"
+
+## @var STATUS_REGRESSION
+#  @brief Comparison status of a case slower than its tolerances allow.
+STATUS_REGRESSION = "REGRESSION"
+
+## @var STATUS_NEW
+#  @brief Comparison status of a case missing in the baseline.
+STATUS_NEW = "new"
+
+## @var STATUS_MISSING
+#  @brief Comparison status of a baseline case that was not run.
+STATUS_MISSING = "missing"
+
+
+## @class BenchmarkCase
+#  @brief A measured operation of the regression suite.
+#  @details `function` is called without arguments, `repeat` times after `warmup` unmeasured calls.
+#           `median_tolerance` and `p95_tolerance` are written to the baseline when it is recorded.
+@dataclass(frozen=True)
+class BenchmarkCase:
+    name: str
+    function: Callable[[], object]
+    repeat: int
+    warmup: int = 1
+    median_tolerance: float = DEFAULT_MEDIAN_TOLERANCE
+    p95_tolerance: float = DEFAULT_P95_TOLERANCE
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Records benchmark baselines and checks for performance regressions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="run the suite and write a baseline file")
+    record.add_argument("--output", default=DEFAULT_BASELINE_PATH, help="path of the baseline file to write")
+
+    check = subparsers.add_parser("check", help="run the suite and compare it with a baseline file")
+    check.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="path of the baseline file")
+    check.add_argument("--tolerance", type=float, default=None,
+                       help="relative median increase counted as a regression, overrides the baseline tolerances")
+    check.add_argument("--p95-tolerance", type=float, default=None,
+                       help="relative p95 increase counted as a regression, overrides the baseline tolerances")
+    check.add_argument("--require-same-machine", action="store_true",
+                       help="fail instead of warning when the baseline was recorded on another machine")
+    check.add_argument("--save", default=None, help="also write the results of this run to the given file")
+
+    for subparser in (record, check):
+        subparser.add_argument("--cases", default=None, help="comma separated names of the cases to run, default all")
+    return parser.parse_args()
+
+
+## @brief Collects metadata describing the machine and the software versions.
+#  @return The metadata, with a `fingerprint` hashing the `MACHINE_FINGERPRINT_FIELDS`.
+#  @rtype dict
+def machine_metadata() -> dict:
+    info = {
+        "system": platform.system(),
+        "release": platform.release(),
+        "machine": platform.machine(),
+        "cpu_model": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "python_implementation": platform.python_implementation(),
+        "python_version": platform.python_version(),
+        "packages": {name: _package_version(name) for name in ("cryptography", "pyHanko", "pycryptodome")},
+    }
+    identity = json.dumps([info[field] for field in MACHINE_FINGERPRINT_FIELDS])
+    info["fingerprint"] = hashlib.sha256(identity.encode()).hexdigest()[:16]
+    return info
+
+
+## @brief Creates the cases of the suite and their inputs.
+#  @param directory A directory for the documents and key files of the cases.
+#  @type directory str
+#  @return The cases.
+#  @rtype list[BenchmarkCase]
+def create_cases(directory: str) -> list[BenchmarkCase]:
+    private_key = generate_private_key()
+    public_key = private_key.public_key()
+    timestamp_policy = NoTimestamps()
+
+    in_path = os.path.join(directory, "in.pdf")
+    signed_path = os.path.join(directory, "signed.pdf")
+    out_path = os.path.join(directory, "out.pdf")
+    write_pdf(in_path, pages=DOCUMENT_PAGES)
+    pdf_signer.sign(private_key, in_path, signed_path, timestamp_policy)
+    session = VerifierSession(public_key)
+
+    key_path = os.path.join(directory, "private_key.pem")
+    with open(key_path, "wb") as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                          serialization.NoEncryption()))
+    params = KdfParameters(KDF_SCRYPT, SCRYPT_MIN_N, SCRYPT_BLOCK_SIZE, 1, os.urandom(SALT_SIZE))
+    aes_encrypt_file(key_path, PIN, params)
+
+    def generate_key():
+        return generate_rsa_key(RSA_KEY_SIZE, randfunc=random.Random(KEY_GENERATION_SEED).randbytes)
+
+    return [
+        BenchmarkCase("sign", lambda: pdf_signer.sign(private_key, in_path, out_path, timestamp_policy), 20),
+        BenchmarkCase("verify", lambda: pdf_signer.verify(public_key, signed_path), 20),
+        BenchmarkCase("verify_session", lambda: session.verify(signed_path), 20),
+        # The unlock path of the CLIs, which skips the consistency check of the authenticated key
+        BenchmarkCase("get_key", lambda: get_key(PIN, key_source=key_path), 10),
+        # Few repetitions of a long case, so its median is noisier
+        BenchmarkCase("key_generation", generate_key, 3, warmup=0, median_tolerance=0.35, p95_tolerance=0.75),
+    ]
+
+
+## @brief Runs benchmark cases.
+#  @param cases The cases.
+#  @type cases list[BenchmarkCase]
+#  @return The results by case name: `median`, `p95` and `min` in seconds, `repeat` and the tolerances.
+#  @rtype dict
+def run_cases(cases: list[BenchmarkCase]) -> dict:
+    results = {}
+    for case in cases:
+        print(f"Running {case.name} ({case.repeat} times)", file=sys.stderr)
+        result = measure(case.function, case.repeat, case.warmup)
+        results[case.name] = {
+            "median": result["median"],
+            "p95": result["p95"],
+            "min": result["min"],
+            "repeat": case.repeat,
+            "median_tolerance": case.median_tolerance,
+            "p95_tolerance": case.p95_tolerance,
+        }
+    return results
+
+
+## @brief Compares results with a baseline.
+#  @param baseline The results of the baseline, as returned by `run_cases`.
+#  @type baseline dict
+#  @param current The results of the current run.
+#  @type current dict
+#  @param median_tolerance A median tolerance replacing the ones of the baseline, or None.
+#  @type median_tolerance float | None
+#  @param p95_tolerance A p95 tolerance replacing the ones of the baseline, or None.
+#  @type p95_tolerance float | None
+#  @return The table rows and whether any case regressed.
+#  @rtype tuple[list[list], bool]
+def compare_results(baseline: dict, current: dict, median_tolerance: float | None = None,
+                    p95_tolerance: float | None = None) -> tuple[list[list], bool]:
+    rows = []
+    regressed = False
+    for name in list(current) + [name for name in baseline if name not in current]:
+        if name not in current:
+            old = baseline[name]
+            rows.append([name, old["median"] * 1000, "-", "-", old["p95"] * 1000, "-", "-", STATUS_MISSING])
+            continue
+        new = current[name]
+        if name not in baseline:
+            rows.append([name, "-", new["median"] * 1000, "-", "-", new["p95"] * 1000, "-", STATUS_NEW])
+            continue
+        old = baseline[name]
+        median_limit = old.get("median_tolerance", DEFAULT_MEDIAN_TOLERANCE) if median_tolerance is None else median_tolerance
+        p95_limit = old.get("p95_tolerance", DEFAULT_P95_TOLERANCE) if p95_tolerance is None else p95_tolerance
+        if _exceeds(old["median"], new["median"], median_limit) or _exceeds(old["p95"], new["p95"], p95_limit):
+            status = STATUS_REGRESSION
+            regressed = True
+        elif new["median"] < old["median"] * (1 - median_limit):
+            status = STATUS_FASTER
+        else:
+            status = STATUS_OK
+        rows.append([name, old["median"] * 1000, new["median"] * 1000, _change(old["median"], new["median"]),
+                     old["p95"] * 1000, new["p95"] * 1000, _change(old["p95"], new["p95"]), status])
+    return rows, regressed
+
+
+## @brief Reads a baseline file.
+#  @param path The path of the file.
+#  @type path str
+#  @return The baseline with its `machine` metadata and `results`.
+#  @rtype dict
+#  @exception ValueError If the file has an unknown format version.
+def load_baseline(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("format_version") != BASELINE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported baseline format {baseline.get('format_version')} in {path}")
+    return baseline
+
+
+## @brief Writes results and the machine metadata to a baseline file.
+#  @param path The path of the file.
+#  @type path str
+#  @param results The results, as returned by `run_cases`.
+#  @type results dict
+#  @param machine The metadata, as returned by `machine_metadata`.
+#  @type machine dict
+def save_baseline(path: str, results: dict, machine: dict):
+    baseline = {
+        "format_version": BASELINE_FORMAT_VERSION,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "machine": machine,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    args = parse_args()
+    if args.command == "check":
+        # Fail on a missing or unreadable baseline before spending minutes on the suite
+        baseline = load_baseline(args.baseline)
+
+    machine = machine_metadata()
+    with tempfile.TemporaryDirectory() as directory:
+        cases = create_cases(directory)
+        if args.cases:
+            selected = set(args.cases.split(","))
+            cases = [case for case in cases if case.name in selected]
+        results = run_cases(cases)
+
+    if args.command == "record":
+        save_baseline(args.output, results, machine)
+        print_table(["case", "median ms", "p95 ms"],
+                    [[name, result["median"] * 1000, result["p95"] * 1000] for name, result in results.items()])
+        print(f"Baseline written to {args.output}")
+        return
+
+    if args.save:
+        save_baseline(args.save, results, machine)
+    baseline_machine = baseline.get("machine", {})
+    same_machine = baseline_machine.get("fingerprint") == machine["fingerprint"]
+    if not same_machine:
+        differences = [f"{field}: {baseline_machine.get(field)} -> {machine[field]}" for field in MACHINE_FINGERPRINT_FIELDS
+                       if baseline_machine.get(field) != machine[field]]
+        print("Warning: the baseline was recorded on another machine, timings are not comparable ("
+              + "; ".join(differences) + ")", file=sys.stderr)
+
+    baseline_results = baseline["results"]
+    if args.cases:
+        baseline_results = {name: result for name, result in baseline_results.items() if name in results}
+    rows, regressed = compare_results(baseline_results, results, args.tolerance, args.p95_tolerance)
+    print_table(["case", "base median ms", "median ms", "change", "base p95 ms", "p95 ms", "change", "status"], rows)
+
+    if not same_machine and args.require_same_machine:
+        sys.exit(2)
+    if regressed:
+        print("Performance regression detected", file=sys.stderr)
+        sys.exit(1)
+
+
+## @brief Tells whether a value grew by more than the tolerance and by more than `MIN_REGRESSION_SECONDS`.
+#  @private
+def _exceeds(old: float, new: float, tolerance: float) -> bool:
+    return new > old * (1 + tolerance) and new - old > MIN_REGRESSION_SECONDS
+
+
+## @brief Formats the relative change between two values.
+#  @private
+def _change(old: float, new: float) -> str:
+    return f"{(new - old) / old:+.1%}" if old else "-"
+
+
+## @brief Returns the CPU model name, or the processor string where /proc/cpuinfo is unavailable.
+#  @private
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+## @brief Returns the installed version of a distribution, None if it is not installed.
+#  @private
+def _package_version(name: str) -> str | None:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+## @file tsa_server.py
+#  @brief Provides a local stand-in RFC 3161 time stamping authority.
+#  @details The server answers timestamp requests over HTTP/1.1 with keep-alive, issuing the
+#           tokens with pyhanko's `DummyTimeStamper` and a throwaway key. It counts the requests
+#           and connections, so benchmarks can check how a client reuses its connections.
+#           It is meant for benchmarks and manual testing only.
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asn1crypto import tsp
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.sign.timestamps import DummyTimeStamper
+
+from services.pdf_signer.signer import _generate_self_signed_cert
+from services.pdf_signer.timestamping import TIMESTAMP_QUERY_CONTENT_TYPE, TIMESTAMP_REPLY_CONTENT_TYPE
+
+## @var TSA_KEY_SIZE
+#  @brief Size in bits of the throwaway key of the stand-in authority.
+TSA_KEY_SIZE = 2048
+
+
+## @class StandInTsaServer
+#  @brief Local RFC 3161 time stamping authority running in a background thread.
+class StandInTsaServer:
+    ## @brief Initializes the StandInTsaServer and binds its socket.
+    #  @param host The address to listen on.
+    #  @type host str
+    #  @param port The port to listen on, 0 picks a free one.
+    #  @type port int
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        tsa_key = rsa.generate_private_key(public_exponent=65537, key_size=TSA_KEY_SIZE)
+        tsa_cert, asn1_tsa_key = _generate_self_signed_cert(tsa_key)
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._timestamper = DummyTimeStamper(tsa_cert, asn1_tsa_key)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    ## @brief The URL of the authority.
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    ## @brief Starts serving in a background thread.
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    ## @brief Stops serving and closes the socket.
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    ## @brief Creates the request handler class bound to this server.
+    #  @return The handler class.
+    #  @rtype type[BaseHTTPRequestHandler]
+    #  @private
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Type") != TIMESTAMP_QUERY_CONTENT_TYPE:
+                    self.send_error(415)
+                    return
+                response = server._timestamper.request_tsa_response(tsp.TimeStampReq.load(body)).dump()
+                with server._lock:
+                    server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", TIMESTAMP_REPLY_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -3,11 +3,13 @@
 # @brief GUI window for generating RSA key pairs.
 # @details Provides input fields for taking a path to saving public/private keys, setting 4-digit PIN and a progress bar to display the current status of the generating process.
 #
-import time
+import math
+import os
 import tkinter as tk
 import threading
 from tkinter import filedialog, ttk
-from generating.key_generate.RSA_key_generator import generate_keys
+from generating.key_generate.RSA_key_generator import (KeyGenerationProcess, save_keys, PHASE_PRIME_P, RSA_KEY_SIZE,
+                                                       KEY_FORMAT_DER, KEY_FORMAT_PEM)
 from generating.key_generate.AES_key_generator import aes_encrypt_file
 
 ## @var PRIVATE_KEY_NAME.
@@ -18,6 +20,18 @@ PRIVATE_KEY_NAME = "private_key.key"
 #  @brief Default filename for the public key.
 PUBLIC_KEY_NAME = "public_key.key"
 
+## @var POLL_INTERVAL_MS.
+#  @brief Interval in milliseconds between two checks of the key generation progress.
+POLL_INTERVAL_MS = 100
+
+## @var EXPECTED_PRIME_CANDIDATES.
+#  @brief Average number of odd candidates tested until a prime of half the key size is found.
+EXPECTED_PRIME_CANDIDATES = RSA_KEY_SIZE / 2 * math.log(2) / 2
+
+## @var GENERATION_PROGRESS_SHARE.
+#  @brief Part of the progress bar (in percent) filled by the prime search, the rest covers saving and encryption.
+GENERATION_PROGRESS_SHARE = 90
+
 FOREGROUND_COLOR = "#ffffff"
 BACKGROUND_COLOR = "#1e1e1e"
 BACKGROUND2_COLOR = "#2d2d2d"
@@ -28,6 +42,8 @@ class GenerateKeys(tk.Frame):
     def __init__(self, parent: tk.Tk):
         tk.Frame.__init__(self, parent)
 
+        self.generation = None
+
         self.configure(bg=BACKGROUND_COLOR, padx=20, pady=20)
 
         self.progress_bar_style = ttk.Style(self)
@@ -123,7 +139,7 @@ class GenerateKeys(tk.Frame):
     ##
     # @brief Show the PIN field.
     #
-    # @details The function display the section label and text field to get a 4-digit PIN.
+    # @details The function display the section label and text field to get a 4-digit PIN, and the option to store the private key as DER.
     #
     def show_pin(self):
         self.label_pin = tk.Label(self, text="PIN:", fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR)
@@ -132,6 +148,14 @@ class GenerateKeys(tk.Frame):
         self.pin_entry.pack(padx=5, pady=(0, 10), anchor="center")
         self.pin_entry.pack(padx=5, pady=5)
 
+        # DER key files skip the PEM/base64 decoding when the signing application unlocks the key
+        self.der_format = tk.BooleanVar(value=False)
+        self.der_format_check = tk.Checkbutton(self, text="Store private key as DER (faster unlock)",
+                                               variable=self.der_format, fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR,
+                                               selectcolor=BACKGROUND2_COLOR, activebackground=BACKGROUND_COLOR,
+                                               activeforeground=FOREGROUND_COLOR)
+        self.der_format_check.pack(padx=5, pady=(0, 5), anchor="center")
+
     ##
     # @brief Show the progress bar
     #
@@ -165,6 +189,19 @@ class GenerateKeys(tk.Frame):
         )
         self.button_generate.pack(padx=5, pady=(0, 5), anchor="center")
 
+        # Cancel button, enabled while the RSA keys are generated
+        self.button_cancel = tk.Button(
+            self,
+            text="Cancel",
+            bg=BLUE_BUTTON_COLOR,
+            fg="white",
+            activebackground=ACTIVATE_BUTTON_COLOR,
+            relief="flat",
+            state="disabled",
+            command=self.cancel_generation
+        )
+        self.button_cancel.pack(padx=5, pady=(0, 5), anchor="center")
+
     ##
     # @brief Open external window to choose a folder.
     #
@@ -182,7 +219,9 @@ class GenerateKeys(tk.Frame):
     ##
     # @brief Manager to generation of keys.
     #
-    # @details The function are the simple manager to entry correctly params for generate_keys_thread function, which is running on the other thread.
+    # @details The function are the simple manager to entry correctly params. It starts the RSA key generation
+    # in a child process and polls its progress with `after()`; the keys are then saved and encrypted
+    # by generate_keys_thread, which is running on the other thread.
     #
     # @param public_path  Path to the public key.
     # @param private_path Path to the private key.
@@ -203,40 +242,100 @@ class GenerateKeys(tk.Frame):
         public_path += ("/" + PUBLIC_KEY_NAME)
         private_path += ("/" + PRIVATE_KEY_NAME)
 
-        threading.Thread(target=self.generate_keys_thread, args=(public_path, private_path, pin)).start()
+        self.button_generate.configure(state="disabled")
+        self.button_cancel.configure(state="normal")
+        self.update_status("Generating RSA keys...", 0, "green.Horizontal.TProgressbar")
+        self.generation = KeyGenerationProcess(RSA_KEY_SIZE, KEY_FORMAT_DER if self.der_format.get() else KEY_FORMAT_PEM)
+        self.after(POLL_INTERVAL_MS, self.poll_generation, public_path, private_path, pin)
 
     ##
-    # @brief Generate keys status function in the thread.
+    # @brief Poll the progress of the RSA key generation.
     #
-    # @details This function calls the generate_keys function from RSA_key_generator and the aes_encrypt_file function from AES_key_generator to generate a public/private RSA key pairs
-    # and encrypt the private key using a 4-digit PIN code.
-    # Additionally, it updates the progress bar to reflect the current stage of the operation.
+    # @details The function shows the phase and the number of tested prime candidates reported by the child process
+    # and schedules itself again until the keys are generated, the generation fails or it is cancelled.
+    # The progress bar is an estimate, the number of candidates needed for a prime varies from key to key.
     #
     # @param public_path  Path to the public key.
     # @param private_path Path to the private key.
     # @param pin Code PIN to encrypt private key.
     #
-    def generate_keys_thread(self, public_path: str, private_path: str, pin: str):
-        self.update_status("Generating RSA keys...", 25,"green.Horizontal.TProgressbar")
-        time.sleep(0.1)
+    def poll_generation(self, public_path: str, private_path: str, pin: str):
+        if self.generation is None:
+            return
+
+        for message in self.generation.poll():
+            if message[0] == "progress":
+                _, phase, tested = message
+                prime_number = 1 if phase == PHASE_PRIME_P else 2
+                fraction = 1 - math.exp(-tested / EXPECTED_PRIME_CANDIDATES)
+                self.update_status(f"Searching prime {prime_number} of 2: {tested} candidates tested",
+                                   int(GENERATION_PROGRESS_SHARE * (prime_number - 1 + fraction) / 2),
+                                   "green.Horizontal.TProgressbar")
+            elif message[0] == "done":
+                _, private_key, public_key = message
+                self.finish_generation()
+                threading.Thread(target=self.generate_keys_thread,
+                                 args=(public_path, private_path, pin, private_key, public_key)).start()
+                return
+            else:
+                self.finish_generation()
+                self.button_generate.configure(state="normal")
+                self.update_status(f"RSA keys generation failed: {message[1]}", 100, "red.Horizontal.TProgressbar")
+                return
 
-        generating_rsa_success = generate_keys(public_path, private_path)
+        self.after(POLL_INTERVAL_MS, self.poll_generation, public_path, private_path, pin)
 
-        if generating_rsa_success:
-            self.update_status("RSA keys generated.",50,"green.Horizontal.TProgressbar")
-            time.sleep(1)
-        else:
-            self.update_status("RSA keys generated failed",0,"green.Horizontal.TProgressbar")
+    ##
+    # @brief Cancel the RSA key generation.
+    #
+    # @details Terminates the child process. Nothing has been written to the chosen locations yet.
+    #
+    def cancel_generation(self):
+        if self.generation is None:
             return
+        self.finish_generation()
+        self.button_generate.configure(state="normal")
+        self.update_status("RSA keys generation cancelled", 0, "red.Horizontal.TProgressbar")
+
+    ##
+    # @brief Stop the child process and disable the cancel button.
+    #
+    def finish_generation(self):
+        self.generation.cancel()
+        self.generation = None
+        self.button_cancel.configure(state="disabled")
+
+    ##
+    # @brief Save and encrypt the generated keys in the thread.
+    #
+    # @details This function calls the save_keys function from RSA_key_generator and the aes_encrypt_file function from AES_key_generator to save the generated public/private RSA key pairs
+    # and encrypt the private key using a 4-digit PIN code. The private key is only encrypted if both keys were saved,
+    # and it is removed again if the encryption fails, so no unencrypted private key is left behind.
+    # Additionally, it updates the progress bar to reflect the current stage of the operation.
+    #
+    # @param public_path  Path to the public key.
+    # @param private_path Path to the private key.
+    # @param pin Code PIN to encrypt private key.
+    # @param private_key The PEM encoded private key.
+    # @param public_key The PEM encoded public key.
+    #
+    def generate_keys_thread(self, public_path: str, private_path: str, pin: str, private_key: bytes, public_key: bytes):
+        try:
+            self.update_status("RSA keys generated.", GENERATION_PROGRESS_SHARE, "green.Horizontal.TProgressbar")
 
-        encrypted_aes_success = aes_encrypt_file(private_path, pin)
-        self.update_status("AES encryption...", 75,"green.Horizontal.TProgressbar")
-        time.sleep(1)
+            if not save_keys(public_path, private_path, private_key, public_key):
+                self.update_status("Saving RSA keys failed", 100, "red.Horizontal.TProgressbar")
+                return
 
-        if encrypted_aes_success:
-            self.update_status("Private key encrypted by PIN", 100,"green.Horizontal.TProgressbar")
-        else:
-            self.update_status("Private key encryption failed", 100,"red.Horizontal.TProgressbar")
+            self.update_status("AES encryption...", 95, "green.Horizontal.TProgressbar")
+            if aes_encrypt_file(private_path, pin):
+                self.update_status("Private key encrypted by PIN", 100, "green.Horizontal.TProgressbar")
+            else:
+                if os.path.exists(private_path):
+                    os.remove(private_path)
+                self.update_status("Private key encryption failed", 100, "red.Horizontal.TProgressbar")
+        finally:
+            self.after(0, lambda: self.button_generate.configure(state="normal"))
 
     ##
     # @brief Update status of the progress bar
@@ -1,13 +1,89 @@
 import os.path
+import struct
+import time
+from dataclasses import dataclass, replace
 
 from Crypto.Cipher import AES
-from hashlib import sha256
+from hashlib import scrypt, sha256
+
+# Argon2id is optional, it needs the argon2-cffi package
+try:
+    from argon2.low_level import hash_secret_raw, Type as Argon2Type
+except ImportError:
+    hash_secret_raw = None
+
+## @var KEY_FILE_MAGIC
+#  @brief Bytes starting every key file with a header. Files without them use the legacy headerless format.
+KEY_FILE_MAGIC = b"BSKKEY"
+
+## @var KEY_FILE_VERSION
+#  @brief Version of the key file header written by `aes_encrypt_file`.
+KEY_FILE_VERSION = 1
+
+## @var KDF_SCRYPT
+#  @brief Header identifier of the scrypt key derivation.
+KDF_SCRYPT = 1
+
+## @var KDF_ARGON2ID
+#  @brief Header identifier of the Argon2id key derivation.
+KDF_ARGON2ID = 2
+
+## @var SALT_SIZE
+#  @brief Size in bytes of the random salt stored in the header.
+SALT_SIZE = 16
+
+## @var DEFAULT_UNLOCK_TIME
+#  @brief Default time in seconds the key derivation should take, see `calibrate_kdf`.
+DEFAULT_UNLOCK_TIME = 0.25
+
+## @var SCRYPT_MIN_N
+#  @brief Smallest scrypt cost parameter N chosen by the calibration.
+SCRYPT_MIN_N = 2 ** 14
+
+## @var SCRYPT_MAX_N
+#  @brief Largest scrypt cost parameter N chosen by the calibration (256 MiB of memory with r = 8).
+#         Longer unlock times are reached by raising the parallelism instead.
+SCRYPT_MAX_N = 2 ** 18
+
+## @var SCRYPT_BLOCK_SIZE
+#  @brief scrypt block size parameter r.
+SCRYPT_BLOCK_SIZE = 8
+
+## @var ARGON2_MEMORY_COST
+#  @brief Argon2id memory cost in KiB used by the calibration.
+ARGON2_MEMORY_COST = 64 * 1024
+
+## @var ARGON2_PARALLELISM
+#  @brief Argon2id parallelism used by the calibration.
+ARGON2_PARALLELISM = 1
+
+## @var _HEADER_STRUCT
+#  @brief Layout of the header: magic, version, KDF identifier, three KDF parameters and the salt length.
+#  @private
+_HEADER_STRUCT = struct.Struct(">6sBBIIIB")
+
+
+##
+# @class KdfParameters
+# @brief Parameters of the PIN key derivation stored in the key file header.
+#
+# @details For scrypt `cost` is N, `memory` is the block size r and `parallelism` is p.
+# For Argon2id `cost` is the number of passes, `memory` the memory cost in KiB and `parallelism` the number of lanes.
+#
+@dataclass(frozen=True)
+class KdfParameters:
+    algorithm: int
+    cost: int
+    memory: int
+    parallelism: int
+    salt: bytes = b""
 
 
 ##
 # @brief Generates a 256-bit key from PIN code
 #
-# @details The function validates the given PIN code and generate a 256-bit code from given PIN code
+# @details The function validates the given PIN code and generate a 256-bit code from given PIN code.
+# It is the key derivation of the legacy headerless key files.
 #
 # @param pin A PIN code as string
 #
@@ -18,33 +94,132 @@ def hash_pin(pin: str):
     return sha256(pin.encode()).digest()
 
 
+##
+# @brief Derives a 256-bit key from PIN code using the given key derivation parameters
+#
+# @param pin A PIN code as string
+# @param params The key derivation function and its cost parameters
+#
+# @return The derived 256-bit key
+def derive_key(pin: str, params: KdfParameters) -> bytes:
+    if not pin.isdigit():
+        raise ValueError("PIN must be a digit")
+    if params.algorithm == KDF_SCRYPT:
+        return scrypt(pin.encode(), salt=params.salt, n=params.cost, r=params.memory, p=params.parallelism,
+                      maxmem=256 * params.memory * params.cost, dklen=32)
+    if params.algorithm == KDF_ARGON2ID:
+        if hash_secret_raw is None:
+            raise ValueError("Argon2id requires the argon2-cffi package")
+        return hash_secret_raw(pin.encode(), params.salt, time_cost=params.cost, memory_cost=params.memory,
+                               parallelism=params.parallelism, hash_len=32, type=Argon2Type.ID)
+    raise ValueError(f"Unknown key derivation function {params.algorithm}")
+
+
+##
+# @brief Picks key derivation parameters reaching the target unlock time on this machine
+#
+# @details The function times derivations with the cheapest parameters and scales the cost linearly
+# to the target. For scrypt N is rounded to a power of two and capped at `SCRYPT_MAX_N`, the rest of the budget
+# is reached by raising p. For Argon2id the memory cost is fixed and the number of passes is scaled.
+# The machine unlocking the key should be of similar speed, otherwise the unlock time differs accordingly.
+#
+# @param target_seconds The wanted duration of the key derivation in seconds
+# @param algorithm `KDF_SCRYPT` or `KDF_ARGON2ID`
+#
+# @return The calibrated parameters with a fresh random salt
+def calibrate_kdf(target_seconds: float = DEFAULT_UNLOCK_TIME, algorithm: int = KDF_SCRYPT) -> KdfParameters:
+    salt = os.urandom(SALT_SIZE)
+    if algorithm == KDF_SCRYPT:
+        params = KdfParameters(KDF_SCRYPT, SCRYPT_MIN_N, SCRYPT_BLOCK_SIZE, 1, salt)
+        scale = target_seconds / measure_kdf(params)
+        n = SCRYPT_MIN_N
+        while n < SCRYPT_MAX_N and n * 2 <= SCRYPT_MIN_N * scale:
+            n *= 2
+        parallelism = max(1, round(SCRYPT_MIN_N * scale / n))
+        return replace(params, cost=n, parallelism=parallelism)
+
+    # Two measurements separate the cost of a pass from the one-off cost of allocating the memory
+    params = KdfParameters(KDF_ARGON2ID, 1, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, salt)
+    one_pass = measure_kdf(params)
+    pass_time = max(measure_kdf(replace(params, cost=2)) - one_pass, 1e-6)
+    return replace(params, cost=max(1, round((target_seconds - one_pass) / pass_time) + 1))
+
+
+##
+# @brief Measures the duration of a single key derivation
+#
+# @param params The key derivation parameters to measure
+#
+# @return The duration in seconds
+def measure_kdf(params: KdfParameters) -> float:
+    start = time.perf_counter()
+    derive_key("0000", params)
+    return time.perf_counter() - start
+
+
+##
+# @brief Serializes the key file header
+#
+# @param params The key derivation parameters recorded in the header
+#
+# @return The header bytes
+def encode_header(params: KdfParameters) -> bytes:
+    return _HEADER_STRUCT.pack(KEY_FILE_MAGIC, KEY_FILE_VERSION, params.algorithm, params.cost, params.memory,
+                               params.parallelism, len(params.salt)) + params.salt
+
+
+##
+# @brief Parses the key file header
+#
+# @param data The content of the key file
+#
+# @return Tuple (params, header) with the key derivation parameters and the raw header bytes;
+#         Tuple (None, b"") for legacy headerless files.
+def decode_header(data: bytes) -> (KdfParameters, bytes):
+    if not data.startswith(KEY_FILE_MAGIC):
+        return None, b""
+    _, version, algorithm, cost, memory, parallelism, salt_length = _HEADER_STRUCT.unpack_from(data)
+    if version != KEY_FILE_VERSION:
+        raise ValueError(f"Unsupported key file version {version}")
+    header_length = _HEADER_STRUCT.size + salt_length
+    params = KdfParameters(algorithm, cost, memory, parallelism, data[_HEADER_STRUCT.size:header_length])
+    return params, data[:header_length]
+
+
 ##
 # @brief Encrypts a file using a 4-digit PIN code and AES encryption
 #
-# @details The function reads a file from the given path, changes the given 4-digit PIN code to a 256-bit key, and then
-# encrypt the file with this key using AES encryption.
+# @details The function reads a file from the given path, derives a 256-bit key from the given 4-digit PIN code
+# with the given (or freshly calibrated) key derivation parameters, and then encrypt the file with this key using
+# AES encryption. The written file starts with a versioned header recording the key derivation, which is also
+# authenticated by the EAX tag.
 #
 # @param file_to_encrypt Path to the input file to encrypt
 # @param pin 4-digit PIN code
+# @param params Key derivation parameters; if None, `calibrate_kdf` picks them for `DEFAULT_UNLOCK_TIME`
 #
 # @return True if AES encryption was successful; False if the file was not found or encryption failed.
-def aes_encrypt_file(file_to_encrypt: str, pin: str) -> bool:
+def aes_encrypt_file(file_to_encrypt: str, pin: str, params: KdfParameters = None) -> bool:
     if not os.path.isfile(file_to_encrypt):
         return False
     try:
-        key = hash_pin(pin)
+        if params is None:
+            params = calibrate_kdf()
+        header = encode_header(params)
+        key = derive_key(pin, params)
 
         with open(file_to_encrypt, 'rb') as file:
             data = file.read()
 
         cipher = AES.new(key, AES.MODE_EAX)
+        cipher.update(header)
         ciphertext, tag = cipher.encrypt_and_digest(data)
         nonce = cipher.nonce
         '''
         len(nonce) = 16 bytes
         len(tag) = 16 bytes
         '''
-        data = nonce + tag + ciphertext
+        data = header + nonce + tag + ciphertext
 
         with open(file_to_encrypt, 'wb') as file:
             file.write(data)
@@ -58,7 +233,7 @@ def aes_encrypt_file(file_to_encrypt: str, pin: str) -> bool:
 # @brief Decrypts a file using a 4-digit PIN code and AES decryption
 #
 # @details The function reads a file from the given path, changes the given 4-digit PIN code to a 256-bit key, and then
-# decrypt the file with this key using AES decryption.
+# decrypt the file with this key using AES decryption. Both files with a header and legacy headerless files are accepted.
 #
 # @param file_to_encrypt Path to the input file to decrypt
 # @param pin 4-digit PIN code
@@ -69,14 +244,17 @@ def aes_decrypt_file(file_to_decrypt: str, pin: str) -> (bool, bytes):
     if not os.path.isfile(file_to_decrypt):
         return False, None
     try:
-        key = hash_pin(pin)
-
         with open(file_to_decrypt, 'rb') as file:
             encrypted_data = file.read()
 
+        params, header = decode_header(encrypted_data)
+        key = hash_pin(pin) if params is None else derive_key(pin, params)
+        encrypted_data = encrypted_data[len(header):]
+
         nonce, tag, ciphertext = encrypted_data[:16], encrypted_data[16:32], encrypted_data[32:]
 
         decrypt_file = AES.new(key, AES.MODE_EAX, nonce=nonce)
+        decrypt_file.update(header)
         data = decrypt_file.decrypt_and_verify(ciphertext, tag)
         return True, data
     except Exception as e:
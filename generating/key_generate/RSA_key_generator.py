@@ -1,5 +1,43 @@
+import multiprocessing
+import queue
+
+from Crypto.Math.Numbers import Integer
+from Crypto.Math.Primality import generate_probable_prime
 from Crypto.PublicKey import RSA
 
+## @var RSA_KEY_SIZE
+#  @brief Length in bits of the generated RSA modulus.
+RSA_KEY_SIZE = 4096
+
+## @var RSA_PUBLIC_EXPONENT
+#  @brief Public exponent of the generated RSA keys.
+RSA_PUBLIC_EXPONENT = 65537
+
+## @var KEY_FORMAT_PEM
+#  @brief Private key file format readable by most tools.
+KEY_FORMAT_PEM = "PEM"
+
+## @var KEY_FORMAT_DER
+#  @brief Private key file format skipping the PEM/base64 decoding when the key is unlocked.
+KEY_FORMAT_DER = "DER"
+
+## @var KEY_FORMATS
+#  @brief Private key file formats accepted by `generate_keys` and `KeyGenerationProcess`.
+KEY_FORMATS = (KEY_FORMAT_PEM, KEY_FORMAT_DER)
+
+## @var PHASE_PRIME_P
+#  @brief Progress phase searching the first prime factor.
+PHASE_PRIME_P = "p"
+
+## @var PHASE_PRIME_Q
+#  @brief Progress phase searching the second prime factor.
+PHASE_PRIME_Q = "q"
+
+## @var PROGRESS_REPORT_INTERVAL
+#  @brief Number of prime candidates tested between two progress reports.
+PROGRESS_REPORT_INTERVAL = 10
+
+
 ##
 # @brief Generate public/private key pairs.
 #
@@ -7,20 +45,38 @@ from Crypto.PublicKey import RSA
 #
 # @param public_key_location Path to save generated a public key
 # @param private_key_location Path to save generated a private key
+# @param progress Optional callable receiving the phase and the number of prime candidates tested, see `generate_rsa_key`
+# @param key_format Format of the private key file, one of `KEY_FORMATS`; the public key is always PEM
 #
 # @return True if RSA generation was successful; False if the RSA generation thrown exception.
 #
-def generate_keys(public_key_location: str, private_key_location: str) -> bool:
+def generate_keys(public_key_location: str, private_key_location: str, progress=None,
+                  key_format: str = KEY_FORMAT_PEM) -> bool:
     try:
-        key = RSA.generate(4096)
+        key = generate_rsa_key(RSA_KEY_SIZE, progress)
+        return save_keys(public_key_location, private_key_location, key.export_key(format=key_format),
+                         key.public_key().exportKey())
+
+    except Exception as e:
+        print(e)
+        return False
 
-        private_key = key.exportKey()
 
+##
+# @brief Write exported public/private keys to their locations.
+#
+# @param public_key_location Path to save the public key
+# @param private_key_location Path to save the private key
+# @param private_key The PEM or DER encoded private key
+# @param public_key The PEM encoded public key
+#
+# @return True if both keys were written; False if writing thrown exception.
+#
+def save_keys(public_key_location: str, private_key_location: str, private_key: bytes, public_key: bytes) -> bool:
+    try:
         with (open(private_key_location, "wb")) as file:
             file.write(private_key)
 
-        public_key = key.public_key().exportKey()
-
         with (open(public_key_location, "wb")) as file:
             file.write(public_key)
 
@@ -29,3 +85,136 @@ def generate_keys(public_key_location: str, private_key_location: str) -> bool:
     except Exception as e:
         print(e)
         return False
+
+
+##
+# @brief Generate an RSA key, reporting the search for its prime factors.
+#
+# @details Follows `Crypto.PublicKey.RSA.generate`, which offers no progress information. The two prime
+# factors are searched one after the other by testing random odd candidates; a 2048-bit factor needs
+# about 700 candidates on average, but the actual number varies a lot from key to key.
+#
+# @param bits Length of the modulus in bits
+# @param progress Optional callable receiving the phase (`PHASE_PRIME_P` or `PHASE_PRIME_Q`) and the number
+#                 of candidates tested in it so far, called every `PROGRESS_REPORT_INTERVAL` candidates
+# @param randfunc Optional callable returning the given number of random bytes, as for `RSA.generate`.
+#                 Defaults to the operating system's generator; other sources are meant for benchmarks only
+#
+# @return The generated key
+#
+def generate_rsa_key(bits: int = RSA_KEY_SIZE, progress=None, randfunc=None) -> RSA.RsaKey:
+    e = Integer(RSA_PUBLIC_EXPONENT)
+    size_q = bits // 2
+    size_p = bits - size_q
+    min_p = min_q = (Integer(1) << (2 * size_q - 1)).sqrt()
+    if size_q != size_p:
+        min_p = (Integer(1) << (2 * size_p - 1)).sqrt()
+    min_distance = Integer(1) << (bits // 2 - 100)
+
+    while True:
+        p = generate_probable_prime(
+            exact_bits=size_p,
+            randfunc=randfunc,
+            prime_filter=_counting_filter(PHASE_PRIME_P, progress,
+                                          lambda candidate: candidate > min_p and (candidate - 1).gcd(e) == 1))
+        q = generate_probable_prime(
+            exact_bits=size_q,
+            randfunc=randfunc,
+            prime_filter=_counting_filter(PHASE_PRIME_Q, progress,
+                                          lambda candidate: (candidate > min_q and (candidate - 1).gcd(e) == 1
+                                                             and (candidate - p if candidate > p else p - candidate) > min_distance)))
+        n = p * q
+        if n.size_in_bits() != bits:
+            continue
+        d = e.inverse((p - 1).lcm(q - 1))
+        if d >= (1 << (bits // 2)):
+            break
+
+    return RSA.construct((int(n), int(e), int(d), int(p), int(q)))
+
+
+##
+# @brief Wrap a prime candidate filter so that it counts the candidates and reports the count.
+#
+# @param phase The phase passed to `progress`
+# @param progress Callable receiving the phase and the count, or None
+# @param prime_filter The wrapped filter
+#
+# @return The counting filter
+#
+def _counting_filter(phase: str, progress, prime_filter):
+    tested = 0
+
+    def counting_filter(candidate) -> bool:
+        nonlocal tested
+        tested += 1
+        if progress is not None and tested % PROGRESS_REPORT_INTERVAL == 0:
+            progress(phase, tested)
+        return prime_filter(candidate)
+
+    return counting_filter
+
+
+##
+# @class KeyGenerationProcess
+# @brief Generate an RSA key in a child process that can be cancelled.
+#
+# @details Key generation holds the GIL for seconds, so it runs in a separate process. The child sends
+# its progress and the result through a queue, which the owner empties with `poll` (e.g. from a Tk `after`
+# callback). The messages are `("progress", phase, tested)`, `("done", private_key, public_pem)` and
+# `("error", message)`. The child never touches the file system.
+#
+class KeyGenerationProcess:
+    ##
+    # @brief Start the child process.
+    #
+    # @param bits Length of the modulus in bits
+    # @param key_format Format of the exported private key, one of `KEY_FORMATS`
+    #
+    def __init__(self, bits: int = RSA_KEY_SIZE, key_format: str = KEY_FORMAT_PEM):
+        # Forking a process running Tk and other threads is unsafe, a fresh interpreter is started instead
+        context = multiprocessing.get_context("spawn")
+        self._queue = context.Queue()
+        self._process = context.Process(target=_generate_in_child, args=(bits, key_format, self._queue),
+                                        daemon=True)
+        self._process.start()
+
+    ##
+    # @brief Return the messages sent by the child since the last call, without blocking.
+    #
+    # @return List of message tuples; a crashed child yields an `("error", message)` message.
+    #
+    def poll(self) -> list:
+        messages = []
+        while True:
+            try:
+                messages.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not messages and not self._process.is_alive() and self._process.exitcode not in (0, None):
+            messages.append(("error", f"Key generation process exited with code {self._process.exitcode}"))
+        return messages
+
+    ##
+    # @brief Stop the child process.
+    #
+    def cancel(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self._queue.close()
+
+
+##
+# @brief Generate a key and send the progress and the result to the parent, run in the child process.
+#
+# @param bits Length of the modulus in bits
+# @param key_format Format of the exported private key
+# @param result_queue The queue read by `KeyGenerationProcess.poll`
+#
+def _generate_in_child(bits: int, key_format: str, result_queue):
+    try:
+        key = generate_rsa_key(bits, lambda phase, tested: result_queue.put(("progress", phase, tested)))
+        result_queue.put(("done", key.export_key(format=key_format), key.public_key().exportKey()))
+    except Exception as e:
+        result_queue.put(("error", str(e)))
@@ -0,0 +1,82 @@
+## @file agent.py
+#  @brief Entry point for the signing agent
+#  @details Asks for the PIN, unlocks the private key from the USB drive, or from `--key-source`,
+#           once and keeps serving sign requests over a Unix domain socket until interrupted. Like
+#           ssh-agent, it prints the shell command exporting the socket path for the clients.
+
+import argparse
+import asyncio
+import getpass
+import sys
+
+from services import key_getter, pdf_signer
+from services.signing_agent import (SigningAgent, AgentAlreadyRunningException, SOCKET_PATH_ENV_VAR,
+                                    default_socket_path)
+from services.signing_agent.server import DEFAULT_BATCH_WINDOW, DEFAULT_MAX_BATCH_SIZE
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Keeps the private key unlocked and signs PDF files for local clients.")
+    parser.add_argument("--socket", default=default_socket_path(), help="path of the Unix domain socket")
+    parser.add_argument("--workers", type=int, default=None, help="number of signing worker processes")
+    parser.add_argument("--key-source", default=None,
+                        help="where the encrypted key file is read from: usb, a file path, fd:N or env:VARIABLE "
+                             f"(default: ${key_getter.KEY_SOURCE_VARIABLE}, else usb)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="maximal number of requests signed by a worker at once")
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW,
+                        help="seconds a batch waits for further requests")
+    parser.add_argument("--timestamps", choices=pdf_signer.TIMESTAMP_POLICY_NAMES, default="dummy",
+                        help="timestamp token embedded into every signature")
+    parser.add_argument("--tsa-url", help="URL of the RFC 3161 time stamping authority used with --timestamps tsa")
+    parser.add_argument("--appearance", choices=pdf_signer.APPEARANCE_MODES, default=pdf_signer.APPEARANCE_VISIBLE,
+                        help="appearance of the signature field; cached reuses a stamp rendered once")
+    parser.add_argument("--compact", action="store_true", help="compress the appended signature revision")
+    parser.add_argument("--embed-dss", action="store_true",
+                        help="embed the signing certificate as validation data (DSS) shared by all documents")
+    parser.add_argument("--digest", choices=list(pdf_signer.DIGEST_ALGORITHMS), default=pdf_signer.DEFAULT_DIGEST_ALGORITHM,
+                        help="digest algorithm of the signatures")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    try:
+        timestamp_policy = pdf_signer.create_timestamp_policy(args.timestamps, args.tsa_url)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        private_key = key_getter.get_key(getpass.getpass("PIN: "), args.key_source)
+    except Exception as e:
+        print(f"Could not read the private key: {type(e).__name__}", file=sys.stderr)
+        sys.exit(1)
+
+    agent = SigningAgent(
+        private_key,
+        args.socket,
+        workers=args.workers,
+        max_batch_size=args.batch_size,
+        batch_window=args.batch_window,
+        sign_options={"timestamp_policy": timestamp_policy, "appearance": args.appearance,
+                      "compact": args.compact, "digest_algorithm": args.digest,
+                      "embed_dss": args.embed_dss},
+    )
+    print(f"{SOCKET_PATH_ENV_VAR}={args.socket}; export {SOCKET_PATH_ENV_VAR};", flush=True)
+
+    try:
+        asyncio.run(agent.serve_forever())
+    except AgentAlreadyRunningException:
+        print(f"Another signing agent is already listening on {args.socket}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
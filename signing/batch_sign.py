@@ -0,0 +1,147 @@
+## @file batch_sign.py
+#  @brief Entry point for one-shot batch signing
+#  @details Asks for the PIN, unlocks the private key from the USB drive, or from `--key-source`,
+#           once, signs the given PDF files and the PDF files inside the given directories, and
+#           prints a summary of the run.
+#           Documents already signed with the key are skipped by default, so a failed run can
+#           simply be started again. With `--journal`, the state of every document is recorded, and
+#           `--resume` continues an interrupted run without opening the documents it completed.
+#           With `--storage`, the inputs are keys and key prefixes of a storage backend, e.g. an
+#           S3-compatible object store, and `--output-dir` is a key prefix.
+
+import argparse
+import getpass
+import sys
+
+from services import key_getter, pdf_signer
+from services.batch import BatchJournal, BatchSigner, list_documents
+from services.scheduler import DEFAULT_MAX_IN_FLIGHT_BYTES, DEFAULT_SMALL_DOCUMENT_SIZE
+from services.signing_pool import ALREADY_SIGNED_ACTIONS, ALREADY_SIGNED_SKIP
+from services.storage import create_storage, list_stored_documents
+
+## @var ALREADY_SIGNED_RESIGN
+#  @brief Value of `--already-signed` signing every document again.
+ALREADY_SIGNED_RESIGN = "resign"
+
+## @var KIB
+#  @brief Number of bytes in a KiB.
+KIB = 1024
+
+## @var MIB
+#  @brief Number of bytes in a MiB.
+MIB = 1024 * KIB
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Signs a batch of PDF files.")
+    parser.add_argument("inputs", nargs="+",
+                        help="PDF files and directories holding PDF files, or keys and key prefixes ending with / with --storage")
+    parser.add_argument("--output-dir", help="directory or key prefix receiving the signed PDF files (default: sign in place)")
+    parser.add_argument("--storage", help="storage holding the documents, s3://bucket[/prefix] or a directory; "
+                                          "s3 endpoint and credentials are read from the AWS_* environment variables")
+    parser.add_argument("--already-signed", choices=ALREADY_SIGNED_ACTIONS + (ALREADY_SIGNED_RESIGN,),
+                        default=ALREADY_SIGNED_SKIP,
+                        help="handling of documents already signed with the key; copy puts them into the output directory")
+    parser.add_argument("--workers", type=int, default=None, help="number of signing worker processes")
+    parser.add_argument("--key-source", default=None,
+                        help="where the encrypted key file is read from: usb, a file path, fd:N or env:VARIABLE "
+                             f"(default: ${key_getter.KEY_SOURCE_VARIABLE}, else usb)")
+    parser.add_argument("--journal", help="journal file recording the state of every document of the run")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the run recorded in --journal, skipping the documents it completed")
+    parser.add_argument("--max-pending", type=int, default=None, help="maximal number of files signed or queued at once")
+    parser.add_argument("--max-in-flight-mib", type=int, default=DEFAULT_MAX_IN_FLIGHT_BYTES // MIB,
+                        help="maximal total size in MiB of the large files signed or queued at once")
+    parser.add_argument("--small-document-kib", type=int, default=DEFAULT_SMALL_DOCUMENT_SIZE // KIB,
+                        help="largest estimated size in KiB of the files signed in the latency lane")
+    parser.add_argument("--timestamps", choices=pdf_signer.TIMESTAMP_POLICY_NAMES, default="dummy",
+                        help="timestamp token embedded into every signature")
+    parser.add_argument("--tsa-url", help="URL of the RFC 3161 time stamping authority used with --timestamps tsa")
+    parser.add_argument("--appearance", choices=pdf_signer.APPEARANCE_MODES, default=pdf_signer.APPEARANCE_VISIBLE,
+                        help="appearance of the signature field; cached reuses a stamp rendered once")
+    parser.add_argument("--compact", action="store_true", help="compress the appended signature revision")
+    parser.add_argument("--embed-dss", action="store_true",
+                        help="embed the signing certificate as validation data (DSS) shared by all documents")
+    parser.add_argument("--digest", choices=list(pdf_signer.DIGEST_ALGORITHMS), default=pdf_signer.DEFAULT_DIGEST_ALGORITHM,
+                        help="digest algorithm of the signatures")
+    return parser.parse_args()
+
+
+## @brief Formats the summary of a batch run.
+#  @param summary The summary returned by `BatchSigner.run`.
+#  @type summary dict
+#  @return The formatted summary, one line per failure followed by the totals and the latency of
+#          every scheduler lane that signed documents.
+#  @rtype str
+def format_summary(summary: dict) -> str:
+    lines = [f"Signing {path} failed: {error_type}: {message}" for path, error_type, message in summary["failures"]]
+    latency_lines = [f"{lane} documents: {stats['count']}, latency p50 {stats['p50']:.2f} s, "
+                     f"p95 {stats['p95']:.2f} s, max {stats['max']:.2f} s"
+                     for lane, stats in summary["latency"].items() if stats["count"]]
+    lines.append(f"signed {summary['signed']}, skipped {summary['skipped']}, copied {summary['copied']}, "
+                 f"failed {summary['failed']}, resumed {summary['resumed']} in {summary['duration']:.1f} s, "
+                 f"{summary['throughput'] * 60:.1f} documents/min")
+    return "\n".join(lines + latency_lines)
+
+
+def main():
+    args = parse_args()
+    if args.resume and args.journal is None:
+        print("--resume requires --journal", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        timestamp_policy = pdf_signer.create_timestamp_policy(args.timestamps, args.tsa_url)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        storage = None if args.storage is None else create_storage(args.storage)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        private_key = key_getter.get_key(getpass.getpass("PIN: "), args.key_source)
+    except Exception as e:
+        print(f"Could not read the private key: {type(e).__name__}", file=sys.stderr)
+        sys.exit(1)
+
+    batch_signer = BatchSigner(
+        private_key,
+        args.output_dir,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        sign_options={"timestamp_policy": timestamp_policy, "appearance": args.appearance,
+                      "compact": args.compact, "digest_algorithm": args.digest,
+                      "embed_dss": args.embed_dss},
+        already_signed=None if args.already_signed == ALREADY_SIGNED_RESIGN else args.already_signed,
+        max_in_flight_bytes=args.max_in_flight_mib * MIB,
+        small_document_size=args.small_document_kib * KIB,
+        storage=storage,
+    )
+    try:
+        documents = list_documents(args.inputs) if storage is None else list_stored_documents(storage, args.inputs)
+    except OSError as e:
+        print(f"Could not list the documents: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        if args.journal is None:
+            summary = batch_signer.run(documents)
+        else:
+            with BatchJournal(args.journal, resume=args.resume) as journal:
+                summary = batch_signer.run(documents, journal=journal)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    print(format_summary(summary))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+## @file batch_verify.py
+#  @brief Entry point for one-shot batch verification
+#  @details Verifies the given PDF files and the PDF files inside the given directories against a
+#           public key and prints a summary of the run. With `--storage`, the inputs are keys and key
+#           prefixes of a storage backend, e.g. an S3-compatible object store.
+
+import argparse
+import sys
+
+from cryptography.hazmat.primitives import serialization
+
+from services import pdf_signer
+from services.batch import BatchVerifier, list_documents, VERDICT_VALID
+from services.scheduler import DEFAULT_MAX_IN_FLIGHT_BYTES, DEFAULT_SMALL_DOCUMENT_SIZE
+from services.storage import create_storage, list_stored_documents
+
+## @var KIB
+#  @brief Number of bytes in a KiB.
+KIB = 1024
+
+## @var MIB
+#  @brief Number of bytes in a MiB.
+MIB = 1024 * KIB
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verifies the signatures of a batch of PDF files.")
+    parser.add_argument("inputs", nargs="+",
+                        help="PDF files and directories holding PDF files, or keys and key prefixes ending with / with --storage")
+    parser.add_argument("--public-key", required=True, help="PEM file of the public key expected to sign the documents")
+    parser.add_argument("--level", choices=pdf_signer.VALIDATION_LEVELS, default=pdf_signer.VALIDATION_FULL,
+                        help="checks a signature has to pass")
+    parser.add_argument("--storage", help="storage holding the documents, s3://bucket[/prefix] or a directory; "
+                                          "s3 endpoint and credentials are read from the AWS_* environment variables")
+    parser.add_argument("--workers", type=int, default=None, help="number of verifying worker processes")
+    parser.add_argument("--max-pending", type=int, default=None, help="maximal number of files verified or queued at once")
+    parser.add_argument("--max-in-flight-mib", type=int, default=DEFAULT_MAX_IN_FLIGHT_BYTES // MIB,
+                        help="maximal total size in MiB of the large files verified or queued at once")
+    parser.add_argument("--small-document-kib", type=int, default=DEFAULT_SMALL_DOCUMENT_SIZE // KIB,
+                        help="largest estimated size in KiB of the files verified in the latency lane")
+    parser.add_argument("--quiet", action="store_true", help="only print the documents that are not valid")
+    return parser.parse_args()
+
+
+## @brief Formats the summary of a batch run.
+#  @param summary The summary returned by `BatchVerifier.run`.
+#  @type summary dict
+#  @return The formatted summary, one line per failure followed by the totals and the latency of
+#          every scheduler lane that verified documents.
+#  @rtype str
+def format_summary(summary: dict) -> str:
+    lines = [f"Verifying {path} failed: {error_type}: {message}" for path, error_type, message in summary["failures"]]
+    latency_lines = [f"{lane} documents: {stats['count']}, latency p50 {stats['p50']:.2f} s, "
+                     f"p95 {stats['p95']:.2f} s, max {stats['max']:.2f} s"
+                     for lane, stats in summary["latency"].items() if stats["count"]]
+    lines.append(f"valid {summary['valid']}, invalid {summary['invalid']}, unsigned {summary['unsigned']}, "
+                 f"failed {summary['failed']} in {summary['duration']:.1f} s, "
+                 f"{summary['throughput'] * 60:.1f} documents/min")
+    return "\n".join(lines + latency_lines)
+
+
+def main():
+    args = parse_args()
+    try:
+        storage = None if args.storage is None else create_storage(args.storage)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        with open(args.public_key, "rb") as key_file:
+            public_key = serialization.load_pem_public_key(key_file.read())
+    except (OSError, ValueError) as e:
+        print(f"Could not read the public key: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        if storage is None:
+            documents = list_documents(args.inputs)
+        else:
+            documents = [key for key, _ in list_stored_documents(storage, args.inputs)]
+    except OSError as e:
+        print(f"Could not list the documents: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    def print_verdict(path: str, verdict: str | None, error: BaseException | None):
+        if verdict is not None and not (args.quiet and verdict == VERDICT_VALID):
+            print(f"{path}: {verdict}")
+
+    batch_verifier = BatchVerifier(
+        public_key,
+        args.level,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        max_in_flight_bytes=args.max_in_flight_mib * MIB,
+        small_document_size=args.small_document_kib * KIB,
+        storage=storage,
+    )
+    summary = batch_verifier.run(documents, on_result=print_verdict)
+    print(format_summary(summary))
+    if summary["invalid"] or summary["unsigned"] or summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+## @file batch_results.py
+#  @brief Tkinter widgets running a batch of PDF documents in the background and listing the results.
+#  @details `BatchJob` runs the work of a batch on a background thread and hands every result over
+#           through a queue. `BatchResultsView` polls that queue with `after()`, adds everything
+#           collected since the last poll to a `VirtualResultList` in one go, and shows the progress,
+#           throughput and ETA. The list keeps a fixed number of Treeview rows and only fills them
+#           with the visible part of the results, so thousands of results do not slow Tk down.
+
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import filedialog, ttk
+from typing import Callable
+
+from services.batch import list_documents
+
+## @var LARGE_FONT_CONFIG
+#  @brief Font configuration for the title of the results view.
+LARGE_FONT_CONFIG = ("TkDefaultFont", 16)
+
+## @var DEFAULT_WRAP_LENGTH
+#  @brief Default wrap length in pixels for text in labels to ensure proper layout.
+DEFAULT_WRAP_LENGTH = 750
+
+## @var PDF_FILE_TYPES
+#  @brief File type filter used in file dialogs, restricting selection to PDF files.
+PDF_FILE_TYPES = [("PDF files", "*.pdf")]
+
+## @var POLL_INTERVAL_MS
+#  @brief Interval in milliseconds between two checks for new results.
+POLL_INTERVAL_MS = 100
+
+## @var MAX_RESULTS_PER_UPDATE
+#  @brief Largest number of results added to the list by a single poll, keeping each update short.
+MAX_RESULTS_PER_UPDATE = 1000
+
+## @var VISIBLE_ROWS
+#  @brief Number of rows shown by the result list.
+VISIBLE_ROWS = 15
+
+## @var WHEEL_SCROLL_ROWS
+#  @brief Number of rows scrolled by one step of the mouse wheel.
+WHEEL_SCROLL_ROWS = 3
+
+## @var RESULT_COLUMNS
+#  @brief Columns of the result list: identifier, heading and width in pixels.
+RESULT_COLUMNS = (("file", "File", 260), ("result", "Result", 160), ("details", "Details", 320))
+
+## @var STATUS_OK
+#  @brief Status of a result that succeeded.
+STATUS_OK = "ok"
+
+## @var STATUS_WARNING
+#  @brief Status of a result that needs attention but is not a failure, e.g. a skipped document.
+STATUS_WARNING = "warning"
+
+## @var STATUS_ERROR
+#  @brief Status of a result that failed.
+STATUS_ERROR = "error"
+
+## @var STATUS_COLORS
+#  @brief Text color of the result rows per status.
+STATUS_COLORS = {STATUS_OK: "#4ec94e", STATUS_WARNING: "#e0c050", STATUS_ERROR: "#f05050"}
+
+## @var GO_BACK_BUTTON_TEXT
+#  @brief Text for the button navigating back to the main menu once the batch has finished.
+GO_BACK_BUTTON_TEXT = "Go back to main menu"
+
+FOREGROUND_COLOR = "#ffffff"
+BACKGROUND_COLOR = "#1e1e1e"
+BACKGROUND2_COLOR = "#2d2d2d"
+BLUE_BUTTON_COLOR = "#007acc"
+ACTIVATE_BUTTON_COLOR = "#005f99"
+
+
+## @brief Opens a file dialog selecting several PDF files.
+#  @param title The title for the file dialog window.
+#  @type title str
+#  @return The selected paths, empty if the dialog was cancelled.
+#  @rtype list[str]
+def ask_pdf_files(title: str) -> list[str]:
+    return list(filedialog.askopenfilenames(title=title, filetypes=PDF_FILE_TYPES))
+
+
+## @brief Opens a directory dialog and lists the PDF files inside the selected folder.
+#  @param title The title for the directory dialog window.
+#  @type title str
+#  @return The paths of the PDF files directly inside the folder, None if the dialog was cancelled.
+#  @rtype list[str] | None
+def ask_pdf_folder(title: str) -> list[str] | None:
+    folder = filedialog.askdirectory(title=title)
+    return list_documents([folder]) if folder else None
+
+
+## @class BatchJob
+#  @brief Runs the work of a batch on a background thread and queues its results.
+class BatchJob:
+    ## @brief Initializes the BatchJob.
+    #  @param total The number of documents of the batch.
+    #  @type total int
+    #  @param work Called on the background thread with the `report` method, which it has to call once per document.
+    #  @type work Callable[[Callable[[str, str, str, str], None]], None]
+    def __init__(self, total: int, work: Callable[[Callable[[str, str, str, str], None]], None]):
+        self.total = total
+        self.results = queue.Queue()
+        self.started_at = None
+        self.finished = False
+        self.error = None
+        self._work = work
+
+    ## @brief Starts the background thread.
+    def start(self):
+        self.started_at = time.monotonic()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    ## @brief Queues the result of a document. Can be called from any thread.
+    #  @param path The path of the document.
+    #  @type path str
+    #  @param status One of `STATUS_OK`, `STATUS_WARNING` and `STATUS_ERROR`.
+    #  @type status str
+    #  @param result The short result shown in the list.
+    #  @type result str
+    #  @param details Further information, e.g. the error.
+    #  @type details str
+    def report(self, path: str, status: str, result: str, details: str = ""):
+        self.results.put((status, (os.path.basename(path), result, details)))
+
+    ## @brief Runs the work and marks the job as finished, also when the work fails.
+    #  @private
+    def _run(self):
+        try:
+            self._work(self.report)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+
+
+## @class VirtualResultList
+#  @brief Scrollable list of results rendering only the visible rows.
+#  @details The Treeview holds a fixed set of `VISIBLE_ROWS` items whose values are replaced when the
+#           list scrolls, and the scrollbar is driven by the position in the whole result list.
+#           While the view is at the end of the list, it follows newly added results.
+class VirtualResultList(tk.Frame):
+    ## @brief Initializes the VirtualResultList.
+    #  @param parent The parent widget.
+    #  @type parent tk.Widget
+    #  @param visible_rows The number of rows shown at once.
+    #  @type visible_rows int
+    def __init__(self, parent: tk.Widget, visible_rows: int = VISIBLE_ROWS):
+        super().__init__(parent, bg=BACKGROUND_COLOR)
+        self._rows: list[tuple[str, tuple]] = []
+        self._first = 0
+
+        style = ttk.Style(self)
+        style.configure("Results.Treeview", background=BACKGROUND2_COLOR, fieldbackground=BACKGROUND2_COLOR,
+                        foreground=FOREGROUND_COLOR)
+        self.tree = ttk.Treeview(self, columns=[column for column, _, _ in RESULT_COLUMNS], show="headings",
+                                 height=visible_rows, selectmode="none", style="Results.Treeview")
+        for column, heading, width in RESULT_COLUMNS:
+            self.tree.heading(column, text=heading, anchor="w")
+            self.tree.column(column, width=width, anchor="w", stretch=column == "details")
+        for status, color in STATUS_COLORS.items():
+            self.tree.tag_configure(status, foreground=color)
+        self._items = [self.tree.insert("", tk.END, values=("",) * len(RESULT_COLUMNS)) for _ in range(visible_rows)]
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_mouse_wheel)
+        self._render()
+
+    def __len__(self):
+        return len(self._rows)
+
+    ## @brief Adds results to the end of the list and redraws it once.
+    #  @param rows The results as `(status, values)` tuples.
+    #  @type rows list[tuple[str, tuple]]
+    def append(self, rows: list[tuple[str, tuple]]):
+        following = self._first >= self._last_first()
+        self._rows.extend(rows)
+        if following:
+            self._first = self._last_first()
+        self._render()
+
+    ## @brief Returns the index of the first visible row when the list is scrolled to its end.
+    #  @private
+    def _last_first(self) -> int:
+        return max(0, len(self._rows) - len(self._items))
+
+    ## @brief Scrolls the list so that the given row is the first visible one.
+    #  @private
+    def _scroll_to(self, first: int):
+        self._first = min(max(0, first), self._last_first())
+        self._render()
+
+    ## @brief Handles the `moveto` and `scroll` commands of the scrollbar.
+    #  @private
+    def _on_scrollbar(self, action: str, amount: str, unit: str | None = None):
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * len(self._rows)))
+        elif action == "scroll":
+            step = 1 if unit == "units" else len(self._items)
+            self._scroll_to(self._first + int(amount) * step)
+
+    ## @brief Scrolls the list with the mouse wheel (`<MouseWheel>` on Windows and macOS, buttons 4 and 5 on X11).
+    #  @private
+    def _on_mouse_wheel(self, event: tk.Event):
+        direction = -1 if event.num == 4 or event.delta > 0 else 1
+        self._scroll_to(self._first + direction * WHEEL_SCROLL_ROWS)
+        return "break"
+
+    ## @brief Fills the Treeview items with the visible results and updates the scrollbar.
+    #  @private
+    def _render(self):
+        for index, item in enumerate(self._items):
+            row_index = self._first + index
+            if row_index < len(self._rows):
+                status, values = self._rows[row_index]
+                self.tree.item(item, values=values, tags=(status,))
+            else:
+                self.tree.item(item, values=("",) * len(RESULT_COLUMNS), tags=())
+
+        total = len(self._rows)
+        if total > len(self._items):
+            self.scrollbar.set(self._first / total, (self._first + len(self._items)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
+## @class BatchResultsView
+#  @brief Shows the progress and the results of a `BatchJob`.
+class BatchResultsView(tk.Frame):
+    ## @brief Initializes the BatchResultsView and starts polling the job.
+    #  @param parent The parent widget.
+    #  @type parent tk.Widget
+    #  @param title The text shown above the results.
+    #  @type title str
+    #  @param job The batch job, started by the view.
+    #  @type job BatchJob
+    #  @param end_callback Called by the go back button, which is enabled once the job has finished.
+    #  @type end_callback Callable[[], None]
+    def __init__(self, parent: tk.Widget, title: str, job: BatchJob, end_callback: Callable[[], None]):
+        super().__init__(parent, bg=BACKGROUND_COLOR)
+        self.job = job
+        self._counts = {STATUS_OK: 0, STATUS_WARNING: 0, STATUS_ERROR: 0}
+        self._poll_id = None
+
+        tk.Label(self, text=title, font=LARGE_FONT_CONFIG, wraplength=DEFAULT_WRAP_LENGTH,
+                 fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR).pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
+        self.progress_label = tk.Label(self, text="", fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR)
+        self.progress_label.pack(padx=10, pady=(0, 5))
+
+        self.result_list = VirtualResultList(self)
+        self.result_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        self.counts_label = tk.Label(self, text="", fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR)
+        self.counts_label.pack(padx=10, pady=5)
+
+        self.go_back_button = tk.Button(
+            self,
+            text=GO_BACK_BUTTON_TEXT,
+            command=end_callback,
+            font=LARGE_FONT_CONFIG,
+            state="disabled",
+            bg=BLUE_BUTTON_COLOR,
+            fg="white",
+            activebackground=ACTIVATE_BUTTON_COLOR
+        )
+        self.go_back_button.pack(side=tk.TOP, padx=10, pady=10)
+
+        self.job.start()
+        self._poll()
+
+    def destroy(self):
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+        super().destroy()
+
+    ## @brief Moves the queued results into the list and schedules the next poll until the job has finished.
+    #  @private
+    def _poll(self):
+        rows = []
+        while len(rows) < MAX_RESULTS_PER_UPDATE:
+            try:
+                rows.append(self.job.results.get_nowait())
+            except queue.Empty:
+                break
+        if rows:
+            for status, _ in rows:
+                self._counts[status] += 1
+            self.result_list.append(rows)
+
+        # The job only finishes after reporting all of its results, so an empty queue is final
+        finished = self.job.finished and self.job.results.empty()
+        self._update_labels(finished)
+        if finished:
+            self._poll_id = None
+            self.go_back_button.config(state="normal")
+        else:
+            self._poll_id = self.after(POLL_INTERVAL_MS, self._poll)
+
+    ## @brief Shows the number of finished documents, the throughput, the ETA and the counts per status.
+    #  @param finished Whether the job has finished.
+    #  @type finished bool
+    #  @private
+    def _update_labels(self, finished: bool):
+        done = len(self.result_list)
+        elapsed = time.monotonic() - self.job.started_at
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        if finished:
+            text = f"Finished {done} of {self.job.total} documents in {_format_duration(elapsed)}"
+            if self.job.error is not None:
+                text += f", stopped by {type(self.job.error).__name__}: {self.job.error}"
+        else:
+            remaining = self.job.total - done
+            eta = _format_duration(remaining / throughput) if throughput > 0 else "unknown"
+            text = f"{done} of {self.job.total} documents, ETA {eta}"
+        self.progress_label.config(text=f"{text} ({throughput * 60:.1f} documents/min)")
+        self.counts_label.config(text=f"Succeeded: {self._counts[STATUS_OK]}   "
+                                      f"Warnings: {self._counts[STATUS_WARNING]}   "
+                                      f"Failed: {self._counts[STATUS_ERROR]}")
+
+
+## @brief Formats a duration in seconds as minutes and seconds.
+#  @private
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes} min {seconds:02d} s" if minutes else f"{seconds} s"
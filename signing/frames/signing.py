@@ -2,8 +2,10 @@
 #  @brief A Tkinter Frame for selecting a PDF, choosing an output location, and signing the PDF.
 #  @details This frame guides the user through selecting an input PDF, specifying an output path
 #           for the signed PDF, and then performs the signing operation using a provided private key.
-#           It handles UI updates for status messages and error reporting.
+#           It handles UI updates for status messages and error reporting. Several files or a folder
+#           can be selected instead, which are then signed in the background into a target folder.
 
+import os
 import tkinter as tk
 from tkinter import filedialog
 from typing import Callable
@@ -12,6 +14,12 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from pyhanko.pdf_utils.misc import PdfReadError
 from pyhanko.sign.general import SigningError
 from services import pdf_signer
+from services.batch import BatchSigner
+from services.signing_pool import OUTCOME_SIGNED, OUTCOME_SKIPPED
+
+from .batch_results import (BatchJob, BatchResultsView, ask_pdf_files, ask_pdf_folder,
+    STATUS_OK, STATUS_WARNING, STATUS_ERROR
+)
 
 ## @var LARGE_FONT_CONFIG
 #  @brief Font configuration for large text elements (e.g., status labels, buttons).
@@ -33,6 +41,18 @@ SELECT_SOURCE_PDF_TITLE = "Select the PDF file to sign"
 #  @brief Title for the file dialog when selecting the output path for the signed PDF.
 SELECT_TARGET_PDF_TITLE = "Set target location and filename for signed PDF"
 
+## @var SELECT_SOURCE_FILES_TITLE
+#  @brief Title for the file dialog when selecting several PDF files to be signed.
+SELECT_SOURCE_FILES_TITLE = "Select the PDF files to sign"
+
+## @var SELECT_SOURCE_FOLDER_TITLE
+#  @brief Title for the directory dialog when selecting a folder of PDF files to be signed.
+SELECT_SOURCE_FOLDER_TITLE = "Select the folder with the PDF files to sign"
+
+## @var SELECT_TARGET_FOLDER_TITLE
+#  @brief Title for the directory dialog when selecting the folder receiving the signed PDF files of a batch.
+SELECT_TARGET_FOLDER_TITLE = "Select the folder for the signed PDF files"
+
 ## @var INITIAL_STATUS_TEXT
 #  @brief Initial instructional text displayed in the status label.
 INITIAL_STATUS_TEXT = "Please choose the PDF file to sign and where the signed PDF file should be placed."
@@ -49,6 +69,38 @@ TARGET_PDF_LABEL_TEXT = "Location where the signed PDF file will be saved:"
 #  @brief Text for the button used to trigger source PDF file selection.
 SELECT_SOURCE_BUTTON_TEXT = "Select PDF file"
 
+## @var SELECT_SOURCE_FILES_BUTTON_TEXT
+#  @brief Text for the button used to trigger the selection of several source PDF files.
+SELECT_SOURCE_FILES_BUTTON_TEXT = "Select several PDF files"
+
+## @var SELECT_SOURCE_FOLDER_BUTTON_TEXT
+#  @brief Text for the button used to trigger the selection of a folder of source PDF files.
+SELECT_SOURCE_FOLDER_BUTTON_TEXT = "Select folder"
+
+## @var BATCH_SOURCE_TEXT
+#  @brief Text shown in the source entry when several PDF files are selected.
+BATCH_SOURCE_TEXT = "{count} PDF files selected"
+
+## @var BATCH_TITLE_TEXT
+#  @brief Title of the results view while signing several PDF files.
+BATCH_TITLE_TEXT = "Signing {count} PDF files into {target}"
+
+## @var NO_PDF_FILES_ERROR_TEXT
+#  @brief Error message displayed when the selected folder does not contain any PDF file.
+NO_PDF_FILES_ERROR_TEXT = "The selected folder does not contain any PDF files. Please choose a different folder."
+
+## @var TARGET_FOLDER_IS_SOURCE_ERROR_TEXT
+#  @brief Error message displayed when the target folder of a batch holds one of the selected PDF files.
+TARGET_FOLDER_IS_SOURCE_ERROR_TEXT = "The signed PDF files cannot be saved into the folder of the original PDF files. Please choose a different folder."
+
+## @var BATCH_RESULT_TEXTS
+#  @brief Result shown in the results view per signing outcome.
+BATCH_RESULT_TEXTS = {OUTCOME_SIGNED: "Signed", OUTCOME_SKIPPED: "Already signed, skipped"}
+
+## @var BATCH_FAILED_TEXT
+#  @brief Result shown in the results view for a PDF file that could not be signed.
+BATCH_FAILED_TEXT = "Failed"
+
 ## @var SELECT_TARGET_BUTTON_TEXT
 #  @brief Text for the button used to trigger target PDF path selection.
 SELECT_TARGET_BUTTON_TEXT = "Set target location"
@@ -117,6 +169,7 @@ class SigningFrame(tk.Frame):
 
         self.source_pdf_path_var = tk.StringVar()
         self.target_pdf_path_var = tk.StringVar()
+        self.batch_pdf_paths: list[str] = []
 
         self._setup_ui()
 
@@ -151,15 +204,19 @@ class SigningFrame(tk.Frame):
         )
         self.source_pdf_path_entry.pack(padx=10, pady=(0, 5), anchor="center")
 
-        select_source_pdf_button = tk.Button(
-            self,
-            text=SELECT_SOURCE_BUTTON_TEXT,
-            command=self._select_source_pdf_file,
-            bg=BLUE_BUTTON_COLOR,
-            fg="white",
-            activebackground=ACTIVATE_BUTTON_COLOR
-        )
-        select_source_pdf_button.pack(padx=10, pady=(0, 20), anchor="center")
+        source_buttons = tk.Frame(self, bg=BACKGROUND_COLOR)
+        source_buttons.pack(padx=10, pady=(0, 20), anchor="center")
+        for text, command in ((SELECT_SOURCE_BUTTON_TEXT, self._select_source_pdf_file),
+                              (SELECT_SOURCE_FILES_BUTTON_TEXT, self._select_source_pdf_files),
+                              (SELECT_SOURCE_FOLDER_BUTTON_TEXT, self._select_source_pdf_folder)):
+            tk.Button(
+                source_buttons,
+                text=text,
+                command=command,
+                bg=BLUE_BUTTON_COLOR,
+                fg="white",
+                activebackground=ACTIVATE_BUTTON_COLOR
+            ).pack(side=tk.LEFT, padx=5)
 
         # --- Target PDF Selection ---
         target_pdf_label = tk.Label(self, text=TARGET_PDF_LABEL_TEXT, fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR)
@@ -207,12 +264,53 @@ class SigningFrame(tk.Frame):
             filetypes=PDF_FILE_TYPES
         )
         if file_path:
+            self._set_batch([])
             self.source_pdf_path_var.set(file_path)
 
+    ## @brief Opens a file dialog to allow the user to select several source PDF files.
+    #  @details A single selected file is handled like one chosen with `_select_source_pdf_file`.
+    def _select_source_pdf_files(self):
+        file_paths = ask_pdf_files(SELECT_SOURCE_FILES_TITLE)
+        if len(file_paths) == 1:
+            self._set_batch([])
+            self.source_pdf_path_var.set(file_paths[0])
+        elif file_paths:
+            self._set_batch(file_paths)
+
+    ## @brief Opens a directory dialog to allow the user to select a folder whose PDF files are signed.
+    def _select_source_pdf_folder(self):
+        folder_files = ask_pdf_folder(SELECT_SOURCE_FOLDER_TITLE)
+        if folder_files:
+            self._set_batch(folder_files)
+        elif folder_files is not None:
+            self._update_feedback(NO_PDF_FILES_ERROR_TEXT, RETRY_BUTTON_TEXT)
+
+    ## @brief Switches between signing one PDF file and signing a batch of PDF files.
+    #  @details In batch mode the source entry shows the number of selected files and cannot be edited,
+    #           and the target becomes a folder, so a previously chosen target path is cleared.
+    #  @param file_paths The PDF files of the batch, empty to sign a single PDF file.
+    #  @type file_paths list[str]
+    def _set_batch(self, file_paths: list[str]):
+        if bool(file_paths) != bool(self.batch_pdf_paths):
+            self.target_pdf_path_var.set("")
+        self.batch_pdf_paths = file_paths
+        if file_paths:
+            self.source_pdf_path_var.set(BATCH_SOURCE_TEXT.format(count=len(file_paths)))
+            self.source_pdf_path_entry.config(state="readonly", readonlybackground=BACKGROUND2_COLOR)
+        else:
+            self.source_pdf_path_var.set("")
+            self.source_pdf_path_entry.config(state="normal")
+
     ## @brief Opens a file dialog to allow the user to select the target path and filename for the signed PDF.
     #  @details Updates the `target_pdf_path_var` and the corresponding entry field
     #           with the path chosen by the user. Suggests ".pdf" as the default extension.
+    #           In batch mode a directory dialog selects the folder for the signed PDF files instead.
     def _select_target_pdf_path(self):
+        if self.batch_pdf_paths:
+            folder = filedialog.askdirectory(title=SELECT_TARGET_FOLDER_TITLE)
+            if folder:
+                self.target_pdf_path_var.set(folder)
+            return
         file_path = filedialog.asksaveasfilename(
             title=SELECT_TARGET_PDF_TITLE,
             filetypes=PDF_FILE_TYPES,
@@ -246,6 +344,10 @@ class SigningFrame(tk.Frame):
         source_pdf_path = self.source_pdf_path_var.get()
         target_pdf_path = self.target_pdf_path_var.get()
 
+        if self.batch_pdf_paths and target_pdf_path:
+            self._sign_pdf_batch(target_pdf_path)
+            return
+
         if not source_pdf_path or not target_pdf_path:
             self._update_feedback(
                 PATHS_REQUIRED_ERROR_TEXT,
@@ -268,4 +370,38 @@ class SigningFrame(tk.Frame):
         except SigningError:
             self._update_feedback(SIGNING_ERROR_TEXT, RETRY_BUTTON_TEXT)
         except Exception as e:
-            self._update_feedback(UNEXPECTED_SIGNING_ERROR_TEXT.format(error_type=type(e).__name__),RETRY_BUTTON_TEXT)
\ No newline at end of file
+            self._update_feedback(UNEXPECTED_SIGNING_ERROR_TEXT.format(error_type=type(e).__name__),RETRY_BUTTON_TEXT)
+
+    ## @brief Signs the selected batch of PDF files into a folder in the background and shows the results.
+    #  @details Validates the target folder, then replaces the content of the frame with a `BatchResultsView`.
+    #           The PDF files are signed by a `BatchSigner` on the thread of the `BatchJob`, skipping files
+    #           already signed with the key. Failures are listed per file and do not stop the batch.
+    #  @param target_dir The folder receiving the signed PDF files.
+    #  @type target_dir str
+    def _sign_pdf_batch(self, target_dir: str):
+        target_dir = os.path.abspath(target_dir)
+        if any(os.path.dirname(os.path.abspath(path)) == target_dir for path in self.batch_pdf_paths):
+            self._update_feedback(TARGET_FOLDER_IS_SOURCE_ERROR_TEXT, RETRY_BUTTON_TEXT)
+            return
+
+        paths = list(self.batch_pdf_paths)
+        batch_signer = BatchSigner(self.private_key, target_dir)
+
+        def work(report):
+            def on_result(path: str, outcome: str | None, error: BaseException | None):
+                if error is not None:
+                    report(path, STATUS_ERROR, BATCH_FAILED_TEXT, f"{type(error).__name__}: {error}")
+                else:
+                    report(path, STATUS_OK if outcome == OUTCOME_SIGNED else STATUS_WARNING,
+                           BATCH_RESULT_TEXTS.get(outcome, outcome))
+
+            batch_signer.run(paths, on_result)
+
+        for child in self.winfo_children():
+            child.destroy()
+        BatchResultsView(
+            self,
+            BATCH_TITLE_TEXT.format(count=len(paths), target=target_dir),
+            BatchJob(len(paths), work),
+            self.end_signing_callback
+        ).pack(fill=tk.BOTH, expand=True)
@@ -2,7 +2,8 @@
 #  @brief A Tkinter Frame for selecting a PDF file and a public key to verify the PDF's digital signature.
 #  @details This frame allows the user to select a PDF document and a public key file
 #           to verify the integrity and authenticity of the PDF's digital signature.
-#           It interacts with the `pdf_signer` service for the verification logic.
+#           It interacts with the `pdf_signer` service for the verification logic. Several files or
+#           a folder can be selected instead, which are then verified in the background.
 
 import tkinter as tk
 from tkinter import filedialog
@@ -13,6 +14,10 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from pyhanko.pdf_utils.misc import PdfReadError
 from services import pdf_signer
 
+from .batch_results import (BatchJob, BatchResultsView, ask_pdf_files, ask_pdf_folder,
+    STATUS_OK, STATUS_WARNING, STATUS_ERROR
+)
+
 
 ## @var LARGE_FONT_CONFIG
 #  @brief Font configuration for large text elements like status labels and buttons.
@@ -34,6 +39,14 @@ PUBLIC_KEY_FILE_TYPES = [("Public Key files", "*.pem *.key")]
 #  @brief Title for the file dialog when selecting the PDF file to be verified.
 SELECT_PDF_TO_VERIFY_TITLE = "Select the PDF file to verify"
 
+## @var SELECT_PDFS_TO_VERIFY_TITLE
+#  @brief Title for the file dialog when selecting several PDF files to be verified.
+SELECT_PDFS_TO_VERIFY_TITLE = "Select the PDF files to verify"
+
+## @var SELECT_FOLDER_TO_VERIFY_TITLE
+#  @brief Title for the directory dialog when selecting a folder of PDF files to be verified.
+SELECT_FOLDER_TO_VERIFY_TITLE = "Select the folder with the PDF files to verify"
+
 ## @var SELECT_PUBLIC_KEY_TITLE
 #  @brief Title for the file dialog when selecting the public key file.
 SELECT_PUBLIC_KEY_TITLE = "Select the public key file"
@@ -70,6 +83,38 @@ VERIFY_BUTTON_RETRY_TEXT = "Try Again"
 #  @brief Text for the main action button to navigate back to the main menu after verification (success or failure).
 VERIFY_BUTTON_GO_BACK_TEXT = "Go back to main menu"
 
+## @var BATCH_SOURCE_TEXT
+#  @brief Text shown in the PDF entry when several PDF files are selected.
+BATCH_SOURCE_TEXT = "{count} PDF files selected"
+
+## @var BATCH_TITLE_TEXT
+#  @brief Title of the results view while verifying several PDF files.
+BATCH_TITLE_TEXT = "Verifying {count} PDF files"
+
+## @var NO_PDF_FILES_MSG
+#  @brief Error message displayed when the selected folder does not contain any PDF file.
+NO_PDF_FILES_MSG = "The selected folder does not contain any PDF files. Please choose a different folder."
+
+## @var BATCH_VALID_TEXT
+#  @brief Result shown in the results view for a PDF file with a valid signature.
+BATCH_VALID_TEXT = "Valid"
+
+## @var BATCH_INVALID_TEXT
+#  @brief Result shown in the results view for a PDF file with an invalid signature.
+BATCH_INVALID_TEXT = "Invalid"
+
+## @var BATCH_NO_SIGNATURE_TEXT
+#  @brief Result shown in the results view for a PDF file without a signature.
+BATCH_NO_SIGNATURE_TEXT = "Not signed"
+
+## @var BATCH_PDF_INVALID_TEXT
+#  @brief Result shown in the results view for a file that is not a valid PDF file.
+BATCH_PDF_INVALID_TEXT = "Not a valid PDF file"
+
+## @var BATCH_ERROR_TEXT
+#  @brief Result shown in the results view when an unexpected error occurred.
+BATCH_ERROR_TEXT = "Error"
+
 ## @var PATHS_REQUIRED_MSG
 #  @brief Error message displayed if either the PDF file or public key file path is not selected.
 PATHS_REQUIRED_MSG = "Both PDF file and public key file locations are required. Please select them."
@@ -128,6 +173,7 @@ class VerifyingFrame(tk.Frame):
 
         self.pdf_to_verify_path_var = tk.StringVar()
         self.public_key_path_var = tk.StringVar()
+        self.batch_pdf_paths: list[str] = []
 
         self._setup_ui()
 
@@ -161,15 +207,19 @@ class VerifyingFrame(tk.Frame):
         )
         self.pdf_to_verify_entry.pack(padx=DEFAULT_PADDING_X, pady=(0, DEFAULT_PADDING_Y), anchor="center")
 
-        select_pdf_button = tk.Button(
-            self,
-            text="Select PDF file",
-            command=self._select_pdf_to_verify_file,
-            bg=BLUE_BUTTON_COLOR,
-            fg="white",
-            activebackground=ACTIVATE_BUTTON_COLOR
-        )
-        select_pdf_button.pack(padx=DEFAULT_PADDING_X, pady=(0, SECTION_SPACING_Y), anchor="center")
+        pdf_buttons = tk.Frame(self, bg=BACKGROUND_COLOR)
+        pdf_buttons.pack(padx=DEFAULT_PADDING_X, pady=(0, SECTION_SPACING_Y), anchor="center")
+        for text, command in (("Select PDF file", self._select_pdf_to_verify_file),
+                              ("Select several PDF files", self._select_pdfs_to_verify_files),
+                              ("Select folder", self._select_folder_to_verify)):
+            tk.Button(
+                pdf_buttons,
+                text=text,
+                command=command,
+                bg=BLUE_BUTTON_COLOR,
+                fg="white",
+                activebackground=ACTIVATE_BUTTON_COLOR
+            ).pack(side=tk.LEFT, padx=5)
 
         # --- Public Key Selection ---
         public_key_label = tk.Label(self, text="Public key file:", fg=FOREGROUND_COLOR, bg=BACKGROUND_COLOR)
@@ -225,8 +275,40 @@ class VerifyingFrame(tk.Frame):
     #  @details Calls `_select_file` with appropriate parameters for PDF selection
     #           and updates `self.pdf_to_verify_path_var`.
     def _select_pdf_to_verify_file(self):
+        self._set_batch([])
         self._select_file(SELECT_PDF_TO_VERIFY_TITLE, PDF_FILE_TYPES, self.pdf_to_verify_path_var)
 
+    ## @brief Opens a file dialog for the user to select several PDF files to be verified.
+    #  @details A single selected file is handled like one chosen with `_select_pdf_to_verify_file`.
+    def _select_pdfs_to_verify_files(self):
+        file_paths = ask_pdf_files(SELECT_PDFS_TO_VERIFY_TITLE)
+        if len(file_paths) == 1:
+            self._set_batch([])
+            self.pdf_to_verify_path_var.set(file_paths[0])
+        elif file_paths:
+            self._set_batch(file_paths)
+
+    ## @brief Opens a directory dialog for the user to select a folder whose PDF files are verified.
+    def _select_folder_to_verify(self):
+        folder_files = ask_pdf_folder(SELECT_FOLDER_TO_VERIFY_TITLE)
+        if folder_files:
+            self._set_batch(folder_files)
+        elif folder_files is not None:
+            self._update_feedback(NO_PDF_FILES_MSG, VERIFY_BUTTON_RETRY_TEXT)
+
+    ## @brief Switches between verifying one PDF file and verifying a batch of PDF files.
+    #  @details In batch mode the PDF entry shows the number of selected files and cannot be edited.
+    #  @param file_paths The PDF files of the batch, empty to verify a single PDF file.
+    #  @type file_paths list[str]
+    def _set_batch(self, file_paths: list[str]):
+        self.batch_pdf_paths = file_paths
+        if file_paths:
+            self.pdf_to_verify_path_var.set(BATCH_SOURCE_TEXT.format(count=len(file_paths)))
+            self.pdf_to_verify_entry.config(state="readonly", readonlybackground=BACKGROUND2_COLOR)
+        else:
+            self.pdf_to_verify_path_var.set("")
+            self.pdf_to_verify_entry.config(state="normal")
+
     ## @brief Opens a file dialog for the user to select the public key file.
     #  @details Calls `_select_file` with appropriate parameters for public key selection
     #           and updates `self.public_key_path_var`.
@@ -286,6 +368,10 @@ class VerifyingFrame(tk.Frame):
         if public_key is None:
             return
 
+        if self.batch_pdf_paths:
+            self._verify_pdf_batch(public_key)
+            return
+
         try:
             is_valid = pdf_signer.verify(public_key, pdf_path)
             if is_valid:
@@ -297,4 +383,36 @@ class VerifyingFrame(tk.Frame):
         except pdf_signer.NoSignatureFound:
             self._update_feedback(NO_SIGNATURE_MSG, VERIFY_BUTTON_RETRY_TEXT)
         except Exception as e:
-            self._update_feedback(VERIFICATION_ERROR_MSG + f" (Details: {type(e).__name__})", VERIFY_BUTTON_RETRY_TEXT)
\ No newline at end of file
+            self._update_feedback(VERIFICATION_ERROR_MSG + f" (Details: {type(e).__name__})", VERIFY_BUTTON_RETRY_TEXT)
+
+    ## @brief Verifies the selected batch of PDF files in the background and shows the results.
+    #  @details Replaces the content of the frame with a `BatchResultsView`. The PDF files are verified
+    #           one after the other by a single `pdf_signer.VerifierSession` on the thread of the `BatchJob`.
+    #  @param public_key The public key the signatures are checked against.
+    #  @type public_key rsa.RSAPublicKey
+    def _verify_pdf_batch(self, public_key: rsa.RSAPublicKey):
+        paths = list(self.batch_pdf_paths)
+
+        def work(report):
+            session = pdf_signer.VerifierSession(public_key)
+            for path in paths:
+                try:
+                    if session.verify(path):
+                        report(path, STATUS_OK, BATCH_VALID_TEXT)
+                    else:
+                        report(path, STATUS_ERROR, BATCH_INVALID_TEXT)
+                except PdfReadError:
+                    report(path, STATUS_ERROR, BATCH_PDF_INVALID_TEXT)
+                except pdf_signer.NoSignatureFound:
+                    report(path, STATUS_WARNING, BATCH_NO_SIGNATURE_TEXT)
+                except Exception as e:
+                    report(path, STATUS_ERROR, BATCH_ERROR_TEXT, f"{type(e).__name__}: {e}")
+
+        for child in self.winfo_children():
+            child.destroy()
+        BatchResultsView(
+            self,
+            BATCH_TITLE_TEXT.format(count=len(paths)),
+            BatchJob(len(paths), work),
+            self.end_verifying_callback
+        ).pack(fill=tk.BOTH, expand=True)
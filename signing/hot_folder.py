@@ -0,0 +1,108 @@
+## @file hot_folder.py
+#  @brief Entry point for the hot-folder signing mode
+#  @details Asks for the PIN, unlocks the private key from the USB drive, or from `--key-source`,
+#           once and then signs every PDF file dropped into the input directory until interrupted,
+#           periodically printing the throughput and end-to-end latency.
+
+import argparse
+import getpass
+import logging
+import sys
+import threading
+
+from services import key_getter, pdf_signer
+from services.hot_folder import HotFolderPipeline
+
+## @var DEFAULT_REPORT_INTERVAL
+#  @brief Default interval in seconds between two printed statistics lines.
+DEFAULT_REPORT_INTERVAL = 30.0
+
+
+## @brief Parses the command line arguments.
+#  @return The parsed arguments.
+#  @rtype argparse.Namespace
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Signs every PDF file written into the input directory.")
+    parser.add_argument("input_dir", help="directory watched for new PDF files")
+    parser.add_argument("output_dir", help="directory receiving the signed PDF files")
+    parser.add_argument("--processed-dir", help="directory receiving signed originals (default: INPUT_DIR/processed)")
+    parser.add_argument("--failed-dir", help="directory receiving originals that failed to sign (default: INPUT_DIR/failed)")
+    parser.add_argument("--workers", type=int, default=None, help="number of signing worker processes")
+    parser.add_argument("--key-source", default=None,
+                        help="where the encrypted key file is read from: usb, a file path, fd:N or env:VARIABLE "
+                             f"(default: ${key_getter.KEY_SOURCE_VARIABLE}, else usb)")
+    parser.add_argument("--max-pending", type=int, default=None, help="maximal number of files signed or queued at once")
+    parser.add_argument("--polling", action="store_true", help="poll the input directory instead of using inotify")
+    parser.add_argument("--timestamps", choices=pdf_signer.TIMESTAMP_POLICY_NAMES, default="dummy",
+                        help="timestamp token embedded into every signature")
+    parser.add_argument("--tsa-url", help="URL of the RFC 3161 time stamping authority used with --timestamps tsa")
+    parser.add_argument("--appearance", choices=pdf_signer.APPEARANCE_MODES, default=pdf_signer.APPEARANCE_VISIBLE,
+                        help="appearance of the signature field; cached reuses a stamp rendered once")
+    parser.add_argument("--compact", action="store_true", help="compress the appended signature revision")
+    parser.add_argument("--embed-dss", action="store_true",
+                        help="embed the signing certificate as validation data (DSS) shared by all documents")
+    parser.add_argument("--digest", choices=list(pdf_signer.DIGEST_ALGORITHMS), default=pdf_signer.DEFAULT_DIGEST_ALGORITHM,
+                        help="digest algorithm of the signatures")
+    parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL,
+                        help="seconds between two statistics lines")
+    return parser.parse_args()
+
+
+## @brief Formats the pipeline statistics as a single line.
+#  @param stats The statistics returned by `HotFolderPipeline.stats`.
+#  @type stats dict
+#  @return The formatted statistics.
+#  @rtype str
+def format_stats(stats: dict) -> str:
+    latency = stats["latency"]
+    latency_text = "n/a" if latency["p50"] is None else f"p50 {latency['p50']:.2f} s, p95 {latency['p95']:.2f} s"
+    return (f"signed {stats['completed']}, failed {stats['failed']}, pending {stats['pending']}, "
+            f"{stats['throughput'] * 60:.1f} documents/min, {stats['byte_throughput'] / 1024:.1f} KiB/s, "
+            f"latency {latency_text}")
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        timestamp_policy = pdf_signer.create_timestamp_policy(args.timestamps, args.tsa_url)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        private_key = key_getter.get_key(getpass.getpass("PIN: "), args.key_source)
+    except Exception as e:
+        print(f"Could not read the private key: {type(e).__name__}", file=sys.stderr)
+        sys.exit(1)
+
+    pipeline = HotFolderPipeline(
+        private_key,
+        args.input_dir,
+        args.output_dir,
+        processed_dir=args.processed_dir,
+        failed_dir=args.failed_dir,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        force_polling=args.polling,
+        sign_options={"timestamp_policy": timestamp_policy, "appearance": args.appearance,
+                      "compact": args.compact, "digest_algorithm": args.digest,
+                      "embed_dss": args.embed_dss},
+    )
+    stop_event = threading.Event()
+    pipeline_thread = threading.Thread(target=pipeline.run, args=(stop_event,))
+    pipeline_thread.start()
+
+    try:
+        while pipeline_thread.is_alive():
+            pipeline_thread.join(args.report_interval)
+            print(format_stats(pipeline.stats()), flush=True)
+    except KeyboardInterrupt:
+        stop_event.set()
+        pipeline_thread.join()
+        print(format_stats(pipeline.stats()))
+
+
+if __name__ == "__main__":
+    main()
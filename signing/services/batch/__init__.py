@@ -0,0 +1,12 @@
+from .batch import BatchSigner, list_documents
+from .verify import (BatchVerifier,
+                     VERDICT_VALID,
+                     VERDICT_INVALID,
+                     VERDICT_UNSIGNED
+)
+from .journal import (BatchJournal,
+                      read_journal,
+                      JOB_PENDING,
+                      JOB_FAILED,
+                      COMPLETED_STATES
+)
@@ -0,0 +1,362 @@
+## @file batch.py
+#  @brief Provides one-shot signing of a batch of PDF documents.
+#  @details The documents are signed by a `SigningPool`, either into an output directory or in
+#           place. A `SizeAwareScheduler` hands them to the pool cheapest first, with a latency lane
+#           for small documents, and limits the total size of the large documents signed at once,
+#           so a few huge files cannot exhaust the memory. Every signed document is first written to a hidden partial file next to
+#           its final path and then renamed, so an interrupted run never leaves truncated outputs
+#           and an in-place signature never truncates the original. By default documents whose
+#           current revision is already signed with the key are skipped, so re-running a batch
+#           after a partial failure only signs the documents that are still missing a signature.
+#           A `BatchJournal` makes long runs resumable without opening the documents again: a resumed
+#           run does not submit the documents the journal records as done, and with a journal every
+#           output is synced to the disk before it is renamed into place.
+#           Given a `StorageBackend`, the batch takes keys instead of paths and the workers read and
+#           write the documents through the backend, whose writers only publish complete outputs.
+
+import functools
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Iterable
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..scheduler import (SizeAwareScheduler, DocumentCost, estimate_cost, DEFAULT_MAX_IN_FLIGHT_BYTES,
+                         DEFAULT_SMALL_DOCUMENT_SIZE, LANES)
+from ..signing_pool import SigningPool, ALREADY_SIGNED_SKIP, OUTCOME_SIGNED, OUTCOME_SKIPPED, OUTCOME_COPIED
+from ..storage import StorageBackend
+from .journal import BatchJournal, JOB_FAILED, JOB_PENDING, sync_file
+
+## @var PDF_EXTENSION
+#  @brief Extension (compared case-insensitively) of the documents listed in directories.
+PDF_EXTENSION = ".pdf"
+
+
+## @class BatchSigner
+#  @brief Signs a list of PDF documents with one key.
+class BatchSigner:
+    ## @brief Initializes the BatchSigner.
+    #  @param private_key The RSA private key used for all signatures.
+    #  @type private_key rsa.RSAPrivateKey
+    #  @param output_dir The directory receiving the signed documents under their original names,
+    #                    or the key prefix receiving them with `storage`. None signs the documents in place.
+    #  @type output_dir str | None
+    #  @param workers The number of signing worker processes. Defaults to the number of CPUs.
+    #  @type workers int | None
+    #  @param max_pending The maximal number of documents queued in the pool or being signed at once.
+    #                     Defaults to twice the number of workers.
+    #  @type max_pending int | None
+    #  @param max_in_flight_bytes The maximal total size of the large documents queued in the pool
+    #                             or being signed at once, see `SizeAwareScheduler`.
+    #  @type max_in_flight_bytes int
+    #  @param small_document_size The highest estimated cost of the documents in the latency lane.
+    #  @type small_document_size int
+    #  @param sign_options Keyword arguments passed to every `pdf_signer.sign` call, see `SigningPool`.
+    #  @type sign_options dict | None
+    #  @param already_signed What to do with documents already signed with the key, one of
+    #                        `signing_pool.ALREADY_SIGNED_ACTIONS`. None signs them again.
+    #                        In place they are always skipped.
+    #  @type already_signed str | None
+    #  @param storage The backend holding the documents. None takes local paths.
+    #  @type storage StorageBackend | None
+    def __init__(self, private_key: rsa.RSAPrivateKey, output_dir: str | None = None,
+                 workers: int | None = None, max_pending: int | None = None, sign_options: dict | None = None,
+                 already_signed: str | None = ALREADY_SIGNED_SKIP, max_in_flight_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+                 small_document_size: int = DEFAULT_SMALL_DOCUMENT_SIZE, storage: StorageBackend | None = None):
+        self.private_key = private_key
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.sign_options = sign_options
+        self.already_signed = already_signed
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.small_document_size = small_document_size
+        self.storage = storage
+
+        self._lock = threading.Lock()
+        self._on_result = None
+        self._journal = None
+        self._counts = {}
+        self._bytes = 0
+        self._failures = []
+        self._resumed = 0
+
+    ## @brief Signs the documents and waits until all of them are done.
+    #  @details Failures do not stop the batch, they are collected in the summary instead.
+    #  @param paths The paths of the PDF documents, or their keys with a storage backend. A stored
+    #               document may also be given as a `(key, name)` pair, see `storage.list_stored_documents`,
+    #               and is then written to `name` below `output_dir` instead of to the last component of its key.
+    #  @type paths Iterable[str | tuple[str, str]]
+    #  @param on_result Called from a pool thread once a document is done, with its path, the
+    #                   `signing_pool.OUTCOME_*` value (None on failure) and the exception (None on success).
+    #  @type on_result Callable[[str, str | None, BaseException | None], None] | None
+    #  @param journal The journal recording the states of the documents. Documents it records as
+    #                 done are not submitted and not passed to `on_result`.
+    #  @type journal BatchJournal | None
+    #  @return A dict with the numbers of `signed`, `skipped`, `copied` and `failed` documents,
+    #          the number of documents `resumed` from the journal, the `bytes` of the signed outputs,
+    #          the `duration` of the run in seconds, the `throughput` in signed documents per second,
+    #          the `failures` as `(path, error_type, message)` tuples and the `latency` of the
+    #          documents by scheduler lane (see `SizeAwareScheduler.stats`).
+    #  @rtype dict
+    #  @exception ValueError If two documents would be written to the same output, or the credentials of the
+    #                       signing options belong to another key, before any document is submitted.
+    def run(self, paths: Iterable[str | tuple[str, str]],
+            on_result: Callable[[str, str | None, BaseException | None], None] | None = None,
+            journal: BatchJournal | None = None) -> dict:
+        documents = [(path, None) if isinstance(path, str) else tuple(path) for path in paths]
+        self._check_outputs(documents)
+        if self.output_dir is not None and self.storage is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self._on_result = on_result
+        self._journal = journal
+        self._counts = {OUTCOME_SIGNED: 0, OUTCOME_SKIPPED: 0, OUTCOME_COPIED: 0}
+        self._bytes = 0
+        self._failures = []
+        self._resumed = 0
+
+        started_at = time.monotonic()
+        # Shutting the pool down waits for the done callbacks, so the counts are final afterwards
+        with SigningPool(self.private_key, self.workers, self.sign_options, self.storage) as pool:
+            scheduler = SizeAwareScheduler(functools.partial(self._dispatch, pool), self.max_pending,
+                                           self.max_in_flight_bytes, self.small_document_size)
+            for path, name in documents:
+                self._add(scheduler, path, name)
+            scheduler.close()
+            scheduler.run()
+        duration = time.monotonic() - started_at
+
+        return {
+            "signed": self._counts[OUTCOME_SIGNED],
+            "skipped": self._counts[OUTCOME_SKIPPED],
+            "copied": self._counts[OUTCOME_COPIED],
+            "failed": len(self._failures),
+            "resumed": self._resumed,
+            "bytes": self._bytes,
+            "duration": duration,
+            "throughput": self._counts[OUTCOME_SIGNED] / duration if duration else 0.0,
+            "failures": list(self._failures),
+            "latency": {lane: stats for lane, stats in scheduler.stats().items() if lane in LANES},
+        }
+
+    ## @brief Checks that no two documents share an output.
+    #  @details Documents sharing an output would also share its partial file and overwrite each
+    #           other, e.g. documents with the same name from two input directories.
+    #  @param documents The paths or keys of the documents with their output names.
+    #  @type documents list[tuple[str, str | None]]
+    #  @exception ValueError If two documents would be written to the same output.
+    #  @private
+    def _check_outputs(self, documents: list[tuple[str, str | None]]):
+        documents_by_output = {}
+        for path, name in documents:
+            out_path = self._output_path(path, name)
+            output = out_path if self.storage is not None else os.path.normcase(os.path.abspath(out_path))
+            if output in documents_by_output:
+                raise ValueError(f"{documents_by_output[output]} and {path} would both be written to {out_path}")
+            documents_by_output[output] = path
+
+    ## @brief Computes the output of a document.
+    #  @param path The path or key of the document.
+    #  @type path str
+    #  @param name The name of a stored document below the output prefix, None for the last component of its key.
+    #  @type name str | None
+    #  @return The final path or key of the signed document.
+    #  @rtype str
+    #  @private
+    def _output_path(self, path: str, name: str | None = None) -> str:
+        if self.output_dir is None:
+            return path
+        if self.storage is not None:
+            return posixpath.join(self.output_dir, name or posixpath.basename(path))
+        return os.path.join(self.output_dir, os.path.basename(path))
+
+    ## @brief Queues a document in the scheduler.
+    #  @param scheduler The scheduler of the run.
+    #  @type scheduler SizeAwareScheduler
+    #  @param path The path or key of the PDF document.
+    #  @type path str
+    #  @param name See `_output_path`.
+    #  @type name str | None
+    #  @private
+    def _add(self, scheduler: SizeAwareScheduler, path: str, name: str | None = None):
+        if self._journal is not None and self._journal.is_completed(self._journal_id(path)):
+            self._resumed += 1
+            return
+
+        # Copying a document onto itself would only rewrite it
+        already_signed = self.already_signed
+        if self.output_dir is None and already_signed is not None:
+            already_signed = ALREADY_SIGNED_SKIP
+
+        if self.storage is not None:
+            out_key = self._output_path(path, name)
+            scheduler.add(self._stored_cost(path), path, out_key, already_signed,
+                          on_done=lambda f: self._finish(path, out_key, None, f))
+            return
+
+        out_path = self._output_path(path)
+        out_dir, name = os.path.split(out_path)
+        partial_path = os.path.join(out_dir, f".{name}.partial")
+        scheduler.add(estimate_cost(path), path, partial_path, already_signed,
+                      on_done=lambda f: self._finish(path, out_path, partial_path, f))
+
+    ## @brief Estimates the cost of a document of the storage backend from its size.
+    #  @details Reading the object count would fetch the tail of every document before the run starts.
+    #  @param key The key of the document.
+    #  @type key str
+    #  @return The cost, zero if the size cannot be read, so the failure is reported by the signing job.
+    #  @rtype DocumentCost
+    #  @private
+    def _stored_cost(self, key: str) -> DocumentCost:
+        try:
+            return DocumentCost(self.storage.size(key))
+        except (OSError, ValueError):
+            return DocumentCost(0)
+
+    ## @brief Identifies a document in the journal.
+    #  @param path The path or key of the document.
+    #  @type path str
+    #  @return The path, or the URI of the key.
+    #  @rtype str
+    #  @private
+    def _journal_id(self, path: str) -> str:
+        return path if self.storage is None else self.storage.uri(path)
+
+    ## @brief Hands a document dispatched by the scheduler to the signing pool.
+    #  @param pool The signing pool of the run.
+    #  @type pool SigningPool
+    #  @param path The path or key of the PDF document.
+    #  @type path str
+    #  @param target The path the output is written to, or its key with a storage backend.
+    #  @type target str
+    #  @param already_signed See `SigningPool.submit`.
+    #  @type already_signed str | None
+    #  @return The future of the signing job.
+    #  @rtype Future
+    #  @private
+    def _dispatch(self, pool: SigningPool, path: str, target: str, already_signed: str | None) -> Future:
+        if self._journal is not None:
+            self._journal.record(self._journal_id(path), JOB_PENDING)
+        if self.storage is not None:
+            return pool.submit_stored(path, target, already_signed)
+        return pool.submit(path, target, already_signed)
+
+    ## @brief Moves the result of a finished job into place and counts it.
+    #  @details The callback runs on a thread of the signing pool, where a raised exception would be
+    #           lost. A job whose output cannot be moved into place or recorded in the journal is
+    #           counted as failed instead, and its partial output is removed.
+    #  @param path The path or key of the original PDF document.
+    #  @type path str
+    #  @param out_path The final path or key of the output.
+    #  @type out_path str
+    #  @param partial_path The path the output was written to, None when the storage backend
+    #                      already published it.
+    #  @type partial_path str | None
+    #  @param future The future of the signing job.
+    #  @type future Future
+    #  @private
+    def _finish(self, path: str, out_path: str, partial_path: str | None, future: Future):
+        error = future.exception() if not future.cancelled() else InterruptedError()
+        outcome = None
+        if error is None:
+            outcome = future.result()
+            try:
+                size = self._complete(path, out_path, partial_path, outcome)
+            except Exception as e:
+                error = e
+        if error is None:
+            with self._lock:
+                self._counts[outcome] += 1
+                self._bytes += size
+        else:
+            outcome = None
+            try:
+                if partial_path is not None and os.path.exists(partial_path):
+                    os.remove(partial_path)
+                if self._journal is not None:
+                    self._journal.record(self._journal_id(path), JOB_FAILED, (type(error).__name__, str(error)))
+            except Exception:
+                # The failure is still counted below, and a document the journal does not call done is redone
+                pass
+            with self._lock:
+                self._failures.append((path, type(error).__name__, str(error)))
+        if self._on_result is not None:
+            self._on_result(path, outcome, error)
+
+    ## @brief Moves the output of a successful job into place and records it in the journal.
+    #  @param path The path or key of the original PDF document.
+    #  @type path str
+    #  @param out_path The final path or key of the output.
+    #  @type out_path str
+    #  @param partial_path See `_finish`.
+    #  @type partial_path str | None
+    #  @param outcome The outcome of the job.
+    #  @type outcome str
+    #  @return The size of the signed output, 0 if the document was not signed.
+    #  @rtype int
+    #  @exception OSError If the output cannot be moved into place or the journal cannot be written.
+    #  @private
+    def _complete(self, path: str, out_path: str, partial_path: str | None, outcome: str) -> int:
+        written = partial_path is not None and outcome in (OUTCOME_SIGNED, OUTCOME_COPIED)
+        if written:
+            if self._journal is not None:
+                # The journal may only call the document done once its content is durable
+                sync_file(partial_path)
+            os.replace(partial_path, out_path)
+        if self._journal is not None:
+            self._journal.record(self._journal_id(path), outcome,
+                                 output_dir=os.path.dirname(out_path) if written else None)
+        return self._output_size(out_path) if outcome == OUTCOME_SIGNED else 0
+
+    ## @brief Reads the size of a signed output.
+    #  @param out_path The path or key of the output.
+    #  @type out_path str
+    #  @return The size in bytes, 0 if the storage backend cannot tell it.
+    #  @rtype int
+    #  @private
+    def _output_size(self, out_path: str) -> int:
+        if self.storage is None:
+            return os.path.getsize(out_path)
+        try:
+            return self.storage.size(out_path)
+        except OSError:
+            return 0
+
+
+## @brief Expands files and directories into the PDF documents of a batch.
+#  @details Directories contribute the non-hidden PDF files directly inside them, in name order.
+#           Files are taken as they are.
+#  @param paths The paths of files and directories.
+#  @type paths Iterable[str]
+#  @return The paths of the documents.
+#  @rtype list[str]
+def list_documents(paths: Iterable[str]) -> list[str]:
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            documents.extend(sorted(list_watched_files(path)))
+        else:
+            documents.append(path)
+    return documents
+
+
+## @brief Checks whether the file name is a document listed in directories, e.g. by the hot-folder watchers.
+#  @param name The file name without the directory.
+#  @type name str
+#  @return True for non-hidden files with the PDF extension.
+#  @rtype bool
+def is_watched_file(name: str) -> bool:
+    return not name.startswith(".") and name.lower().endswith(PDF_EXTENSION)
+
+
+## @brief Lists the documents currently present directly inside the directory.
+#  @param directory The directory to list.
+#  @type directory str
+#  @return The paths of the non-hidden regular PDF files.
+#  @rtype list[str]
+def list_watched_files(directory: str) -> list[str]:
+    with os.scandir(directory) as entries:
+        return [entry.path for entry in entries if is_watched_file(entry.name) and entry.is_file()]
@@ -0,0 +1,204 @@
+## @file journal.py
+#  @brief Provides the write-ahead journal of long batch runs.
+#  @details The journal is an append-only file with one JSON record per line, holding the state
+#           a document reached: `pending` when it was handed to the signing pool, one of the
+#           `signing_pool.OUTCOME_*` values once it is done, or `failed`. Records are buffered and
+#           written with a single fsync every `sync_interval` records or `sync_seconds` seconds,
+#           so journaling costs a few microseconds per document instead of one fsync each. Before
+#           the journal itself is synced, the directories that received outputs since the last
+#           sync are synced, so a document the journal calls done also survived the crash. A crash
+#           loses at most the records written since the last sync, and those documents are simply
+#           signed again on resume. A torn last line is ignored when the journal is read.
+
+import json
+import os
+import threading
+import time
+from typing import TextIO
+
+from ..signing_pool import OUTCOME_SIGNED, OUTCOME_SKIPPED, OUTCOME_COPIED
+
+## @var JOB_PENDING
+#  @brief State of a document handed to the signing pool and not done yet.
+JOB_PENDING = "pending"
+
+## @var JOB_FAILED
+#  @brief State of a document whose signing failed.
+JOB_FAILED = "failed"
+
+## @var COMPLETED_STATES
+#  @brief States of documents a resumed run does not submit again.
+COMPLETED_STATES = frozenset((OUTCOME_SIGNED, OUTCOME_SKIPPED, OUTCOME_COPIED))
+
+## @var DEFAULT_SYNC_INTERVAL
+#  @brief Default number of records written between two fsyncs of the journal.
+DEFAULT_SYNC_INTERVAL = 256
+
+## @var DEFAULT_SYNC_SECONDS
+#  @brief Default maximal number of seconds a record stays unsynced while records arrive.
+DEFAULT_SYNC_SECONDS = 1.0
+
+
+## @class BatchJournal
+#  @brief Records the state of every document of a batch run.
+#  @details Documents are identified by their absolute paths, or by their URIs when they are kept in
+#           a storage backend (see `storage.StorageBackend.uri`). The journal does not record the
+#           options of the run, resuming with another output directory is up to the caller.
+class BatchJournal:
+    ## @brief Initializes the BatchJournal and opens its file.
+    #  @param path The path of the journal file.
+    #  @type path str
+    #  @param resume Whether to keep the records of an earlier run. Otherwise the file is truncated.
+    #  @type resume bool
+    #  @param sync_interval The number of records written between two fsyncs.
+    #  @type sync_interval int
+    #  @param sync_seconds The maximal number of seconds between a record and the next fsync,
+    #                      checked whenever a record is written.
+    #  @type sync_seconds float
+    def __init__(self, path: str, resume: bool = False, sync_interval: int = DEFAULT_SYNC_INTERVAL,
+                 sync_seconds: float = DEFAULT_SYNC_SECONDS):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.sync_seconds = sync_seconds
+        self.states = read_journal(path) if resume else {}
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._directories: set[str] = set()
+        self._file: TextIO = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0 and not _ends_with_newline(path):
+            # Records appended after a torn line must start on a line of their own
+            self._file.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    ## @brief Tells whether an earlier run completed a document.
+    #  @param path The path or URI of the document.
+    #  @type path str
+    #  @return True if the last record of the document is one of `COMPLETED_STATES`.
+    #  @rtype bool
+    def is_completed(self, path: str) -> bool:
+        return self.states.get(_document_id(path)) in COMPLETED_STATES
+
+    ## @brief Records the state of a document.
+    #  @param path The path or URI of the document.
+    #  @type path str
+    #  @param state `JOB_PENDING`, `JOB_FAILED` or one of the `signing_pool.OUTCOME_*` values.
+    #  @type state str
+    #  @param error The `(error_type, message)` of a failure.
+    #  @type error tuple[str, str] | None
+    #  @param output_dir The directory an output was renamed into. It is synced before the journal.
+    #  @type output_dir str | None
+    def record(self, path: str, state: str, error: tuple[str, str] | None = None, output_dir: str | None = None):
+        path = _document_id(path)
+        entry = {"path": path, "state": state}
+        if error is not None:
+            entry["error"] = list(error)
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.states[path] = state
+            if output_dir is not None:
+                self._directories.add(output_dir or ".")
+            self._unsynced += 1
+            if (self._unsynced >= self.sync_interval
+                    or time.monotonic() - self._last_sync >= self.sync_seconds):
+                self._sync()
+
+    ## @brief Writes the buffered records and syncs them to the disk.
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    ## @brief Syncs the journal and closes its file.
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+
+    ## @brief Syncs the output directories and then the journal. The lock must be held.
+    #  @private
+    def _sync(self):
+        for directory in self._directories:
+            sync_directory(directory)
+        self._directories.clear()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+## @brief Reads the last state of every document from a journal.
+#  @param path The path of the journal file.
+#  @type path str
+#  @return The state by absolute document path. Empty if the file does not exist.
+#  @rtype dict[str, str]
+def read_journal(path: str) -> dict[str, str]:
+    states = {}
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return states
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                states[entry["path"]] = entry["state"]
+            except (ValueError, KeyError, TypeError):
+                # A line torn by a crash, the document is signed again
+                continue
+    return states
+
+
+## @brief Syncs a file to the disk.
+#  @param path The path of the file.
+#  @type path str
+def sync_file(path: str):
+    fd = os.open(path, os.O_RDWR)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+## @brief Syncs a directory, making the renames into it durable.
+#  @details Directories cannot be opened on Windows, where renames are journaled by NTFS itself.
+#  @param path The path of the directory.
+#  @type path str
+def sync_directory(path: str):
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+## @brief Normalizes the identifier of a document.
+#  @param path The path or URI of the document.
+#  @type path str
+#  @return The URI as it is, or the absolute path.
+#  @rtype str
+#  @private
+def _document_id(path: str) -> str:
+    return path if "://" in path else os.path.abspath(path)
+
+
+## @brief Tells whether a non-empty file ends with a newline.
+#  @param path The path of the file.
+#  @type path str
+#  @return True if the last byte is a newline.
+#  @rtype bool
+#  @private
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
@@ -0,0 +1,192 @@
+## @file verify.py
+#  @brief Provides one-shot verification of a batch of PDF documents.
+#  @details The documents are verified by worker processes, each keeping one `VerifierSession`, so the
+#           validation context of a signing certificate is built once per worker rather than once per
+#           document. Like `BatchSigner`, the batch is dispatched by a `SizeAwareScheduler`, and given
+#           a `StorageBackend` it takes keys instead of paths, the workers reading the documents in
+#           ranges through their own copies of the backend.
+
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..pdf_signer import VerifierSession, NoSignatureFound, VALIDATION_FULL
+from ..scheduler import (SizeAwareScheduler, DocumentCost, estimate_cost, DEFAULT_MAX_IN_FLIGHT_BYTES,
+                         DEFAULT_SMALL_DOCUMENT_SIZE, LANES)
+from ..storage import StorageBackend, verify_document
+
+## @var VERDICT_VALID
+#  @brief Verdict of a document whose signature passes all checks of the level.
+VERDICT_VALID = "valid"
+
+## @var VERDICT_INVALID
+#  @brief Verdict of a document whose signature fails a check of the level.
+VERDICT_INVALID = "invalid"
+
+## @var VERDICT_UNSIGNED
+#  @brief Verdict of a document without any embedded signature.
+VERDICT_UNSIGNED = "unsigned"
+
+
+## @class BatchVerifier
+#  @brief Verifies a list of PDF documents against one public key.
+class BatchVerifier:
+    ## @brief Initializes the BatchVerifier.
+    #  @param public_key The RSA public key expected to correspond to the signatures.
+    #  @type public_key rsa.RSAPublicKey
+    #  @param level One of `pdf_signer.VALIDATION_LEVELS`.
+    #  @type level str
+    #  @param workers The number of verifying worker processes. Defaults to the number of CPUs.
+    #  @type workers int | None
+    #  @param max_pending The maximal number of documents queued in the pool or being verified at once.
+    #                     Defaults to twice the number of workers.
+    #  @type max_pending int | None
+    #  @param max_in_flight_bytes The maximal total size of the large documents queued in the pool
+    #                             or being verified at once, see `SizeAwareScheduler`.
+    #  @type max_in_flight_bytes int
+    #  @param small_document_size The highest estimated cost of the documents in the latency lane.
+    #  @type small_document_size int
+    #  @param storage The backend holding the documents. None takes local paths.
+    #  @type storage StorageBackend | None
+    def __init__(self, public_key: rsa.RSAPublicKey, level: str = VALIDATION_FULL, workers: int | None = None,
+                 max_pending: int | None = None, max_in_flight_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+                 small_document_size: int = DEFAULT_SMALL_DOCUMENT_SIZE, storage: StorageBackend | None = None):
+        # Fails on an unknown level before any worker is started
+        VerifierSession(public_key, level)
+        self.public_key = public_key
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.small_document_size = small_document_size
+        self.storage = storage
+
+        self._lock = threading.Lock()
+        self._on_result = None
+        self._counts = {}
+        self._failures = []
+
+    ## @brief Verifies the documents and waits until all of them are done.
+    #  @details Failures do not stop the batch, they are collected in the summary instead.
+    #  @param paths The paths of the PDF documents, or their keys with a storage backend.
+    #  @type paths Iterable[str]
+    #  @param on_result Called from a pool thread once a document is done, with its path, the
+    #                   `VERDICT_*` value (None on failure) and the exception (None on success).
+    #  @type on_result Callable[[str, str | None, BaseException | None], None] | None
+    #  @return A dict with the numbers of `valid`, `invalid`, `unsigned` and `failed` documents,
+    #          the `duration` of the run in seconds, the `throughput` in documents per second,
+    #          the `failures` as `(path, error_type, message)` tuples and the `latency` of the
+    #          documents by scheduler lane (see `SizeAwareScheduler.stats`).
+    #  @rtype dict
+    def run(self, paths: Iterable[str],
+            on_result: Callable[[str, str | None, BaseException | None], None] | None = None) -> dict:
+        self._on_result = on_result
+        self._counts = {VERDICT_VALID: 0, VERDICT_INVALID: 0, VERDICT_UNSIGNED: 0}
+        self._failures = []
+
+        key_der = self.public_key.public_bytes(serialization.Encoding.DER,
+                                               serialization.PublicFormat.SubjectPublicKeyInfo)
+        started_at = time.monotonic()
+        # Shutting the executor down waits for the done callbacks, so the counts are final afterwards
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(key_der, self.level, self.storage)) as executor:
+            scheduler = SizeAwareScheduler(functools.partial(executor.submit, _verify_one), self.max_pending,
+                                           self.max_in_flight_bytes, self.small_document_size)
+            for path in paths:
+                scheduler.add(self._cost(path), path, on_done=functools.partial(self._finish, path))
+            scheduler.close()
+            scheduler.run()
+        duration = time.monotonic() - started_at
+
+        done = sum(self._counts.values()) + len(self._failures)
+        return {
+            "valid": self._counts[VERDICT_VALID],
+            "invalid": self._counts[VERDICT_INVALID],
+            "unsigned": self._counts[VERDICT_UNSIGNED],
+            "failed": len(self._failures),
+            "duration": duration,
+            "throughput": done / duration if duration else 0.0,
+            "failures": list(self._failures),
+            "latency": {lane: stats for lane, stats in scheduler.stats().items() if lane in LANES},
+        }
+
+    ## @brief Estimates the cost of a document.
+    #  @param path The path or key of the document.
+    #  @type path str
+    #  @return The cost, zero if it cannot be estimated, so the failure is reported by the verification job.
+    #  @rtype DocumentCost
+    #  @private
+    def _cost(self, path: str) -> DocumentCost:
+        if self.storage is None:
+            return estimate_cost(path)
+        try:
+            return DocumentCost(self.storage.size(path))
+        except (OSError, ValueError):
+            return DocumentCost(0)
+
+    ## @brief Counts a finished verification.
+    #  @param path The path or key of the document.
+    #  @type path str
+    #  @param future The future of the verification job.
+    #  @type future Future
+    #  @private
+    def _finish(self, path: str, future: Future):
+        error = future.exception() if not future.cancelled() else InterruptedError()
+        if error is None:
+            verdict = future.result()
+            with self._lock:
+                self._counts[verdict] += 1
+        else:
+            verdict = None
+            with self._lock:
+                self._failures.append((path, type(error).__name__, str(error)))
+        if self._on_result is not None:
+            self._on_result(path, verdict, error)
+
+
+## @var _worker_session
+#  @brief The verifier session created by `_init_worker` in every worker process.
+#  @private
+_worker_session = None
+
+## @var _worker_storage
+#  @brief The storage backend unpickled by `_init_worker` in every worker process.
+#  @private
+_worker_storage = None
+
+
+## @brief Creates the verifier session of a worker process.
+#  @param key_der The SubjectPublicKeyInfo DER encoding of the public key.
+#  @type key_der bytes
+#  @param level The validation level.
+#  @type level str
+#  @param storage The storage backend of the batch.
+#  @type storage StorageBackend | None
+#  @private
+def _init_worker(key_der: bytes, level: str, storage: StorageBackend | None):
+    global _worker_session, _worker_storage
+    _worker_session = VerifierSession(serialization.load_der_public_key(key_der), level)
+    _worker_storage = storage
+
+
+## @brief Verifies a single document in a worker process.
+#  @param path The path or key of the document.
+#  @type path str
+#  @return One of the `VERDICT_*` values.
+#  @rtype str
+#  @private
+def _verify_one(path: str) -> str:
+    try:
+        if _worker_storage is None:
+            valid = _worker_session.verify(path)
+        else:
+            valid = verify_document(_worker_session, _worker_storage, path)
+    except NoSignatureFound:
+        return VERDICT_UNSIGNED
+    return VERDICT_VALID if valid else VERDICT_INVALID
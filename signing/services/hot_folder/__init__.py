@@ -0,0 +1,6 @@
+from .pipeline import HotFolderPipeline
+from .watchers import (create_watcher,
+                       InotifyWatcher,
+                       PollingWatcher,
+                       InotifyUnavailableException
+)
@@ -0,0 +1,209 @@
+## @file pipeline.py
+#  @brief Provides the hot-folder pipeline signing every PDF file dropped into a directory.
+#  @details Finished files reported by a watcher from `watchers.py` are signed by a bounded
+#           `SigningPool`. The signed document is first written to a hidden partial file in the
+#           output directory and then renamed to its final name, so consumers of the output
+#           directory never see incomplete files. The original is moved to the processed
+#           directory on success and to the failed directory on failure. Failures are reported
+#           through the `logging` logger of this module.
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..instrumentation import LatencyTracker
+from ..signing_pool import SigningPool
+from .watchers import create_watcher, list_watched_files, PollingWatcher
+
+## @var logger
+#  @brief Logger of the pipeline.
+logger = logging.getLogger(__name__)
+
+## @var PROCESSED_DIR_NAME
+#  @brief Name of the default directory (inside the input directory) receiving signed originals.
+PROCESSED_DIR_NAME = "processed"
+
+## @var FAILED_DIR_NAME
+#  @brief Name of the default directory (inside the input directory) receiving originals that failed to sign.
+FAILED_DIR_NAME = "failed"
+
+## @var WAIT_TIMEOUT
+#  @brief Time in seconds the pipeline waits for new files before checking whether it should stop.
+WAIT_TIMEOUT = 0.5
+
+
+## @class HotFolderPipeline
+#  @brief Watches an input directory and signs every PDF file written into it.
+class HotFolderPipeline:
+    ## @brief Initializes the HotFolderPipeline.
+    #  @param private_key The RSA private key used for all signatures.
+    #  @type private_key rsa.RSAPrivateKey
+    #  @param input_dir The directory the scanners drop the PDF files into.
+    #  @type input_dir str
+    #  @param output_dir The directory receiving the signed PDF files.
+    #  @type output_dir str
+    #  @param processed_dir The directory receiving signed originals. Defaults to `input_dir/processed`.
+    #  @type processed_dir str | None
+    #  @param failed_dir The directory receiving originals that failed to sign. Defaults to `input_dir/failed`.
+    #  @type failed_dir str | None
+    #  @param workers The number of signing worker processes. Defaults to the number of CPUs.
+    #  @type workers int | None
+    #  @param max_pending The maximal number of files queued or being signed at once.
+    #                     Defaults to twice the number of workers.
+    #  @type max_pending int | None
+    #  @param force_polling Whether to poll the input directory even if inotify is available.
+    #  @type force_polling bool
+    #  @param sign_options Keyword arguments passed to every `pdf_signer.sign` call, see `SigningPool`.
+    #  @type sign_options dict | None
+    def __init__(self, private_key: rsa.RSAPrivateKey, input_dir: str, output_dir: str,
+                 processed_dir: str | None = None, failed_dir: str | None = None,
+                 workers: int | None = None, max_pending: int | None = None, force_polling: bool = False,
+                 sign_options: dict | None = None):
+        self.private_key = private_key
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.processed_dir = processed_dir or os.path.join(input_dir, PROCESSED_DIR_NAME)
+        self.failed_dir = failed_dir or os.path.join(input_dir, FAILED_DIR_NAME)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.force_polling = force_polling
+        self.sign_options = sign_options
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending: set[str] = set()
+        self._latency = LatencyTracker()
+        self._completed = 0
+        self._failed = 0
+        self._bytes = 0
+        self._started_at = None
+        self._pool = None
+
+    ## @brief Signs the files already present and then every newly finished file until stopped.
+    #  @details The files already present may still be written to, and an inotify watcher only
+    #           reports them once they are closed again. They are submitted once `PollingWatcher`
+    #           finds them unchanged for its settle time, as it does for the files it watches itself.
+    #  @param stop_event The event ending the pipeline once set. Without it the pipeline runs forever.
+    #  @type stop_event threading.Event | None
+    def run(self, stop_event: threading.Event | None = None):
+        stop_event = stop_event or threading.Event()
+        for directory in (self.output_dir, self.processed_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        watcher = create_watcher(self.input_dir, self.force_polling)
+        self._pool = SigningPool(self.private_key, self.workers, self.sign_options)
+        self._started_at = time.monotonic()
+        # A polling watcher reports the files already present itself once they have settled
+        startup_files = set() if isinstance(watcher, PollingWatcher) else set(list_watched_files(self.input_dir))
+        startup_watcher = PollingWatcher(self.input_dir)
+        try:
+            while not stop_event.is_set():
+                for path in watcher.wait(WAIT_TIMEOUT):
+                    self._submit(path)
+                if startup_files:
+                    for path in startup_watcher.wait(0):
+                        if path in startup_files:
+                            self._submit(path)
+                    # Files reported by the watcher meanwhile have been moved away
+                    startup_files = {path for path in startup_files if os.path.exists(path)}
+        finally:
+            watcher.close()
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    ## @brief Returns the throughput and end-to-end latency of the pipeline.
+    #  @details The latency of a file is measured from its last modification (the moment the
+    #           scanner finished writing it) until the signed document is in the output directory.
+    #  @return A dict with `completed`, `failed`, `pending`, `bytes`, `uptime`, `throughput`
+    #          (documents per second), `byte_throughput` (bytes per second) and `latency`
+    #          (see `LatencyTracker.snapshot`).
+    #  @rtype dict
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        with self._lock:
+            completed, failed, pending, byte_count = self._completed, self._failed, len(self._pending), self._bytes
+        return {
+            "completed": completed,
+            "failed": failed,
+            "pending": pending,
+            "bytes": byte_count,
+            "uptime": uptime,
+            "throughput": completed / uptime if uptime else 0.0,
+            "byte_throughput": byte_count / uptime if uptime else 0.0,
+            "latency": self._latency.snapshot(),
+        }
+
+    ## @brief Hands a finished file to the signing pool, waiting while too many files are pending.
+    #  @param path The path of the finished PDF file.
+    #  @type path str
+    #  @private
+    def _submit(self, path: str):
+        with self._lock:
+            if path in self._pending:
+                return
+        try:
+            modified_at = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return
+
+        self._slots.acquire()
+        with self._lock:
+            self._pending.add(path)
+
+        partial_path = os.path.join(self.output_dir, f".{os.path.basename(path)}.partial")
+        future = self._pool.submit(path, partial_path)
+        future.add_done_callback(lambda f: self._finish(path, partial_path, modified_at, f))
+
+    ## @brief Moves the results of a finished signing into place.
+    #  @details The callback runs on a thread of the signing pool, where a raised exception would be
+    #           lost. A file whose results cannot be moved into place is counted as failed, and
+    #           whatever can still be moved is: its partial output is removed and the original is
+    #           moved to the failed directory.
+    #  @param path The path of the original PDF file.
+    #  @type path str
+    #  @param partial_path The path the signed document was written to.
+    #  @type partial_path str
+    #  @param modified_at The modification time of the original when it was picked up.
+    #  @type modified_at float
+    #  @param future The future of the signing job.
+    #  @type future Future
+    #  @private
+    def _finish(self, path: str, partial_path: str, modified_at: float, future: Future):
+        name = os.path.basename(path)
+        try:
+            error = future.exception() if not future.cancelled() else InterruptedError()
+            if error is None:
+                try:
+                    size = os.path.getsize(path)
+                    os.replace(partial_path, os.path.join(self.output_dir, name))
+                    os.replace(path, os.path.join(self.processed_dir, name))
+                except OSError as e:
+                    error = e
+            if error is None:
+                self._latency.record(time.time() - modified_at)
+                with self._lock:
+                    self._completed += 1
+                    self._bytes += size
+                return
+
+            logger.error("Signing %s failed: %s: %s", path, type(error).__name__, error)
+            try:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            except OSError as e:
+                logger.error("Removing %s failed: %s: %s", partial_path, type(e).__name__, e)
+            try:
+                if os.path.exists(path):
+                    os.replace(path, os.path.join(self.failed_dir, name))
+            except OSError as e:
+                logger.error("Moving %s to %s failed: %s: %s", path, self.failed_dir, type(e).__name__, e)
+            with self._lock:
+                self._failed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+            self._slots.release()
@@ -0,0 +1,209 @@
+## @file watchers.py
+#  @brief Provides watchers reporting PDF files that were completely written into a directory.
+#  @details On Linux, `InotifyWatcher` reports files when the writer closes them (`IN_CLOSE_WRITE`)
+#           or when they are moved into the directory (`IN_MOVED_TO`). On other systems, or when
+#           inotify is unavailable, `PollingWatcher` lists the directory periodically and reports
+#           files whose size and modification time stayed the same for a settle period.
+#           Only the top level of the directory is watched, hidden files and non-PDF files are ignored.
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from ..batch.batch import is_watched_file, list_watched_files
+
+## @var DEFAULT_POLL_INTERVAL
+#  @brief Default interval in seconds between two directory listings of `PollingWatcher`.
+DEFAULT_POLL_INTERVAL = 1.0
+
+## @var DEFAULT_SETTLE_TIME
+#  @brief Default time in seconds a file must stay unchanged before `PollingWatcher` reports it.
+DEFAULT_SETTLE_TIME = 2.0
+
+## @var IN_CLOSE_WRITE
+#  @brief inotify event: a file opened for writing was closed.
+IN_CLOSE_WRITE = 0x00000008
+
+## @var IN_MOVED_TO
+#  @brief inotify event: a file was moved into the watched directory.
+IN_MOVED_TO = 0x00000080
+
+## @var IN_Q_OVERFLOW
+#  @brief inotify event: the kernel event queue overflowed and events were lost.
+IN_Q_OVERFLOW = 0x00004000
+
+## @var _EVENT_HEADER
+#  @brief Layout of `struct inotify_event` without the trailing name.
+#  @private
+_EVENT_HEADER = struct.Struct("iIII")
+
+## @var _READ_BUFFER_SIZE
+#  @brief Number of bytes read from the inotify file descriptor at once.
+#  @private
+_READ_BUFFER_SIZE = 64 * 1024
+
+
+## @brief Exception raised when inotify cannot be used on the current system.
+class InotifyUnavailableException(Exception):
+    pass
+
+
+## @class InotifyWatcher
+#  @brief Watches a directory using the Linux inotify API.
+class InotifyWatcher:
+    ## @brief Initializes the InotifyWatcher.
+    #  @param directory The directory to watch.
+    #  @type directory str
+    #  @exception InotifyUnavailableException If inotify is not available on this system.
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        try:
+            # The flags of inotify_init1 are those of open, they and libc only exist on Unix
+            flags = os.O_NONBLOCK | os.O_CLOEXEC
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError, TypeError) as e:
+            raise InotifyUnavailableException() from e
+
+        self._fd = inotify_init1(flags)
+        if self._fd < 0:
+            raise InotifyUnavailableException(os.strerror(ctypes.get_errno()))
+
+        inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        if inotify_add_watch(self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise InotifyUnavailableException(os.strerror(error))
+
+    ## @brief Waits for files that were completely written.
+    #  @param timeout The maximal time to wait in seconds.
+    #  @type timeout float
+    #  @return The paths of the files finished since the previous call, possibly empty.
+    #  @rtype list[str]
+    def wait(self, timeout: float) -> list[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self._fd, _READ_BUFFER_SIZE)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so everything present is reported again
+                paths.extend(list_watched_files(self.directory))
+            elif is_watched_file(name):
+                paths.append(os.path.join(self.directory, name))
+        return list(dict.fromkeys(paths))
+
+    ## @brief Releases the inotify file descriptor.
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+## @class PollingWatcher
+#  @brief Watches a directory by listing it periodically.
+#  @details A file is considered finished once its size and modification time did not change
+#           for `settle_time` seconds. A finished file is reported again only after it changes.
+class PollingWatcher:
+    ## @brief Initializes the PollingWatcher.
+    #  @param directory The directory to watch.
+    #  @type directory str
+    #  @param poll_interval The interval in seconds between two directory listings.
+    #  @type poll_interval float
+    #  @param settle_time The time in seconds a file must stay unchanged before it is reported.
+    #  @type settle_time float
+    def __init__(self, directory: str, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 settle_time: float = DEFAULT_SETTLE_TIME):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        # path -> (size, mtime_ns, time the state was first seen, already reported)
+        self._states: dict[str, tuple[int, int, float, bool]] = {}
+        self._next_poll = 0.0
+
+    ## @brief Waits for files that were completely written.
+    #  @param timeout The maximal time to wait in seconds.
+    #  @type timeout float
+    #  @return The paths of the files finished since the previous call, possibly empty.
+    #  @rtype list[str]
+    def wait(self, timeout: float) -> list[str]:
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if now >= self._next_poll:
+                self._next_poll = now + self.poll_interval
+                finished = self._poll(now)
+                if finished:
+                    return finished
+            if now >= deadline:
+                return []
+            time.sleep(max(min(self._next_poll, deadline) - time.monotonic(), 0))
+
+    ## @brief Nothing to release, present for interface parity with `InotifyWatcher`.
+    def close(self):
+        pass
+
+    ## @brief Lists the directory once and updates the file states.
+    #  @param now The current monotonic time.
+    #  @type now float
+    #  @return The paths of the files that became finished.
+    #  @rtype list[str]
+    #  @private
+    def _poll(self, now: float) -> list[str]:
+        states = {}
+        finished = []
+        for path in list_watched_files(self.directory):
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    continue
+                raise
+
+            previous = self._states.get(path)
+            if previous is None or previous[:2] != (st.st_size, st.st_mtime_ns):
+                states[path] = (st.st_size, st.st_mtime_ns, now, False)
+                continue
+
+            size, mtime_ns, first_seen, reported = previous
+            if not reported and now - first_seen >= self.settle_time:
+                finished.append(path)
+                reported = True
+            states[path] = (size, mtime_ns, first_seen, reported)
+
+        self._states = states
+        return finished
+
+
+## @brief Creates the best watcher available on this system.
+#  @param directory The directory to watch.
+#  @type directory str
+#  @param force_polling Whether to use `PollingWatcher` even if inotify is available.
+#  @type force_polling bool
+#  @return An `InotifyWatcher` if possible, otherwise a `PollingWatcher`.
+#  @rtype InotifyWatcher | PollingWatcher
+def create_watcher(directory: str, force_polling: bool = False):
+    if not force_polling:
+        try:
+            return InotifyWatcher(directory)
+        except InotifyUnavailableException:
+            pass
+    return PollingWatcher(directory)
@@ -0,0 +1,3 @@
+from .spans import span, enable, disable, is_enabled, Span, SpanRecord
+from .sinks import MemorySink, JsonLogSink, PrometheusTextfileSink
+from .latency import LatencyTracker, percentile
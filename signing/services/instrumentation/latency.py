@@ -0,0 +1,61 @@
+## @file latency.py
+#  @brief Provides a rolling latency tracker for long-running services.
+#  @details `LatencyTracker` keeps the most recent latency samples and reports their count,
+#           median, 95th percentile and maximum. It is used by the signing agent and the
+#           batch pipelines to expose their latency statistics.
+
+import threading
+from collections import deque
+
+## @var DEFAULT_WINDOW_SIZE
+#  @brief Default number of most recent samples kept by `LatencyTracker`.
+DEFAULT_WINDOW_SIZE = 1000
+
+
+## @class LatencyTracker
+#  @brief Thread-safe rolling window of latency samples.
+class LatencyTracker:
+    ## @brief Initializes the LatencyTracker.
+    #  @param window_size The number of most recent samples used for the percentiles.
+    #  @type window_size int
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window_size)
+        self.total_count = 0
+
+    ## @brief Records a single latency sample.
+    #  @param seconds The measured latency in seconds.
+    #  @type seconds float
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.total_count += 1
+
+    ## @brief Summarizes the samples of the current window.
+    #  @return A dict with `count` (all samples ever recorded), `p50`, `p95` and `max` in seconds.
+    #          The percentiles are None while no sample was recorded.
+    #  @rtype dict
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            total_count = self.total_count
+        return {
+            "count": total_count,
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "max": samples[-1] if samples else None,
+        }
+
+
+## @brief Returns the nearest-rank percentile of sorted samples.
+#  @param sorted_samples The samples in ascending order.
+#  @type sorted_samples list[float]
+#  @param fraction The requested percentile as a fraction, e.g. 0.95.
+#  @type fraction float
+#  @return The percentile, or None if there are no samples.
+#  @rtype float | None
+def percentile(sorted_samples: list[float], fraction: float) -> float | None:
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
@@ -0,0 +1,172 @@
+## @file sinks.py
+#  @brief Provides sinks collecting the spans produced by `spans.py`.
+#  @details Every sink implements `emit(record)`. `MemorySink` keeps the records in a list,
+#           `JsonLogSink` writes one JSON object per line and `PrometheusTextfileSink` keeps
+#           per-span totals and writes them in the Prometheus text format, so that the
+#           node_exporter textfile collector can pick them up.
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from typing import IO
+
+from .spans import SpanRecord
+
+
+## @class MemorySink
+#  @brief Collects span records in memory.
+class MemorySink:
+    ## @brief Initializes the MemorySink.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: list[SpanRecord] = []
+
+    ## @brief Stores the record.
+    #  @param record The finished span.
+    #  @type record SpanRecord
+    def emit(self, record: SpanRecord):
+        with self._lock:
+            self.records.append(record)
+
+    ## @brief Removes all collected records.
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    ## @brief Aggregates the collected records by span name.
+    #  @return A dict mapping span names to dicts with `count`, `wall_time`, `cpu_time`
+    #          and `bytes_processed` totals.
+    #  @rtype dict[str, dict]
+    def summary(self) -> dict[str, dict]:
+        with self._lock:
+            records = list(self.records)
+        return _aggregate(records)
+
+
+## @class JsonLogSink
+#  @brief Writes every span record as a single JSON line.
+class JsonLogSink:
+    ## @brief Initializes the JsonLogSink.
+    #  @param target A path of the log file (opened in append mode) or an already opened text stream.
+    #  @type target str | IO[str]
+    def __init__(self, target: str | IO[str]):
+        self._lock = threading.Lock()
+        if isinstance(target, str):
+            self._stream = open(target, "a", encoding="utf-8")
+            self._owns_stream = True
+        else:
+            self._stream = target
+            self._owns_stream = False
+
+    ## @brief Writes the record to the log.
+    #  @param record The finished span.
+    #  @type record SpanRecord
+    def emit(self, record: SpanRecord):
+        line = json.dumps({"timestamp": time.time(), **asdict(record)})
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    ## @brief Closes the log file if it was opened by this sink.
+    def close(self):
+        if self._owns_stream:
+            self._stream.close()
+
+
+## @class PrometheusTextfileSink
+#  @brief Keeps per-span totals and writes them to a Prometheus textfile.
+#  @details The file is rewritten atomically (temporary file and rename) at most once per
+#           `flush_interval` seconds while records arrive, and on every explicit `flush`.
+class PrometheusTextfileSink:
+    ## @brief Initializes the PrometheusTextfileSink.
+    #  @param path The path of the `.prom` file to write.
+    #  @type path str
+    #  @param prefix The prefix of the exported metric names.
+    #  @type prefix str
+    #  @param flush_interval The minimal number of seconds between two automatic writes.
+    #  @type flush_interval float
+    def __init__(self, path: str, prefix: str = "bsk_signer", flush_interval: float = 10.0):
+        self.path = path
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._totals: dict[str, dict] = {}
+        self._last_flush = 0.0
+
+    ## @brief Adds the record to the totals and writes the file when the flush interval elapsed.
+    #  @param record The finished span.
+    #  @type record SpanRecord
+    def emit(self, record: SpanRecord):
+        with self._lock:
+            _add_to_totals(self._totals, record)
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                return
+        self.flush()
+
+    ## @brief Writes the current totals to the textfile.
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            content = self._render()
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+
+    ## @brief Renders the totals in the Prometheus text exposition format.
+    #  @return The textfile content.
+    #  @rtype str
+    #  @private
+    def _render(self) -> str:
+        metrics = [
+            ("spans_total", "counter", "Number of finished spans.", "count"),
+            ("span_failures_total", "counter", "Number of spans left by an exception.", "failures"),
+            ("span_wall_seconds_total", "counter", "Total wall time spent in spans.", "wall_time"),
+            ("span_cpu_seconds_total", "counter", "Total CPU time spent in spans.", "cpu_time"),
+            ("span_bytes_total", "counter", "Total number of bytes processed in spans.", "bytes_processed"),
+        ]
+        lines = []
+        for metric, metric_type, help_text, field in metrics:
+            name = f"{self.prefix}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for span_name in sorted(self._totals):
+                lines.append(f'{name}{{span="{span_name}"}} {self._totals[span_name][field]}')
+        return "\n".join(lines) + "\n"
+
+
+## @brief Aggregates span records by their name.
+#  @param records The records to aggregate.
+#  @type records list[SpanRecord]
+#  @return A dict mapping span names to their totals.
+#  @rtype dict[str, dict]
+#  @private
+def _aggregate(records: list[SpanRecord]) -> dict[str, dict]:
+    totals: dict[str, dict] = {}
+    for record in records:
+        _add_to_totals(totals, record)
+    return totals
+
+
+## @brief Adds a single span record to the totals of its name.
+#  @param totals The totals to update in place.
+#  @type totals dict[str, dict]
+#  @param record The record to add.
+#  @type record SpanRecord
+#  @private
+def _add_to_totals(totals: dict[str, dict], record: SpanRecord):
+    entry = totals.setdefault(record.name, {
+        "count": 0,
+        "failures": 0,
+        "wall_time": 0.0,
+        "cpu_time": 0.0,
+        "bytes_processed": 0,
+    })
+    entry["count"] += 1
+    entry["failures"] += int(record.failed)
+    entry["wall_time"] += record.wall_time
+    entry["cpu_time"] += record.cpu_time
+    entry["bytes_processed"] += record.bytes_processed
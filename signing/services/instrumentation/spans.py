@@ -0,0 +1,140 @@
+## @file spans.py
+#  @brief Provides named timing spans for the signing services.
+#  @details A span measures the wall time, the CPU time of the calling thread and the number
+#           of bytes processed by one stage of an operation (e.g. `sign.rsa`). Finished spans
+#           are handed to the sink installed with `enable`. When no sink is installed, `span`
+#           returns a shared no-op object, so instrumented code pays only for one function call.
+
+import contextvars
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+## @class SpanRecord
+#  @brief A single finished span measurement passed to the sinks.
+#  @details `parent` is the name of the enclosing span (or None for a top-level span), so sinks
+#           can tell nested stages apart. `failed` is True when the span was left by an exception.
+@dataclass(frozen=True)
+class SpanRecord:
+    name: str
+    parent: Optional[str]
+    wall_time: float
+    cpu_time: float
+    bytes_processed: int
+    failed: bool
+
+
+## @var _sink
+#  @brief The sink receiving finished spans, or None when instrumentation is disabled.
+#  @private
+_sink = None
+
+## @var _current_span
+#  @brief The innermost open span of the current thread or asyncio task.
+#  @private
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+## @class Span
+#  @brief Context manager measuring one named stage.
+#  @details The CPU time is measured with `time.thread_time`, so it only covers the thread
+#           that opened the span.
+class Span:
+    __slots__ = ("name", "bytes_processed", "_parent", "_token", "_wall_start", "_cpu_start")
+
+    ## @brief Initializes the Span.
+    #  @param name The name of the measured stage.
+    #  @type name str
+    #  @param bytes_processed The number of bytes already known to be processed by the stage.
+    #  @type bytes_processed int
+    def __init__(self, name: str, bytes_processed: int = 0):
+        self.name = name
+        self.bytes_processed = bytes_processed
+
+    ## @brief Adds to the number of bytes processed by the stage.
+    #  @param count The number of bytes to add.
+    #  @type count int
+    def add_bytes(self, count: int):
+        self.bytes_processed += count
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self._parent = parent.name if parent is not None else None
+        self._token = _current_span.set(self)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_time = time.perf_counter() - self._wall_start
+        cpu_time = time.thread_time() - self._cpu_start
+        _current_span.reset(self._token)
+
+        sink = _sink
+        if sink is not None:
+            sink.emit(SpanRecord(
+                name=self.name,
+                parent=self._parent,
+                wall_time=wall_time,
+                cpu_time=cpu_time,
+                bytes_processed=self.bytes_processed,
+                failed=exc_type is not None,
+            ))
+        return False
+
+
+## @class _NullSpan
+#  @brief Shared do-nothing span returned while instrumentation is disabled.
+#  @private
+class _NullSpan:
+    __slots__ = ()
+
+    def add_bytes(self, count: int):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+## @var _NULL_SPAN
+#  @brief The single `_NullSpan` instance.
+#  @private
+_NULL_SPAN = _NullSpan()
+
+
+## @brief Opens a named span.
+#  @param name The name of the measured stage, dot-separated by convention (e.g. `sign.rsa`).
+#  @type name str
+#  @param bytes_processed The number of bytes processed by the stage, if already known.
+#  @type bytes_processed int
+#  @return A context manager measuring the stage. It exposes `add_bytes` to report bytes later.
+#  @rtype Span
+def span(name: str, bytes_processed: int = 0):
+    if _sink is None:
+        return _NULL_SPAN
+    return Span(name, bytes_processed)
+
+
+## @brief Enables instrumentation and sends all finished spans to the given sink.
+#  @param sink Any object with an `emit(record: SpanRecord)` method, e.g. `MemorySink`.
+#  @type sink object
+def enable(sink):
+    global _sink
+    _sink = sink
+
+
+## @brief Disables instrumentation. Spans opened afterwards are no-ops.
+def disable():
+    global _sink
+    _sink = None
+
+
+## @brief Checks whether a sink is currently installed.
+#  @return True if instrumentation is enabled.
+#  @rtype bool
+def is_enabled() -> bool:
+    return _sink is not None
@@ -1,12 +1,70 @@
 ## @file AES_PIN_decryptor.py
-#  @brief Provides cryptographic utility functions for hashing and AES decryption.
-#  @details This module contains functions to hash a PIN using SHA256 and to decrypt
-#           data encrypted with AES in EAX mode.
+#  @brief Provides cryptographic utility functions for PIN key derivation and AES decryption.
+#  @details This module contains functions to derive a key from a PIN and to decrypt
+#           data encrypted with AES in EAX mode. Key files start with a versioned header
+#           recording the key derivation function (scrypt or Argon2id) and its cost parameters.
+#           Legacy files without the header use a single SHA256 of the PIN.
+
+import struct
+from dataclasses import dataclass
+from hashlib import scrypt, sha256
 
 from Crypto.Cipher import AES
-from hashlib import sha256
+
+from ..instrumentation import span
+
+# Argon2id is optional, it needs the argon2-cffi package
+try:
+    from argon2.low_level import hash_secret_raw, Type as Argon2Type
+except ImportError:
+    hash_secret_raw = None
+
+## @var KEY_FILE_MAGIC
+#  @brief Bytes starting every key file with a header. Files without them use the legacy headerless format.
+KEY_FILE_MAGIC = b"BSKKEY"
+
+## @var KEY_FILE_VERSION
+#  @brief The only supported version of the key file header.
+KEY_FILE_VERSION = 1
+
+## @var KDF_SCRYPT
+#  @brief Header identifier of the scrypt key derivation.
+KDF_SCRYPT = 1
+
+## @var KDF_ARGON2ID
+#  @brief Header identifier of the Argon2id key derivation.
+KDF_ARGON2ID = 2
+
+## @var MAX_KDF_MEMORY
+#  @brief Largest memory in bytes a key derivation may request. Protects against corrupted headers.
+MAX_KDF_MEMORY = 1024 * 1024 * 1024
+
+## @var MAX_KDF_COST
+#  @brief Largest Argon2id pass count and scrypt/Argon2id parallelism accepted from a header.
+MAX_KDF_COST = 1024
+
+## @var _HEADER_STRUCT
+#  @brief Layout of the header: magic, version, KDF identifier, three KDF parameters and the salt length.
+#  @private
+_HEADER_STRUCT = struct.Struct(">6sBBIIIB")
+
+
+## @class KdfParameters
+#  @brief Parameters of the PIN key derivation stored in the key file header.
+#  @details For scrypt `cost` is N, `memory` is the block size r and `parallelism` is p.
+#           For Argon2id `cost` is the number of passes, `memory` the memory cost in KiB
+#           and `parallelism` the number of lanes.
+@dataclass(frozen=True)
+class KdfParameters:
+    algorithm: int
+    cost: int
+    memory: int
+    parallelism: int
+    salt: bytes = b""
+
 
 ## @brief Hashes a numeric PIN string using SHA256.
+#  @details This is the key derivation of the legacy headerless key files.
 #  @param pin The numeric PIN string to hash.
 #  @type pin str
 #  @return The SHA256 hash of the PIN as bytes.
@@ -15,21 +73,80 @@ def hash_pin(pin: str) -> bytes:
     return sha256(pin.encode()).digest()
 
 
+## @brief Derives a 256-bit key from a PIN using the key derivation recorded in a header.
+#  @param pin The numeric PIN string.
+#  @type pin str
+#  @param params The key derivation function and its cost parameters.
+#  @type params KdfParameters
+#  @return The derived key.
+#  @rtype bytes
+#  @exception ValueError If the parameters are unknown, exceed the limits or Argon2id is not available.
+def derive_key(pin: str, params: KdfParameters) -> bytes:
+    if not 1 <= params.parallelism <= MAX_KDF_COST:
+        raise ValueError("Invalid key derivation parallelism")
+
+    if params.algorithm == KDF_SCRYPT:
+        memory = 128 * params.memory * params.cost
+        if memory > MAX_KDF_MEMORY:
+            raise ValueError("Key derivation requires too much memory")
+        return scrypt(pin.encode(), salt=params.salt, n=params.cost, r=params.memory, p=params.parallelism,
+                      maxmem=2 * memory, dklen=32)
+
+    if params.algorithm == KDF_ARGON2ID:
+        if hash_secret_raw is None:
+            raise ValueError("Argon2id requires the argon2-cffi package")
+        if params.memory * 1024 > MAX_KDF_MEMORY or params.cost > MAX_KDF_COST:
+            raise ValueError("Key derivation is too expensive")
+        return hash_secret_raw(pin.encode(), params.salt, time_cost=params.cost, memory_cost=params.memory,
+                               parallelism=params.parallelism, hash_len=32, type=Argon2Type.ID)
+
+    raise ValueError(f"Unknown key derivation function {params.algorithm}")
+
+
+## @brief Parses the header of a key file.
+#  @param encrypted_data The content of the key file.
+#  @type encrypted_data bytes
+#  @return A tuple of the key derivation parameters and the raw header bytes,
+#          or `(None, b"")` for legacy headerless files.
+#  @rtype Tuple[KdfParameters | None, bytes]
+#  @exception ValueError If the header is truncated or has an unsupported version.
+def decode_header(encrypted_data: bytes) -> tuple[KdfParameters | None, bytes]:
+    if not encrypted_data.startswith(KEY_FILE_MAGIC):
+        return None, b""
+    if len(encrypted_data) < _HEADER_STRUCT.size:
+        raise ValueError("Truncated key file header")
+
+    _, version, algorithm, cost, memory, parallelism, salt_length = _HEADER_STRUCT.unpack_from(encrypted_data)
+    if version != KEY_FILE_VERSION:
+        raise ValueError(f"Unsupported key file version {version}")
+
+    header_length = _HEADER_STRUCT.size + salt_length
+    params = KdfParameters(algorithm, cost, memory, parallelism, encrypted_data[_HEADER_STRUCT.size:header_length])
+    return params, encrypted_data[:header_length]
+
+
 ## @brief Decrypts data encrypted using AES in EAX mode.
-#  @param encrypted_data The encrypted data, which includes a 16-byte nonce,
-#                        a 16-byte tag, and the ciphertext.
+#  @details The key derivation is reported as the `get_key.kdf` span of `services.instrumentation`,
+#           making its share of the unlock time visible.
+#  @param encrypted_data The encrypted data, which includes an optional header, a 16-byte nonce,
+#                        a 16-byte tag, and the ciphertext. The header is authenticated by the tag.
 #  @type encrypted_data bytes
 #  @param pin The numeric PIN string used to derive the decryption key.
 #  @type pin str
 #  @return The decrypted data as bytes.
 #  @rtype bytes
-#  @exception ValueError If the `encrypted_data` is less than 32 bytes (too short to contain nonce and tag).
+#  @exception ValueError If the `encrypted_data` is too short to contain nonce and tag, or its header is invalid.
 def aes_decrypt_file(encrypted_data: bytes, pin: str) -> bytes:
+    params, header = decode_header(encrypted_data)
+    encrypted_data = encrypted_data[len(header):]
     if len(encrypted_data) < 32:
         raise ValueError
-    key = hash_pin(pin)
+
+    with span("get_key.kdf"):
+        key = hash_pin(pin) if params is None else derive_key(pin, params)
     nonce, tag, ciphertext = encrypted_data[:16], encrypted_data[16:32], encrypted_data[32:]
 
     decrypt_file = AES.new(key, AES.MODE_EAX, nonce=nonce)
+    decrypt_file.update(header)
     data = decrypt_file.decrypt_and_verify(ciphertext, tag)
     return data
@@ -1,7 +1,12 @@
 from .key_getter import (get_key,
+                         read_encrypted_key,
+                         load_private_key,
+                         KEY_SOURCE_USB,
+                         KEY_SOURCE_VARIABLE,
                          MultipleKeysFoundException,
                          NoKeyFoundException,
                          NoUSBDrivesFoundException,
                          UnsupportedPlatformException,
-                         KeyOrPinInvalidException
+                         KeyOrPinInvalidException,
+                         KeyInvalidException
 )
@@ -4,6 +4,9 @@
 #           find a specific key file (`private_key.key`), read its encrypted content,
 #           and decrypt it using a PIN to obtain an RSA private key. It defines
 #           several custom exceptions to handle various error conditions during this process.
+#           Servers and containers without removable media can read the same encrypted key file
+#           from a path, an inherited file descriptor or a path held by an environment variable
+#           instead (see `read_encrypted_key`), which skips the USB detection and its subprocesses.
 
 import os
 import platform
@@ -11,6 +14,7 @@ import platform
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
+from ..instrumentation import span
 from .AES_PIN_decryptor import aes_decrypt_file
 
 ## @var WINDOWS_PLATFORM_NAME
@@ -25,11 +29,25 @@ LINUX_PLATFORM_NAME = "Linux"
 #  @brief The expected filename of the encrypted private key on the USB drive.
 KEY_FILE_NAME = "private_key.key"
 
-# Platform-specific imports for USB drive detection
-if platform.system() == WINDOWS_PLATFORM_NAME:
-    from .usb_finder_windows import get_usb_mount_paths_windows
-elif platform.system() == LINUX_PLATFORM_NAME:
-    from .usb_finder_linux import get_usb_mount_paths_linux
+## @var PEM_PREFIX
+#  @brief Bytes starting a PEM-encoded key. Decrypted keys without them are parsed as DER.
+PEM_PREFIX = b"-----BEGIN"
+
+## @var KEY_SOURCE_USB
+#  @brief Key source searching the USB drives for `KEY_FILE_NAME`.
+KEY_SOURCE_USB = "usb"
+
+## @var FD_SOURCE_PREFIX
+#  @brief Prefix of the key sources reading an inherited file descriptor, e.g. `fd:3`.
+FD_SOURCE_PREFIX = "fd:"
+
+## @var ENV_SOURCE_PREFIX
+#  @brief Prefix of the key sources reading the path held by an environment variable, e.g. `env:SIGNING_KEY_PATH`.
+ENV_SOURCE_PREFIX = "env:"
+
+## @var KEY_SOURCE_VARIABLE
+#  @brief Environment variable holding the key source used when none is given.
+KEY_SOURCE_VARIABLE = "SIGNING_KEY_SOURCE"
 
 ## @brief Exception raised when the current operating system is not supported for USB key retrieval.
 class UnsupportedPlatformException(Exception):
@@ -56,39 +74,126 @@ class KeyInvalidException(Exception):
     pass
 
 
-## @brief Retrieves and decrypts the RSA private key from a USB drive using a PIN.
+## @brief Retrieves and decrypts the RSA private key from a USB drive, or another key source, using a PIN.
+#  @details The stages of the key retrieval are reported as `get_key.*` spans of `services.instrumentation`.
 #  @param pin The PIN code to decrypt the private key.
 #  @type pin str
+#  @param key_source Where the encrypted key file is read from, see `read_encrypted_key`.
+#  @type key_source str | None
 #  @return The decrypted RSA private key.
 #  @rtype rsa.RSAPrivateKey
 #  @exception UnsupportedPlatformException If the current operating system is not supported.
 #  @exception NoUSBDrivesFoundException If no USB drives are detected.
-#  @exception NoKeyFoundException If the key file is not found on any USB drive.
+#  @exception NoKeyFoundException If the key file is not found on any USB drive or at the key source.
 #  @exception MultipleKeysFoundException If the key file is found on more than one USB drive.
 #  @exception KeyOrPinInvalidException If the PIN is incorrect or the key data is malformed leading to decryption failure.
-#  @exception KeyInvalidException If the decrypted data cannot be loaded as a valid PEM-encoded private key.
-def get_key(pin: str) -> rsa.RSAPrivateKey:
-    if platform.system() == WINDOWS_PLATFORM_NAME:
-        encrypted_key = _get_key_windows()
-    elif platform.system() == LINUX_PLATFORM_NAME:
-        encrypted_key = _get_key_linux()
-    else:
-        raise UnsupportedPlatformException()
-
-    try:
-        key = aes_decrypt_file(encrypted_key, pin)
-    except Exception:
-        raise KeyOrPinInvalidException()
-
-    try:
-        private_key = serialization.load_pem_private_key(
-            key,
-            password=None,
-        )
-    except Exception:
-        raise KeyInvalidException()
-
-    return private_key
+#  @exception KeyInvalidException If the decrypted data cannot be loaded as a valid PEM or DER-encoded private key.
+#  @exception ValueError If the key source cannot be parsed.
+def get_key(pin: str, key_source: str | None = None) -> rsa.RSAPrivateKey:
+    with span("get_key"):
+        encrypted_key = read_encrypted_key(key_source)
+
+        try:
+            with span("get_key.decrypt", len(encrypted_key)):
+                key = aes_decrypt_file(encrypted_key, pin)
+        except Exception:
+            raise KeyOrPinInvalidException()
+
+        try:
+            with span("get_key.key_parse", len(key)):
+                # aes_decrypt_file raises unless the EAX tag has verified, so the key bytes are authenticated
+                private_key = load_private_key(key, authenticated=True)
+        except Exception:
+            raise KeyInvalidException()
+
+        return private_key
+
+
+## @brief Reads the encrypted key file from a key source.
+#  @details The source is `KEY_SOURCE_USB`, searching the USB drives, `fd:<number>`, reading an
+#           inherited file descriptor to its end and closing it, `env:<variable>`, reading the file
+#           whose path the environment variable holds, or else the path of the key file. Only the USB
+#           source runs the drive detection. The reading is reported as a `get_key.usb_scan` or a
+#           `get_key.key_read` span.
+#  @param key_source The key source. Defaults to the value of the `KEY_SOURCE_VARIABLE` environment
+#                    variable, and to `KEY_SOURCE_USB` if it is not set.
+#  @type key_source str | None
+#  @return The encrypted key file.
+#  @rtype bytes
+#  @exception UnsupportedPlatformException If USB drives cannot be searched on the current operating system.
+#  @exception NoUSBDrivesFoundException If no USB drives are detected.
+#  @exception NoKeyFoundException If there is no key file on the USB drives or at the path, or the
+#                                 environment variable holds no path.
+#  @exception MultipleKeysFoundException If the key file is found on more than one USB drive.
+#  @exception ValueError If the file descriptor of the source is not a number.
+#  @exception OSError If the key file or the file descriptor cannot be read.
+def read_encrypted_key(key_source: str | None = None) -> bytes:
+    key_source = key_source or os.environ.get(KEY_SOURCE_VARIABLE) or KEY_SOURCE_USB
+    if key_source == KEY_SOURCE_USB:
+        with span("get_key.usb_scan") as usb_scan_span:
+            encrypted_key = _get_key_usb()
+            usb_scan_span.add_bytes(len(encrypted_key))
+        return encrypted_key
+
+    with span("get_key.key_read") as key_read_span:
+        if key_source.startswith(FD_SOURCE_PREFIX):
+            fd_number = key_source[len(FD_SOURCE_PREFIX):]
+            if not fd_number.isdigit():
+                raise ValueError(f"Invalid key source {key_source}")
+            with os.fdopen(int(fd_number), "rb") as key_file:
+                encrypted_key = key_file.read()
+        else:
+            if key_source.startswith(ENV_SOURCE_PREFIX):
+                key_path = os.environ.get(key_source[len(ENV_SOURCE_PREFIX):])
+                if not key_path:
+                    raise NoKeyFoundException()
+            else:
+                key_path = key_source
+            try:
+                with open(key_path, "rb") as key_file:
+                    encrypted_key = key_file.read()
+            except FileNotFoundError:
+                raise NoKeyFoundException()
+        key_read_span.add_bytes(len(encrypted_key))
+    return encrypted_key
+
+
+## @brief Loads a decrypted private key in the PEM or DER format.
+#  @details When `authenticated` is set, the RSA key consistency check of `cryptography` is skipped,
+#           which takes about 0.4 s for a 4096-bit key. Only set it for bytes whose integrity has been
+#           proven, such as the plaintext of a key file whose AES-EAX tag has verified: they are then
+#           exactly the bytes the key generator wrote from a valid key.
+#  @param key_data The PEM or DER encoding of the private key.
+#  @type key_data bytes
+#  @param authenticated Whether the key bytes are authenticated and the consistency check can be skipped.
+#  @type authenticated bool
+#  @return The private key.
+#  @rtype rsa.RSAPrivateKey
+#  @exception ValueError If the data cannot be parsed as a private key.
+def load_private_key(key_data: bytes, authenticated: bool = False) -> rsa.RSAPrivateKey:
+    if key_data.lstrip().startswith(PEM_PREFIX):
+        return serialization.load_pem_private_key(key_data, password=None,
+                                                  unsafe_skip_rsa_key_validation=authenticated)
+    return serialization.load_der_private_key(key_data, password=None, unsafe_skip_rsa_key_validation=authenticated)
+
+
+## @brief Internal function to retrieve the encrypted key data from USB drives.
+#  @details The detection module of the platform is only imported here, so the other key sources
+#           never load WMI or run the Linux detection.
+#  @return The encrypted key data as bytes.
+#  @rtype bytes
+#  @exception UnsupportedPlatformException If the current operating system is not supported.
+#  @exception NoUSBDrivesFoundException If no USB drives are detected.
+#  @exception NoKeyFoundException If the key file is not found on any USB drive.
+#  @exception MultipleKeysFoundException If the key file is found on more than one USB drive.
+#  @private
+def _get_key_usb() -> bytes:
+    system = platform.system()
+    if system == WINDOWS_PLATFORM_NAME:
+        return _get_key_windows()
+    if system == LINUX_PLATFORM_NAME:
+        return _get_key_linux()
+    raise UnsupportedPlatformException()
 
 
 ## @brief Internal function to retrieve the encrypted key data from USB drives on Windows.
@@ -101,6 +206,7 @@ def get_key(pin: str) -> rsa.RSAPrivateKey:
 #  @exception MultipleKeysFoundException If the key file is found on multiple USB drives by `_get_key_paths`.
 #  @private
 def _get_key_windows() -> bytes:
+    from .usb_finder_windows import get_usb_mount_paths_windows
     usb_paths = get_usb_mount_paths_windows()
     return _get_key_paths(usb_paths)
 
@@ -115,6 +221,7 @@ def _get_key_windows() -> bytes:
 #  @exception MultipleKeysFoundException If the key file is found on multiple USB drives by `_get_key_paths`.
 #  @private
 def _get_key_linux() -> bytes:
+    from .usb_finder_linux import get_usb_mount_paths_linux
     usb_paths = get_usb_mount_paths_linux()
     return _get_key_paths(usb_paths)
 
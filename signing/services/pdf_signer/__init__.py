@@ -1,2 +1,32 @@
-from .signer import sign
-from .verifier import verify, NoSignatureFound
+from .signer import (sign,
+                     sign_bytes,
+                     create_signing_credentials,
+                     check_signing_credentials,
+                     SigningCredentials,
+                     DIGEST_ALGORITHMS,
+                     DEFAULT_DIGEST_ALGORITHM
+)
+from .verifier import (verify,
+                       verify_stream,
+                       verify_bytes,
+                       VerifierSession,
+                       NoSignatureFound,
+                       VALIDATION_INTEGRITY,
+                       VALIDATION_KEY_MATCH,
+                       VALIDATION_FULL,
+                       VALIDATION_LEVELS
+)
+from .timestamping import (TimestampPolicy,
+                           NoTimestamps,
+                           DummyTimestamps,
+                           TsaTimestamps,
+                           create_timestamp_policy,
+                           TIMESTAMP_POLICY_NAMES
+)
+from .appearance import (APPEARANCE_VISIBLE,
+                         APPEARANCE_CACHED,
+                         APPEARANCE_INVISIBLE,
+                         APPEARANCE_MODES
+)
+from .spooling import DEFAULT_SPOOL_THRESHOLD
+from .async_api import async_sign, async_verify
@@ -0,0 +1,180 @@
+## @file appearance.py
+#  @brief Provides the signature appearance modes available to `sign`.
+#  @details A visible signature needs an appearance stream with its own font resources.
+#           `APPEARANCE_VISIBLE` lets pyhanko lay out and render it for every document.
+#           `APPEARANCE_CACHED` renders the stamp once per signer and only copies the rendered
+#           form XObject into every document.
+#           `APPEARANCE_INVISIBLE` adds a signature field without any widget area, which is
+#           enough for machine-to-machine workflows and needs no appearance at all.
+
+import threading
+from dataclasses import dataclass
+
+from pyhanko.pdf_utils import generic, layout
+from pyhanko.pdf_utils.writer import BasePdfFileWriter, PdfFileWriter, init_xobject_dictionary
+from pyhanko.sign.fields import SigFieldSpec
+from pyhanko.stamp import BaseStamp, BaseStampStyle, TextStampStyle, STAMP_ART_CONTENT
+
+## @var APPEARANCE_VISIBLE
+#  @brief Name of the mode rendering the visible stamp for every document.
+APPEARANCE_VISIBLE = "visible"
+
+## @var APPEARANCE_CACHED
+#  @brief Name of the mode reusing a visible stamp rendered once per signer.
+APPEARANCE_CACHED = "cached"
+
+## @var APPEARANCE_INVISIBLE
+#  @brief Name of the mode adding an invisible signature field.
+APPEARANCE_INVISIBLE = "invisible"
+
+## @var APPEARANCE_MODES
+#  @brief Names accepted by `create_field_spec` and `create_stamp_style`.
+APPEARANCE_MODES = (APPEARANCE_VISIBLE, APPEARANCE_CACHED, APPEARANCE_INVISIBLE)
+
+## @var SIGNATURE_FIELD_NAME
+#  @brief Name of the signature field added to the documents.
+SIGNATURE_FIELD_NAME = "PAdES-signature"
+
+## @var SIGNATURE_BOX
+#  @brief Position of the visible signature on the first page.
+SIGNATURE_BOX = (50, 775, 250, 830)
+
+## @var CACHED_STAMP_TEXT
+#  @brief Text of the cached stamp. Unlike the default stamp it has no per-document timestamp,
+#         the signing time stays available in the signature dictionary.
+CACHED_STAMP_TEXT = "Digitally signed by %(signer)s."
+
+_cache_lock = threading.Lock()
+_cached_styles: dict[tuple, "CachedStampStyle"] = {}
+
+
+## @class CachedStampStyle
+#  @brief Stamp style reusing a pre-rendered appearance instead of laying it out again.
+#  @details The style keeps the content stream of the stamp and a template of its resources.
+#           Every document only receives a form XObject made of these and copies of the few
+#           indirect resource objects (the font descriptor), so no text layout or font handling
+#           happens per document. Use `get_cached_stamp_style` instead of creating instances directly.
+@dataclass(frozen=True)
+class CachedStampStyle(BaseStampStyle):
+    content: bytes = b""
+    resources: generic.DictionaryObject | None = None
+
+    def create_stamp(self, writer: BasePdfFileWriter, box: layout.BoxConstraints, text_params: dict) -> BaseStamp:
+        return _CachedStamp(writer, self, box)
+
+
+## @brief Returns the cached stamp style of a signer, rendering it on first use.
+#  @param signer_name The signer name shown in the stamp.
+#  @type signer_name str
+#  @return The stamp style.
+#  @rtype CachedStampStyle
+def get_cached_stamp_style(signer_name: str) -> CachedStampStyle:
+    x1, y1, x2, y2 = SIGNATURE_BOX
+    cache_key = (signer_name, x2 - x1, y2 - y1)
+    with _cache_lock:
+        style = _cached_styles.get(cache_key)
+        if style is None:
+            style = _render_stamp(signer_name, x2 - x1, y2 - y1)
+            _cached_styles[cache_key] = style
+        return style
+
+
+## @brief Creates the signature field specification of an appearance mode.
+#  @param appearance One of `APPEARANCE_MODES`.
+#  @type appearance str
+#  @return The field specification.
+#  @rtype SigFieldSpec
+#  @exception ValueError If the appearance mode is unknown.
+def create_field_spec(appearance: str) -> SigFieldSpec:
+    if appearance not in APPEARANCE_MODES:
+        raise ValueError(f"Unknown signature appearance {appearance}")
+    box = None if appearance == APPEARANCE_INVISIBLE else SIGNATURE_BOX
+    return SigFieldSpec(sig_field_name=SIGNATURE_FIELD_NAME, on_page=0, box=box)
+
+
+## @brief Creates the stamp style of an appearance mode.
+#  @param appearance One of `APPEARANCE_MODES`.
+#  @type appearance str
+#  @param signer_name The signer name shown in the stamp.
+#  @type signer_name str
+#  @return The stamp style, or None to let pyhanko use its default one.
+#  @rtype BaseStampStyle | None
+def create_stamp_style(appearance: str, signer_name: str) -> BaseStampStyle | None:
+    if appearance == APPEARANCE_CACHED:
+        return get_cached_stamp_style(signer_name)
+    return None
+
+
+## @brief Stamp writing the pre-rendered appearance of a `CachedStampStyle`.
+#  @private
+class _CachedStamp(BaseStamp):
+    def as_form_xobject(self) -> generic.StreamObject:
+        return init_xobject_dictionary(
+            command_stream=self.style.content,
+            box_width=self.box.width,
+            box_height=self.box.height,
+            resources=_attach(self.writer, self.style.resources),
+        )
+
+
+## @brief Marks an object that has to be added to the target writer as an indirect object.
+#  @private
+@dataclass(frozen=True)
+class _IndirectTemplate:
+    value: generic.PdfObject
+
+
+## @brief Renders the stamp of a signer once.
+#  @param signer_name The signer name shown in the stamp.
+#  @type signer_name str
+#  @param width The width of the stamp.
+#  @type width int
+#  @param height The height of the stamp.
+#  @type height int
+#  @return The stamp style holding the rendered stamp.
+#  @rtype CachedStampStyle
+#  @private
+def _render_stamp(signer_name: str, width: int, height: int) -> CachedStampStyle:
+    style = TextStampStyle(stamp_text=CACHED_STAMP_TEXT, background=STAMP_ART_CONTENT)
+    stamp = style.create_stamp(PdfFileWriter(), layout.BoxConstraints(width=width, height=height),
+                               {"signer": signer_name})
+    content = stamp.render()
+    return CachedStampStyle(content=content, resources=_detach(stamp.resources.as_pdf_object()))
+
+
+## @brief Copies an object out of its writer, replacing indirect references by templates.
+#  @param obj The object to copy.
+#  @type obj generic.PdfObject
+#  @return The copy.
+#  @rtype generic.PdfObject | _IndirectTemplate
+#  @private
+def _detach(obj: generic.PdfObject):
+    if isinstance(obj, generic.IndirectObject):
+        return _IndirectTemplate(_detach(obj.get_object()))
+    if isinstance(obj, generic.StreamObject):
+        return generic.StreamObject({k: _detach(v) for k, v in obj.items()}, stream_data=obj.data)
+    if isinstance(obj, generic.DictionaryObject):
+        return generic.DictionaryObject({k: _detach(v) for k, v in obj.items()})
+    if isinstance(obj, generic.ArrayObject):
+        return generic.ArrayObject(_detach(v) for v in obj)
+    return obj
+
+
+## @brief Copies a template made by `_detach` into a writer.
+#  @param writer The target writer.
+#  @type writer BasePdfFileWriter
+#  @param obj The template.
+#  @type obj generic.PdfObject | _IndirectTemplate
+#  @return The object to use in the writer.
+#  @rtype generic.PdfObject
+#  @private
+def _attach(writer: BasePdfFileWriter, obj):
+    if isinstance(obj, _IndirectTemplate):
+        return writer.add_object(_attach(writer, obj.value))
+    if isinstance(obj, generic.StreamObject):
+        return generic.StreamObject({k: _attach(writer, v) for k, v in obj.items()}, stream_data=obj.data)
+    if isinstance(obj, generic.DictionaryObject):
+        return generic.DictionaryObject({k: _attach(writer, v) for k, v in obj.items()})
+    if isinstance(obj, generic.ArrayObject):
+        return generic.ArrayObject(_attach(writer, v) for v in obj)
+    return obj
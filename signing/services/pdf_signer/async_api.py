@@ -0,0 +1,121 @@
+## @file async_api.py
+#  @brief Provides asyncio variants of `sign` and `verify`.
+#  @details The documents are read and written in worker threads, and the CPU-bound parsing,
+#           CMS and RSA work runs on a configurable executor, so the event loop keeps serving
+#           other tasks. An optional semaphore limits how many documents are processed at once.
+#           Cancelling a call before its result is written leaves no output file behind; work
+#           already handed to the executor still runs to completion in the background, its
+#           result is discarded.
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import uuid
+from concurrent.futures import Executor
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from .appearance import APPEARANCE_VISIBLE
+from .signer import DEFAULT_DIGEST_ALGORITHM, sign_bytes, SigningCredentials
+from .timestamping import TimestampPolicy
+from .verifier import VALIDATION_FULL, VerifierSession
+
+
+## @brief Signs a PDF document without blocking the event loop.
+#  @details Returns the same result as `sign`. The signed document is written to a temporary
+#           file next to `pdf_out_path` and renamed, so the output path never holds a partial document.
+#  @param private_key The RSA private key object to use for signing.
+#  @type private_key rsa.RSAPrivateKey
+#  @param pdf_in_path The file system path to the input PDF document that needs to be signed.
+#  @type pdf_in_path str
+#  @param pdf_out_path The file system path where the signed PDF document will be saved.
+#  @type pdf_out_path str
+#  @param timestamp_policy See `sign`.
+#  @type timestamp_policy TimestampPolicy | None
+#  @param appearance See `sign`.
+#  @type appearance str
+#  @param compact See `sign`.
+#  @type compact bool
+#  @param digest_algorithm See `sign`.
+#  @type digest_algorithm str
+#  @param embed_dss See `sign`.
+#  @type embed_dss bool
+#  @param credentials See `sign`.
+#  @type credentials SigningCredentials | None
+#  @param executor The executor running the signing. Defaults to the default executor of the loop.
+#                  It has to run the work in the same process, e.g. a `ThreadPoolExecutor`,
+#                  use `SigningPool` to sign in worker processes.
+#  @type executor Executor | None
+#  @param limiter A semaphore shared by the calls that may run at the same time.
+#  @type limiter asyncio.Semaphore | None
+#  @exception ValueError When the appearance or the digest algorithm is unknown, or the credentials
+#                        belong to another key or use another digest algorithm
+#  @exception FileNotFoundError When the input file doesn't exist
+#  @exception PdfReadError When an error occurs during signature or while reading the input PDF file
+async def async_sign(private_key: rsa.RSAPrivateKey, pdf_in_path: str, pdf_out_path: str,
+                     timestamp_policy: TimestampPolicy | None = None, appearance: str = APPEARANCE_VISIBLE,
+                     compact: bool = False, digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM, embed_dss: bool = False,
+                     credentials: SigningCredentials | None = None, *,
+                     executor: Executor | None = None, limiter: asyncio.Semaphore | None = None):
+    async with limiter or contextlib.nullcontext():
+        data = await asyncio.to_thread(_read_file, pdf_in_path)
+        signed = await _run_in_executor(executor, sign_bytes, private_key, data, timestamp_policy, appearance,
+                                        compact, digest_algorithm, embed_dss, credentials)
+        await asyncio.to_thread(_write_file, pdf_out_path, signed)
+
+
+## @brief Verifies the signature of a PDF document without blocking the event loop.
+#  @details Returns the same result as `verify`.
+#  @param public_key The RSA public key expected to correspond to the signature.
+#  @type public_key rsa.RSAPublicKey
+#  @param pdf_path The file system path to the PDF document whose signature is to be verified.
+#  @type pdf_path str
+#  @param level One of `VALIDATION_LEVELS`. Defaults to `VALIDATION_FULL`.
+#  @type level str
+#  @param executor The executor running the verification, see `async_sign`.
+#  @type executor Executor | None
+#  @param limiter A semaphore shared by the calls that may run at the same time.
+#  @type limiter asyncio.Semaphore | None
+#  @return `True` if all checks of the level pass, `False` otherwise.
+#  @rtype bool
+#  @exception ValueError If the validation level is unknown.
+#  @exception FileNotFoundError If the `pdf_path` does not exist.
+#  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
+#  @exception PdfReadError When an error occurs during verifying or while reading the PDF file
+async def async_verify(public_key: rsa.RSAPublicKey, pdf_path: str, level: str = VALIDATION_FULL, *,
+                       executor: Executor | None = None, limiter: asyncio.Semaphore | None = None) -> bool:
+    session = VerifierSession(public_key, level)
+    async with limiter or contextlib.nullcontext():
+        data = await asyncio.to_thread(_read_file, pdf_path)
+        return await _run_in_executor(executor, session.verify_stream, data)
+
+
+## @brief Runs a function on an executor, keeping the context (e.g. the current span) of the caller.
+#  @private
+async def _run_in_executor(executor: Executor | None, function, *args):
+    call = functools.partial(contextvars.copy_context().run, function, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+## @brief Reads a whole file.
+#  @private
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+## @brief Writes a whole file through a temporary file in the same directory.
+#  @private
+def _write_file(path: str, data: bytes):
+    directory, name = os.path.split(os.path.abspath(path))
+    partial_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.partial")
+    try:
+        with open(partial_path, "xb") as f:
+            f.write(data)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
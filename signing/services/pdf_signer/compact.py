@@ -0,0 +1,51 @@
+## @file compact.py
+#  @brief Provides an incremental PDF writer producing a compact signature revision.
+#  @details The revision appended by `sign` holds a handful of small objects (the signature
+#           field, its widget, the appearance and the updated page, form and catalog).
+#           `CompactIncrementalPdfFileWriter` Flate-compresses the new streams and, if the
+#           input already uses cross-reference streams, packs all other objects of the revision
+#           into one compressed object stream. Inputs with classic cross-reference tables keep
+#           their table, because some readers reject updates that switch the format.
+
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+from pyhanko.sign.signers.pdf_byterange import PdfByteRangeDigest
+
+
+## @class CompactIncrementalPdfFileWriter
+#  @brief `IncrementalPdfFileWriter` compressing the objects of the revision it appends.
+class CompactIncrementalPdfFileWriter(IncrementalPdfFileWriter):
+    def _write_objects(self, stream, object_position_dict):
+        # Encrypted documents are left as they are, their strings and streams are encrypted per object
+        if self.security_handler is None:
+            self._compress_streams()
+            if self.stream_xrefs:
+                self._pack_object_stream()
+        super()._write_objects(stream, object_position_dict)
+
+    ## @brief Adds a Flate filter to every new stream without a filter.
+    #  @details XMP metadata stays uncompressed, so tools not parsing PDF can still find it.
+    #  @private
+    def _compress_streams(self):
+        for obj in self.objects.values():
+            if (isinstance(obj, generic.StreamObject) and "/Filter" not in obj
+                    and obj.get("/Type") != "/Metadata"):
+                obj.compress()
+
+    ## @brief Moves every object that may live in an object stream into a new object stream.
+    #  @details Streams cannot be put into object streams, and the signature dictionary has to
+    #           stay a top-level object, because its `/Contents` placeholder is patched in place
+    #           after the digest of the written file has been computed.
+    #  @private
+    def _pack_object_stream(self):
+        packable = [
+            (generation, idnum) for (generation, idnum), obj in self.objects.items()
+            if generation == 0 and not isinstance(obj, (generic.StreamObject, PdfByteRangeDigest))
+        ]
+        if len(packable) < 2:
+            return
+        object_stream = self.prepare_object_stream()
+        for key in sorted(packable, key=lambda k: k[1]):
+            obj = self.objects.pop(key)
+            object_stream.add_object(key[1], obj)
+            self.objs_in_streams[key[1]] = obj
@@ -0,0 +1,80 @@
+## @file dss.py
+#  @brief Embeds and reads the Document Security Store (DSS) of signed PDF documents.
+#  @details The DSS holds the certificates and revocation data needed to validate the signatures
+#           of a document without any network access. The documents of a batch share one
+#           self-signed certificate (see `SigningCredentials`), so they all carry the same DSS.
+#           It is written into the signed revision itself, before the signature, so it is covered
+#           by the signature and does not add a revision that the modification analysis would have
+#           to inspect. A self-signed certificate has no revocation data, the DSS then only lists
+#           the certificate. `read_validation_data` reads the raw entries without decoding them and
+#           digests them, so a verifier can recognize a DSS it has already seen and reuse the
+#           validation context it built from it.
+
+import hashlib
+from dataclasses import dataclass
+
+from asn1crypto import crl as asn1_crl, ocsp as asn1_ocsp, x509 as asn1_x509
+from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.pdf_utils.writer import BasePdfFileWriter
+from pyhanko.sign.validation.dss import DocumentSecurityStore
+from pyhanko_certvalidator import ValidationContext
+
+
+## @class ValidationData
+#  @brief The raw entries of the DSS of a document.
+#  @details `certs`, `ocsps` and `crls` hold the DER encodings of the certificates, OCSP responses and
+#           CRLs. `digest` identifies the entries, documents with the same DSS have the same digest.
+@dataclass(frozen=True)
+class ValidationData:
+    digest: bytes
+    certs: tuple[bytes, ...]
+    ocsps: tuple[bytes, ...] = ()
+    crls: tuple[bytes, ...] = ()
+
+    ## @brief Builds an offline validation context trusting a certificate, preloaded with the DSS entries.
+    #  @param trust_root The certificate trusted as the root of the validation.
+    #  @type trust_root asn1_x509.Certificate
+    #  @return The validation context. It never fetches certificates or revocation data.
+    #  @rtype ValidationContext
+    def validation_context(self, trust_root: asn1_x509.Certificate) -> ValidationContext:
+        return ValidationContext(
+            trust_roots=[trust_root],
+            other_certs=[asn1_x509.Certificate.load(cert) for cert in self.certs],
+            ocsps=[asn1_ocsp.OCSPResponse.load(ocsp) for ocsp in self.ocsps],
+            crls=[asn1_crl.CertificateList.load(crl) for crl in self.crls],
+            allow_fetching=False,
+        )
+
+
+## @brief Adds a DSS listing the signing certificate to a document about to be signed.
+#  @param writer The writer of the revision the signature is added to.
+#  @type writer BasePdfFileWriter
+#  @param asn1_cert The signing certificate.
+#  @type asn1_cert asn1_x509.Certificate
+def embed_validation_data(writer: BasePdfFileWriter, asn1_cert: asn1_x509.Certificate):
+    DocumentSecurityStore.supply_dss_in_writer(writer, None, certs=[asn1_cert])
+
+
+## @brief Reads the DSS of a document.
+#  @param reader The reader of the document.
+#  @type reader PdfFileReader
+#  @return The entries of the DSS, None if the document has none or it is malformed.
+#  @rtype ValidationData | None
+def read_validation_data(reader: PdfFileReader) -> ValidationData | None:
+    dss = reader.root.get("/DSS")
+    if dss is None:
+        return None
+    try:
+        dss = dss.get_object()
+        entries = tuple(tuple(reference.get_object().data for reference in dss.get(key, ()))
+                        for key in ("/Certs", "/OCSPs", "/CRLs"))
+    except (AttributeError, TypeError):
+        # Entries that are not streams, the DSS is ignored like a missing one
+        return None
+    digest = hashlib.sha256()
+    for group in entries:
+        digest.update(len(group).to_bytes(4, "big"))
+        for data in group:
+            digest.update(len(data).to_bytes(4, "big"))
+            digest.update(data)
+    return ValidationData(digest.digest(), *entries)
@@ -2,82 +2,276 @@
 #  @brief Provides functions for signing PDF documents using RSA private keys.
 #  @details This module leverages the `pyhanko` library to perform PAdES
 #           digital signatures. It includes functionality to generate a self-signed
-#           certificate on-the-fly for the signing process.
+#           certificate on-the-fly for the signing process. Batches create the certificate
+#           once with `create_signing_credentials` and sign all their documents with it.
 
 import datetime
+import io
 import os
-from typing import Tuple
+from dataclasses import dataclass
+from typing import BinaryIO, Tuple
 
 from cryptography import x509
 from cryptography.hazmat._oid import ExtendedKeyUsageOID
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.x509.oid import NameOID
 
 from asn1crypto import x509 as asn1_x509, keys as asn1_keys
 
 from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
 from pyhanko.sign import signers, PdfSignatureMetadata, PdfSigner
-from pyhanko.sign.fields import SigFieldSpec
-from pyhanko.sign.timestamps import DummyTimeStamper
 from pyhanko_certvalidator.registry import SimpleCertificateStore
+from pyhanko_certvalidator.util import get_pyca_cryptography_hash
+
+from ..instrumentation import span
+from .appearance import APPEARANCE_VISIBLE, SIGNATURE_FIELD_NAME, create_field_spec, create_stamp_style
+from .compact import CompactIncrementalPdfFileWriter
+from .dss import embed_validation_data
+from .spooling import open_document
+from .timestamping import DummyTimestamps, TimestampPolicy
+
+## @var DEFAULT_TIMESTAMP_POLICY
+#  @brief Timestamping policy used by `sign` when none is given.
+DEFAULT_TIMESTAMP_POLICY = DummyTimestamps()
+
+## @var DIGEST_ALGORITHMS
+#  @brief Digest algorithms accepted by `sign`, mapped to their `cryptography` implementations.
+#  @details All of them are allowed for PAdES signatures. SHA-512 (and SHA-384, which shares its
+#           implementation) is usually faster than SHA-256 on 64-bit CPUs without SHA extensions.
+DIGEST_ALGORITHMS = {
+    "sha256": hashes.SHA256,
+    "sha384": hashes.SHA384,
+    "sha512": hashes.SHA512,
+}
+
+## @var DEFAULT_DIGEST_ALGORITHM
+#  @brief Digest algorithm used by `sign` when none is given.
+DEFAULT_DIGEST_ALGORITHM = "sha256"
+
+## @var IO_CHUNK_SIZE
+#  @brief Size in bytes of the chunks in which the original document is copied to the output and
+#         the signed byte ranges are digested. pyhanko defaults to 4 KiB, which costs a Python
+#         call per chunk when the streams are not `io` objects.
+IO_CHUNK_SIZE = 1024 * 1024
+
+
+## @class SigningCredentials
+#  @brief The self-signed certificate of a signing key, reusable for any number of signatures.
+#  @details `certificate` and `private_key_info` are the results of `_generate_self_signed_cert`,
+#           the certificate is signed with `digest_algorithm`.
+@dataclass(frozen=True)
+class SigningCredentials:
+    certificate: asn1_x509.Certificate
+    private_key_info: asn1_keys.PrivateKeyInfo
+    digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM
+
+
+## @brief Creates the credentials shared by the signatures of a batch.
+#  @details Generating the certificate costs an RSA signature. Reusing it saves that for every further
+#           document, and all documents of the batch carry the same certificate and DSS, so a verifier
+#           validates the certificate once for the whole batch.
+#  @param private_key The RSA private key.
+#  @type private_key rsa.RSAPrivateKey
+#  @param digest_algorithm The digest algorithm of the signatures, one of `DIGEST_ALGORITHMS`.
+#  @type digest_algorithm str
+#  @return The credentials.
+#  @rtype SigningCredentials
+#  @exception ValueError When the digest algorithm is unknown
+def create_signing_credentials(private_key: rsa.RSAPrivateKey,
+                               digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM) -> SigningCredentials:
+    if digest_algorithm not in DIGEST_ALGORITHMS:
+        raise ValueError(f"Unsupported digest algorithm {digest_algorithm}")
+    return SigningCredentials(*_generate_self_signed_cert(private_key, digest_algorithm), digest_algorithm)
+
+
+## @brief Checks that credentials can sign with a key and a digest algorithm.
+#  @details Signing with the certificate of another key would write documents that fail verification
+#           with either key.
+#  @param private_key The RSA private key of the signatures.
+#  @type private_key rsa.RSAPrivateKey
+#  @param credentials The credentials.
+#  @type credentials SigningCredentials
+#  @param digest_algorithm The digest algorithm of the signatures.
+#  @type digest_algorithm str
+#  @exception ValueError If the certificate does not hold the public key of `private_key`, or the
+#                        credentials use another digest algorithm.
+def check_signing_credentials(private_key: rsa.RSAPrivateKey, credentials: SigningCredentials,
+                              digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM):
+    public_key_info = private_key.public_key().public_bytes(serialization.Encoding.DER,
+                                                            serialization.PublicFormat.SubjectPublicKeyInfo)
+    if credentials.certificate.public_key.dump() != public_key_info:
+        raise ValueError("The credentials were created for another key")
+    if credentials.digest_algorithm != digest_algorithm:
+        raise ValueError(f"The credentials use {credentials.digest_algorithm}, not {digest_algorithm}")
 
 
 ## @brief Signs a PDF document using a provided RSA private key.
 #  @details This function creates a self-signed certificate from the given private key
 #           and uses it to apply a digital signature to the input PDF. The signed
 #           PDF is saved to the specified output path. A signature field is added
-#           to the first page of the PDF. If an error occurs during signing,
-#           any partially created output file is removed.
+#           to the first page of the PDF, visible unless `appearance` says otherwise.
+#           If an error occurs during signing, any partially created output file is removed.
+#           The stages of the signing are reported as `sign.*` spans of `services.instrumentation`.
 #  @param private_key The RSA private key object to use for signing.
 #  @type private_key rsa.RSAPrivateKey
 #  @param pdf_in_path The file system path to the input PDF document that needs to be signed.
 #  @type pdf_in_path str
 #  @param pdf_out_path The file system path where the signed PDF document will be saved.
 #  @type pdf_out_path str
+#  @param timestamp_policy Decides which timestamp token is embedded, see `timestamping.py`.
+#                          Defaults to `DEFAULT_TIMESTAMP_POLICY`.
+#  @type timestamp_policy TimestampPolicy | None
+#  @param appearance The appearance of the signature field, one of `appearance.APPEARANCE_MODES`.
+#  @type appearance str
+#  @param compact Whether to compress the appended signature revision, see `compact.py`.
+#  @type compact bool
+#  @param digest_algorithm The digest algorithm of the document digest and of the certificate,
+#                          one of `DIGEST_ALGORITHMS`.
+#  @type digest_algorithm str
+#  @param embed_dss Whether to embed a Document Security Store listing the certificate, see `dss.py`.
+#  @type embed_dss bool
+#  @param credentials The certificate to sign with, from `create_signing_credentials` for the key and
+#                     the digest algorithm, see `check_signing_credentials`. None generates a new certificate.
+#  @type credentials SigningCredentials | None
+#  @exception ValueError When the appearance or the digest algorithm is unknown, or the credentials
+#                        belong to another key or use another digest algorithm
 #  @exception FileNotFoundError When the input file doesn't exist
 #  @exception PdfReadError When an error occurs during signature or while reading the input PDF file
-def sign(private_key: rsa.RSAPrivateKey, pdf_in_path: str, pdf_out_path: str):
-    asn1_cert, asn1_private_key = _generate_self_signed_cert(private_key)
-
-    certification_store = SimpleCertificateStore()
-    certification_store.register(asn1_cert)
-
-    signer = signers.SimpleSigner(
-        signing_cert=asn1_cert,
-        signing_key=asn1_private_key,
-        cert_registry=certification_store,
-    )
-
-    timestamper = DummyTimeStamper(asn1_cert, asn1_private_key)
-
-    field_name = 'PAdES-signature'
-    sign_metadata = PdfSignatureMetadata(
-        field_name=field_name,
-    )
-    sig_spec = SigFieldSpec(
-        sig_field_name=field_name,
-        on_page=0,
-        box=(50, 775, 250, 830)
-    )
-
+def sign(private_key: rsa.RSAPrivateKey, pdf_in_path: str, pdf_out_path: str,
+         timestamp_policy: TimestampPolicy | None = None, appearance: str = APPEARANCE_VISIBLE,
+         compact: bool = False, digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM, embed_dss: bool = False,
+         credentials: SigningCredentials | None = None):
     try:
         with open(pdf_in_path, "rb") as inf, open(pdf_out_path, "wb") as outf:
-            writer = IncrementalPdfFileWriter(inf, strict=False)
-
-            pdf_signer = PdfSigner(
-                sign_metadata,
-                signer,
-                timestamper=timestamper,
-                new_field_spec=sig_spec
-            )
-            pdf_signer.sign_pdf(writer, output=outf)
+            _sign_stream(private_key, inf, outf, timestamp_policy, appearance, compact, digest_algorithm,
+                         embed_dss, credentials)
     except Exception as e:
         if os.path.exists(pdf_out_path):
             os.remove(pdf_out_path)
         raise e
 
 
+## @brief Signs a PDF document held in memory.
+#  @details Does the same as `sign` without touching the file system, e.g. for documents uploaded to
+#           a web service. The input is read through an `io.BytesIO` sharing a `bytes` object (see
+#           `spooling.open_document`) and the output is returned without copying it out of its buffer.
+#  @param private_key The RSA private key object to use for signing.
+#  @type private_key rsa.RSAPrivateKey
+#  @param data The PDF document.
+#  @type data bytes | bytearray | memoryview
+#  @param timestamp_policy See `sign`.
+#  @type timestamp_policy TimestampPolicy | None
+#  @param appearance See `sign`.
+#  @type appearance str
+#  @param compact See `sign`.
+#  @type compact bool
+#  @param digest_algorithm See `sign`.
+#  @type digest_algorithm str
+#  @param embed_dss See `sign`.
+#  @type embed_dss bool
+#  @param credentials See `sign`.
+#  @type credentials SigningCredentials | None
+#  @return The signed PDF document.
+#  @rtype bytes
+#  @exception ValueError When the appearance or the digest algorithm is unknown, or the credentials
+#                        belong to another key or use another digest algorithm
+#  @exception PdfReadError When an error occurs during signature or while reading the PDF document
+def sign_bytes(private_key: rsa.RSAPrivateKey, data: bytes | bytearray | memoryview,
+               timestamp_policy: TimestampPolicy | None = None, appearance: str = APPEARANCE_VISIBLE,
+               compact: bool = False, digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM, embed_dss: bool = False,
+               credentials: SigningCredentials | None = None) -> bytes:
+    output = io.BytesIO()
+    with open_document(data) as inf:
+        _sign_stream(private_key, inf, output, timestamp_policy, appearance, compact, digest_algorithm,
+                     embed_dss, credentials)
+    return output.getvalue()
+
+
+## @brief Signs a PDF document read from a binary stream into another binary stream.
+#  @details Does the work of `sign`, see there for the parameters.
+#  @param inf The seekable stream of the input PDF document.
+#  @type inf BinaryIO
+#  @param outf The stream receiving the signed PDF document.
+#  @type outf BinaryIO
+#  @private
+def _sign_stream(private_key: rsa.RSAPrivateKey, inf: BinaryIO, outf: BinaryIO,
+                 timestamp_policy: TimestampPolicy | None = None, appearance: str = APPEARANCE_VISIBLE,
+                 compact: bool = False, digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM, embed_dss: bool = False,
+                 credentials: SigningCredentials | None = None):
+    sig_spec = create_field_spec(appearance)
+    if digest_algorithm not in DIGEST_ALGORITHMS:
+        raise ValueError(f"Unsupported digest algorithm {digest_algorithm}")
+    if credentials is not None:
+        check_signing_credentials(private_key, credentials, digest_algorithm)
+    with span("sign") as sign_span:
+        if credentials is None:
+            with span("sign.cert_generation"):
+                credentials = create_signing_credentials(private_key, digest_algorithm)
+        asn1_cert, asn1_private_key = credentials.certificate, credentials.private_key_info
+
+        certification_store = SimpleCertificateStore()
+        certification_store.register(asn1_cert)
+
+        signer = _SpanSigner(
+            private_key,
+            signing_cert=asn1_cert,
+            signing_key=asn1_private_key,
+            cert_registry=certification_store,
+        )
+
+        timestamp_policy = timestamp_policy or DEFAULT_TIMESTAMP_POLICY
+        timestamper = timestamp_policy.create_timestamper(asn1_cert, asn1_private_key)
+
+        sign_metadata = PdfSignatureMetadata(
+            field_name=SIGNATURE_FIELD_NAME,
+            md_algorithm=digest_algorithm,
+        )
+
+        sign_span.add_bytes(inf.seek(0, os.SEEK_END))
+        inf.seek(0)
+        with span("sign.pdf_parse"):
+            writer_class = CompactIncrementalPdfFileWriter if compact else IncrementalPdfFileWriter
+            writer = writer_class(inf, strict=False)
+            writer.IO_CHUNK_SIZE = IO_CHUNK_SIZE
+        if embed_dss:
+            with span("sign.dss"):
+                embed_validation_data(writer, asn1_cert)
+
+        pdf_signer = PdfSigner(
+            sign_metadata,
+            signer,
+            timestamper=timestamper,
+            stamp_style=create_stamp_style(appearance, signer.subject_name),
+            new_field_spec=sig_spec
+        )
+        # Covers the digest of the byte ranges and the output write, "sign.rsa" and "sign.timestamp" are nested in it
+        with span("sign.pdf_sign") as pdf_sign_span:
+            start = outf.tell()
+            pdf_signer.sign_pdf(writer, output=outf, chunk_size=IO_CHUNK_SIZE)
+            # pyhanko leaves readable outputs positioned at their start
+            pdf_sign_span.add_bytes(outf.seek(0, os.SEEK_END) - start)
+
+
+## @brief `SimpleSigner` reporting its raw RSA operations as `sign.rsa` spans.
+#  @details `SimpleSigner` loads its key from DER again for every signature, which reruns the RSA
+#           key consistency check while holding the GIL. This signer uses the already loaded key instead.
+#  @private
+class _SpanSigner(signers.SimpleSigner):
+    def __init__(self, private_key: rsa.RSAPrivateKey, **kwargs):
+        super().__init__(**kwargs)
+        self._private_key = private_key
+
+    async def async_sign_raw(self, data: bytes, digest_algorithm: str, dry_run=False) -> bytes:
+        with span("sign.rsa", len(data)):
+            return await super().async_sign_raw(data, digest_algorithm, dry_run)
+
+    def sign_raw(self, data: bytes, digest_algorithm: str) -> bytes:
+        if self.get_signature_mechanism_for_digest(digest_algorithm).signature_algo != "rsassa_pkcs1v15":
+            return super().sign_raw(data, digest_algorithm)
+        return self._private_key.sign(data, padding.PKCS1v15(), get_pyca_cryptography_hash(digest_algorithm))
+
+
 ## @brief Generates a self-signed X.509 certificate and private key information in ASN.1 format.
 #  @details This internal helper function takes an RSA private key and creates a
 #           self-signed certificate suitable for use with `pyhanko`. The certificate
@@ -85,12 +279,15 @@ def sign(private_key: rsa.RSAPrivateKey, pdf_in_path: str, pdf_out_path: str):
 #  @param private_key The RSA private key object from which to generate the public key for the certificate
 #                     and to sign the certificate.
 #  @type private_key rsa.RSAPrivateKey
+#  @param digest_algorithm The digest algorithm of the certificate signature, one of `DIGEST_ALGORITHMS`.
+#  @type digest_algorithm str
 #  @return A tuple containing:
 #          - `asn1_cert`: The generated self-signed certificate in `asn1crypto.x509.Certificate` format.
 #          - `asn1_private_key`: The private key information in `asn1crypto.keys.PrivateKeyInfo` format.
 #  @rtype Tuple[asn1_x509.Certificate, asn1_keys.PrivateKeyInfo]
 #  @private
-def _generate_self_signed_cert(private_key: rsa.RSAPrivateKey) -> Tuple[asn1_x509.Certificate, asn1_keys.PrivateKeyInfo]:
+def _generate_self_signed_cert(private_key: rsa.RSAPrivateKey,
+                               digest_algorithm: str = DEFAULT_DIGEST_ALGORITHM) -> Tuple[asn1_x509.Certificate, asn1_keys.PrivateKeyInfo]:
     common_name = "myPAdESCertificate"
     public_key = private_key.public_key()
 
@@ -126,7 +323,7 @@ def _generate_self_signed_cert(private_key: rsa.RSAPrivateKey) -> Tuple[asn1_x50
         )
     )
 
-    cert = builder.sign(private_key, hashes.SHA256())
+    cert = builder.sign(private_key, DIGEST_ALGORITHMS[digest_algorithm]())
 
     # Converting to asn1crypto format
     der_cert = cert.public_bytes(serialization.Encoding.DER)
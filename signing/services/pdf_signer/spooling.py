@@ -0,0 +1,100 @@
+## @file spooling.py
+#  @brief Turns in-memory documents and non-seekable streams into seekable streams for pyhanko.
+#  @details pyhanko's reader needs to seek, so documents arriving on a pipe, stdin or a socket have
+#           to be buffered first. Small documents are kept in memory. Once a document grows past a
+#           threshold, it moves to an anonymous memory file (`memfd_create`), or an unnamed temporary
+#           file where that is unavailable, so it neither grows the Python heap nor gets written to a
+#           named file on disk. Documents that are already in memory are handed to the reader without
+#           copying where possible. The tokenizer of pyhanko reads about one byte per call, so the
+#           stream has to be a C-implemented `io` object; a Python wrapper around a `memoryview`
+#           would cost more than a single copy of the buffer.
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, ContextManager
+
+## @var DEFAULT_SPOOL_THRESHOLD
+#  @brief Size in bytes up to which a streamed document is buffered in memory.
+DEFAULT_SPOOL_THRESHOLD = 8 * 1024 * 1024
+
+## @var SPOOL_CHUNK_SIZE
+#  @brief Number of bytes read from a streamed document at once.
+SPOOL_CHUNK_SIZE = 256 * 1024
+
+## @var MEMFD_NAME
+#  @brief Name of the anonymous memory files, shown in `/proc/<pid>/fd` only.
+MEMFD_NAME = "pdf-spool"
+
+
+## @brief Returns a seekable stream of a document given as bytes or as a binary stream.
+#  @details Bytes-like documents are wrapped in an `io.BytesIO`, which shares `bytes` objects
+#           (also behind a `memoryview` spanning all of them) instead of copying them. Seekable
+#           streams are used as they are and are left open. Other streams are read to their end
+#           and spooled, see `spool_stream`.
+#  @param source The document.
+#  @type source BinaryIO | bytes | bytearray | memoryview
+#  @param spool_threshold The size in bytes up to which a streamed document is kept in memory.
+#  @type spool_threshold int
+#  @return A context manager yielding the seekable stream and closing it afterwards if it was created here.
+#  @rtype ContextManager[BinaryIO]
+def open_document(source: BinaryIO | bytes | bytearray | memoryview,
+                  spool_threshold: int = DEFAULT_SPOOL_THRESHOLD) -> ContextManager[BinaryIO]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(_shared_bytes(source))
+    if source.seekable():
+        return contextlib.nullcontext(source)
+    return spool_stream(source, spool_threshold)
+
+
+## @brief Reads a non-seekable stream to its end into a seekable stream.
+#  @param inf The stream, e.g. `sys.stdin.buffer` or a file object of a socket.
+#  @type inf BinaryIO
+#  @param spool_threshold The size in bytes up to which the data is kept in an `io.BytesIO`.
+#                         Larger documents are moved to an anonymous file.
+#  @type spool_threshold int
+#  @return The spooled stream, positioned at its start. The caller has to close it.
+#  @rtype BinaryIO
+def spool_stream(inf: BinaryIO, spool_threshold: int = DEFAULT_SPOOL_THRESHOLD) -> BinaryIO:
+    # The chunks are joined once at the end, growing an io.BytesIO chunk by chunk copies the data repeatedly
+    chunks = []
+    size = 0
+    while size <= spool_threshold:
+        chunk = inf.read(SPOOL_CHUNK_SIZE)
+        if not chunk:
+            return io.BytesIO(b"".join(chunks))
+        chunks.append(chunk)
+        size += len(chunk)
+
+    spool = _anonymous_file()
+    try:
+        spool.writelines(chunks)
+        chunks.clear()
+        shutil.copyfileobj(inf, spool, SPOOL_CHUNK_SIZE)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+## @brief Returns the `bytes` object behind a bytes-like document, or the document if it cannot be shared.
+#  @private
+def _shared_bytes(data: bytes | bytearray | memoryview) -> bytes | bytearray | memoryview:
+    if isinstance(data, memoryview) and isinstance(data.obj, bytes) and data.nbytes == len(data.obj):
+        return data.obj
+    return data
+
+
+## @brief Opens an anonymous read-write file, preferring a memory file that is never written to disk.
+#  @private
+def _anonymous_file() -> BinaryIO:
+    if hasattr(os, "memfd_create"):
+        try:
+            return open(os.memfd_create(MEMFD_NAME), "w+b")
+        except OSError:
+            # e.g. forbidden by a seccomp filter
+            pass
+    return tempfile.TemporaryFile()
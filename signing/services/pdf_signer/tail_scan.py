@@ -0,0 +1,160 @@
+## @file tail_scan.py
+#  @brief Finds the signatures of a PDF document in its raw bytes, without parsing the PDF.
+#  @details A signature appended by `sign` forms the last revision of the document. Its signature
+#           dictionary, with the `/ByteRange` written after the `/Contents`, sits in the last few
+#           KiB of the file, and the byte range of a signature covering the whole file ends where
+#           the file ends. `scan_tail` looks for such a byte range in the tail and decodes the CMS
+#           blob it leaves out. `scan_signatures` does the same for every `/ByteRange` of the
+#           document. The byte ranges are patched into the file after it is written, so a signature
+#           dictionary is never hidden in a compressed object stream. The results are only hints:
+#           neither the digest nor the signature value is checked, a `VerifierSession` does that.
+
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+import re
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+from asn1crypto import cms
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+## @var TAIL_SCAN_SIZE
+#  @brief Number of bytes at the end of a file searched for the signature dictionary.
+TAIL_SCAN_SIZE = 16 * 1024
+
+## @var _BYTE_RANGE_KEY
+#  @brief Matches the `/ByteRange` key.
+#  @private
+_BYTE_RANGE_KEY = re.compile(rb"/ByteRange")
+
+## @var _BYTE_RANGE_PATTERN
+#  @brief Matches a `/ByteRange` entry and captures its four integers.
+#  @private
+_BYTE_RANGE_PATTERN = re.compile(rb"/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+
+
+## @class ScannedSignature
+#  @brief A signature found by `scan_tail` or `scan_signatures`.
+#  @details `byte_range` is the `/ByteRange` of the signature; for `scan_tail` its second range ends
+#           at the end of the file. `key_fingerprint` is the `public_key_fingerprint` of the signer
+#           certificate, None if the certificate could not be decoded.
+@dataclass(frozen=True)
+class ScannedSignature:
+    byte_range: tuple[int, int, int, int]
+    key_fingerprint: bytes | None
+
+
+## @brief Computes the fingerprint `scan_tail` reports for the key of a signer certificate.
+#  @details The SHA-256 hash of the PKCS#1 encoding of the key. Unlike a certificate fingerprint,
+#           it stays the same for all the self-signed certificates `sign` generates for one key.
+#  @param public_key The RSA public key.
+#  @type public_key rsa.RSAPublicKey
+#  @return The fingerprint.
+#  @rtype bytes
+def public_key_fingerprint(public_key: rsa.RSAPublicKey) -> bytes:
+    return hashlib.sha256(public_key.public_bytes(serialization.Encoding.DER,
+                                                  serialization.PublicFormat.PKCS1)).digest()
+
+
+## @brief Looks for a signature covering the whole document in the tail of a PDF file.
+#  @param inf The seekable stream of the PDF document. Its position is left undefined.
+#  @type inf BinaryIO
+#  @param tail_size The number of bytes read from the end of the stream.
+#  @type tail_size int
+#  @return The last signature in the tail whose byte range covers the whole file,
+#          None if there is no such signature.
+#  @rtype ScannedSignature | None
+def scan_tail(inf: BinaryIO, tail_size: int = TAIL_SCAN_SIZE) -> ScannedSignature | None:
+    size = inf.seek(0, os.SEEK_END)
+    inf.seek(max(0, size - tail_size))
+    tail = inf.read()
+
+    for match in reversed(list(_BYTE_RANGE_PATTERN.finditer(tail))):
+        byte_range = tuple(int(group) for group in match.groups())
+        first_start, first_length, second_start, second_length = byte_range
+        if first_start != 0 or first_length >= second_start or second_start + second_length != size:
+            continue
+        inf.seek(first_length)
+        contents = inf.read(second_start - first_length)
+        return ScannedSignature(byte_range, _signer_key_fingerprint(contents))
+    return None
+
+
+## @brief Finds all signatures of a PDF document by searching its raw bytes for `/ByteRange` entries.
+#  @param buffer The whole document, e.g. from `map_document`.
+#  @type buffer bytes | memoryview | mmap.mmap
+#  @return The signatures in file order, empty if the document contains no `/ByteRange`. None if a
+#          `/ByteRange` is not followed by a byte range within the document, e.g. because the key
+#          appears in a content stream, so that the signatures cannot be told apart from other data.
+#  @rtype list[ScannedSignature] | None
+def scan_signatures(buffer: bytes | memoryview | mmap.mmap) -> list[ScannedSignature] | None:
+    size = len(buffer)
+    signatures = []
+    for key in _BYTE_RANGE_KEY.finditer(buffer):
+        match = _BYTE_RANGE_PATTERN.match(buffer, key.start())
+        if match is None:
+            return None
+        byte_range = tuple(int(group) for group in match.groups())
+        first_start, first_length, second_start, second_length = byte_range
+        if first_start != 0 or first_length >= second_start or second_start + second_length > size:
+            return None
+        contents = bytes(buffer[first_length:second_start])
+        signatures.append(ScannedSignature(byte_range, _signer_key_fingerprint(contents)))
+    return signatures
+
+
+## @brief Gives access to the whole content of a seekable stream without reading it.
+#  @details `io.BytesIO` streams are accessed through their buffer and streams of files, including
+#           memory files, are mapped into memory read-only.
+#  @param inf The stream of the document.
+#  @type inf BinaryIO
+#  @return A context manager yielding the content, or None for other streams and empty files.
+#  @rtype ContextManager[memoryview | mmap.mmap | None]
+@contextlib.contextmanager
+def map_document(inf: BinaryIO) -> Iterator[memoryview | mmap.mmap | None]:
+    if isinstance(inf, io.BytesIO):
+        with inf.getbuffer() as view:
+            yield view
+        return
+    try:
+        fileno = inf.fileno()
+    except (AttributeError, OSError, ValueError):
+        yield None
+        return
+    if os.fstat(fileno).st_size == 0:
+        yield None
+        return
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+## @brief Decodes the `/Contents` string of a signature and fingerprints the key of its signer certificate.
+#  @param contents The bytes left out by the byte range, the hexadecimal string including its delimiters.
+#  @type contents bytes
+#  @return The fingerprint, None if the CMS blob or the certificate could not be decoded.
+#  @rtype bytes | None
+#  @private
+def _signer_key_fingerprint(contents: bytes) -> bytes | None:
+    contents = contents.strip()
+    if not (contents.startswith(b"<") and contents.endswith(b">")):
+        return None
+    try:
+        # The placeholder is padded with zeros after the DER encoding, which load ignores
+        signed_data = cms.ContentInfo.load(bytes.fromhex(contents[1:-1].decode("ascii")))["content"]
+        sid = signed_data["signer_infos"][0]["sid"]
+        for choice in signed_data["certificates"] or []:
+            cert = choice.chosen
+            if sid.name == "issuer_and_serial_number":
+                matches = (sid.chosen["issuer"] == cert.issuer
+                           and sid.chosen["serial_number"].native == cert.serial_number)
+            else:
+                matches = sid.chosen.native == cert.key_identifier
+            if matches:
+                return cert.public_key.sha256 if cert.public_key.algorithm == "rsa" else None
+    except (ValueError, TypeError, KeyError, IndexError, UnicodeDecodeError):
+        return None
+    return None
@@ -2,21 +2,284 @@
 #  @brief Provides functionality to verify digital signatures in PDF documents.
 #  @details This module uses `pyhanko` and `cryptography` libraries to validate
 #           the integrity of a PDF signature and compare the embedded public key
-#           with a provided public key.
+#           with a provided public key. Bulk jobs verifying many documents against the
+#           same key should use a `VerifierSession`, which prepares the key once, reuses
+#           validation contexts and can skip the expensive validation stages. The contexts are
+#           keyed by the signing certificate and the Document Security Store (DSS) of the
+#           document, so a batch signed with one certificate and DSS builds one context. Before parsing
+#           a document, a session searches its raw bytes for signature dictionaries (see
+#           `tail_scan.py`) to reject unsigned documents and documents signed only with other
+#           keys without building a `PdfFileReader`. Documents
+#           can also be verified from bytes or from a stream, e.g. a pipe or a socket,
+#           without writing them to a file first (see `spooling.py`).
+
+import os
+from collections import OrderedDict
+from typing import BinaryIO, Iterable
 
-from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.x509 import load_der_x509_certificate
 
+from asn1crypto import x509 as asn1_x509
 from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.sign.validation.errors import SignatureValidationError
 from pyhanko.sign.validation import validate_pdf_signature
+from pyhanko.sign.validation.generic_cms import validate_sig_integrity
+from pyhanko.sign.validation.pdf_embedded import EmbeddedPdfSignature
+from pyhanko.sign.validation.status import SignatureCoverageLevel
 from pyhanko_certvalidator import ValidationContext
 
+from ..instrumentation import span
+from .dss import ValidationData, read_validation_data
+from .signer import DIGEST_ALGORITHMS
+from .spooling import DEFAULT_SPOOL_THRESHOLD, open_document
+from .tail_scan import map_document, public_key_fingerprint, scan_signatures, scan_tail
+
+## @var VALIDATION_INTEGRITY
+#  @brief Validation level checking only that the signature covers the whole file, the signed bytes
+#         are unchanged and the signature over them is cryptographically valid for the embedded
+#         certificate. Does not check who signed. Documents with revisions appended after the
+#         signature, e.g. countersignatures, are checked by the validation of `VALIDATION_FULL`
+#         instead, whose analysis of the later modifications they have to pass.
+VALIDATION_INTEGRITY = "integrity"
+
+## @var VALIDATION_KEY_MATCH
+#  @brief Validation level checking the integrity and that the embedded certificate holds the expected key.
+VALIDATION_KEY_MATCH = "key_match"
+
+## @var VALIDATION_FULL
+#  @brief Validation level checking the key and running pyhanko's full validation, including the
+#         certificate path and the analysis of modifications made after signing. The verification
+#         passes only if pyhanko's bottom line does: the signature is intact, cryptographically valid
+#         and trusted, and any later revisions only make modifications the signature allows.
+VALIDATION_FULL = "full"
+
+## @var VALIDATION_LEVELS
+#  @brief Validation levels accepted by `verify` and `VerifierSession`, from the cheapest to the most thorough.
+VALIDATION_LEVELS = (VALIDATION_INTEGRITY, VALIDATION_KEY_MATCH, VALIDATION_FULL)
+
+## @var PREFILTER_MARKER_WINDOW
+#  @brief Number of bytes at the start and at the end of a document searched for the `%PDF-` header
+#         and the `startxref` keyword before the prefilter reports it as unsigned.
+PREFILTER_MARKER_WINDOW = 1024
+
+## @var DEFAULT_CONTEXT_CACHE_SIZE
+#  @brief Default number of signing certificates whose validation contexts a session keeps.
+DEFAULT_CONTEXT_CACHE_SIZE = 64
+
 ## @brief Exception raised when a PDF document does not contain any embedded digital signatures.
 class NoSignatureFound(Exception):
     pass
 
 
+## @class VerifierSession
+#  @brief Verifies any number of PDF documents against one public key.
+#  @details The expected key is prepared once, and the validation context trusting a signing
+#           certificate is built once per certificate and reused for every further document
+#           signed with it. A session is not thread-safe, use one per thread.
+class VerifierSession:
+    ## @brief Initializes the VerifierSession.
+    #  @param public_key The RSA public key expected to correspond to the signatures.
+    #  @type public_key rsa.RSAPublicKey
+    #  @param level One of `VALIDATION_LEVELS`.
+    #  @type level str
+    #  @param context_cache_size The number of signing certificates whose validation contexts are kept.
+    #  @type context_cache_size int
+    #  @param digest_algorithms The accepted digest algorithms of the signatures, others fail the verification.
+    #                           Defaults to the algorithms `sign` can use.
+    #  @type digest_algorithms Iterable[str] | None
+    #  @param spool_threshold The size in bytes up to which `verify_stream` buffers a non-seekable stream in memory.
+    #  @type spool_threshold int
+    #  @param prefilter Whether documents are searched for signature dictionaries before they are parsed.
+    #  @type prefilter bool
+    #  @exception ValueError If the validation level is unknown.
+    def __init__(self, public_key: rsa.RSAPublicKey, level: str = VALIDATION_FULL,
+                 context_cache_size: int = DEFAULT_CONTEXT_CACHE_SIZE, digest_algorithms: Iterable[str] | None = None,
+                 spool_threshold: int = DEFAULT_SPOOL_THRESHOLD, prefilter: bool = True):
+        if level not in VALIDATION_LEVELS:
+            raise ValueError(f"Unknown validation level {level}")
+        self.public_key = public_key
+        self.level = level
+        self.context_cache_size = context_cache_size
+        self.digest_algorithms = frozenset(digest_algorithms or DIGEST_ALGORITHMS)
+        self.spool_threshold = spool_threshold
+        self.prefilter = prefilter
+        public_numbers = public_key.public_numbers()
+        self._expected_key = (public_numbers.n, public_numbers.e)
+        self._expected_fingerprint = public_key_fingerprint(public_key)
+        self._contexts: OrderedDict[bytes, ValidationContext] = OrderedDict()
+
+    ## @brief Verifies the first signature of a PDF document at the level of the session.
+    #  @details The stages of the verification are reported as `verify.*` spans of `services.instrumentation`.
+    #  @param pdf_path The file system path to the PDF document whose signature is to be verified.
+    #  @type pdf_path str
+    #  @return `True` if all checks of the level pass, `False` otherwise.
+    #  @rtype bool
+    #  @exception FileNotFoundError If the `pdf_path` does not exist.
+    #  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
+    #  @exception PdfReadError When an error occurs while reading the PDF file
+    def verify(self, pdf_path: str) -> bool:
+        with open(pdf_path, "rb") as inf:
+            return self.verify_stream(inf)
+
+    ## @brief Verifies the first signature of a PDF document held in memory or read from a binary stream.
+    #  @details See `verify`. A non-seekable stream is read to its end first, in memory up to the
+    #           spool threshold of the session and in an anonymous file above it (`verify.spool` span).
+    #           Seekable streams are read from their start and left open.
+    #  @param source The PDF document, or a binary stream of it.
+    #  @type source BinaryIO | bytes | bytearray | memoryview
+    #  @return `True` if all checks of the level pass, `False` otherwise.
+    #  @rtype bool
+    #  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
+    #  @exception PdfReadError When an error occurs while reading the PDF document
+    def verify_stream(self, source: BinaryIO | bytes | bytearray | memoryview) -> bool:
+        with span("verify") as verify_span:
+            with span("verify.spool"):
+                document = open_document(source, self.spool_threshold)
+            with document as inf:
+                verify_span.add_bytes(inf.seek(0, os.SEEK_END))
+                inf.seek(0)
+                return self._verify_seekable(inf)
+
+    ## @brief Verifies the first signature of a PDF document read from a seekable stream positioned at its start.
+    #  @private
+    def _verify_seekable(self, inf: BinaryIO) -> bool:
+        if self.prefilter:
+            with span("verify.prefilter"):
+                with map_document(inf) as buffer:
+                    prefiltered = None if buffer is None else self._prefilter(buffer)
+            if prefiltered is not None:
+                return prefiltered
+            inf.seek(0)
+
+        with span("verify.pdf_parse"):
+            reader = PdfFileReader(inf, strict=False)
+            signatures = reader.embedded_signatures
+        if not signatures:
+            raise NoSignatureFound
+
+        sig = signatures[0]
+        if sig.md_algorithm not in self.digest_algorithms:
+            return False
+
+        if self.level != VALIDATION_INTEGRITY:
+            with span("verify.key_match"):
+                keys_match = self._matches_expected_key(sig.signer_cert)
+            if not keys_match:
+                return False
+
+        with span("verify.validation"):
+            coverage = sig.evaluate_signature_coverage()
+            # Revisions appended after the signature, e.g. countersignatures, need the difference analysis
+            if self.level == VALIDATION_FULL or coverage == SignatureCoverageLevel.ENTIRE_REVISION:
+                validation_data = read_validation_data(reader)
+                status = validate_pdf_signature(sig, self._validation_context(sig.signer_cert, validation_data))
+                return bool(status.bottom_line)
+            if coverage != SignatureCoverageLevel.ENTIRE_FILE:
+                return False
+            return _check_integrity(sig)
+
+    ## @brief Decides the verification of a document from its raw bytes where that is possible.
+    #  @details The signature verified is the first one pyhanko finds, which need not be the last one
+    #           in the file, so all signature dictionaries are searched rather than only the tail.
+    #           A well-formed document without any is unsigned. If every signature found is made with
+    #           another key, the first signature is too, and the verification fails at every level
+    #           that checks the key. Anything else, including signatures whose certificate cannot be
+    #           decoded, is left to the full verification.
+    #  @param buffer The whole document.
+    #  @type buffer memoryview | mmap.mmap
+    #  @return `False` if the document fails the verification, None if it has to be parsed.
+    #  @rtype bool | None
+    #  @exception NoSignatureFound If the document does not contain any signature dictionary.
+    #  @private
+    def _prefilter(self, buffer) -> bool | None:
+        signatures = scan_signatures(buffer)
+        if signatures is None:
+            return None
+        if not signatures:
+            # Damaged files are left to the reader, so that they keep failing with a PdfReadError
+            size = len(buffer)
+            if (b"%PDF-" in bytes(buffer[:PREFILTER_MARKER_WINDOW])
+                    and b"startxref" in bytes(buffer[max(0, size - PREFILTER_MARKER_WINDOW):])):
+                raise NoSignatureFound
+            return None
+        if self.level == VALIDATION_INTEGRITY:
+            return None
+        if all(signature.key_fingerprint is not None and signature.key_fingerprint != self._expected_fingerprint
+               for signature in signatures):
+            return False
+        return None
+
+    ## @brief Checks whether the current revision of a PDF document is already signed with the expected key.
+    #  @details Lets batch signing skip documents it has signed before. The last bytes of the document
+    #           are scanned first (see `tail_scan.py`), and only a document whose tail holds a signature
+    #           over the whole file by the expected key is parsed. Its last signature then has to cover
+    #           the entire file, hold the expected key and be intact. The level of the session is ignored.
+    #  @param inf The seekable stream of the PDF document.
+    #  @type inf BinaryIO
+    #  @return Whether the document is signed with the expected key and unchanged since.
+    #  @rtype bool
+    #  @exception PdfReadError When an error occurs while reading the PDF document
+    def is_signed_by_key(self, inf: BinaryIO) -> bool:
+        with span("verify.tail_scan"):
+            tail_signature = scan_tail(inf)
+        if tail_signature is None or tail_signature.key_fingerprint != self._expected_fingerprint:
+            return False
+
+        inf.seek(0)
+        with span("verify.pdf_parse"):
+            reader = PdfFileReader(inf, strict=False)
+            signatures = reader.embedded_signatures
+        if not signatures:
+            return False
+        sig = signatures[-1]
+        if not self._matches_expected_key(sig.signer_cert):
+            return False
+        with span("verify.validation"):
+            if sig.evaluate_signature_coverage() != SignatureCoverageLevel.ENTIRE_FILE:
+                return False
+            return _check_integrity(sig)
+
+    ## @brief Checks whether a certificate holds the expected public key.
+    #  @param asn1_cert The certificate.
+    #  @type asn1_cert asn1_x509.Certificate
+    #  @return Whether the keys match.
+    #  @rtype bool
+    #  @private
+    def _matches_expected_key(self, asn1_cert: asn1_x509.Certificate) -> bool:
+        public_key_info = asn1_cert.public_key
+        if public_key_info.algorithm != "rsa":
+            return False
+        embedded_key = public_key_info["public_key"].parsed
+        return (embedded_key["modulus"].native, embedded_key["public_exponent"].native) == self._expected_key
+
+    ## @brief Returns the validation context trusting a signing certificate, building it on first use.
+    #  @details A context built from the DSS of a document is reused for every document carrying the same
+    #           DSS, i.e. for all documents of a batch signed with `embed_dss`.
+    #  @param asn1_cert The self-signed signing certificate.
+    #  @type asn1_cert asn1_x509.Certificate
+    #  @param validation_data The DSS of the document, None if it has none.
+    #  @type validation_data ValidationData | None
+    #  @return The validation context.
+    #  @rtype ValidationContext
+    #  @private
+    def _validation_context(self, asn1_cert: asn1_x509.Certificate,
+                            validation_data: ValidationData | None = None) -> ValidationContext:
+        fingerprint = asn1_cert.sha256 if validation_data is None else asn1_cert.sha256 + validation_data.digest
+        context = self._contexts.get(fingerprint)
+        if context is None:
+            # Creating a trust root where our certificate is the root, so we can validate the self-signed certificate signature.
+            if validation_data is None:
+                context = ValidationContext(trust_roots=[asn1_cert])
+            else:
+                context = validation_data.validation_context(asn1_cert)
+            self._contexts[fingerprint] = context
+            if len(self._contexts) > self.context_cache_size:
+                self._contexts.popitem(last=False)
+        else:
+            self._contexts.move_to_end(fingerprint)
+        return context
+
+
 ## @brief Verifies the digital signature found in a PDF document against a provided public key.
 #  @details This function reads a PDF, extracts its first embedded signature, and performs two main checks:
 #           1. It compares the public key embedded in the signature's certificate with the `public_key` argument.
@@ -24,42 +287,77 @@ class NoSignatureFound(Exception):
 #           2. It validates the integrity of the signature itself using `pyhanko`'s validation mechanism.
 #              For self-signed certificates, it creates a `ValidationContext`
 #              trusting the embedded certificate itself to validate the signature.
+#           Cheaper `level`s skip some of these checks, see `VALIDATION_LEVELS`. To verify many
+#           documents, create a `VerifierSession` once instead of calling this function for each.
+#           The stages of the verification are reported as `verify.*` spans of `services.instrumentation`.
 #  @param public_key The RSA public key expected to correspond to the signature.
 #  @type public_key rsa.RSAPublicKey
 #  @param pdf_path The file system path to the PDF document whose signature is to be verified.
 #  @type pdf_path str
-#  @return `True` if the embedded public key matches the provided `public_key` AND the signature is intact
-#          Returns `False` otherwise.
+#  @param level One of `VALIDATION_LEVELS`. Defaults to `VALIDATION_FULL`.
+#  @type level str
+#  @return `True` if the embedded public key matches the provided `public_key` AND the signature passes
+#          the checks of the level. Returns `False` otherwise.
 #  @rtype bool
 #  @exception FileNotFoundError If the `pdf_path` does not exist.
+#  @exception ValueError If the validation level is unknown.
 #  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
 #  @exception PdfReadError When an error occurs during verifying or while reading the PDF file
-def verify(public_key: rsa.RSAPublicKey, pdf_path: str) -> bool:
-    with open(pdf_path, "rb") as inf:
-        reader = PdfFileReader(inf, strict=False)
-
-        signatures = reader.embedded_signatures
-        if not signatures:
-            raise NoSignatureFound
+def verify(public_key: rsa.RSAPublicKey, pdf_path: str, level: str = VALIDATION_FULL) -> bool:
+    return VerifierSession(public_key, level).verify(pdf_path)
 
-        sig = signatures[0]
 
-        # Getting the certificate and its public key from the signature:
-        asn1_cert = sig.signer_cert
-        cert_bytes = asn1_cert.dump()
-        crypto_cert = load_der_x509_certificate(cert_bytes, default_backend())
+## @brief Verifies the digital signature of a PDF document held in memory or read from a binary stream.
+#  @details Performs the same checks as `verify`, without the document having to be a file, e.g. for
+#           documents received on stdin or a socket. See `VerifierSession.verify_stream`.
+#  @param public_key The RSA public key expected to correspond to the signature.
+#  @type public_key rsa.RSAPublicKey
+#  @param source The PDF document, or a binary stream of it. Streams need not be seekable.
+#  @type source BinaryIO | bytes | bytearray | memoryview
+#  @param level One of `VALIDATION_LEVELS`. Defaults to `VALIDATION_FULL`.
+#  @type level str
+#  @param spool_threshold The size in bytes up to which a non-seekable stream is buffered in memory.
+#  @type spool_threshold int
+#  @return `True` if all checks of the level pass, `False` otherwise.
+#  @rtype bool
+#  @exception ValueError If the validation level is unknown.
+#  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
+#  @exception PdfReadError When an error occurs during verifying or while reading the PDF document
+def verify_stream(public_key: rsa.RSAPublicKey, source: BinaryIO | bytes | bytearray | memoryview,
+                  level: str = VALIDATION_FULL, spool_threshold: int = DEFAULT_SPOOL_THRESHOLD) -> bool:
+    return VerifierSession(public_key, level, spool_threshold=spool_threshold).verify_stream(source)
 
-        # Comparing the signature public key to the one the user provided:
-        embedded_pub = crypto_cert.public_key()
-        if embedded_pub.public_numbers() != public_key.public_numbers():
-            return False
 
-        # Creating a trust root where our certificate is the root, so we can validate the self-signed certificate signature.
-        vc = ValidationContext(trust_roots=[asn1_cert])
-        status = validate_pdf_signature(sig, vc)
+## @brief Verifies the digital signature of a PDF document held in memory.
+#  @details Performs the same checks as `verify` without touching the file system. `bytes` are read
+#           without copying them, see `spooling.open_document`.
+#  @param public_key The RSA public key expected to correspond to the signature.
+#  @type public_key rsa.RSAPublicKey
+#  @param data The PDF document.
+#  @type data bytes | bytearray | memoryview
+#  @param level One of `VALIDATION_LEVELS`. Defaults to `VALIDATION_FULL`.
+#  @type level str
+#  @return `True` if all checks of the level pass, `False` otherwise.
+#  @rtype bool
+#  @exception ValueError If the validation level is unknown.
+#  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
+#  @exception PdfReadError When an error occurs during verifying or while reading the PDF document
+def verify_bytes(public_key: rsa.RSAPublicKey, data: bytes | bytearray | memoryview,
+                 level: str = VALIDATION_FULL) -> bool:
+    return VerifierSession(public_key, level).verify_stream(data)
 
 
-        if status.intact:
-            return True
-        else:
-            return False
+## @brief Checks that the signed bytes are unchanged and the signature over them is valid.
+#  @details Skips the certificate path validation and the modification analysis of `validate_pdf_signature`.
+#  @param sig The embedded signature.
+#  @type sig EmbeddedPdfSignature
+#  @return Whether the digest matches and the signature is cryptographically valid.
+#  @rtype bool
+#  @private
+def _check_integrity(sig: EmbeddedPdfSignature) -> bool:
+    content_type = sig.signed_data["encap_content_info"]["content_type"].native
+    try:
+        intact, valid = validate_sig_integrity(sig.signer_info, sig.signer_cert, content_type, sig.compute_digest())
+    except SignatureValidationError:
+        return False
+    return intact and valid
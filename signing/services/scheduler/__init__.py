@@ -0,0 +1,8 @@
+from .scheduler import (SizeAwareScheduler,
+                        LANE_SMALL,
+                        LANE_LARGE,
+                        LANES,
+                        DEFAULT_SMALL_DOCUMENT_SIZE,
+                        DEFAULT_MAX_IN_FLIGHT_BYTES
+)
+from .cost import DocumentCost, estimate_cost, read_object_count, OBJECT_COST_BYTES
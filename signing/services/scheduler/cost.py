@@ -0,0 +1,90 @@
+## @file cost.py
+#  @brief Estimates the cost of signing or verifying a PDF document without parsing it.
+#  @details Both signing and verifying hash the whole file and parse the cross-reference data, so
+#           their duration grows with the file size and with the number of objects, which in turn
+#           grows with the page count. Reading the page count needs the page tree, costing about
+#           20 ms per thousand pages, as much as a good part of the signing itself. The number of
+#           objects is read from the `/Size` of the last trailer instead, which sits in the last
+#           bytes of the file or at the start of the last cross-reference stream.
+
+import os
+import re
+from dataclasses import dataclass
+from typing import BinaryIO
+
+## @var OBJECT_COST_BYTES
+#  @brief Number of file bytes taking as long to process as one object.
+#  @details Measured with `pdf_signer.sign`: about 5 ns per byte and 15-20 us per object.
+OBJECT_COST_BYTES = 4096
+
+## @var TRAILER_SCAN_SIZE
+#  @brief Number of bytes read at the end of the file and at the last cross-reference section.
+TRAILER_SCAN_SIZE = 1024
+
+## @var _SIZE_PATTERN
+#  @brief Matches the `/Size` entry of a trailer or cross-reference stream dictionary.
+_SIZE_PATTERN = re.compile(rb"/Size\s+(\d+)")
+
+## @var _STARTXREF_PATTERN
+#  @brief Matches the offset of the last cross-reference section.
+_STARTXREF_PATTERN = re.compile(rb"startxref\s+(\d+)")
+
+
+## @class DocumentCost
+#  @brief The estimated cost of processing a document.
+#  @details `size` is the file size in bytes, `objects` the number of objects declared by the last
+#           trailer, None if it could not be found.
+@dataclass(frozen=True)
+class DocumentCost:
+    size: int
+    objects: int | None = None
+
+    ## @brief The estimated cost in bytes-equivalent, the size plus `OBJECT_COST_BYTES` per object.
+    @property
+    def cost(self) -> int:
+        return self.size + OBJECT_COST_BYTES * (self.objects or 0)
+
+
+## @brief Estimates the cost of processing a PDF file.
+#  @param path The path of the PDF file.
+#  @type path str
+#  @return The estimated cost. A file that cannot be read costs nothing, so that it is handed to
+#          the workers early and fails there with the usual error.
+#  @rtype DocumentCost
+def estimate_cost(path: str) -> DocumentCost:
+    try:
+        with open(path, "rb") as f:
+            return DocumentCost(os.fstat(f.fileno()).st_size, read_object_count(f))
+    except OSError:
+        return DocumentCost(0)
+
+
+## @brief Reads the number of objects declared by the last trailer of a PDF document.
+#  @param inf The seekable stream of the PDF document. Its position is left undefined.
+#  @type inf BinaryIO
+#  @return The `/Size` of the last trailer or cross-reference stream, None if it was not found.
+#  @rtype int | None
+def read_object_count(inf: BinaryIO) -> int | None:
+    size = inf.seek(0, os.SEEK_END)
+    inf.seek(max(0, size - TRAILER_SCAN_SIZE))
+    tail = inf.read()
+
+    startxref = None
+    for match in _STARTXREF_PATTERN.finditer(tail):
+        startxref = match
+    if startxref is None:
+        return None
+    # A classic trailer follows its cross-reference table and precedes `startxref`
+    trailer = None
+    for match in _SIZE_PATTERN.finditer(tail, 0, startxref.start()):
+        trailer = match
+    if trailer is not None:
+        return int(trailer.group(1))
+
+    # A cross-reference stream starts with its dictionary
+    offset = int(startxref.group(1))
+    if offset >= size:
+        return None
+    inf.seek(offset)
+    match = _SIZE_PATTERN.search(inf.read(TRAILER_SCAN_SIZE))
+    return int(match.group(1)) if match is not None else None
@@ -0,0 +1,199 @@
+## @file scheduler.py
+#  @brief Provides a size-aware scheduler in front of the signing and verification worker pools.
+#  @details Jobs are queued with their estimated `DocumentCost` and handed to a pool through a
+#           `submit` callable returning a `Future`, e.g. `SigningPool.submit` or the `submit` of an
+#           executor running `VerifierSession.verify`. The cheapest queued job is dispatched first.
+#           Jobs up to `small_document_size` form a latency lane: they are bounded in size, do not
+#           count against the in-flight byte limit, and `reserved_small_jobs` of the in-flight jobs
+#           are kept free for them while other documents may still arrive, so a small document
+#           never waits for large ones to finish. Larger jobs are dispatched while the sizes of the
+#           large documents in flight stay within `max_in_flight_bytes`. A document larger than the
+#           limit is dispatched once no other large document is in flight, so it runs alone instead
+#           of failing. The latency of each job, from `add` until it is done, is tracked per lane.
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable
+
+from ..instrumentation import LatencyTracker
+from .cost import DocumentCost
+
+## @var LANE_SMALL
+#  @brief Name of the latency lane of small documents.
+LANE_SMALL = "small"
+
+## @var LANE_LARGE
+#  @brief Name of the lane of the other documents.
+LANE_LARGE = "large"
+
+## @var LANES
+#  @brief Names of all lanes.
+LANES = (LANE_SMALL, LANE_LARGE)
+
+## @var DEFAULT_SMALL_DOCUMENT_SIZE
+#  @brief Default highest estimated cost, in bytes, of documents in the latency lane.
+DEFAULT_SMALL_DOCUMENT_SIZE = 1024 * 1024
+
+## @var DEFAULT_MAX_IN_FLIGHT_BYTES
+#  @brief Default highest total size of the large documents in flight.
+DEFAULT_MAX_IN_FLIGHT_BYTES = 512 * 1024 * 1024
+
+
+## @class _Job
+#  @brief A queued job. Jobs are ordered by cost, then by the order they were added in.
+#  @private
+@dataclass(order=True)
+class _Job:
+    cost: int
+    sequence: int
+    size: int = field(compare=False)
+    lane: str = field(compare=False)
+    args: tuple = field(compare=False)
+    on_done: Callable[[Future], None] | None = field(compare=False)
+    added_at: float = field(compare=False)
+
+
+## @class SizeAwareScheduler
+#  @brief Orders jobs by estimated cost and limits the jobs and bytes in flight.
+class SizeAwareScheduler:
+    ## @brief Initializes the SizeAwareScheduler.
+    #  @param submit Hands a job to the pool, called with the arguments given to `add`.
+    #  @type submit Callable[..., Future]
+    #  @param max_in_flight_jobs The maximal number of jobs handed to the pool and not done yet.
+    #  @type max_in_flight_jobs int
+    #  @param max_in_flight_bytes The maximal total size of the large documents in flight.
+    #  @type max_in_flight_bytes int
+    #  @param small_document_size The highest estimated cost of the documents in the latency lane.
+    #  @type small_document_size int
+    #  @param reserved_small_jobs The number of in-flight jobs only small documents may use until
+    #                             `close` is called. Defaults to one if more than one job may be in flight.
+    #  @type reserved_small_jobs int | None
+    def __init__(self, submit: Callable[..., Future], max_in_flight_jobs: int,
+                 max_in_flight_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+                 small_document_size: int = DEFAULT_SMALL_DOCUMENT_SIZE, reserved_small_jobs: int | None = None):
+        self.max_in_flight_jobs = max(1, max_in_flight_jobs)
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.small_document_size = small_document_size
+        if reserved_small_jobs is None:
+            reserved_small_jobs = 1 if self.max_in_flight_jobs > 1 else 0
+        self.reserved_small_jobs = min(reserved_small_jobs, self.max_in_flight_jobs - 1)
+
+        self._submit = submit
+        self._condition = threading.Condition()
+        self._queues: dict[str, list[_Job]] = {lane: [] for lane in LANES}
+        self._sequence = itertools.count()
+        self._closed = False
+        self._in_flight_jobs = 0
+        self._in_flight_large_jobs = 0
+        self._in_flight_large_bytes = 0
+        self._peak_in_flight_bytes = 0
+        self._latency = {lane: LatencyTracker() for lane in LANES}
+
+    ## @brief Queues a job.
+    #  @param cost The estimated cost of the document, see `estimate_cost`.
+    #  @type cost DocumentCost
+    #  @param args The arguments passed to `submit`.
+    #  @param on_done Called with the future of the job once it is done, before the job stops
+    #                 counting as in flight.
+    #  @type on_done Callable[[Future], None] | None
+    #  @exception RuntimeError If the scheduler was closed.
+    def add(self, cost: DocumentCost, *args, on_done: Callable[[Future], None] | None = None):
+        lane = LANE_SMALL if cost.cost <= self.small_document_size else LANE_LARGE
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The scheduler is closed")
+            heapq.heappush(self._queues[lane], _Job(cost.cost, next(self._sequence), cost.size, lane, args,
+                                                    on_done, time.monotonic()))
+            self._condition.notify_all()
+
+    ## @brief Tells the scheduler that no more jobs will be added.
+    #  @details Large documents may then use the in-flight jobs reserved for small ones once the
+    #           latency lane is empty, and `run` returns once all jobs are done.
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    ## @brief Dispatches the queued jobs until the scheduler is closed and all jobs are done.
+    #  @details Jobs may be added from other threads meanwhile.
+    #  @exception Exception Whatever `submit` raises. The job is not retried.
+    def run(self):
+        while True:
+            with self._condition:
+                while (job := self._next_job()) is None:
+                    if self._closed and self._in_flight_jobs == 0 and not any(self._queues.values()):
+                        return
+                    self._condition.wait()
+            try:
+                future = self._submit(*job.args)
+            except BaseException:
+                self._release(job)
+                raise
+            future.add_done_callback(lambda f, job=job: self._finish(job, f))
+
+    ## @brief Returns the per-lane latency and the peak of the in-flight bytes.
+    #  @return A dict with a `LatencyTracker.snapshot` per lane name, `queued` (the number of jobs
+    #          not dispatched yet), `in_flight` and `peak_in_flight_bytes` (of the large documents).
+    #  @rtype dict
+    def stats(self) -> dict:
+        with self._condition:
+            queued = sum(len(queue) for queue in self._queues.values())
+            in_flight, peak = self._in_flight_jobs, self._peak_in_flight_bytes
+        return {
+            **{lane: tracker.snapshot() for lane, tracker in self._latency.items()},
+            "queued": queued,
+            "in_flight": in_flight,
+            "peak_in_flight_bytes": peak,
+        }
+
+    ## @brief Takes the next job that may be dispatched now off its queue. The lock must be held.
+    #  @return The job, counted as in flight, or None if no job may be dispatched.
+    #  @rtype _Job | None
+    #  @private
+    def _next_job(self) -> _Job | None:
+        if self._in_flight_jobs >= self.max_in_flight_jobs:
+            return None
+        small, large = self._queues[LANE_SMALL], self._queues[LANE_LARGE]
+        if small:
+            job = heapq.heappop(small)
+        elif large and self._large_job_fits(large[0]):
+            job = heapq.heappop(large)
+            self._in_flight_large_jobs += 1
+            self._in_flight_large_bytes += job.size
+            self._peak_in_flight_bytes = max(self._peak_in_flight_bytes, self._in_flight_large_bytes)
+        else:
+            return None
+        self._in_flight_jobs += 1
+        return job
+
+    ## @brief Tells whether a large job may be dispatched now. The lock must be held.
+    #  @private
+    def _large_job_fits(self, job: _Job) -> bool:
+        reserved = 0 if self._closed else self.reserved_small_jobs
+        if self._in_flight_jobs >= self.max_in_flight_jobs - reserved:
+            return False
+        return self._in_flight_large_jobs == 0 or self._in_flight_large_bytes + job.size <= self.max_in_flight_bytes
+
+    ## @brief Records the latency of a done job and passes its future on.
+    #  @private
+    def _finish(self, job: _Job, future: Future):
+        try:
+            self._latency[job.lane].record(time.monotonic() - job.added_at)
+            if job.on_done is not None:
+                job.on_done(future)
+        finally:
+            self._release(job)
+
+    ## @brief Stops counting a job as in flight.
+    #  @private
+    def _release(self, job: _Job):
+        with self._condition:
+            self._in_flight_jobs -= 1
+            if job.lane == LANE_LARGE:
+                self._in_flight_large_jobs -= 1
+                self._in_flight_large_bytes -= job.size
+            self._condition.notify_all()
@@ -0,0 +1,9 @@
+from .server import (SigningAgent,
+                     AgentAlreadyRunningException,
+                     UnknownOperationException
+)
+from .client import (SigningAgentClient,
+                     AgentNotRunningException,
+                     AgentRequestFailedException
+)
+from .protocol import default_socket_path, SOCKET_PATH_ENV_VAR
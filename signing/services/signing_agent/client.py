@@ -0,0 +1,126 @@
+## @file client.py
+#  @brief Provides a synchronous client of the signing agent.
+#  @details The client connects to the Unix domain socket of a running `SigningAgent` and sends
+#           it sign requests, so that the calling process never has to unlock the private key.
+
+import os
+import socket
+
+from .protocol import OP_PING, OP_SIGN, OP_STATS, decode_message, default_socket_path, encode_message
+
+
+## @brief Exception raised when no signing agent is listening on the socket path.
+class AgentNotRunningException(Exception):
+    pass
+
+
+## @brief Exception raised when the agent reports a failed request.
+#  @details `error_type` holds the name of the exception raised inside the agent,
+#           e.g. `PdfReadError` or `FileNotFoundError`.
+class AgentRequestFailedException(Exception):
+    def __init__(self, error_type: str, message: str):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+
+
+## @class SigningAgentClient
+#  @brief Connection to a running signing agent.
+#  @details The connection is opened lazily and reused for subsequent requests.
+#           The client can be used as a context manager that closes the connection.
+class SigningAgentClient:
+    ## @brief Initializes the SigningAgentClient.
+    #  @param socket_path The path of the agent socket. Defaults to `default_socket_path()`.
+    #  @type socket_path str | None
+    #  @param timeout The socket timeout in seconds, or None to wait indefinitely.
+    #  @type timeout float | None
+    def __init__(self, socket_path: str | None = None, timeout: float | None = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._socket = None
+        self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    ## @brief Checks that the agent responds.
+    #  @exception AgentNotRunningException If the agent cannot be reached.
+    def ping(self):
+        self._request({"op": OP_PING})
+
+    ## @brief Signs a PDF document through the agent.
+    #  @details The paths are made absolute, because the agent resolves them in its own working directory.
+    #  @param pdf_in_path The path of the PDF document to sign.
+    #  @type pdf_in_path str
+    #  @param pdf_out_path The path where the signed PDF document is saved.
+    #  @type pdf_out_path str
+    #  @return The time in seconds the request spent in the agent.
+    #  @rtype float
+    #  @exception AgentNotRunningException If the agent cannot be reached.
+    #  @exception AgentRequestFailedException If the agent failed to sign the document.
+    def sign(self, pdf_in_path: str, pdf_out_path: str) -> float:
+        response = self._request({
+            "op": OP_SIGN,
+            "input": os.path.abspath(pdf_in_path),
+            "output": os.path.abspath(pdf_out_path),
+        })
+        return response["latency"]
+
+    ## @brief Returns the queue depth and latency statistics of the agent.
+    #  @return The statistics described in `SigningAgent.stats`.
+    #  @rtype dict
+    #  @exception AgentNotRunningException If the agent cannot be reached.
+    def stats(self) -> dict:
+        return self._request({"op": OP_STATS})["stats"]
+
+    ## @brief Closes the connection to the agent.
+    def close(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+            self._socket = None
+            self._reader = None
+
+    ## @brief Sends a request and waits for its response.
+    #  @param request The request to send.
+    #  @type request dict
+    #  @return The successful response.
+    #  @rtype dict
+    #  @exception AgentNotRunningException If the agent cannot be reached or closed the connection.
+    #  @exception AgentRequestFailedException If the agent reported an error.
+    #  @private
+    def _request(self, request: dict) -> dict:
+        self._connect()
+        try:
+            self._socket.sendall(encode_message(request))
+            line = self._reader.readline()
+        except OSError as e:
+            self.close()
+            raise AgentNotRunningException(self.socket_path) from e
+        if not line:
+            self.close()
+            raise AgentNotRunningException(self.socket_path)
+
+        response = decode_message(line)
+        if not response.get("ok"):
+            raise AgentRequestFailedException(response.get("error", "Exception"), response.get("message", ""))
+        return response
+
+    ## @brief Opens the connection unless it is already open.
+    #  @exception AgentNotRunningException If nothing listens on the socket path.
+    #  @private
+    def _connect(self):
+        if self._socket is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            sock.close()
+            raise AgentNotRunningException(self.socket_path) from e
+        self._socket = sock
+        self._reader = sock.makefile("rb")
@@ -0,0 +1,73 @@
+## @file protocol.py
+#  @brief Defines the wire protocol between the signing agent and its clients.
+#  @details Every message is a single JSON object terminated by a newline. A request carries
+#           an `op` field (one of the `OP_*` constants) and its arguments, a response carries
+#           `ok` and either the result fields or `error` (the exception type name) and `message`.
+
+import json
+import os
+import tempfile
+
+## @var SOCKET_PATH_ENV_VAR
+#  @brief Environment variable holding the agent socket path, analogous to `SSH_AUTH_SOCK`.
+SOCKET_PATH_ENV_VAR = "BSK_SIGNING_AGENT_SOCK"
+
+## @var OP_PING
+#  @brief Request checking that the agent is alive.
+OP_PING = "ping"
+
+## @var OP_SIGN
+#  @brief Request signing `input` into `output`. Both are absolute paths on the agent machine.
+OP_SIGN = "sign"
+
+## @var OP_STATS
+#  @brief Request returning the queue depth and latency statistics of the agent.
+OP_STATS = "stats"
+
+## @var MAX_MESSAGE_SIZE
+#  @brief Maximal size of a single message in bytes.
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+## @brief Returns the socket path used when none is given explicitly.
+#  @details Uses `SOCKET_PATH_ENV_VAR` if set, otherwise a per-user socket in `XDG_RUNTIME_DIR`
+#           or in the temporary directory.
+#  @return The default socket path.
+#  @rtype str
+def default_socket_path() -> str:
+    path = os.environ.get(SOCKET_PATH_ENV_VAR)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"bsk-signing-agent-{os.getuid()}.sock")
+
+
+## @brief Encodes a message for sending.
+#  @param message The message to encode.
+#  @type message dict
+#  @return The newline-terminated JSON encoding of the message.
+#  @rtype bytes
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message).encode("utf-8") + b"\n"
+
+
+## @brief Decodes a received message.
+#  @param line A single newline-terminated message.
+#  @type line bytes
+#  @return The decoded message.
+#  @rtype dict
+#  @exception ValueError If the line is not a JSON object.
+def decode_message(line: bytes) -> dict:
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("Message must be a JSON object")
+    return message
+
+
+## @brief Builds an error response for the given exception.
+#  @param error The exception to report.
+#  @type error BaseException
+#  @return The error response.
+#  @rtype dict
+def error_response(error: BaseException) -> dict:
+    return {"ok": False, "error": type(error).__name__, "message": str(error)}
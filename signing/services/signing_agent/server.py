@@ -0,0 +1,274 @@
+## @file server.py
+#  @brief Provides a long-running signing agent that keeps the private key unlocked.
+#  @details Similarly to ssh-agent, the agent is started once with an already decrypted private key
+#           and serves sign requests of other processes over a Unix domain socket, so that clients do
+#           not repeat the USB scan, AES decryption and key parsing of `key_getter.get_key`.
+#           Concurrent requests are collected into micro-batches, and every batch is signed by one
+#           worker of a `SigningPool`, which loads the key once per worker.
+
+import asyncio
+import os
+import socket
+import stat
+import time
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..instrumentation import LatencyTracker
+from ..signing_pool import SigningPool
+from .protocol import (OP_PING, OP_SIGN, OP_STATS, MAX_MESSAGE_SIZE, decode_message, encode_message,
+                       error_response)
+
+## @var DEFAULT_MAX_BATCH_SIZE
+#  @brief Default maximal number of sign requests handed to a worker at once.
+DEFAULT_MAX_BATCH_SIZE = 8
+
+## @var DEFAULT_BATCH_WINDOW
+#  @brief Default time in seconds a batch waits for further requests before it is dispatched.
+DEFAULT_BATCH_WINDOW = 0.005
+
+## @var SOCKET_PERMISSIONS
+#  @brief Permissions of the socket file: only the owner may connect.
+SOCKET_PERMISSIONS = 0o600
+
+
+## @brief Exception raised when another agent is already listening on the socket path.
+class AgentAlreadyRunningException(Exception):
+    pass
+
+
+## @brief Exception raised for requests with an unknown `op`.
+class UnknownOperationException(Exception):
+    pass
+
+
+## @class SigningAgent
+#  @brief Asyncio server signing PDF documents on behalf of local clients.
+class SigningAgent:
+    ## @brief Initializes the SigningAgent.
+    #  @param private_key The unlocked RSA private key used for all signatures.
+    #  @type private_key rsa.RSAPrivateKey
+    #  @param socket_path The path of the Unix domain socket to listen on.
+    #  @type socket_path str
+    #  @param workers The number of worker processes. Defaults to the number of CPUs.
+    #  @type workers int | None
+    #  @param max_batch_size The maximal number of requests handed to a worker at once.
+    #  @type max_batch_size int
+    #  @param batch_window The time in seconds a batch waits for further requests.
+    #  @type batch_window float
+    #  @param sign_options Keyword arguments passed to every `pdf_signer.sign` call, see `SigningPool`.
+    #  @type sign_options dict | None
+    def __init__(self, private_key: rsa.RSAPrivateKey, socket_path: str, workers: int | None = None,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 sign_options: dict | None = None):
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.sign_options = sign_options
+
+        self._private_key = private_key
+        self._latency = LatencyTracker()
+        self._in_flight = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_requests = 0
+        self._started_at = None
+        self._server = None
+        self._pool = None
+        self._queue = None
+        self._worker_slots = None
+        self._batch_task = None
+        # The event loop only keeps weak references to tasks, so running batches are held here
+        self._batch_runs = set()
+
+    ## @brief Starts the worker pool and begins listening on the socket.
+    #  @exception AgentAlreadyRunningException If another agent is listening on `socket_path`.
+    async def start(self):
+        self._remove_stale_socket()
+
+        self._queue = asyncio.Queue()
+        self._worker_slots = asyncio.Semaphore(self.workers)
+        self._pool = SigningPool(self._private_key, self.workers, self.sign_options)
+
+        old_umask = os.umask(0o777 ^ SOCKET_PERMISSIONS)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path,
+                                                           limit=MAX_MESSAGE_SIZE)
+        finally:
+            os.umask(old_umask)
+
+        self._started_at = time.monotonic()
+        self._batch_task = asyncio.create_task(self._batch_loop())
+
+    ## @brief Starts the agent and serves requests until cancelled.
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    ## @brief Stops listening, shuts the worker pool down and removes the socket file.
+    #  @details Batches already handed to a worker are signed and answered before the pool is shut down.
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+        if self._batch_runs:
+            await asyncio.gather(*self._batch_runs, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    ## @brief Returns the current queue depth and latency statistics.
+    #  @return A dict with `queue_depth` (requests waiting for a worker), `in_flight`, `failed`,
+    #          `batches`, `mean_batch_size`, `uptime` and `latency` (see `LatencyTracker.snapshot`).
+    #  @rtype dict
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "failed": self._failed,
+            "batches": self._batches,
+            "mean_batch_size": self._batched_requests / self._batches if self._batches else 0.0,
+            "uptime": time.monotonic() - self._started_at if self._started_at is not None else 0.0,
+            "latency": self._latency.snapshot(),
+        }
+
+    ## @brief Removes a socket file left behind by an agent that is no longer running.
+    #  @exception AgentAlreadyRunningException If an agent still accepts connections on the socket.
+    #  @private
+    def _remove_stale_socket(self):
+        try:
+            mode = os.stat(self.socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(self.socket_path)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.socket_path)
+                return
+        raise AgentAlreadyRunningException(self.socket_path)
+
+    ## @brief Serves all requests of a single client connection, one at a time.
+    #  @param reader The stream reader of the connection.
+    #  @type reader asyncio.StreamReader
+    #  @param writer The stream writer of the connection.
+    #  @type writer asyncio.StreamWriter
+    #  @private
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self._handle_request(decode_message(line))
+                except Exception as e:
+                    response = error_response(e)
+                writer.write(encode_message(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    ## @brief Executes a single decoded request.
+    #  @param request The decoded request.
+    #  @type request dict
+    #  @return The response to send back.
+    #  @rtype dict
+    #  @exception UnknownOperationException If the request has an unknown `op`.
+    #  @private
+    async def _handle_request(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == OP_PING:
+            return {"ok": True}
+        if op == OP_STATS:
+            return {"ok": True, "stats": self.stats()}
+        if op == OP_SIGN:
+            return await self._sign(str(request["input"]), str(request["output"]))
+        raise UnknownOperationException(op)
+
+    ## @brief Queues a sign request and waits for its batch to be signed.
+    #  @param pdf_in_path The path of the PDF document to sign.
+    #  @type pdf_in_path str
+    #  @param pdf_out_path The path where the signed PDF document is saved.
+    #  @type pdf_out_path str
+    #  @return The response to send back.
+    #  @rtype dict
+    #  @private
+    async def _sign(self, pdf_in_path: str, pdf_out_path: str) -> dict:
+        received_at = time.perf_counter()
+        result = asyncio.get_running_loop().create_future()
+        await self._queue.put((pdf_in_path, pdf_out_path, result))
+        error = await result
+
+        latency = time.perf_counter() - received_at
+        self._latency.record(latency)
+        if error is not None:
+            self._failed += 1
+            error_type, message = error
+            return {"ok": False, "error": error_type, "message": message, "latency": latency}
+        return {"ok": True, "latency": latency}
+
+    ## @brief Collects queued requests into batches and dispatches them to free workers.
+    #  @details A batch is only started once a worker is free, so requests arriving while all
+    #           workers are busy accumulate in the queue and are signed together by the next free one.
+    #           A batch collected while several workers are idle is split between them.
+    #  @private
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._worker_slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Spreading the batch over all idle workers, so a burst does not end up on a single one
+            slots = 1
+            while slots < len(batch) and not self._worker_slots.locked():
+                await self._worker_slots.acquire()
+                slots += 1
+
+            for chunk in (batch[i::slots] for i in range(slots)):
+                self._batches += 1
+                self._batched_requests += len(chunk)
+                self._in_flight += len(chunk)
+                task = asyncio.create_task(self._run_batch(chunk))
+                self._batch_runs.add(task)
+                task.add_done_callback(self._batch_runs.discard)
+
+    ## @brief Signs a batch on a worker and resolves the futures of its requests.
+    #  @param batch The batch of `(pdf_in_path, pdf_out_path, future)` tuples.
+    #  @type batch list[tuple]
+    #  @private
+    async def _run_batch(self, batch: list[tuple]):
+        jobs = [(pdf_in_path, pdf_out_path) for pdf_in_path, pdf_out_path, _ in batch]
+        try:
+            errors = await asyncio.wrap_future(self._pool.submit_batch(jobs))
+        except Exception as e:
+            errors = [(type(e).__name__, str(e))] * len(batch)
+        finally:
+            self._in_flight -= len(batch)
+            self._worker_slots.release()
+
+        for (_, _, result), error in zip(batch, errors):
+            if not result.done():
+                result.set_result(error)
+
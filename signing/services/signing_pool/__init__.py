@@ -0,0 +1,9 @@
+from .pool import (SigningPool,
+                   SignedDocument,
+                   ALREADY_SIGNED_SKIP,
+                   ALREADY_SIGNED_COPY,
+                   ALREADY_SIGNED_ACTIONS,
+                   OUTCOME_SIGNED,
+                   OUTCOME_SKIPPED,
+                   OUTCOME_COPIED
+)
@@ -0,0 +1,392 @@
+## @file pool.py
+#  @brief Provides a process pool signing PDF documents with a preloaded private key.
+#  @details `pdf_signer.sign` is CPU-bound and mostly runs Python code, so parallel signing needs
+#           processes rather than threads. The key and the signing options are sent to every worker
+#           once, when the worker starts, so the individual jobs only carry the input and output paths.
+#           Jobs may ask the worker to leave documents it has already signed as they are, which makes
+#           re-running a batch idempotent. The self-signed certificate is created once per pool and
+#           shared by all signatures (see `pdf_signer.create_signing_credentials`). Documents held in
+#           memory are handed to the workers in shared memory segments (see `shared_buffers.py`), and
+#           the workers write the signed documents into shared memory as well, so that no document is
+#           pickled through the worker pipes. Documents of a `StorageBackend` are read and written by
+#           the workers themselves, each worker keeping its own copy of the backend and its connections.
+
+import io
+import os
+import shutil
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..pdf_signer import (sign, create_signing_credentials, check_signing_credentials, VerifierSession,
+                          DEFAULT_DIGEST_ALGORITHM, VALIDATION_INTEGRITY)
+from ..pdf_signer.signer import _sign_stream
+from ..storage import StorageBackend, sign_document
+from .shared_buffers import SharedBufferFullException, SharedBufferPool, SharedBufferStream
+
+## @var ALREADY_SIGNED_SKIP
+#  @brief Handling of documents already signed with the key: no output is written.
+ALREADY_SIGNED_SKIP = "skip"
+
+## @var ALREADY_SIGNED_COPY
+#  @brief Handling of documents already signed with the key: the document is copied to the output unchanged.
+ALREADY_SIGNED_COPY = "copy"
+
+## @var ALREADY_SIGNED_ACTIONS
+#  @brief Handlings of already signed documents accepted by `SigningPool.submit`.
+ALREADY_SIGNED_ACTIONS = (ALREADY_SIGNED_SKIP, ALREADY_SIGNED_COPY)
+
+## @var OUTCOME_SIGNED
+#  @brief Result of a job whose document was signed.
+OUTCOME_SIGNED = "signed"
+
+## @var OUTCOME_SKIPPED
+#  @brief Result of a job whose document was already signed with the key and was skipped.
+OUTCOME_SKIPPED = "skipped"
+
+## @var OUTCOME_COPIED
+#  @brief Result of a job whose document was already signed with the key and was copied through.
+OUTCOME_COPIED = "copied"
+
+
+## @var OUTPUT_RESERVE
+#  @brief Number of bytes reserved for the appended signature revision when a document is signed in shared memory.
+#         Outputs that do not fit are sent back through the worker pipe instead.
+OUTPUT_RESERVE = 1024 * 1024
+
+
+## @class SignedDocument
+#  @brief A document signed by `SigningPool.submit_bytes`.
+#  @details The signed bytes usually stay in a shared memory segment of the pool, `view` gives access
+#           to them without copying. `release` hands the segment back to the pool; the document must not
+#           be used afterwards. The document can be used as a context manager that releases it.
+class SignedDocument:
+    ## @brief Initializes the SignedDocument.
+    #  @param buffers The pool owning the segment.
+    #  @type buffers SharedBufferPool
+    #  @param segment The segment holding the document, or None if the document is held in `data`.
+    #  @type segment shared_memory.SharedMemory | None
+    #  @param size The size of the document in bytes.
+    #  @type size int
+    #  @param data The document if it did not fit into the segment.
+    #  @type data bytes | None
+    def __init__(self, buffers: SharedBufferPool, segment: shared_memory.SharedMemory | None, size: int,
+                 data: bytes | None = None):
+        self._buffers = buffers
+        self._segment = segment
+        self._data = data
+        self._size = size
+        self._views = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def __len__(self):
+        return self._size
+
+    ## @brief Returns a read-only view of the signed document.
+    #  @return The view, released together with the document.
+    #  @rtype memoryview
+    @property
+    def view(self) -> memoryview:
+        if self._segment is None:
+            return memoryview(self._data)
+        view = self._segment.buf[:self._size].toreadonly()
+        self._views.append(view)
+        return view
+
+    ## @brief Copies the signed document into a bytes object.
+    #  @return The signed document.
+    #  @rtype bytes
+    def tobytes(self) -> bytes:
+        if self._segment is None:
+            return self._data
+        return self._segment.buf[:self._size].tobytes()
+
+    ## @brief Hands the segment back to the pool for reuse.
+    def release(self):
+        if self._segment is not None:
+            for view in self._views:
+                view.release()
+            self._views.clear()
+            self._buffers.release(self._segment)
+            self._segment = None
+        self._data = None
+
+
+## @class SigningPool
+#  @brief Pool of worker processes running `pdf_signer.sign`.
+#  @details The pool can be used as a context manager that shuts it down.
+class SigningPool:
+    ## @brief Initializes the SigningPool and starts its workers.
+    #  @param private_key The RSA private key used for all signatures.
+    #  @type private_key rsa.RSAPrivateKey
+    #  @param workers The number of worker processes. Defaults to the number of CPUs.
+    #  @type workers int | None
+    #  @param sign_options Keyword arguments passed to every `pdf_signer.sign` call, e.g. `timestamp_policy`.
+    #                      They must be picklable. Without `credentials`, the pool creates them for the key.
+    #  @type sign_options dict | None
+    #  @param storage The backend of the documents passed to `submit_stored`. It is pickled once per worker.
+    #  @type storage StorageBackend | None
+    #  @exception ValueError If the digest algorithm of the options is unknown, or their credentials belong
+    #                       to another key or use another digest algorithm.
+    def __init__(self, private_key: rsa.RSAPrivateKey, workers: int | None = None, sign_options: dict | None = None,
+                 storage: StorageBackend | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        sign_options = dict(sign_options or {})
+        digest_algorithm = sign_options.get("digest_algorithm", DEFAULT_DIGEST_ALGORITHM)
+        if sign_options.get("credentials") is None:
+            sign_options["credentials"] = create_signing_credentials(private_key, digest_algorithm)
+        else:
+            check_signing_credentials(private_key, sign_options["credentials"], digest_algorithm)
+        key_der = private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(key_der, sign_options, storage),
+        )
+        self._buffers = SharedBufferPool(max_idle_segments=4 * self.workers)
+        self._storage = storage
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+    ## @brief Schedules signing of a single document.
+    #  @param pdf_in_path The path of the PDF document to sign.
+    #  @type pdf_in_path str
+    #  @param pdf_out_path The path where the signed PDF document is saved.
+    #  @type pdf_out_path str
+    #  @param already_signed What to do with a document whose current revision is already signed
+    #                        with the key, one of `ALREADY_SIGNED_ACTIONS`. None signs every document again.
+    #  @type already_signed str | None
+    #  @return A future resolved with one of the `OUTCOME_*` values, or with the exception raised by `pdf_signer.sign`.
+    #  @rtype Future
+    #  @exception ValueError When the handling of already signed documents is unknown
+    def submit(self, pdf_in_path: str, pdf_out_path: str, already_signed: str | None = None) -> Future:
+        if already_signed is not None and already_signed not in ALREADY_SIGNED_ACTIONS:
+            raise ValueError(f"Unknown handling of already signed documents {already_signed}")
+        return self._executor.submit(_sign_one, pdf_in_path, pdf_out_path, already_signed)
+
+    ## @brief Schedules signing of a document of the storage backend of the pool.
+    #  @param in_key The key of the PDF document to sign.
+    #  @type in_key str
+    #  @param out_key The key receiving the signed PDF document, it may be `in_key`.
+    #  @type out_key str
+    #  @param already_signed See `submit`. Copied documents are copied within the backend.
+    #  @type already_signed str | None
+    #  @return A future resolved with one of the `OUTCOME_*` values, or with the exception raised while signing.
+    #  @rtype Future
+    #  @exception ValueError When the pool has no storage backend or the handling of already signed
+    #                        documents is unknown
+    def submit_stored(self, in_key: str, out_key: str, already_signed: str | None = None) -> Future:
+        if self._storage is None:
+            raise ValueError("The pool has no storage backend")
+        if already_signed is not None and already_signed not in ALREADY_SIGNED_ACTIONS:
+            raise ValueError(f"Unknown handling of already signed documents {already_signed}")
+        return self._executor.submit(_sign_stored, in_key, out_key, already_signed)
+
+    ## @brief Schedules signing of a document held in memory.
+    #  @details The document is copied into a shared memory segment once, and the worker signs it from
+    #           there into a second segment, so neither the input nor the output is pickled. Both segments
+    #           are recycled: the input one when the job is done, the output one when the returned document
+    #           is released. Signing many documents is done by submitting them one by one, at most
+    #           a few per worker at a time to bound the memory held in segments.
+    #  @param data The PDF document.
+    #  @type data bytes | bytearray | memoryview
+    #  @return A future resolved with the `SignedDocument`, or with the exception raised while signing.
+    #  @rtype Future
+    def submit_bytes(self, data: bytes | bytearray | memoryview) -> Future:
+        with memoryview(data) as source:
+            size = source.nbytes
+            input_segment = self._buffers.acquire(size)
+            input_segment.buf[:size] = source.cast("B")
+        output_segment = self._buffers.acquire(size + OUTPUT_RESERVE)
+
+        result = Future()
+
+        def finish(future: Future):
+            self._buffers.release(input_segment)
+            error = future.exception() if not future.cancelled() else InterruptedError()
+            if error is not None:
+                self._buffers.release(output_segment)
+                result.set_exception(error)
+                return
+            output = future.result()
+            if isinstance(output, bytes):
+                self._buffers.release(output_segment)
+                result.set_result(SignedDocument(self._buffers, None, len(output), output))
+            else:
+                result.set_result(SignedDocument(self._buffers, output_segment, output))
+
+        try:
+            job = self._executor.submit(_sign_shared, input_segment.name, size, output_segment.name)
+        except BaseException:
+            self._buffers.release(input_segment)
+            self._buffers.release(output_segment)
+            raise
+        job.add_done_callback(finish)
+        return result
+
+    ## @brief Schedules signing of several documents by a single worker.
+    #  @details Failures do not stop the batch, they are reported per job instead.
+    #  @param jobs The `(pdf_in_path, pdf_out_path)` pairs to sign.
+    #  @type jobs list[tuple[str, str]]
+    #  @return A future resolved with a list holding for every job None on success,
+    #          otherwise the `(error_type, message)` of the failure.
+    #  @rtype Future
+    def submit_batch(self, jobs: list[tuple[str, str]]) -> Future:
+        return self._executor.submit(_sign_batch, jobs)
+
+    ## @brief Shuts the workers down.
+    #  @param wait Whether to wait for the running jobs to finish.
+    #  @type wait bool
+    #  @param cancel_futures Whether to cancel the jobs that have not started yet.
+    #  @type cancel_futures bool
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        self._buffers.close()
+
+
+## @var _worker_key
+#  @brief The private key loaded by `_init_worker` in every worker process.
+#  @private
+_worker_key = None
+
+## @var _worker_sign_options
+#  @brief The keyword arguments of `pdf_signer.sign` set by `_init_worker` in every worker process.
+#  @private
+_worker_sign_options = {}
+
+## @var _worker_session
+#  @brief The verifier session recognizing documents signed with `_worker_key`.
+#  @private
+_worker_session = None
+
+## @var _worker_storage
+#  @brief The storage backend unpickled by `_init_worker` in every worker process.
+#  @private
+_worker_storage = None
+
+
+## @brief Loads the private key and the signing options in a worker process.
+#  @param key_der The PKCS#8 DER encoding of the private key.
+#  @type key_der bytes
+#  @param sign_options Keyword arguments passed to every `pdf_signer.sign` call.
+#  @type sign_options dict
+#  @param storage The storage backend of the pool.
+#  @type storage StorageBackend | None
+#  @private
+def _init_worker(key_der: bytes, sign_options: dict, storage: StorageBackend | None):
+    global _worker_key, _worker_sign_options, _worker_session, _worker_storage
+    # The key was serialized from an already loaded key, checking its consistency again would only cost time
+    _worker_key = serialization.load_der_private_key(key_der, password=None, unsafe_skip_rsa_key_validation=True)
+    _worker_sign_options = sign_options
+    _worker_session = VerifierSession(_worker_key.public_key(), VALIDATION_INTEGRITY)
+    _worker_storage = storage
+
+
+## @brief Signs a single document in a worker process.
+#  @param pdf_in_path The path of the PDF document to sign.
+#  @type pdf_in_path str
+#  @param pdf_out_path The path where the signed PDF document is saved.
+#  @type pdf_out_path str
+#  @param already_signed See `SigningPool.submit`.
+#  @type already_signed str | None
+#  @return One of the `OUTCOME_*` values.
+#  @rtype str
+#  @private
+def _sign_one(pdf_in_path: str, pdf_out_path: str, already_signed: str | None = None) -> str:
+    if already_signed is not None:
+        with open(pdf_in_path, "rb") as inf:
+            signed_before = _worker_session.is_signed_by_key(inf)
+        if signed_before:
+            if already_signed == ALREADY_SIGNED_SKIP:
+                return OUTCOME_SKIPPED
+            shutil.copyfile(pdf_in_path, pdf_out_path)
+            return OUTCOME_COPIED
+    sign(_worker_key, pdf_in_path, pdf_out_path, **_worker_sign_options)
+    return OUTCOME_SIGNED
+
+
+## @brief Signs a single document of the storage backend in a worker process.
+#  @param in_key The key of the PDF document to sign.
+#  @type in_key str
+#  @param out_key The key receiving the signed PDF document.
+#  @type out_key str
+#  @param already_signed See `SigningPool.submit`.
+#  @type already_signed str | None
+#  @return One of the `OUTCOME_*` values.
+#  @rtype str
+#  @private
+def _sign_stored(in_key: str, out_key: str, already_signed: str | None = None) -> str:
+    if already_signed is not None:
+        with _worker_storage.open_read(in_key) as inf:
+            signed_before = _worker_session.is_signed_by_key(inf)
+        if signed_before:
+            if already_signed == ALREADY_SIGNED_SKIP:
+                return OUTCOME_SKIPPED
+            if out_key != in_key:
+                _worker_storage.copy(in_key, out_key)
+            return OUTCOME_COPIED
+    sign_document(_worker_key, _worker_storage, in_key, out_key, **_worker_sign_options)
+    return OUTCOME_SIGNED
+
+
+## @brief Signs a document from one shared memory segment into another in a worker process.
+#  @param input_name The name of the segment holding the PDF document.
+#  @type input_name str
+#  @param input_size The size of the PDF document in bytes.
+#  @type input_size int
+#  @param output_name The name of the segment receiving the signed PDF document.
+#  @type output_name str
+#  @return The size of the signed document, or the signed document itself if it did not fit into the output segment.
+#  @rtype int | bytes
+#  @private
+def _sign_shared(input_name: str, input_size: int, output_name: str) -> int | bytes:
+    input_segment = shared_memory.SharedMemory(input_name)
+    output_segment = shared_memory.SharedMemory(output_name)
+    try:
+        with SharedBufferStream(input_segment.buf, input_size) as inf:
+            try:
+                with SharedBufferStream(output_segment.buf) as outf:
+                    _sign_stream(_worker_key, inf, outf, **_worker_sign_options)
+                    return outf.size
+            except SharedBufferFullException:
+                inf.seek(0)
+                output = io.BytesIO()
+                _sign_stream(_worker_key, inf, output, **_worker_sign_options)
+                return output.getvalue()
+    finally:
+        input_segment.close()
+        output_segment.close()
+
+
+## @brief Signs a batch of documents in a worker process.
+#  @param jobs The `(pdf_in_path, pdf_out_path)` pairs to sign.
+#  @type jobs list[tuple[str, str]]
+#  @return For every job None on success, otherwise the `(error_type, message)` of the failure.
+#  @rtype list[tuple[str, str] | None]
+#  @private
+def _sign_batch(jobs: list[tuple[str, str]]) -> list[tuple[str, str] | None]:
+    errors = []
+    for pdf_in_path, pdf_out_path in jobs:
+        try:
+            sign(_worker_key, pdf_in_path, pdf_out_path, **_worker_sign_options)
+            errors.append(None)
+        except Exception as e:
+            errors.append((type(e).__name__, str(e)))
+    return errors
@@ -0,0 +1,182 @@
+## @file shared_buffers.py
+#  @brief Provides recycled shared memory segments and file-like access to them.
+#  @details Documents signed from memory are handed to the pool workers in `multiprocessing.shared_memory`
+#           segments instead of being pickled through the worker pipes. The segment sizes are rounded
+#           up to powers of two, so that segments of a finished job fit the next documents of a similar
+#           size and can be reused: their pages are already allocated, so a reused segment costs neither
+#           the system calls to create it nor the page faults to fill it. On Linux unused pages of a
+#           segment are not backed by memory, so the rounding does not waste any.
+
+import io
+import threading
+from multiprocessing import shared_memory
+
+## @var MIN_SEGMENT_SIZE
+#  @brief Size in bytes of the smallest segment.
+MIN_SEGMENT_SIZE = 1024 * 1024
+
+## @var DEFAULT_MAX_IDLE_SEGMENTS
+#  @brief Default number of unused segments kept for reuse.
+DEFAULT_MAX_IDLE_SEGMENTS = 8
+
+
+## @brief Exception raised when a document does not fit into its shared memory segment.
+class SharedBufferFullException(Exception):
+    pass
+
+
+## @class SharedBufferPool
+#  @brief Creates shared memory segments and keeps released ones for reuse.
+#  @details Thread-safe. The pool owns all segments it created and unlinks them when it is closed.
+class SharedBufferPool:
+    ## @brief Initializes the SharedBufferPool.
+    #  @param max_idle_segments The number of released segments kept for reuse, larger ones first.
+    #  @type max_idle_segments int
+    def __init__(self, max_idle_segments: int = DEFAULT_MAX_IDLE_SEGMENTS):
+        self.max_idle_segments = max_idle_segments
+        self._lock = threading.Lock()
+        self._idle: list[shared_memory.SharedMemory] = []
+        self._in_use: dict[str, shared_memory.SharedMemory] = {}
+        self._closed = False
+
+    ## @brief Returns a segment holding at least the given number of bytes.
+    #  @details Reuses the smallest idle segment that is large enough, or creates a new one.
+    #  @param size The number of bytes needed.
+    #  @type size int
+    #  @return The segment, to be handed back with `release`.
+    #  @rtype shared_memory.SharedMemory
+    #  @exception ValueError If the pool is closed.
+    def acquire(self, size: int) -> shared_memory.SharedMemory:
+        with self._lock:
+            if self._closed:
+                raise ValueError("The shared buffer pool is closed")
+            fitting = [segment for segment in self._idle if segment.size >= size]
+            if fitting:
+                segment = min(fitting, key=lambda s: s.size)
+                self._idle.remove(segment)
+            else:
+                segment = shared_memory.SharedMemory(create=True, size=_segment_size(size))
+            self._in_use[segment.name] = segment
+            return segment
+
+    ## @brief Hands a segment back for reuse.
+    #  @details The segment is destroyed instead if the pool is closed or already keeps enough idle segments.
+    #  @param segment A segment returned by `acquire`.
+    #  @type segment shared_memory.SharedMemory
+    def release(self, segment: shared_memory.SharedMemory):
+        with self._lock:
+            self._in_use.pop(segment.name, None)
+            if self._closed:
+                segment.close()
+                return
+            self._idle.append(segment)
+            if len(self._idle) > self.max_idle_segments:
+                # Dropping the smallest segment keeps the ones that are most expensive to recreate
+                smallest = min(self._idle, key=lambda s: s.size)
+                self._idle.remove(smallest)
+                _destroy(smallest)
+
+    ## @brief Destroys the idle segments and unlinks the ones still in use.
+    #  @details Segments in use stay mapped until they are released.
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for segment in self._idle:
+                _destroy(segment)
+            self._idle.clear()
+            for segment in self._in_use.values():
+                segment.unlink()
+
+
+## @class SharedBufferStream
+#  @brief Seekable binary stream over a shared memory buffer, readable and writable.
+#  @details The stream covers the first `size` bytes of the buffer and grows up to the length of the
+#           buffer when written past its end; writing beyond the buffer raises `SharedBufferFullException`.
+#           Reads copy only the requested bytes. Closing the stream releases its view of the buffer,
+#           which has to happen before the segment can be closed.
+class SharedBufferStream(io.RawIOBase):
+    ## @brief Initializes the SharedBufferStream.
+    #  @param buffer The buffer, e.g. `SharedMemory.buf`.
+    #  @type buffer memoryview
+    #  @param size The number of bytes of the buffer holding data. Defaults to 0, an empty stream.
+    #  @type size int
+    def __init__(self, buffer: memoryview, size: int = 0):
+        super().__init__()
+        self._view = memoryview(buffer).cast("B")
+        self._size = size
+        self._position = 0
+
+    ## @brief Returns the number of bytes of data in the stream.
+    #  @return The size.
+    #  @rtype int
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def read(self, size: int = -1) -> bytes:
+        end = self._size if size is None or size < 0 else min(self._size, self._position + size)
+        if end <= self._position:
+            return b""
+        data = self._view[self._position:end].tobytes()
+        self._position = end
+        return data
+
+    def readinto(self, buffer) -> int:
+        with memoryview(buffer) as target:
+            count = max(0, min(target.nbytes, self._size - self._position))
+            target.cast("B")[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def write(self, data) -> int:
+        with memoryview(data) as source:
+            count = source.nbytes
+            end = self._position + count
+            if end > len(self._view):
+                raise SharedBufferFullException(f"{end} bytes do not fit into a buffer of {len(self._view)} bytes")
+            self._view[self._position:end] = source.cast("B")
+        self._position = end
+        self._size = max(self._size, end)
+        return count
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+## @brief Rounds a size up to the size of the segment holding it.
+#  @private
+def _segment_size(size: int) -> int:
+    segment_size = MIN_SEGMENT_SIZE
+    while segment_size < size:
+        segment_size *= 2
+    return segment_size
+
+
+## @brief Closes and unlinks a segment.
+#  @private
+def _destroy(segment: shared_memory.SharedMemory):
+    segment.close()
+    segment.unlink()
@@ -0,0 +1,5 @@
+from .backend import StorageBackend, ObjectWriter, StorageError
+from .local import LocalStorage
+from .s3 import S3Storage
+from .urls import create_storage
+from .documents import sign_document, verify_document, list_stored_documents
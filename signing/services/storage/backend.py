@@ -0,0 +1,173 @@
+## @file backend.py
+#  @brief Defines the interface of the document storage backends.
+#  @details A backend stores documents under string keys with `/` separated parts, like the keys of
+#           an object store. Documents are read through seekable binary streams and written through
+#           `ObjectWriter` streams, which make the document visible under its key only once they are
+#           closed without an error, so readers never see a partial document. Backends are safe to
+#           use from several threads and can be pickled, e.g. to hand them to worker processes; an
+#           unpickled backend opens its own connections.
+
+import abc
+import io
+import shutil
+from typing import BinaryIO
+
+## @var COPY_CHUNK_SIZE
+#  @brief Number of bytes copied at once between two streams.
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+## @brief Exception raised when a storage backend rejects a request.
+#  @details Missing documents raise `FileNotFoundError` instead, like local files.
+class StorageError(OSError):
+    pass
+
+
+## @class ObjectWriter
+#  @brief Write-only stream committing the written document on `close`.
+#  @details Used as a context manager, the document is discarded instead if the block raises.
+class ObjectWriter(io.RawIOBase, abc.ABC):
+    # `io.RawIOBase` is implemented in C and does not refuse abstract classes by itself
+    def __new__(cls, *args, **kwargs):
+        if cls.__abstractmethods__:
+            raise TypeError(f"Can't instantiate abstract class {cls.__name__} with abstract methods "
+                            f"{', '.join(sorted(cls.__abstractmethods__))}")
+        return super().__new__(cls)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        with memoryview(data) as view:
+            self._write(view.cast("B"))
+            return view.nbytes
+
+    ## @brief Makes the written document visible under its key.
+    def close(self):
+        if not self.closed:
+            try:
+                self._commit()
+            finally:
+                super().close()
+
+    ## @brief Discards the written document, leaving the key as it was.
+    def abort(self):
+        if not self.closed:
+            try:
+                self._abort()
+            finally:
+                super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # `io.IOBase` closes streams it collects, which would commit a document nobody finished
+    def __del__(self):
+        try:
+            self.abort()
+        except Exception:
+            pass
+
+    ## @brief Writes the next bytes of the document.
+    #  @param data The bytes.
+    #  @type data memoryview
+    #  @private
+    @abc.abstractmethod
+    def _write(self, data: memoryview):
+        pass
+
+    ## @brief Makes the document visible.
+    #  @private
+    @abc.abstractmethod
+    def _commit(self):
+        pass
+
+    ## @brief Discards the document.
+    #  @private
+    @abc.abstractmethod
+    def _abort(self):
+        pass
+
+
+## @class StorageBackend
+#  @brief Stores documents under keys.
+class StorageBackend(abc.ABC):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    ## @brief Opens a document for reading.
+    #  @param key The key of the document.
+    #  @type key str
+    #  @return A seekable stream of the document. The caller has to close it.
+    #  @rtype BinaryIO
+    #  @exception FileNotFoundError If there is no document under the key.
+    @abc.abstractmethod
+    def open_read(self, key: str) -> BinaryIO:
+        pass
+
+    ## @brief Opens a document for writing.
+    #  @param key The key of the document. An existing document is replaced once the writer is closed.
+    #  @type key str
+    #  @return The writer.
+    #  @rtype ObjectWriter
+    @abc.abstractmethod
+    def open_write(self, key: str) -> ObjectWriter:
+        pass
+
+    ## @brief Returns the size of a document.
+    #  @param key The key of the document.
+    #  @type key str
+    #  @return The size in bytes.
+    #  @rtype int
+    #  @exception FileNotFoundError If there is no document under the key.
+    @abc.abstractmethod
+    def size(self, key: str) -> int:
+        pass
+
+    ## @brief Lists the keys of the documents starting with a prefix.
+    #  @param prefix The prefix of the keys, e.g. `"invoices/"`.
+    #  @type prefix str
+    #  @return The keys in lexicographic order.
+    #  @rtype list[str]
+    @abc.abstractmethod
+    def list(self, prefix: str = "") -> list[str]:
+        pass
+
+    ## @brief Deletes a document.
+    #  @param key The key of the document.
+    #  @type key str
+    #  @exception FileNotFoundError If there is no document under the key.
+    @abc.abstractmethod
+    def delete(self, key: str):
+        pass
+
+    ## @brief Returns a URI identifying a document across backends, e.g. in a journal.
+    #  @param key The key of the document.
+    #  @type key str
+    #  @return The URI.
+    #  @rtype str
+    @abc.abstractmethod
+    def uri(self, key: str) -> str:
+        pass
+
+    ## @brief Copies a document to another key of the same backend.
+    #  @param source_key The key of the document.
+    #  @type source_key str
+    #  @param target_key The key of the copy.
+    #  @type target_key str
+    #  @exception FileNotFoundError If there is no document under the source key.
+    def copy(self, source_key: str, target_key: str):
+        with self.open_read(source_key) as inf, self.open_write(target_key) as outf:
+            shutil.copyfileobj(inf, outf, COPY_CHUNK_SIZE)
+
+    ## @brief Releases the resources of the backend, e.g. its idle connections.
+    def close(self):
+        pass
@@ -0,0 +1,93 @@
+## @file documents.py
+#  @brief Signs PDF documents kept in a storage backend.
+#  @details pyhanko reads the input through the seekable stream of the backend, so a document in an
+#           object store is fetched in ranges as the signer reads it. The signer has to go back into
+#           its output to insert the signature, so the output is spooled, in memory for documents
+#           up to `DEFAULT_SPOOL_THRESHOLD` and in an anonymous file otherwise, and then streamed to
+#           the backend, which uploads it in parts. Verification reads the document in ranges too.
+
+import io
+import os
+import shutil
+from typing import Iterable
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..pdf_signer import VerifierSession
+from ..pdf_signer.signer import _sign_stream
+from ..pdf_signer.spooling import DEFAULT_SPOOL_THRESHOLD, _anonymous_file
+from .backend import COPY_CHUNK_SIZE, StorageBackend
+
+## @var PDF_SUFFIX
+#  @brief Suffix of the keys of PDF documents, compared case-insensitively.
+PDF_SUFFIX = ".pdf"
+
+
+## @brief Signs a PDF document of a storage backend.
+#  @param private_key The RSA private key object to use for signing.
+#  @type private_key rsa.RSAPrivateKey
+#  @param storage The backend holding the document.
+#  @type storage StorageBackend
+#  @param in_key The key of the document.
+#  @type in_key str
+#  @param out_key The key receiving the signed document. It may be `in_key`; the document is only
+#                 replaced once it is signed completely.
+#  @type out_key str
+#  @param sign_options Keyword arguments of `pdf_signer.sign`, e.g. `timestamp_policy`.
+#  @exception FileNotFoundError If there is no document under `in_key`.
+#  @exception StorageError If the backend rejects a request.
+#  @exception PdfReadError When an error occurs during signature or while reading the input PDF document
+def sign_document(private_key: rsa.RSAPrivateKey, storage: StorageBackend, in_key: str, out_key: str,
+                  **sign_options):
+    with storage.open_read(in_key) as inf:
+        size = inf.seek(0, os.SEEK_END)
+        inf.seek(0)
+        with io.BytesIO() if size <= DEFAULT_SPOOL_THRESHOLD else _anonymous_file() as spool:
+            _sign_stream(private_key, inf, spool, **sign_options)
+            spool.seek(0)
+            with storage.open_write(out_key) as outf:
+                shutil.copyfileobj(spool, outf, COPY_CHUNK_SIZE)
+
+
+## @brief Verifies a PDF document of a storage backend.
+#  @param session The verifier session, see `pdf_signer.VerifierSession`.
+#  @type session VerifierSession
+#  @param storage The backend holding the document.
+#  @type storage StorageBackend
+#  @param key The key of the document.
+#  @type key str
+#  @return `True` if all checks of the level of the session pass, `False` otherwise.
+#  @rtype bool
+#  @exception FileNotFoundError If there is no document under `key`.
+#  @exception StorageError If the backend rejects a request.
+#  @exception NoSignatureFound If the PDF document does not contain any embedded signatures.
+#  @exception PdfReadError When an error occurs while reading the PDF document
+def verify_document(session: VerifierSession, storage: StorageBackend, key: str) -> bool:
+    with storage.open_read(key) as inf:
+        return session.verify_stream(inf)
+
+
+## @brief Expands keys and prefixes into the PDF documents of a batch.
+#  @details Prefixes, ending with `/` or empty for the whole backend, contribute the keys of the
+#           non-hidden PDF documents below them, in key order, including those in nested "directories".
+#           Other keys are taken as they are. Every document is named by its key relative to the
+#           prefix it was listed under, so `in/2024/a.pdf` listed under `in/` is `2024/a.pdf`, and
+#           documents given as keys by their last component. `BatchSigner` writes the outputs under
+#           these names.
+#  @param storage The backend holding the documents.
+#  @type storage StorageBackend
+#  @param inputs The keys and prefixes.
+#  @type inputs Iterable[str]
+#  @return The `(key, name)` pairs of the documents.
+#  @rtype list[tuple[str, str]]
+def list_stored_documents(storage: StorageBackend, inputs: Iterable[str]) -> list[tuple[str, str]]:
+    documents = []
+    for key in inputs:
+        if key and not key.endswith("/"):
+            documents.append((key, key.rsplit("/", 1)[-1]))
+            continue
+        for listed in storage.list(key):
+            name = listed.rsplit("/", 1)[-1]
+            if name.lower().endswith(PDF_SUFFIX) and not name.startswith("."):
+                documents.append((listed, listed[len(key):]))
+    return documents
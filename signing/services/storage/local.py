@@ -0,0 +1,108 @@
+## @file local.py
+#  @brief Provides the storage backend keeping documents in a local directory.
+#  @details Keys map to paths below the root directory. Documents are written to a hidden partial
+#           file next to their final path and renamed when the writer is closed, like the outputs
+#           of `BatchSigner`.
+
+import os
+import pathlib
+import uuid
+from typing import BinaryIO
+
+from .backend import ObjectWriter, StorageBackend
+
+
+## @class LocalStorage
+#  @brief Stores documents as files below a root directory.
+class LocalStorage(StorageBackend):
+    ## @brief Initializes the LocalStorage.
+    #  @param root The root directory. It is created when the first document is written.
+    #  @type root str
+    #  @param sync Whether to sync every written document and its directory to the disk before it
+    #              becomes visible, so it survives a crash.
+    #  @type sync bool
+    def __init__(self, root: str, sync: bool = False):
+        self.root = os.path.abspath(root)
+        self.sync = sync
+
+    def open_read(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def open_write(self, key: str) -> ObjectWriter:
+        return _LocalWriter(self._path(key), self.sync)
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def list(self, prefix: str = "") -> list[str]:
+        # Only the directory holding the prefix and its subdirectories can hold matching keys
+        directory = os.path.join(self.root, *prefix.split("/")[:-1])
+        keys = []
+        for current, directories, files in os.walk(directory):
+            directories[:] = [name for name in directories if not name.startswith(".")]
+            relative = os.path.relpath(current, self.root)
+            for name in files:
+                if name.startswith("."):
+                    continue
+                key = name if relative == os.curdir else pathlib.Path(relative, name).as_posix()
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete(self, key: str):
+        os.remove(self._path(key))
+
+    def uri(self, key: str) -> str:
+        return pathlib.Path(self._path(key)).as_uri()
+
+    ## @brief Maps a key to its path.
+    #  @param key The key.
+    #  @type key str
+    #  @return The path below the root.
+    #  @rtype str
+    #  @exception ValueError If the key is empty or would leave the root directory.
+    #  @private
+    def _path(self, key: str) -> str:
+        parts = key.split("/")
+        if not key or key.startswith("/") or any(part in ("", os.curdir, os.pardir) for part in parts):
+            raise ValueError(f"Invalid document key {key!r}")
+        return os.path.join(self.root, *parts)
+
+
+## @class _LocalWriter
+#  @brief Writes a file through a hidden partial file renamed on commit.
+#  @private
+class _LocalWriter(ObjectWriter):
+    def __init__(self, path: str, sync: bool):
+        super().__init__()
+        directory, name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._partial_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.partial")
+        self._sync = sync
+        self._file = open(self._partial_path, "xb")
+
+    def _write(self, data: memoryview):
+        self._file.write(data)
+
+    def _commit(self):
+        try:
+            if self._sync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._partial_path, self._path)
+        except BaseException:
+            self._abort()
+            raise
+        if self._sync and os.name != "nt":
+            fd = os.open(os.path.dirname(self._path), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _abort(self):
+        self._file.close()
+        if os.path.exists(self._partial_path):
+            os.remove(self._partial_path)
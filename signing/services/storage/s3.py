@@ -0,0 +1,435 @@
+## @file s3.py
+#  @brief Provides the storage backend keeping documents in an S3-compatible object store.
+#  @details Requests are signed with AWS Signature Version 4 and sent over a pool of keep-alive
+#           `http.client` connections shared by all threads, like the requests of
+#           `PooledHTTPTimeStamper`. Buckets are addressed in the path style
+#           (`<endpoint>/<bucket>/<key>`), which every S3-compatible store understands. Request
+#           bodies are not hashed (`UNSIGNED-PAYLOAD`), so large uploads cost no extra pass over the data.
+#           Documents are read through ranged GET requests: opening a document fetches its last
+#           block, where a PDF reader starts, together with the document size, so a small document
+#           costs a single request. Documents are written in parts of `part_size` bytes, a document
+#           up to one part with a single PUT and larger ones with a multipart upload, so at most one
+#           part per writer is held in memory. A process forked from the one that opened the
+#           connections starts a pool of its own, as two processes must never share a keep-alive socket.
+
+import datetime
+import hashlib
+import hmac
+import http.client
+import io
+import os
+import queue
+import re
+import socket
+import threading
+import urllib.parse
+from typing import BinaryIO
+from xml.etree import ElementTree
+
+from .backend import ObjectWriter, StorageBackend, StorageError
+
+## @var DEFAULT_REGION
+#  @brief Default region of the requests, accepted by most S3-compatible stores.
+DEFAULT_REGION = "us-east-1"
+
+## @var DEFAULT_POOL_SIZE
+#  @brief Default maximal number of concurrent connections.
+DEFAULT_POOL_SIZE = 8
+
+## @var DEFAULT_TIMEOUT
+#  @brief Default timeout in seconds of a single request.
+DEFAULT_TIMEOUT = 60.0
+
+## @var DEFAULT_PART_SIZE
+#  @brief Default size in bytes of the parts of multipart uploads. S3 requires at least 5 MiB.
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+## @var DEFAULT_READ_BLOCK_SIZE
+#  @brief Default number of bytes fetched by one ranged GET request.
+DEFAULT_READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+## @var UNSIGNED_PAYLOAD
+#  @brief Payload hash of requests whose body is not covered by the signature.
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+## @var S3_XML_NAMESPACE
+#  @brief XML namespace of the S3 API responses.
+S3_XML_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+## @var _CONTENT_RANGE_PATTERN
+#  @brief Matches the `Content-Range` header of a partial response.
+_CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+## @class S3Storage
+#  @brief Stores documents as objects of a bucket of an S3-compatible object store.
+class S3Storage(StorageBackend):
+    ## @brief Initializes the S3Storage.
+    #  @param endpoint_url The URL of the object store, e.g. `http://127.0.0.1:9000`.
+    #  @type endpoint_url str
+    #  @param bucket The name of the bucket.
+    #  @type bucket str
+    #  @param access_key The access key ID. Without it the requests are sent unsigned.
+    #  @type access_key str | None
+    #  @param secret_key The secret access key.
+    #  @type secret_key str | None
+    #  @param region The region of the bucket.
+    #  @type region str
+    #  @param prefix The prefix added to all keys, e.g. `"documents/"`.
+    #  @type prefix str
+    #  @param pool_size The maximal number of concurrent connections.
+    #  @type pool_size int
+    #  @param part_size The size in bytes of the parts of multipart uploads.
+    #  @type part_size int
+    #  @param read_block_size The number of bytes fetched by one ranged GET request.
+    #  @type read_block_size int
+    #  @param timeout The timeout in seconds of a single request.
+    #  @type timeout float
+    #  @exception ValueError If the endpoint URL scheme is neither http nor https.
+    def __init__(self, endpoint_url: str, bucket: str, access_key: str | None = None, secret_key: str | None = None,
+                 region: str = DEFAULT_REGION, prefix: str = "", pool_size: int = DEFAULT_POOL_SIZE,
+                 part_size: int = DEFAULT_PART_SIZE, read_block_size: int = DEFAULT_READ_BLOCK_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        parts = urllib.parse.urlsplit(endpoint_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported object store URL {endpoint_url}")
+        self.endpoint_url = endpoint_url
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self.part_size = part_size
+        self.read_block_size = read_block_size
+        self.timeout = timeout
+        self._init_pool()
+
+    ## @brief Drops the connections and locks, which cannot be pickled.
+    def __getstate__(self) -> dict:
+        return {name: value for name, value in self.__dict__.items() if not name.startswith("_")}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._init_pool()
+
+    def open_read(self, key: str) -> BinaryIO:
+        raw = _RangeReader(self, self._object_path(key))
+        return io.BufferedReader(raw, buffer_size=self.read_block_size)
+
+    def open_write(self, key: str) -> ObjectWriter:
+        return _MultipartWriter(self, self._object_path(key))
+
+    def size(self, key: str) -> int:
+        response, _ = self.request("HEAD", self._object_path(key))
+        return int(response.getheader("Content-Length"))
+
+    def list(self, prefix: str = "") -> list[str]:
+        keys = []
+        query = {"list-type": "2", "prefix": self.prefix + prefix}
+        while True:
+            _, content = self.request("GET", self._bucket_path(), query)
+            result = ElementTree.fromstring(content)
+            keys.extend(element.text[len(self.prefix):]
+                        for element in result.iterfind(f"{S3_XML_NAMESPACE}Contents/{S3_XML_NAMESPACE}Key"))
+            token = result.findtext(f"{S3_XML_NAMESPACE}NextContinuationToken")
+            if result.findtext(f"{S3_XML_NAMESPACE}IsTruncated") != "true" or not token:
+                return sorted(keys)
+            query["continuation-token"] = token
+
+    def delete(self, key: str):
+        # Deleting a missing object succeeds in S3, the file system semantics need a check
+        self.size(key)
+        self.request("DELETE", self._object_path(key))
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self.prefix}{key}"
+
+    def copy(self, source_key: str, target_key: str):
+        # A server-side copy, limited to 5 GiB by S3
+        source = urllib.parse.quote(f"/{self.bucket}/{self.prefix}{source_key}", safe="/-_.~")
+        self.request("PUT", self._object_path(target_key), headers={"x-amz-copy-source": source})
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    ## @brief Sends a signed request over a pooled connection.
+    #  @details A request failing on a reused connection, which the server may have closed in the
+    #           meantime, is retried once on a new connection.
+    #  @param method The HTTP method.
+    #  @type method str
+    #  @param path The path of the bucket or object, already URL-encoded.
+    #  @type path str
+    #  @param query The query parameters.
+    #  @type query dict | None
+    #  @param body The request body.
+    #  @type body bytes | memoryview
+    #  @param headers Additional headers.
+    #  @type headers dict | None
+    #  @param expected_status The status codes of a successful response.
+    #  @type expected_status tuple[int, ...]
+    #  @return The response and its body.
+    #  @rtype tuple[http.client.HTTPResponse, bytes]
+    #  @exception FileNotFoundError If the object or bucket does not exist.
+    #  @exception StorageError If the request fails otherwise.
+    def request(self, method: str, path: str, query: dict | None = None, body: bytes | memoryview = b"",
+                headers: dict | None = None,
+                expected_status: tuple[int, ...] = (200, 204, 206)) -> tuple[http.client.HTTPResponse, bytes]:
+        query_string = "&".join(f"{_quote(name)}={_quote(value)}" for name, value in sorted((query or {}).items()))
+        target = self._base_path + path + (f"?{query_string}" if query_string else "")
+        headers = self._signed_headers(method, self._base_path + path, query_string, headers or {})
+        headers["Content-Length"] = str(len(body))
+
+        if self._pid != os.getpid():
+            # Forked, e.g. into a pool worker: the inherited connections belong to the parent
+            self._init_pool()
+        with self._slots:
+            try:
+                connection, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self._connect(), False
+            while True:
+                try:
+                    if connection.sock is None:
+                        connection.connect()
+                        # http.client writes a body that is not bytes apart from the headers, which
+                        # Nagle's algorithm would hold back until the server acknowledges them
+                        connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    connection.request(method, target, body, headers)
+                    response = connection.getresponse()
+                    content = response.read()
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    connection.close()
+                    if not reused:
+                        raise StorageError(f"{method} {target} failed: {e}") from e
+                    connection, reused = self._connect(), False
+            self.requests_sent += 1
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle.put(connection)
+
+        if response.status == 404:
+            raise FileNotFoundError(f"{method} {target} failed: not found")
+        # A failing CompleteMultipartUpload or server-side copy may answer 200 with an error document
+        failed_late = method in ("PUT", "POST") and content.startswith(b"<?xml") and b"<Error>" in content[:512]
+        if response.status not in expected_status or failed_late:
+            raise StorageError(f"{method} {target} failed with HTTP {response.status}: "
+                               f"{_error_message(content)}")
+        return response, content
+
+    ## @brief Creates the connection pool.
+    #  @private
+    def _init_pool(self):
+        parts = urllib.parse.urlsplit(self.endpoint_url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.netloc
+        self._base_path = parts.path.rstrip("/")
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._idle = queue.LifoQueue()
+        self._signing_keys: dict[str, bytes] = {}
+        self._pid = os.getpid()
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    ## @brief Opens a new connection to the object store.
+    #  @private
+    def _connect(self) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        return self._connection_class(self._host, timeout=self.timeout)
+
+    ## @brief Returns the URL-encoded path of the bucket.
+    #  @private
+    def _bucket_path(self) -> str:
+        return "/" + _quote(self.bucket)
+
+    ## @brief Returns the URL-encoded path of an object.
+    #  @private
+    def _object_path(self, key: str) -> str:
+        if not key:
+            raise ValueError("Invalid document key ''")
+        return f"{self._bucket_path()}/{_quote(self.prefix + key, safe='/-_.~')}"
+
+    ## @brief Adds the AWS Signature Version 4 authentication headers to the headers of a request.
+    #  @private
+    def _signed_headers(self, method: str, path: str, query_string: str, headers: dict) -> dict:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        headers = {**headers, "Host": self._host, "x-amz-date": amz_date, "x-amz-content-sha256": UNSIGNED_PAYLOAD}
+        if self.access_key is None:
+            return headers
+
+        signed = sorted((name.lower(), " ".join(str(value).split())) for name, value in headers.items())
+        signed_names = ";".join(name for name, _ in signed)
+        canonical_request = "\n".join([
+            method,
+            path or "/",
+            query_string,
+            "".join(f"{name}:{value}\n" for name, value in signed),
+            signed_names,
+            UNSIGNED_PAYLOAD,
+        ])
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope,
+                                    hashlib.sha256(canonical_request.encode()).hexdigest()])
+        signature = hmac.new(self._signing_key(amz_date[:8]), string_to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["Authorization"] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={signed_names}, Signature={signature}")
+        return headers
+
+    ## @brief Derives the signing key of a day, caching it.
+    #  @private
+    def _signing_key(self, date: str) -> bytes:
+        key = self._signing_keys.get(date)
+        if key is None:
+            key = f"AWS4{self.secret_key}".encode()
+            for part in (date, self.region, "s3", "aws4_request"):
+                key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+            self._signing_keys = {date: key}
+        return key
+
+
+## @class _RangeReader
+#  @brief Raw stream reading an object through ranged GET requests.
+#  @details Meant to be wrapped in an `io.BufferedReader`, which serves the small reads of a PDF
+#           reader from its buffer. The last block of the object is fetched when the stream is
+#           opened and kept, since a PDF reader goes back to the trailer repeatedly.
+#  @private
+class _RangeReader(io.RawIOBase):
+    def __init__(self, storage: S3Storage, path: str):
+        super().__init__()
+        self._storage = storage
+        self._path = path
+        self._position = 0
+        response, content = storage.request("GET", path, headers={"Range": f"bytes=-{storage.read_block_size}"},
+                                            expected_status=(200, 206, 416))
+        if response.status == 416:
+            # The suffix range of an empty object is not satisfiable
+            content = b""
+        match = _CONTENT_RANGE_PATTERN.fullmatch(response.getheader("Content-Range") or "")
+        # Stores may answer a range covering the whole object with the whole object
+        self._size = int(match.group(3)) if match is not None else len(content)
+        self._tail_start = self._size - len(content)
+        self._tail = content
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        with memoryview(buffer) as view:
+            view = view.cast("B")
+            start = self._position
+            end = min(self._size, start + len(view))
+            if start >= end:
+                return 0
+            if start >= self._tail_start:
+                data = memoryview(self._tail)[start - self._tail_start:end - self._tail_start]
+            else:
+                end = min(end, self._tail_start)
+                _, data = self._storage.request("GET", self._path, headers={"Range": f"bytes={start}-{end - 1}"})
+            view[:len(data)] = data
+            self._position += len(data)
+            return len(data)
+
+    # `io.RawIOBase.readall` reads in chunks of 8 KiB, one request each
+    def readall(self) -> bytes:
+        data = bytearray(max(0, self._size - self._position))
+        with memoryview(data) as view:
+            read = 0
+            while read < len(data):
+                read += self.readinto(view[read:])
+        return bytes(data)
+
+
+## @class _MultipartWriter
+#  @brief Writes an object with a single PUT, or with a multipart upload once it exceeds one part.
+#  @private
+class _MultipartWriter(ObjectWriter):
+    def __init__(self, storage: S3Storage, path: str):
+        super().__init__()
+        self._storage = storage
+        self._path = path
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._etags: list[str] = []
+
+    def _write(self, data: memoryview):
+        self._buffer += data
+        while len(self._buffer) >= self._storage.part_size:
+            part = bytes(self._buffer[:self._storage.part_size])
+            del self._buffer[:self._storage.part_size]
+            self._upload_part(part)
+
+    def _commit(self):
+        if self._upload_id is None:
+            self._storage.request("PUT", self._path, body=bytes(self._buffer))
+            return
+        try:
+            if self._buffer or not self._etags:
+                self._upload_part(bytes(self._buffer))
+            parts = "".join(f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                            for number, etag in enumerate(self._etags, 1))
+            self._storage.request("POST", self._path, {"uploadId": self._upload_id},
+                                  f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode())
+        except BaseException:
+            self._abort()
+            raise
+
+    def _abort(self):
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            upload_id, self._upload_id = self._upload_id, None
+            self._storage.request("DELETE", self._path, {"uploadId": upload_id})
+
+    ## @brief Uploads the next part, starting the multipart upload with the first one.
+    #  @private
+    def _upload_part(self, part: bytes):
+        if self._upload_id is None:
+            _, content = self._storage.request("POST", self._path, {"uploads": ""})
+            self._upload_id = ElementTree.fromstring(content).findtext(f"{S3_XML_NAMESPACE}UploadId")
+            if not self._upload_id:
+                raise StorageError(f"POST {self._path}?uploads returned no upload ID")
+        try:
+            response, _ = self._storage.request("PUT", self._path, {"partNumber": str(len(self._etags) + 1),
+                                                                    "uploadId": self._upload_id}, part)
+        except BaseException:
+            self._abort()
+            raise
+        self._etags.append(response.getheader("ETag"))
+
+
+## @brief URL-encodes a string as required by AWS Signature Version 4.
+#  @private
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return urllib.parse.quote(value, safe=safe)
+
+
+## @brief Extracts the message of an S3 error document.
+#  @private
+def _error_message(content: bytes) -> str:
+    try:
+        error = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return content[:200].decode(errors="replace")
+    return f"{error.findtext('Code')}: {error.findtext('Message')}"
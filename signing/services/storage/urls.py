@@ -0,0 +1,61 @@
+## @file urls.py
+#  @brief Creates storage backends from URLs.
+#  @details `s3://bucket/prefix/` selects an `S3Storage`. Its endpoint and credentials are read from
+#           the usual environment variables of S3 clients (`AWS_ENDPOINT_URL`, `AWS_ACCESS_KEY_ID`,
+#           `AWS_SECRET_ACCESS_KEY`, `AWS_REGION`), since they must not appear on command lines.
+#           `file:///directory` and plain paths select a `LocalStorage`.
+
+import os
+import urllib.parse
+import urllib.request
+
+from .backend import StorageBackend
+from .local import LocalStorage
+from .s3 import DEFAULT_REGION, S3Storage
+
+## @var ENDPOINT_URL_VARIABLE
+#  @brief Environment variable holding the URL of the object store.
+ENDPOINT_URL_VARIABLE = "AWS_ENDPOINT_URL"
+
+## @var ACCESS_KEY_VARIABLE
+#  @brief Environment variable holding the access key ID.
+ACCESS_KEY_VARIABLE = "AWS_ACCESS_KEY_ID"
+
+## @var SECRET_KEY_VARIABLE
+#  @brief Environment variable holding the secret access key.
+SECRET_KEY_VARIABLE = "AWS_SECRET_ACCESS_KEY"
+
+## @var REGION_VARIABLE
+#  @brief Environment variable holding the region.
+REGION_VARIABLE = "AWS_REGION"
+
+
+## @brief Creates the storage backend of a URL.
+#  @param url `s3://bucket[/prefix]`, `file:///directory` or a directory path.
+#  @type url str
+#  @param options Additional keyword arguments of the backend, e.g. `pool_size` of `S3Storage`.
+#  @return The backend.
+#  @rtype StorageBackend
+#  @exception ValueError If the URL scheme is unknown, or no object store endpoint is configured for an `s3://` URL.
+def create_storage(url: str, **options) -> StorageBackend:
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme == "s3":
+        endpoint_url = options.pop("endpoint_url", None) or os.environ.get(ENDPOINT_URL_VARIABLE)
+        if not endpoint_url:
+            raise ValueError(f"No object store endpoint given, set {ENDPOINT_URL_VARIABLE}")
+        prefix = parts.path.lstrip("/")
+        return S3Storage(
+            endpoint_url,
+            parts.netloc,
+            options.pop("access_key", None) or os.environ.get(ACCESS_KEY_VARIABLE),
+            options.pop("secret_key", None) or os.environ.get(SECRET_KEY_VARIABLE),
+            options.pop("region", None) or os.environ.get(REGION_VARIABLE, DEFAULT_REGION),
+            prefix=prefix if not prefix or prefix.endswith("/") else prefix + "/",
+            **options,
+        )
+    if parts.scheme == "file":
+        return LocalStorage(urllib.request.url2pathname(parts.path), **options)
+    if parts.scheme and len(parts.scheme) > 1:
+        raise ValueError(f"Unsupported storage URL {url}")
+    # A plain path, a one-letter scheme is a Windows drive
+    return LocalStorage(url, **options)
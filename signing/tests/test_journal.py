@@ -0,0 +1,88 @@
+## @file test_journal.py
+#  @brief Tests which documents a resumed batch run takes up again from its `BatchJournal`.
+#  @details Completed documents are skipped, failed and in-flight ones are retried, and a last
+#           record torn by a crash is ignored.
+#           Run from the `signing` directory: `python -m pytest tests` or `python -m unittest discover tests`.
+
+import os
+import tempfile
+import unittest
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from services.batch import BatchJournal, BatchSigner, read_journal, JOB_FAILED, JOB_PENDING
+from services.signing_pool import OUTCOME_COPIED, OUTCOME_SIGNED, OUTCOME_SKIPPED
+
+from test_verifier import unsigned_document
+
+## @var RECORDS
+#  @brief Records of the interrupted run by document name, the last record of `torn.pdf` is torn.
+RECORDS = [
+    ("signed.pdf", JOB_PENDING), ("signed.pdf", OUTCOME_SIGNED),
+    ("skipped.pdf", JOB_PENDING), ("skipped.pdf", OUTCOME_SKIPPED),
+    ("copied.pdf", JOB_PENDING), ("copied.pdf", OUTCOME_COPIED),
+    ("failed.pdf", JOB_PENDING), ("failed.pdf", JOB_FAILED),
+    ("in_flight.pdf", JOB_PENDING),
+    ("retried.pdf", JOB_FAILED), ("retried.pdf", JOB_PENDING), ("retried.pdf", OUTCOME_SIGNED),
+    ("torn.pdf", JOB_PENDING), ("torn.pdf", OUTCOME_SIGNED),
+]
+
+## @var COMPLETED
+#  @brief Documents the interrupted run completed.
+COMPLETED = {"signed.pdf", "skipped.pdf", "copied.pdf", "retried.pdf"}
+
+
+class BatchJournalResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.directory.name, "in")
+        os.mkdir(self.input_dir)
+        self.journal_path = os.path.join(self.directory.name, "journal.jsonl")
+        self.paths = {name: os.path.join(self.input_dir, name) for name, _ in RECORDS}
+
+        with BatchJournal(self.journal_path) as journal:
+            for name, state in RECORDS:
+                journal.record(self.paths[name], state)
+        # The crash tears the last record in the middle of the line
+        with open(self.journal_path, "rb+") as f:
+            f.truncate(os.path.getsize(self.journal_path) - 10)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_torn_last_record_is_ignored(self):
+        states = read_journal(self.journal_path)
+        self.assertEqual(states[os.path.abspath(self.paths["torn.pdf"])], JOB_PENDING)
+        self.assertEqual(len(states), len(self.paths))
+
+    def test_resume_skips_only_completed_documents(self):
+        with BatchJournal(self.journal_path, resume=True) as journal:
+            self.assertEqual({name for name, path in self.paths.items() if journal.is_completed(path)}, COMPLETED)
+            journal.record(self.paths["torn.pdf"], OUTCOME_SIGNED)
+        # The record appended after the torn line starts on a line of its own
+        self.assertEqual(read_journal(self.journal_path)[os.path.abspath(self.paths["torn.pdf"])], OUTCOME_SIGNED)
+
+    def test_resumed_batch_signs_the_remaining_documents(self):
+        for path in self.paths.values():
+            with open(path, "wb") as f:
+                f.write(unsigned_document())
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        output_dir = os.path.join(self.directory.name, "out")
+        signed = []
+
+        with BatchJournal(self.journal_path, resume=True) as journal:
+            summary = BatchSigner(private_key, output_dir, workers=1).run(
+                sorted(self.paths.values()), on_result=lambda path, outcome, error: signed.append(path),
+                journal=journal)
+
+        remaining = set(self.paths) - COMPLETED
+        self.assertEqual(summary["resumed"], len(COMPLETED))
+        self.assertEqual(summary["signed"], len(remaining))
+        self.assertEqual({os.path.basename(path) for path in signed}, remaining)
+        self.assertEqual(sorted(os.listdir(output_dir)), sorted(remaining))
+        states = read_journal(self.journal_path)
+        self.assertTrue(all(states[os.path.abspath(self.paths[name])] == OUTCOME_SIGNED for name in remaining))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+## @file test_signer.py
+#  @brief Tests that signing rejects credentials created for another key.
+#  @details Run from the `signing` directory: `python -m pytest tests` or `python -m unittest discover tests`.
+
+import unittest
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from services.pdf_signer import sign_bytes, verify_bytes, create_signing_credentials
+from services.signing_pool import SigningPool
+
+from test_verifier import unsigned_document
+
+
+class SigningCredentialsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        cls.other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def test_credentials_of_the_key_sign(self):
+        signed = sign_bytes(self.private_key, unsigned_document(),
+                            credentials=create_signing_credentials(self.private_key))
+        self.assertTrue(verify_bytes(self.private_key.public_key(), signed))
+
+    def test_credentials_of_another_key_are_rejected(self):
+        credentials = create_signing_credentials(self.other_key)
+        with self.assertRaises(ValueError):
+            sign_bytes(self.private_key, unsigned_document(), credentials=credentials)
+        # Before any worker process is started
+        with self.assertRaises(ValueError):
+            SigningPool(self.private_key, 1, {"credentials": credentials})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+## @file test_storage.py
+#  @brief Tests the storage backends, `S3Storage` against the stand-in object store of the benchmarks.
+#  @details The behaviour shared by all backends is tested for `LocalStorage` and `S3Storage` alike.
+#           The S3 tests also cover the request signing of keys and queries, the switch between a
+#           single PUT and a multipart upload at the part size, empty objects and paged listings.
+#           Run from the `signing` directory: `python -m pytest tests` or `python -m unittest discover tests`.
+
+import os
+import sys
+import tempfile
+import unittest
+
+from services.storage import LocalStorage, S3Storage, StorageError
+
+# The stand-in object store lives with the benchmarks at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from benchmarks import object_store_server
+from benchmarks.object_store_server import StandInObjectStore
+
+## @var SPECIAL_KEY
+#  @brief Key with characters that have to be URL-encoded.
+SPECIAL_KEY = "dir/a b+c=d&e~ü.pdf"
+
+## @var ACCESS_KEY
+#  @brief Access key ID of the stand-in object store.
+ACCESS_KEY = "test"
+
+## @var SECRET_KEY
+#  @brief Secret access key of the stand-in object store.
+SECRET_KEY = "test-secret"
+
+## @var PART_SIZE
+#  @brief Part size of the multipart uploads of the tests.
+PART_SIZE = 1024
+
+
+## @brief Writes a document through a backend.
+def write(storage, key: str, data: bytes):
+    with storage.open_write(key) as outf:
+        outf.write(data)
+
+
+## @brief Reads a document through a backend.
+def read(storage, key: str) -> bytes:
+    with storage.open_read(key) as inf:
+        return inf.read()
+
+
+## @class StorageBackendTests
+#  @brief Tests of the behaviour shared by all backends, mixed into one test case per backend.
+class StorageBackendTests:
+    def test_round_trip(self):
+        data = os.urandom(3 * PART_SIZE + 17)
+        write(self.storage, SPECIAL_KEY, data)
+        self.assertEqual(read(self.storage, SPECIAL_KEY), data)
+        self.assertEqual(self.storage.size(SPECIAL_KEY), len(data))
+
+    def test_seek_and_read(self):
+        data = os.urandom(2 * PART_SIZE + 5)
+        write(self.storage, "seek.pdf", data)
+        with self.storage.open_read("seek.pdf") as inf:
+            inf.seek(100)
+            self.assertEqual(inf.read(50), data[100:150])
+            inf.seek(-10, os.SEEK_END)
+            self.assertEqual(inf.read(), data[-10:])
+
+    def test_empty_document(self):
+        write(self.storage, "empty.pdf", b"")
+        self.assertEqual(read(self.storage, "empty.pdf"), b"")
+        self.assertEqual(self.storage.size("empty.pdf"), 0)
+
+    def test_replace(self):
+        write(self.storage, "doc.pdf", b"old")
+        write(self.storage, "doc.pdf", b"new")
+        self.assertEqual(read(self.storage, "doc.pdf"), b"new")
+
+    def test_aborted_write_keeps_document(self):
+        write(self.storage, "doc.pdf", b"old")
+        with self.assertRaises(RuntimeError):
+            with self.storage.open_write("doc.pdf") as outf:
+                outf.write(os.urandom(2 * PART_SIZE))
+                raise RuntimeError()
+        self.assertEqual(read(self.storage, "doc.pdf"), b"old")
+        self.assertEqual(self.storage.list(), ["doc.pdf"])
+
+    def test_list(self):
+        for key in ("in/2024/b.pdf", "in/2024/a.pdf", "in/2025/a.pdf", "inbox.pdf", SPECIAL_KEY):
+            write(self.storage, key, b"x")
+        self.assertEqual(self.storage.list("in/"), ["in/2024/a.pdf", "in/2024/b.pdf", "in/2025/a.pdf"])
+        self.assertEqual(self.storage.list("in"), ["in/2024/a.pdf", "in/2024/b.pdf", "in/2025/a.pdf", "inbox.pdf"])
+        self.assertEqual(self.storage.list("dir/a b"), [SPECIAL_KEY])
+        self.assertEqual(self.storage.list("missing/"), [])
+
+    def test_copy(self):
+        write(self.storage, SPECIAL_KEY, b"content")
+        self.storage.copy(SPECIAL_KEY, "copy/doc.pdf")
+        self.assertEqual(read(self.storage, "copy/doc.pdf"), b"content")
+
+    def test_missing_document(self):
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size("missing.pdf")
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open_read("missing.pdf")
+        with self.assertRaises(FileNotFoundError):
+            self.storage.delete("missing.pdf")
+
+    def test_delete(self):
+        write(self.storage, SPECIAL_KEY, b"x")
+        self.storage.delete(SPECIAL_KEY)
+        self.assertEqual(self.storage.list(), [])
+
+
+class LocalStorageTest(StorageBackendTests, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class S3StorageTest(StorageBackendTests, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.store = StandInObjectStore(access_key=ACCESS_KEY, secret_key=SECRET_KEY)
+        cls.store.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.close()
+
+    def setUp(self):
+        self.store.buckets.clear()
+        self.storage = S3Storage(self.store.url, "bucket", ACCESS_KEY, SECRET_KEY, prefix="documents/",
+                                 part_size=PART_SIZE, read_block_size=PART_SIZE)
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_keys_are_encoded_for_signing(self):
+        # AWS Signature Version 4 encodes every byte but the unreserved characters, except for the `/` of paths
+        self.assertEqual(self.storage._object_path(SPECIAL_KEY),
+                         "/bucket/documents/dir/a%20b%2Bc%3Dd%26e~%C3%BC.pdf")
+        write(self.storage, SPECIAL_KEY, b"x")
+        self.assertEqual(self.store.buckets["bucket"], {"documents/" + SPECIAL_KEY: b"x"})
+
+    def test_wrong_secret_key_is_rejected(self):
+        storage = S3Storage(self.store.url, "bucket", ACCESS_KEY, "wrong")
+        with self.assertRaises(StorageError):
+            storage.list()
+        storage.close()
+
+    def test_single_put_below_part_size(self):
+        self.assertEqual(self.count_requests(lambda: write(self.storage, "doc.pdf", os.urandom(PART_SIZE - 1))), 1)
+
+    def test_multipart_upload_at_part_size(self):
+        data = os.urandom(PART_SIZE)
+        # Initiate, one part, complete
+        self.assertEqual(self.count_requests(lambda: write(self.storage, "doc.pdf", data)), 3)
+        self.assertEqual(read(self.storage, "doc.pdf"), data)
+
+    def test_multipart_upload_above_part_size(self):
+        data = os.urandom(PART_SIZE + 1)
+        # Initiate, two parts, complete
+        self.assertEqual(self.count_requests(lambda: write(self.storage, "doc.pdf", data)), 4)
+        self.assertEqual(read(self.storage, "doc.pdf"), data)
+
+    def test_aborted_multipart_upload_is_discarded(self):
+        with self.assertRaises(RuntimeError):
+            with self.storage.open_write("doc.pdf") as outf:
+                outf.write(os.urandom(2 * PART_SIZE))
+                raise RuntimeError()
+        self.assertEqual(self.store._uploads, {})
+
+    def test_list_follows_continuation_tokens(self):
+        keys = [f"page/{index:02d}.pdf" for index in range(7)]
+        for key in reversed(keys):
+            write(self.storage, key, b"x")
+        max_keys = object_store_server.MAX_KEYS
+        object_store_server.MAX_KEYS = 3
+        try:
+            self.assertEqual(self.count_requests(lambda: self.assertEqual(self.storage.list("page/"), keys)), 3)
+        finally:
+            object_store_server.MAX_KEYS = max_keys
+
+    ## @brief Counts the requests the object store receives while a function runs.
+    def count_requests(self, function) -> int:
+        requests = self.store.requests
+        function()
+        return self.store.requests - requests
+
+
+if __name__ == "__main__":
+    unittest.main()
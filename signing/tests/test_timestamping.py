@@ -0,0 +1,45 @@
+## @file test_timestamping.py
+#  @brief Tests that the timestamp tokens issued by `DummyTimestamps` validate.
+#  @details `_SpanDummyTimeStamper` overrides a private method of pyhanko's `DummyTimeStamper`, so
+#           these tests guard the pyhanko range pinned in `requirements.txt`.
+#           Run from the `signing` directory: `python -m pytest tests` or `python -m unittest discover tests`.
+
+import io
+import unittest
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.sign.validation import validate_pdf_signature
+from pyhanko_certvalidator import ValidationContext
+
+from services.pdf_signer import sign_bytes, DummyTimestamps, DIGEST_ALGORITHMS
+
+from test_verifier import unsigned_document
+
+
+class DummyTimestampTokenTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def test_token_validates(self):
+        for digest_algorithm in DIGEST_ALGORITHMS:
+            with self.subTest(digest_algorithm=digest_algorithm):
+                signed = sign_bytes(self.private_key, unsigned_document(), DummyTimestamps(),
+                                    digest_algorithm=digest_algorithm)
+                sig = PdfFileReader(io.BytesIO(signed), strict=False).embedded_signatures[0]
+                # The token is issued with the self-signed signing certificate
+                context = ValidationContext(trust_roots=[sig.signer_cert], allow_fetching=False)
+                status = validate_pdf_signature(sig, signer_validation_context=context, ts_validation_context=context)
+
+                timestamp = status.timestamp_validity
+                self.assertIsNotNone(timestamp)
+                self.assertTrue(timestamp.intact)
+                self.assertTrue(timestamp.valid)
+                self.assertTrue(timestamp.trusted)
+                self.assertEqual(timestamp.md_algorithm, digest_algorithm)
+                self.assertEqual(timestamp.signing_cert.public_key.dump(), sig.signer_cert.public_key.dump())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+## @file test_verifier.py
+#  @brief Tests that tampered and modified documents fail every validation level of the verifier, and
+#         that countersigned documents pass every level.
+#  @details Run from the `signing` directory: `python -m pytest tests` or `python -m unittest discover tests`.
+
+import hashlib
+import io
+import unittest
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.pdf_utils.writer import PageObject, PdfFileWriter
+from pyhanko.sign import signers
+from pyhanko_certvalidator.registry import SimpleCertificateStore
+
+from services.pdf_signer import sign_bytes, verify_bytes, create_signing_credentials, VALIDATION_LEVELS
+
+## @var PAGE_TEXT
+#  @brief Text shown on the page of the test document.
+PAGE_TEXT = b"(Page 1)"
+
+## @var TAMPERED_TEXT
+#  @brief Text of the same length replacing `PAGE_TEXT` after signing.
+TAMPERED_TEXT = b"(Evil 1)"
+
+
+## @brief Writes a one-page unsigned PDF document with an uncompressed content stream.
+#  @return The document.
+#  @rtype bytes
+def unsigned_document() -> bytes:
+    writer = PdfFileWriter()
+    content = generic.StreamObject(stream_data=b"BT /F1 12 Tf 72 712 Td " + PAGE_TEXT + b" Tj ET")
+    writer.insert_page(PageObject(contents=writer.add_object(content),
+                                  media_box=generic.ArrayObject(generic.NumberObject(x) for x in (0, 0, 612, 792))))
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class VerifierTamperingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        cls.signed = sign_bytes(cls.private_key, unsigned_document())
+
+    def verify_all_levels(self, data: bytes) -> list[bool]:
+        return [verify_bytes(self.private_key.public_key(), data, level) for level in VALIDATION_LEVELS]
+
+    def test_signed_document_passes(self):
+        self.assertEqual(self.verify_all_levels(self.signed), [True] * len(VALIDATION_LEVELS))
+
+    def test_signed_bytes_changed_with_matching_digest_fail(self):
+        sig = PdfFileReader(io.BytesIO(self.signed), strict=False).embedded_signatures[0]
+        message_digest = next(attribute["values"][0].native for attribute in sig.signer_info["signed_attrs"]
+                              if attribute["type"].native == "message_digest")
+        tampered = bytearray(self.signed.replace(PAGE_TEXT, TAMPERED_TEXT, 1))
+        # The CMS messageDigest is made to match the changed bytes, the RSA signature over it is left stale
+        start, length, resume, rest = sig.byte_range
+        digest = hashlib.new(sig.md_algorithm, tampered[start:start + length])
+        digest.update(tampered[resume:resume + rest])
+        offset = tampered.lower().index(message_digest.hex().encode())
+        tampered[offset:offset + 2 * len(message_digest)] = digest.hexdigest().encode()
+
+        self.assertEqual(self.verify_all_levels(bytes(tampered)), [False] * len(VALIDATION_LEVELS))
+
+    def test_page_contents_replaced_after_signing_fail(self):
+        writer = IncrementalPdfFileWriter(io.BytesIO(self.signed))
+        page = writer.root["/Pages"]["/Kids"][0].get_object()
+        page["/Contents"] = writer.add_object(
+            generic.StreamObject(stream_data=b"BT /F1 12 Tf 72 712 Td " + TAMPERED_TEXT + b" Tj ET"))
+        writer.update_container(page)
+        out = io.BytesIO()
+        writer.write(out)
+
+        self.assertEqual(self.verify_all_levels(out.getvalue()), [False] * len(VALIDATION_LEVELS))
+
+    def test_countersigned_document_passes(self):
+        other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        credentials = create_signing_credentials(other_key)
+        signer = signers.SimpleSigner(signing_cert=credentials.certificate, signing_key=credentials.private_key_info,
+                                      cert_registry=SimpleCertificateStore.from_certs([credentials.certificate]))
+        countersigned = signers.sign_pdf(IncrementalPdfFileWriter(io.BytesIO(self.signed)),
+                                         signers.PdfSignatureMetadata(field_name="Countersignature"), signer=signer)
+
+        self.assertEqual(self.verify_all_levels(countersigned.getvalue()), [True] * len(VALIDATION_LEVELS))
+
+
+if __name__ == "__main__":
+    unittest.main()